@@ -1,9 +1,27 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, Response, current_app, g, jsonify, request
 from flask_cors import CORS
-import os
 import json
-import firebase_admin
-from firebase_admin import credentials, firestore
+import threading
+import time
+from typing import Dict, Any, Optional
+
+# --- Core Modules ---
+# Only modules that are cheap to import are imported here. Firebase, web3
+# (minima_bridge) and aiohttp (minima_async) are imported when the service
+# that needs them is first used, so workers start quickly and a missing
+# configuration only breaks the endpoints that depend on it.
+import minima_wallet
+from minima_nft_marketplace import NFTMarketplace
+from minima_marketplace_log import MARKETPLACE_DIR, DurableMarketplace
+from minima_bridge_queue import BRIDGE_QUEUE_PATH, BridgeQueue
+from minima_bridge_status import BridgeStatusStore, BridgeStatusFollower
+from minima_dex_router import RouteIndex
+from minima_dex_cache import ReservesCache
+from minima_dex_history import INTERVALS, RESERVE_HISTORY_DIR, ReserveHistory
+from minima_dex_stream import ReserveBroadcaster, sse_event
+from metrics import CONTENT_TYPE, REGISTRY, REQUEST_LATENCY, upstream_timer
+from providers import LazyProvider, ProviderUnavailable
+from structured_log import get_logger
 
 # --- Firebase Configuration (Provided by Canvas) ---
 __firebase_config = '{}'
@@ -12,22 +30,45 @@ __app_id = 'your-app-id'
 # Use this path for public collections, as defined by Firestore security rules.
 PUBLIC_COLLECTION_PATH = f"artifacts/{__app_id}/public/data"
 
-# --- Firebase Initialization ---
-try:
-    firebase_config = json.loads(__firebase_config)
-    cred = credentials.Certificate(firebase_config)
-    firebase_admin.initialize_app(cred)
-    print("Firebase initialized successfully.")
-except (json.JSONDecodeError, ValueError, KeyError, Exception) as e:
-    print(f"Failed to initialize Firebase: {e}")
+# Firestore rejects batched writes with more than 500 operations.
+MAX_BATCH_WRITES = 500
 
-db = firestore.client()
+log = get_logger("app")
+
+DEFAULT_CONFIG = {
+    "FIREBASE_CONFIG": __firebase_config,
+    # Creates the Firestore client instead of connect_to_firestore, e.g.
+    # firestore_stub.StubFirestoreClient for local runs and load tests.
+    "FIRESTORE_CLIENT_FACTORY": None,
+    "BRIDGE_QUEUE_PATH": BRIDGE_QUEUE_PATH,
+    "RESERVE_HISTORY_DIR": RESERVE_HISTORY_DIR,
+    # Event log and snapshots of the marketplace; one process may use it at a time.
+    # None keeps the marketplace in memory only.
+    "MARKETPLACE_DIR": MARKETPLACE_DIR,
+    # Seconds a failed service initialization is reported before it is retried.
+    "PROVIDER_RETRY_INTERVAL": 30.0,
+}
+
+
+def _server_timestamp():
+    from firebase_admin import firestore
+    return firestore.SERVER_TIMESTAMP
+
+
+def connect_to_firestore(firebase_config: str):
+    """
+    Initializes Firebase (once per process) and returns a Firestore client.
+    Raises if the configuration is invalid or the client cannot be created.
+    """
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(json.loads(firebase_config))
+        firebase_admin.initialize_app(cred)
+        log.info("firebase_initialized")
+    return firestore.client()
 
-# --- Core Modules (including new DEX class) ---
-from minima_wallet import MinimaWallet
-from minima_nft_marketplace import NFTMarketplace
-from minima_bridge import MinimaBridge
-from custom_token import CustomToken
 
 class FirestoreDEX:
     """
@@ -35,7 +76,24 @@ class FirestoreDEX:
     """
     def __init__(self, db_client):
         self.db = db_client
+        # Stand-in clients bring their own timestamp, so they run without firebase_admin installed.
+        self._server_timestamp = getattr(db_client, "server_timestamp", _server_timestamp)
         self.reserves_ref = self.db.collection(PUBLIC_COLLECTION_PATH).document('dex').collection('reserves')
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """
+        Registers a callback(token_a, token_b, reserve_a, reserve_b) that runs
+        after every successful reserve update.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, token_a, token_b, reserve_a, reserve_b):
+        for callback in self._listeners:
+            try:
+                callback(token_a, token_b, reserve_a, reserve_b)
+            except Exception as e:
+                log.error("reserve_listener_failed", pair=f"{token_a}-{token_b}", error=str(e))
 
     def update_reserves(self, token_a, token_b, reserve_a, reserve_b):
         """
@@ -44,16 +102,70 @@ class FirestoreDEX:
         """
         try:
             doc_ref = self.reserves_ref.document(f"{token_a}-{token_b}")
-            doc_ref.set({
-                "token_a": token_a,
-                "token_b": token_b,
-                "reserve_a": reserve_a,
-                "reserve_b": reserve_b,
-                "updatedAt": firestore.SERVER_TIMESTAMP
-            })
-            print(f"Reserves for {token_a}-{token_b} updated in Firestore.")
+            with upstream_timer("firestore", "set_reserves"):
+                doc_ref.set({
+                    "token_a": token_a,
+                    "token_b": token_b,
+                    "reserve_a": reserve_a,
+                    "reserve_b": reserve_b,
+                    "updatedAt": self._server_timestamp()
+                })
+            log.debug("reserves_updated", pair=f"{token_a}-{token_b}")
         except Exception as e:
-            print(f"Failed to update DEX reserves: {e}")
+            log.error("reserves_update_failed", pair=f"{token_a}-{token_b}", error=str(e))
+            return
+        self._notify(token_a, token_b, reserve_a, reserve_b)
+
+    def update_reserves_many(self, updates, failed_updates: Optional[list] = None):
+        """
+        Writes reserve updates for many pairs using Firestore batched writes.
+
+        Updates to the same pair are deduplicated so only the last one is
+        written, and writes are grouped into batches of up to MAX_BATCH_WRITES.
+
+        Args:
+            updates: An iterable of dicts with token_a, token_b, reserve_a and reserve_b.
+            failed_updates: If given, the updates of the batches that failed are appended to it.
+
+        Returns:
+            A summary with the number of pairs written, batches committed and pairs that failed.
+        """
+        latest = {}
+        for update in updates:
+            key = f"{update['token_a']}-{update['token_b']}"
+            # Re-inserting keeps the write order of the last update per pair.
+            latest.pop(key, None)
+            latest[key] = update
+
+        items = list(latest.items())
+        written = batches = failed = 0
+        for start in range(0, len(items), MAX_BATCH_WRITES):
+            chunk = items[start:start + MAX_BATCH_WRITES]
+            try:
+                batch = self.db.batch()
+                for key, update in chunk:
+                    batch.set(self.reserves_ref.document(key), {
+                        "token_a": update['token_a'],
+                        "token_b": update['token_b'],
+                        "reserve_a": update['reserve_a'],
+                        "reserve_b": update['reserve_b'],
+                        "updatedAt": self._server_timestamp()
+                    })
+                with upstream_timer("firestore", "batch_commit"):
+                    batch.commit()
+            except Exception as e:
+                log.error("reserves_batch_failed", pairs=len(chunk), error=str(e))
+                failed += len(chunk)
+                if failed_updates is not None:
+                    failed_updates.extend(update for _, update in chunk)
+                continue
+            batches += 1
+            written += len(chunk)
+            for _, update in chunk:
+                self._notify(update['token_a'], update['token_b'], update['reserve_a'], update['reserve_b'])
+
+        log.info("reserves_bulk_updated", written=written, batches=batches, failed=failed)
+        return {"written": written, "batches": batches, "failed": failed}
 
     def get_reserves(self, token_a, token_b):
         """
@@ -61,34 +173,294 @@ class FirestoreDEX:
         """
         try:
             doc_ref = self.reserves_ref.document(f"{token_a}-{token_b}")
-            doc = doc_ref.get()
+            with upstream_timer("firestore", "get_reserves"):
+                doc = doc_ref.get()
             if doc.exists:
                 return doc.to_dict()
             else:
                 return {"error": "Reserves not found for this token pair."}
         except Exception as e:
-            print(f"Failed to get DEX reserves: {e}")
+            log.error("reserves_get_failed", pair=f"{token_a}-{token_b}", error=str(e))
             return {"error": "Failed to fetch reserves from database."}
 
-# Initialize Flask and all core modules with the Firestore client
-app = Flask(__name__)
-CORS(app)
-wallet = MinimaWallet()
-marketplace = NFTMarketplace()
-bridge = MinimaBridge()
-token = CustomToken()
-dex = FirestoreDEX(db)
+    def get_all_reserves(self):
+        """
+        Retrieves every stored reserve document.
+
+        Unlike the single-pair reads this raises on a Firestore error, so the
+        route index is not built (and cached) from an empty pool list.
+        """
+        try:
+            with upstream_timer("firestore", "list_reserves"):
+                return [doc.to_dict() for doc in self.reserves_ref.stream()]
+        except Exception as e:
+            log.error("reserves_list_failed", error=str(e))
+            raise
+
+
+class Services:
+    """
+    The service objects behind the API, each created on first use.
+
+    Nothing here connects to Firestore, an EVM node or the Minima node until
+    an endpoint needs it. The DEX pieces share one FirestoreDEX: creating it
+    wires the reserves cache, the SSE broadcaster, the route index and the
+    reserve history to its update listeners.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        retry = config["PROVIDER_RETRY_INTERVAL"]
+        self._firestore = LazyProvider(
+            "Firestore", config["FIRESTORE_CLIENT_FACTORY"] or (lambda: connect_to_firestore(config["FIREBASE_CONFIG"])),
+            retry)
+        self._dex = LazyProvider("DEX", self._create_dex, retry)
+        self._reserves_cache = LazyProvider(
+            "Reserves cache", lambda: ReservesCache(self.dex, max_entries=4096, ttl=5.0), retry)
+        # The route index is built from Firestore once, on the first quote, and then
+        # kept current by the reserve listener instead of being rebuilt.
+        self._route_index = LazyProvider("Route index", self._create_route_index, retry)
+        # Reserve updates that arrive while the index is loading, replayed onto it
+        # once it is built; None when no load is running.
+        self._route_lock = threading.Lock()
+        self._route_updates: Optional[list] = None
+        self._built_route_index: Optional[RouteIndex] = None
+        self._marketplace = LazyProvider("Marketplace", lambda: self._create_marketplace(config["MARKETPLACE_DIR"]), retry)
+        # Local files, so candles can be served without Firestore.
+        self._reserve_history = LazyProvider(
+            "Reserve history", lambda: ReserveHistory(config["RESERVE_HISTORY_DIR"]), retry)
+        # Transfer statuses are mirrored from the bridge queue, which the bridge
+        # worker may be updating from another process.
+        self._bridge_status = LazyProvider(
+            "Bridge status", lambda: self._create_bridge_status(config["BRIDGE_QUEUE_PATH"]), retry)
+        self.reserve_broadcaster = ReserveBroadcaster()
+        self.bridge_status_follower: Optional[BridgeStatusFollower] = None
+        self.providers = [self._firestore, self._dex, self._reserves_cache, self._route_index,
+                          self._reserve_history, self._marketplace, self._bridge_status]
+
+    def _create_dex(self) -> FirestoreDEX:
+        dex = FirestoreDEX(self._firestore.get())
+        dex.add_listener(self._invalidate_reserves)
+        dex.add_listener(self.reserve_broadcaster.publish)
+        dex.add_listener(self._update_route_index)
+        dex.add_listener(self._record_reserves)
+        return dex
+
+    def _invalidate_reserves(self, token_a, token_b, reserve_a, reserve_b):
+        cache = self._reserves_cache.peek()
+        if cache:
+            cache.invalidate(token_a, token_b, reserve_a, reserve_b)
+
+    def _create_route_index(self) -> RouteIndex:
+        # Updates from here on may be missing from the documents read below, so
+        # they are buffered and applied on top of them.
+        with self._route_lock:
+            self._route_updates = []
+        index = RouteIndex()
+        try:
+            index.load(self.dex.get_all_reserves())
+        except Exception:
+            with self._route_lock:
+                self._route_updates = None
+            raise
+        with self._route_lock:
+            for update in self._route_updates:
+                index.update_pool(*update)
+            self._route_updates = None
+            # The provider publishes the index only once this returns.
+            self._built_route_index = index
+        return index
+
+    def _update_route_index(self, token_a, token_b, reserve_a, reserve_b):
+        index = self._route_index.peek()
+        if index is None:
+            with self._route_lock:
+                if self._route_updates is not None:
+                    self._route_updates.append((token_a, token_b, reserve_a, reserve_b))
+                    return
+                index = self._built_route_index
+        if index is not None:
+            index.update_pool(token_a, token_b, reserve_a, reserve_b)
+
+    def _record_reserves(self, token_a, token_b, reserve_a, reserve_b):
+        self.reserve_history.record(token_a, token_b, reserve_a, reserve_b)
+
+    @staticmethod
+    def _create_marketplace(directory: Optional[str]) -> NFTMarketplace:
+        # Replays the log after the latest snapshot, so listings and bids survive restarts.
+        return DurableMarketplace(directory) if directory else NFTMarketplace()
+
+    def _create_bridge_status(self, queue_path: str) -> BridgeStatusStore:
+        # Locks sent by the API are written to the queue, so they survive a restart.
+        queue = BridgeQueue(queue_path)
+        store = BridgeStatusStore(queue)
+        # Every app process follows the queue, so none of them prunes its change
+        # feed; the bridge's MintWorker trims it to a retention window.
+        self.bridge_status_follower = BridgeStatusFollower(store, queue)
+        self.bridge_status_follower.start()
+        return store
+
+    @property
+    def dex(self) -> FirestoreDEX:
+        return self._dex.get()
+
+    @property
+    def reserves_cache(self) -> ReservesCache:
+        return self._reserves_cache.get()
+
+    @property
+    def route_index(self) -> RouteIndex:
+        return self._route_index.get()
+
+    @property
+    def reserve_history(self) -> ReserveHistory:
+        return self._reserve_history.get()
+
+    @property
+    def marketplace(self) -> NFTMarketplace:
+        return self._marketplace.get()
+
+    @property
+    def bridge_status(self) -> BridgeStatusStore:
+        return self._bridge_status.get()
+
+    def status(self) -> Dict[str, str]:
+        return {provider.name: provider.status() for provider in self.providers}
+
+    def register_metrics(self, registry):
+        """
+        Exposes cache, bridge and stream counters on the registry. They are
+        read at scrape time, and services not created yet are skipped rather
+        than created.
+        """
+        def cache_lookups():
+            cache = self._reserves_cache.peek()
+            if cache:
+                stats = cache.stats()
+                for result in ("hits", "misses", "coalesced"):
+                    yield (result,), stats[result]
+
+        def cache_entries():
+            cache = self._reserves_cache.peek()
+            if cache:
+                yield (), cache.stats()["entries"]
+
+        def bridge_transfers():
+            store = self._bridge_status.peek()
+            if store:
+                yield from (((status,), count) for status, count in store.counts().items())
+
+        def subscribers():
+            yield ("reserves",), self.reserve_broadcaster.subscriber_count()
+            store = self._bridge_status.peek()
+            if store:
+                yield ("bridge",), store.subscriber_count()
+
+        registry.collected("reserves_cache_lookups", "Reserves cache lookups by result.", "counter",
+                           ("result",), cache_lookups)
+        registry.collected("reserves_cache_entries", "Pairs held in the reserves cache.", "gauge", (),
+                           cache_entries)
+        registry.collected("bridge_transfers", "Bridge transfers by status; queued and submitted are the mint backlog.",
+                           "gauge", ("status",), bridge_transfers)
+        registry.collected("sse_subscribers", "Open Server-Sent Event streams.", "gauge", ("stream",), subscribers)
+        registry.collected("service_ready", "1 once a lazily created service is up.", "gauge", ("service",),
+                           lambda: (((p.name,), int(p.initialized)) for p in self.providers))
+
+    def close(self):
+        if self.bridge_status_follower:
+            self.bridge_status_follower.stop()
+        history = self._reserve_history.peek()
+        if history:
+            history.close()
+
+
+api = Blueprint('api', __name__)
+
+
+def services() -> Services:
+    return current_app.extensions['services']
+
+
+def create_app(config: Optional[Dict[str, Any]] = None) -> Flask:
+    """
+    Creates the Flask app. Services are set up lazily, so this does no I/O.
+
+    Args:
+        config: Overrides for DEFAULT_CONFIG and any Flask settings.
+    """
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    app.config.update(config or {})
+    CORS(app)
+    app.extensions['services'] = Services(app.config)
+    app.extensions['services'].register_metrics(REGISTRY)
+    app.register_blueprint(api)
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def observe_latency(response):
+        start = g.pop('request_start', None)
+        if start is not None:
+            # The rule ("/api/bridge/status/<transaction_id>"), not the path, keeps the label set small.
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            REQUEST_LATENCY.labels(route, request.method, str(response.status_code)).observe(
+                time.perf_counter() - start)
+        return response
+
+    return app
+
+
+@api.errorhandler(ProviderUnavailable)
+def service_unavailable(e):
+    return jsonify({"error": str(e)}), 503
+
+
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Returns request, upstream, cache and queue metrics in the Prometheus text format.
+    """
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+@api.route('/api/health', methods=['GET'])
+def get_health():
+    """
+    Reports which services have been created, without creating any.
+    """
+    return jsonify(services().status())
+
 
 # --- WALLET ENDPOINTS (unchanged) ---
-@app.route('/api/wallet/balance', methods=['GET'])
+@api.route('/api/wallet/balance', methods=['GET'])
 def get_wallet_balance():
     token_id = request.args.get('token_id', '0x00')
-    balance = wallet.get_balance(token_id)
+    balance = minima_wallet.get_balance(token_id)
     if balance:
         return jsonify(balance)
     return jsonify({"error": "Failed to retrieve balance"}), 500
 
-@app.route('/api/wallet/send', methods=['POST'])
+
+@api.route('/api/wallet/balances', methods=['POST'])
+def get_wallet_balances():
+    """
+    Returns balances for many addresses, fetched concurrently from the node.
+    Expects {"addresses": [...]}; addresses that fail are listed under "errors".
+    """
+    data = request.get_json(silent=True) or {}
+    addresses = data.get('addresses')
+    if not isinstance(addresses, list) or not addresses or not all(isinstance(a, str) and a for a in addresses):
+        return jsonify({"error": "Missing addresses list"}), 400
+    if len(addresses) > 1000:
+        return jsonify({"error": "At most 1000 addresses per request"}), 400
+    # Imported here so aiohttp is only loaded by workers that serve this endpoint.
+    import minima_async
+    return jsonify(minima_async.get_balances(addresses, base_url=minima_wallet.MINIMA_API_URL))
+
+
+@api.route('/api/wallet/send', methods=['POST'])
 def send_transaction():
     data = request.get_json()
     recipient = data.get('recipient_address')
@@ -96,13 +468,119 @@ def send_transaction():
     token_id = data.get('token_id', '0x00')
     if not all([recipient, amount]):
         return jsonify({"error": "Missing recipient or amount"}), 400
-    result = wallet.send_transaction(recipient, amount, token_id)
+    result = minima_wallet.send_transaction(recipient, amount, token_id)
     if result:
         return jsonify(result)
     return jsonify({"error": "Transaction failed"}), 500
 
+
+# --- MARKETPLACE ENDPOINTS ---
+@api.route('/api/marketplace/listings', methods=['GET'])
+def get_marketplace_listings():
+    """
+    Returns one page of marketplace listings.
+    Optional query parameters: status, owner, min_price, max_price,
+    sort ('recency' or 'price'), order ('desc' or 'asc'), limit (max 200),
+    cursor (next_cursor of the previous page) and include_bids ('true' to include bids).
+    """
+    args = request.args
+    try:
+        min_price = float(args['min_price']) if args.get('min_price') else None
+        max_price = float(args['max_price']) if args.get('max_price') else None
+        limit = int(args.get('limit', 50))
+        if not 1 <= limit <= 200:
+            raise ValueError("limit must be between 1 and 200.")
+        page = services().marketplace.query_listings(
+            status=args.get('status') or None,
+            owner=args.get('owner') or None,
+            min_price=min_price,
+            max_price=max_price,
+            sort=args.get('sort', 'recency'),
+            order=args.get('order', 'desc'),
+            limit=limit,
+            cursor=args.get('cursor') or None,
+            include_bids=args.get('include_bids', '').lower() in ('1', 'true', 'yes')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(page)
+
+
+# --- BRIDGE ENDPOINTS ---
+@api.route('/api/bridge/start', methods=['POST'])
+def start_bridge():
+    """
+    Starts a transfer to the EVM side by locking funds on Minima.
+    Expects {"amount", "evm_address"} and optionally "token_id".
+    """
+    data = request.get_json(silent=True) or {}
+    amount = data.get('amount')
+    evm_address = data.get('evm_address')
+    token_id = data.get('token_id') or '0x00'
+    if not amount or not evm_address:
+        return jsonify({"error": "Missing amount or evm_address"}), 400
+    # minima_bridge loads web3, which is slow to import; only this endpoint needs it.
+    from minima_bridge import start_bridge_transfer
+    try:
+        transfer = start_bridge_transfer(services().bridge_status, evm_address, amount, token_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if "error" in transfer:
+        return jsonify(transfer), 500
+    return jsonify({"transaction": transfer})
+
+
+@api.route('/api/bridge/status/<transaction_id>', methods=['GET'])
+def get_bridge_status(transaction_id):
+    """
+    Returns the status of a transfer by its Minima lock txid or its EVM mint transaction hash.
+    """
+    transfer = services().bridge_status.get(transaction_id)
+    if transfer:
+        return jsonify({"status": transfer})
+    return jsonify({"error": "Transaction not found"}), 404
+
+
+@api.route('/api/bridge/status/stream', methods=['GET'])
+def stream_bridge_status():
+    """
+    Streams transfer status changes as Server-Sent Events.
+    Subscribe to transfers with repeated 'id' parameters (lock txids or EVM
+    hashes; their current status is sent first), or to every transfer with none.
+    """
+    transfer_ids = request.args.getlist('id')
+    bridge_status = services().bridge_status
+    subscription = bridge_status.subscribe(transfer_ids)
+
+    def events():
+        try:
+            for transfer_id in transfer_ids:
+                transfer = bridge_status.get(transfer_id)
+                if transfer:
+                    yield sse_event(transfer, event="bridge")
+            while not subscription.closed:
+                updates = subscription.get(timeout=15)
+                if not updates:
+                    yield ": keep-alive\n\n"
+                for update in updates:
+                    yield sse_event(update, event="bridge")
+        finally:
+            subscription.close()
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@api.route('/api/bridge/stats', methods=['GET'])
+def get_bridge_stats():
+    """
+    Returns the number of transfers in each status.
+    """
+    return jsonify(services().bridge_status.counts())
+
+
 # --- NEW: DEX API ENDPOINTS ---
-@app.route('/api/dex/reserves', methods=['GET'])
+@api.route('/api/dex/reserves', methods=['GET'])
 def get_dex_reserves():
     """
     Returns the current reserves for a token pair from Firestore.
@@ -113,12 +591,114 @@ def get_dex_reserves():
     if not token_a or not token_b:
         return jsonify({"error": "Missing token_a or token_b query parameter"}), 400
     
-    reserves = dex.get_reserves(token_a, token_b)
+    reserves = services().reserves_cache.get_reserves(token_a, token_b)
     if reserves:
         return jsonify({"reserves": reserves})
     return jsonify({"error": "Failed to fetch reserves"}), 500
 
-@app.route('/api/dex/update-reserves', methods=['POST'])
+
+@api.route('/api/dex/reserves/stream', methods=['GET'])
+def stream_dex_reserves():
+    """
+    Streams reserve changes as Server-Sent Events.
+    Subscribe to one pair with 'token_a' and 'token_b' (the current reserves are
+    sent first), to several with repeated 'pair' parameters ("{token_a}-{token_b}"),
+    or to every pair with no parameters.
+    """
+    token_a = request.args.get('token_a')
+    token_b = request.args.get('token_b')
+    if bool(token_a) != bool(token_b):
+        return jsonify({"error": "Missing token_a or token_b query parameter"}), 400
+    pairs = request.args.getlist('pair')
+    if token_a:
+        pairs.append(f"{token_a}-{token_b}")
+    reserves_cache = services().reserves_cache if token_a else None
+    subscription = services().reserve_broadcaster.subscribe(pairs)
+
+    def events():
+        try:
+            if token_a:
+                reserves = reserves_cache.get_reserves(token_a, token_b)
+                if reserves and "error" not in reserves:
+                    yield sse_event({"pair": f"{token_a}-{token_b}", **reserves})
+            while not subscription.closed:
+                updates = subscription.get(timeout=15)
+                if not updates:
+                    # Comment line to keep proxies from closing an idle stream.
+                    yield ": keep-alive\n\n"
+                for update in updates:
+                    yield sse_event(update)
+        finally:
+            subscription.close()
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@api.route('/api/dex/cache-stats', methods=['GET'])
+def get_dex_cache_stats():
+    """
+    Returns hit/miss counters of the reserves cache.
+    """
+    return jsonify(services().reserves_cache.stats())
+
+
+@api.route('/api/dex/candles', methods=['GET'])
+def get_dex_candles():
+    """
+    Returns OHLC candles of a pair's price (reserve_b / reserve_a) from the reserve history.
+    Requires 'token_a' and 'token_b'. 'interval' is 1m, 5m, 1h or 1d (default 1m);
+    'start' and 'end' are unix times bounding the candles' start times, and 'limit'
+    caps the candles returned (default 500, at most 5000). Without 'start', the
+    latest candles up to 'end' (default now) are returned.
+    """
+    token_a = request.args.get('token_a')
+    token_b = request.args.get('token_b')
+    if not token_a or not token_b:
+        return jsonify({"error": "Missing token_a or token_b query parameter"}), 400
+    interval = request.args.get('interval', '1m')
+    if interval not in INTERVALS:
+        return jsonify({"error": f"interval must be one of {', '.join(INTERVALS)}"}), 400
+    try:
+        start = float(request.args['start']) if 'start' in request.args else None
+        end = float(request.args['end']) if 'end' in request.args else None
+        limit = int(request.args.get('limit', 500))
+    except ValueError:
+        return jsonify({"error": "start, end and limit must be numbers"}), 400
+    if not 1 <= limit <= 5000:
+        return jsonify({"error": "limit must be between 1 and 5000"}), 400
+
+    candles = services().reserve_history.candles(token_a, token_b, interval, start, end, limit)
+    if candles is None:
+        return jsonify({"error": "No reserve history for this token pair."}), 404
+    return jsonify({"pair": f"{token_a}-{token_b}", "interval": interval, "candles": candles})
+
+
+@api.route('/api/dex/quote', methods=['GET'])
+def get_dex_quote():
+    """
+    Returns the best swap route of up to 'max_hops' pools (default 3).
+    Requires 'token_in', 'token_out' and 'amount_in' query parameters.
+    """
+    token_in = request.args.get('token_in')
+    token_out = request.args.get('token_out')
+    if not token_in or not token_out:
+        return jsonify({"error": "Missing token_in or token_out query parameter"}), 400
+    try:
+        amount_in = float(request.args.get('amount_in', ''))
+        max_hops = int(request.args.get('max_hops', 3))
+    except ValueError:
+        return jsonify({"error": "amount_in and max_hops must be numbers"}), 400
+    if not 0 < amount_in < float("inf") or not 1 <= max_hops <= 3:
+        return jsonify({"error": "amount_in must be positive and max_hops between 1 and 3"}), 400
+
+    quote = services().route_index.best_route(token_in, token_out, amount_in, max_hops)
+    if quote:
+        return jsonify({"quote": quote})
+    return jsonify({"error": "No route found for this token pair."}), 404
+
+
+@api.route('/api/dex/update-reserves', methods=['POST'])
 def update_dex_reserves():
     """
     Endpoint to manually update reserves (for testing).
@@ -133,10 +713,38 @@ def update_dex_reserves():
     if not all([token_a, token_b, reserve_a, reserve_b]):
         return jsonify({"error": "Missing required parameters"}), 400
 
-    dex.update_reserves(token_a, token_b, reserve_a, reserve_b)
+    services().dex.update_reserves(token_a, token_b, reserve_a, reserve_b)
     return jsonify({"message": "Reserves updated successfully"}), 200
 
 
+@api.route('/api/dex/update-reserves/bulk', methods=['POST'])
+def update_dex_reserves_bulk():
+    """
+    Updates reserves for many pairs in one request, e.g. all pools touched in a block.
+    Expects {"updates": [{"token_a", "token_b", "reserve_a", "reserve_b"}, ...]};
+    only the last update per pair is written.
+    """
+    data = request.get_json(silent=True) or {}
+    updates = data.get('updates')
+    if not isinstance(updates, list) or not updates:
+        return jsonify({"error": "Missing updates list"}), 400
+    for i, update in enumerate(updates):
+        if not isinstance(update, dict) or not all(update.get(field) for field in
+                                                   ('token_a', 'token_b', 'reserve_a', 'reserve_b')):
+            return jsonify({"error": f"Missing required parameters in update {i}"}), 400
+
+    result = services().dex.update_reserves_many(updates)
+    if result["failed"]:
+        return jsonify({"error": "Some reserve updates failed", **result}), 500
+    return jsonify({"message": "Reserves updated successfully", **result}), 200
+
+
+# For `flask run`, `python serve.py --app app:app` and other WSGI servers.
+app = create_app()
+
+
 if __name__ == '__main__':
-    # This is a placeholder. A real deployment would use a production-ready server.
+    # Development server only. In production run `python serve.py` (one worker; see its
+    # docstring for why this app must not run with --workers), which bounds the
+    # Firestore and Minima calls per route and drains requests on shutdown.
     app.run(debug=True, port=5000)
@@ -0,0 +1,115 @@
+"""
+Measures bridge mint throughput against a local stub EVM node.
+
+Every scenario mints the same number of locks and waits until all of them
+have a receipt:
+  - per-mint:  the original flow, one eth_getTransactionCount per mint, then
+               one receipt poll loop per transaction;
+  - threaded:  mint_on_evm from several threads at once, sharing the local
+               NonceManager and cached mint binding, with per-transaction
+               receipt polling;
+  - pipeline:  MintWorker, which signs a batch, sends it as one JSON-RPC
+               batch and polls receipts in batches.
+The stub adds a fixed latency to every HTTP request and mines with a block
+time, so round trips dominate like they do against a remote node.
+
+Run from the backend directory:
+    python benchmarks/bench_bridge_mint.py --mints 500 --latency 0.005 --block-time 1.0
+
+Example output (300 mints):
+    per-mint (original)     :   21.74s      13.8 mints/s   9.00 HTTP requests/mint  lost=0
+    mint_on_evm x8 threads  :    3.46s      86.6 mints/s   2.05 HTTP requests/mint  lost=0
+    pipeline (batch 100)    :    1.62s     184.7 mints/s   0.11 HTTP requests/mint  lost=0
+"""
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from web3 import Web3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import minima_bridge  # noqa: E402
+from evm_stub_server import start_stub_evm  # noqa: E402
+from minima_bridge import BridgeMinter, MintWorker, connect_to_evm, mint_on_evm  # noqa: E402
+from minima_bridge_queue import BridgeQueue  # noqa: E402
+
+# A well-known local development key; never use it on a real network.
+PRIVATE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+CONTRACT = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+RECIPIENT = "0x742d35Cc4A95D71C0F4A5E44007b819973E73E77".lower()
+
+
+def per_mint_original(w3, recipient, amount):
+    """The mint flow before the nonce manager: a fresh contract and nonce lookup per mint."""
+    contract = w3.eth.contract(address=CONTRACT, abi=minima_bridge.BRIDGE_CONTRACT_ABI)
+    from_address = w3.eth.account.from_key(PRIVATE_KEY).address
+    nonce = w3.eth.get_transaction_count(from_address)
+    transaction = contract.functions.mint(recipient, w3.to_wei(amount, 'ether')).build_transaction({
+        'from': from_address,
+        'nonce': nonce
+    })
+    signed_txn = w3.eth.account.sign_transaction(transaction, PRIVATE_KEY)
+    return w3.to_hex(w3.eth.send_raw_transaction(signed_txn.rawTransaction))
+
+
+def wait_for_receipts(w3, tx_hashes):
+    for tx_hash in tx_hashes:
+        w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120, poll_latency=0.1)
+
+
+def run(name, args, scenario):
+    server, url = start_stub_evm(latency=args.latency, block_time=args.block_time)
+    minima_bridge._nonce_managers.clear()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        scenario(url)
+        elapsed = time.perf_counter() - start
+    server.shutdown()
+    lost = args.mints - len(server.mints)
+    print(f"  {name:<24}: {elapsed:7.2f}s  {args.mints / elapsed:8.1f} mints/s  "
+          f"{server.http_requests / args.mints:5.2f} HTTP requests/mint  lost={lost}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mints', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.005, help='Seconds added to every HTTP request.')
+    parser.add_argument('--block-time', type=float, default=1.0)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+
+    minima_bridge.EVM_PRIVATE_KEY = PRIVATE_KEY
+    minima_bridge.BRIDGE_CONTRACT_ADDRESS = CONTRACT
+    recipient = Web3.to_checksum_address(RECIPIENT)
+
+    def per_mint(url):
+        w3 = connect_to_evm(url)
+        wait_for_receipts(w3, [per_mint_original(w3, recipient, 1.5) for _ in range(args.mints)])
+
+    def threaded(url):
+        w3 = connect_to_evm(url)
+        with ThreadPoolExecutor(args.threads) as pool:
+            tx_hashes = list(pool.map(lambda _: mint_on_evm(w3, recipient, 1.5), range(args.mints)))
+        wait_for_receipts(w3, [h for h in tx_hashes if h])
+
+    def pipeline(url):
+        queue = BridgeQueue(os.path.join(tempfile.mkdtemp(), "bridge_queue.db"))
+        queue.enqueue_many({"txid": f"0x{i:064x}", "recipient": recipient, "amount": "1.5"}
+                           for i in range(args.mints))
+        worker = MintWorker(queue, BridgeMinter(node_url=url, private_key=PRIVATE_KEY, contract_address=CONTRACT),
+                            batch_size=args.batch_size)
+        while worker.process_once() or len(worker.tracker):
+            if not worker.poll_receipts():
+                time.sleep(0.1)
+        queue.close()
+
+    print(f"mints={args.mints} latency={args.latency * 1000:.0f}ms block_time={args.block_time}s")
+    run("per-mint (original)", args, per_mint)
+    run(f"mint_on_evm x{args.threads} threads", args, threaded)
+    run(f"pipeline (batch {args.batch_size})", args, pipeline)
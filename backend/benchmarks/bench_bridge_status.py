@@ -0,0 +1,127 @@
+"""
+Measures bridge status lookups and change-feed syncing at scale.
+
+Builds a bridge queue of N transfers (most confirmed, the rest in flight),
+then:
+  - loads them into a BridgeStatusStore with a BridgeStatusFollower and
+    reports the time and the memory the store holds;
+  - times status lookups by lock txid and by EVM hash against the store and
+    against SQLite lookups on the queue (indexed by txid, scanned by hash);
+  - moves the in-flight transfers along in the queue and times the
+    follower's incremental sync and delivery to subscribers.
+
+Run from the backend directory:
+    python benchmarks/bench_bridge_status.py --transfers 300000
+
+Example output:
+    initial load          :    2.49s       120,420/s  store holds 174 MiB (609 B/transfer)
+    store by txid         :      508,772/s
+    store by EVM hash     :      279,225/s
+    SQLite by txid        :       72,860/s
+    SQLite by EVM hash    :           24/s  (no index)
+    incremental sync      :    0.41s        48,294/s  delivered 1000/1000 watched, 20000 to the all-transfers feed
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minima_bridge_queue import BridgeQueue  # noqa: E402
+from minima_bridge_status import BridgeStatusFollower, BridgeStatusStore  # noqa: E402
+
+RECIPIENT = "0x742d35Cc4A95D71C0F4A5E44007b819973E73E77"
+
+
+def txid(i):
+    return f"0x{i:064x}"
+
+
+def tx_hash(i):
+    return f"0x{2 ** 255 + i:064x}"
+
+
+def build_queue(path, transfers, in_flight):
+    queue = BridgeQueue(path)
+    step = 50_000
+    for start in range(0, transfers, step):
+        ids = range(start, min(start + step, transfers))
+        queue.enqueue_many({"txid": txid(i), "recipient": RECIPIENT, "amount": "1.5"} for i in ids)
+        queue.mark_signed_many((txid(i), i, tx_hash(i), b"") for i in ids if i >= in_flight)
+        queue.mark_confirmed_many(txid(i) for i in ids if i >= in_flight)
+    return queue
+
+
+def rate(count, elapsed):
+    return f"{count / elapsed:12,.0f}/s"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--transfers', type=int, default=300_000)
+    parser.add_argument('--in-flight', type=int, default=20_000, help='Transfers still queued when loading.')
+    parser.add_argument('--lookups', type=int, default=200_000)
+    parser.add_argument('--subscribers', type=int, default=1000, help='Clients each watching one transfer.')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bridge_queue.db")
+    start = time.perf_counter()
+    queue = build_queue(path, args.transfers, args.in_flight)
+    print(f"transfers={args.transfers} in_flight={args.in_flight} "
+          f"(queue built in {time.perf_counter() - start:.1f}s)")
+
+    # Loaded once for the memory figure (tracemalloc slows loading down), then again for the timing.
+    tracemalloc.start()
+    measured = BridgeStatusStore()
+    BridgeStatusFollower(measured, BridgeQueue(path)).poll_once()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del measured
+    store = BridgeStatusStore()
+    follower = BridgeStatusFollower(store, BridgeQueue(path))
+    start = time.perf_counter()
+    follower.poll_once()
+    elapsed = time.perf_counter() - start
+    print(f"  initial load          : {elapsed:7.2f}s  {rate(len(store), elapsed)}  "
+          f"store holds {memory / 2 ** 20:.0f} MiB ({memory / len(store):.0f} B/transfer)")
+
+    rng = random.Random(0)
+    ids = [rng.randrange(args.transfers) for _ in range(args.lookups)]
+    confirmed = [i for i in ids if i >= args.in_flight]
+    start = time.perf_counter()
+    for i in ids:
+        store.get(txid(i))
+    print(f"  store by txid         : {rate(len(ids), time.perf_counter() - start)}")
+    start = time.perf_counter()
+    for i in confirmed:
+        store.get(tx_hash(i))
+    print(f"  store by EVM hash     : {rate(len(confirmed), time.perf_counter() - start)}")
+    sample = ids[:min(len(ids), 20_000)]
+    start = time.perf_counter()
+    for i in sample:
+        queue.get(txid(i))
+    print(f"  SQLite by txid        : {rate(len(sample), time.perf_counter() - start)}")
+    sample = confirmed[:20]
+    start = time.perf_counter()
+    for i in sample:
+        queue._rows("SELECT * FROM locks WHERE tx_hash = ?", (tx_hash(i),))
+    print(f"  SQLite by EVM hash    : {rate(len(sample), time.perf_counter() - start)}  (no index)")
+
+    # Move every in-flight transfer to submitted and then confirmed while clients watch.
+    watched = [store.subscribe([txid(i)]) for i in range(min(args.subscribers, args.in_flight))]
+    everything = store.subscribe()
+    pending = range(args.in_flight)
+    queue.mark_signed_many((txid(i), i, tx_hash(i), b"") for i in pending)
+    queue.mark_submitted_many(txid(i) for i in pending)
+    queue.mark_confirmed_many(txid(i) for i in pending[::2])
+    start = time.perf_counter()
+    changed = follower.poll_once()
+    elapsed = time.perf_counter() - start
+    delivered = sum(len(subscription.get(timeout=0)) for subscription in watched)
+    print(f"  incremental sync      : {elapsed:7.2f}s  {rate(changed, elapsed)}  "
+          f"delivered {delivered}/{len(watched)} watched, {len(everything.get(timeout=0))} to the all-transfers feed")
+    print(f"  counts                : {store.counts()}")
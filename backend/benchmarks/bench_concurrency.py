@@ -0,0 +1,260 @@
+"""
+Stress-tests the DEX and marketplace under many threads and checks their invariants.
+
+Writer threads hammer one ExactDex/SimpleDex pool with swaps and a marketplace
+with bids and sales while reader threads poll prices and best bids without
+locking. Afterwards the run checks that:
+  - every swap is accounted for: the final reserves equal the initial ones
+    plus what went in minus what came out, and the pool is still on its k curve;
+  - no reader saw a torn reserve snapshot or a malformed best bid;
+  - no bid was lost: a sale saw exactly the bids that were acknowledged
+    before it, no bid was acknowledged on a sold listing, and every unsold
+    listing still holds all of its bids;
+  - the status, token and price indexes agree with the listings.
+It exits non-zero if any check fails.
+
+Throughput is timed in a separate pass without the readers, which would
+otherwise take a share of the interpreter that grows as writers are added,
+and is printed per thread count next to the speedup over one thread. On a
+CPython build with the GIL, pure-Python swaps and bids run one at a time
+however many threads there are, so the speedup stays around 1x, within
+run-to-run noise, or drops below it: extra threads add lock handoffs and
+thread switches, not parallel work. What this
+benchmark shows is that the locks keep the state consistent and what they
+cost; it prints the interpreter and CPU count so the figures can be read
+that way.
+
+Run from the backend directory:
+    python benchmarks/bench_concurrency.py --threads 1,2,4,8 --ops 20000
+"""
+import argparse
+import contextlib
+import os
+import platform
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minima_dex import ExactDex, SimpleDex, to_wei  # noqa: E402
+from minima_nft_marketplace import NFTMarketplace  # noqa: E402
+
+
+class RecordingMarketplace(NFTMarketplace):
+    """Remembers the bids each listing held at the moment it was sold."""
+
+    def __init__(self):
+        super().__init__()
+        self.sold_with = {}
+
+    def _complete_sale(self, listing_id):
+        self.sold_with[listing_id] = list(self.listings[listing_id]['bids'])
+        super()._complete_sale(listing_id)
+
+
+def run_threads(count, target):
+    failures = []
+
+    def guarded(i):
+        try:
+            target(i)
+        except Exception as e:  # Reported as an invariant failure below.
+            failures.append(f"{type(e).__name__}: {e}")
+
+    threads = [threading.Thread(target=guarded, args=(i,)) for i in range(count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, failures
+
+
+def start_readers(count, read):
+    stop = threading.Event()
+    failures = []
+
+    def loop():
+        while not stop.is_set():
+            try:
+                read()
+            except Exception as e:
+                failures.append(f"{type(e).__name__}: {e}")
+                return
+
+    threads = [threading.Thread(target=loop, daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+
+    def finish():
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return failures
+
+    return finish
+
+
+def stress_exact_dex(threads: int, ops: int, seed: int, readers: int = 2):
+    initial = to_wei(1_000_000)
+    dex = ExactDex(initial, initial)
+    k = dex.k
+    flows = [[0, 0, 0, 0] for _ in range(threads)]  # A in, A out, B in, B out
+
+    def holds_k(reserves):
+        # Without a fee every swap leaves reserve_out == k // reserve_in, like the contract.
+        a, b = reserves['tokenA'], reserves['tokenB']
+        return a == k // b or b == k // a
+
+    def read():
+        reserves = dex.reserves
+        if not holds_k(reserves):
+            raise AssertionError(f"reader saw a torn reserve snapshot: {reserves}")
+
+    def swap(i):
+        rng = random.Random(seed + i)
+        flow = flows[i]
+        for _ in range(ops // threads):
+            token_in = 'tokenA' if rng.random() < 0.5 else 'tokenB'
+            amount_in = rng.randint(1, to_wei(100))
+            amount_out = dex.swap_tokens(token_in, amount_in)['amount_out']
+            if token_in == 'tokenA':
+                flow[0] += amount_in
+                flow[3] += amount_out
+            else:
+                flow[2] += amount_in
+                flow[1] += amount_out
+
+    finish = start_readers(readers, read)
+    elapsed, failures = run_threads(threads, swap)
+    failures += finish()
+    a_in, a_out, b_in, b_out = (sum(f[j] for f in flows) for j in range(4))
+    if dex.reserves['tokenA'] != initial + a_in - a_out or dex.reserves['tokenB'] != initial + b_in - b_out:
+        failures.append(f"lost swap: reserves {dex.reserves} do not match the swap flows")
+    if not holds_k(dex.reserves):
+        failures.append("k not conserved")
+    return elapsed, failures
+
+
+def stress_simple_dex(threads: int, ops: int, seed: int, readers: int = 2):
+    initial = 1_000_000.0
+    dex = SimpleDex(initial, initial)
+    net = [[0.0, 0.0] for _ in range(threads)]
+
+    def read():
+        reserves = dex.reserves
+        if abs(reserves['tokenA'] * reserves['tokenB'] / dex.k - 1) > 1e-9:
+            raise AssertionError(f"reader saw a torn reserve snapshot: {reserves}")
+
+    def swap(i):
+        rng = random.Random(seed + i)
+        for _ in range(ops // threads):
+            token_in = 'tokenA' if rng.random() < 0.5 else 'tokenB'
+            amount_in = rng.uniform(1, 100)
+            amount_out = dex.swap_tokens(token_in, amount_in)['amount_out']
+            side = 0 if token_in == 'tokenA' else 1
+            net[i][side] += amount_in
+            net[i][1 - side] -= amount_out
+
+    finish = start_readers(readers, read)
+    elapsed, failures = run_threads(threads, swap)
+    failures += finish()
+    for side, token in enumerate(('tokenA', 'tokenB')):
+        expected = initial + sum(n[side] for n in net)
+        if abs(dex.reserves[token] - expected) > 1e-6 * initial:
+            failures.append(f"lost swap: {token} reserve {dex.reserves[token]} != {expected}")
+    if abs(dex.reserves['tokenA'] * dex.reserves['tokenB'] / dex.k - 1) > 1e-9:
+        failures.append("k not conserved")
+    return elapsed, failures
+
+
+def stress_marketplace(threads: int, ops: int, seed: int, num_listings: int, readers: int = 2):
+    marketplace = RecordingMarketplace()
+    for i in range(num_listings):
+        marketplace.list_nft_for_sale(f"NFT{i}", f"MxOwner{i % 50}", float(i % 1000 + 1))
+    listing_ids = list(marketplace.listings)
+    acked = [[] for _ in range(threads)]  # (listing_id, amount) of acknowledged bids
+
+    def read():
+        listing_id = listing_ids[random.randrange(num_listings)]
+        best = marketplace.get_highest_bid(listing_id)
+        if best is not None and (best['amount'] <= 0 or not best['bidder'].startswith("MxBidder")):
+            raise AssertionError(f"bad best bid {best}")
+        marketplace.query_listings(status='for_sale', sort='price', limit=20)
+
+    def work(i):
+        rng = random.Random(seed + i)
+        for n in range(ops // threads):
+            listing_id = listing_ids[rng.randrange(num_listings)]
+            if rng.random() < 0.02:
+                marketplace.accept_highest_bid(listing_id, marketplace.listings[listing_id]['owner'])
+            else:
+                # Encode who placed the bid in the amount so it can be traced afterwards.
+                amount = rng.randint(1, 1000) + (i * ops + n) / (threads * ops + 1)
+                if marketplace.place_bid(listing_id, f"MxBidder{i}", amount):
+                    acked[i].append((listing_id, amount))
+
+    finish = start_readers(readers, read)
+    elapsed, failures = run_threads(threads, work)
+    failures += finish()
+
+    expected = {}
+    for thread_acks in acked:
+        for listing_id, amount in thread_acks:
+            expected.setdefault(listing_id, []).append(amount)
+    for listing_id in listing_ids:
+        listing = marketplace.listings[listing_id]
+        held = marketplace.sold_with.get(listing_id, listing['bids'])
+        if sorted(b['amount'] for b in held) != sorted(expected.get(listing_id, [])):
+            failures.append(f"{listing_id}: acknowledged bids and recorded bids differ")
+        if listing['status'] == 'for_sale':
+            best = marketplace.get_highest_bid(listing_id)
+            top = max(expected.get(listing_id, [0]))
+            if (best['amount'] if best else 0) != top:
+                failures.append(f"{listing_id}: best bid {best} != {top}")
+
+    for_sale = {lid for lid, listing in marketplace.listings.items() if listing['status'] == 'for_sale'}
+    if {f"LST_{n}" for n in marketplace.listings_by_status['for_sale']} != for_sale:
+        failures.append("status index out of sync")
+    if len(marketplace.price_index) != len(for_sale) or set(marketplace.active_by_token.values()) != for_sale:
+        failures.append("price or token index out of sync")
+    return elapsed, failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', default='1,2,4,8', help='Comma-separated writer thread counts.')
+    parser.add_argument('--ops', type=int, default=20_000, help='Operations per scenario and thread count.')
+    parser.add_argument('--listings', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    all_failures = []
+    scenarios = [
+        ("ExactDex swaps", lambda t, r: stress_exact_dex(t, args.ops, args.seed, r)),
+        ("SimpleDex swaps", lambda t, r: stress_simple_dex(t, args.ops, args.seed, r)),
+        ("marketplace bids/sales", lambda t, r: stress_marketplace(t, args.ops, args.seed, args.listings, r)),
+    ]
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f"Python {platform.python_version()}, GIL {'enabled' if gil else 'disabled'}, {os.cpu_count()} CPUs")
+    for name, scenario in scenarios:
+        print(name)
+        single = None
+        for threads in (int(t) for t in args.threads.split(',')):
+            # The DEX and marketplace log INFO events (every listing, one swap in 1000) to
+            # stdout; keep them out of the output.
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                elapsed, _ = scenario(threads, 0)
+                _, failures = scenario(threads, 2)
+            rate = args.ops / elapsed
+            single = single or rate
+            status = "ok" if not failures else f"FAILED ({len(failures)})"
+            print(f"  threads={threads:<3} {rate:12,.0f} ops/s  {rate / single:5.2f}x  {status}")
+            all_failures += failures
+    if gil:
+        print("With the GIL, Python code runs on one core at a time; the locks make threads safe, not faster.")
+    for failure in all_failures[:20]:
+        print(f"  - {failure}")
+    sys.exit(1 if all_failures else 0)
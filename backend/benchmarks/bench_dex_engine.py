@@ -0,0 +1,78 @@
+"""
+Compares looping SimpleDex.swap_tokens against PoolRegistry.swap_many.
+
+The gain depends on how the batch spreads over pools. Spread over many
+pools, swap_many applies it in per-pool rounds with SimpleDex's exact
+arithmetic. Concentrated on a few pools (here about 10,000 swaps per pool),
+it falls back to a log-step scan that is only about twice as fast as the loop.
+
+Run from the backend directory:
+    python benchmarks/bench_dex_engine.py --swaps 100000 --pools 2000
+
+Example output (one core, swap logging sampled as in production):
+    swaps=100000 pools=2000
+      SimpleDex loop : 0.1385s (721,963 swaps/s)
+      swap_many      : 0.0098s (10,203,182 swaps/s)
+      speedup        : 14.1x
+      max rel. diff  : 0.00e+00
+
+With --pools 10:
+      SimpleDex loop : 0.1284s (778,669 swaps/s)
+      swap_many      : 0.0581s (1,721,896 swaps/s)
+      speedup        : 2.2x
+      max rel. diff  : 1.51e-10
+"""
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minima_dex import SimpleDex  # noqa: E402
+from minima_dex_engine import PoolRegistry  # noqa: E402
+
+
+def run(num_swaps: int, num_pools: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    reserves_a = rng.uniform(1e4, 1e6, num_pools)
+    reserves_b = rng.uniform(1e4, 1e6, num_pools)
+    pair_ids = rng.integers(0, num_pools, num_swaps)
+    tokens = rng.integers(0, 2, num_swaps)
+    amounts = rng.uniform(1, 100, num_swaps)
+    token_names = np.where(tokens == 0, 'tokenA', 'tokenB').tolist()
+
+    # SimpleDex logs a sample of its swaps; send that to /dev/null so the loop is not terminal-bound.
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        dexes = [SimpleDex(a, b) for a, b in zip(reserves_a.tolist(), reserves_b.tolist())]
+        start = time.perf_counter()
+        loop_out = [
+            dexes[p].swap_tokens(t, a)['amount_out']
+            for p, t, a in zip(pair_ids.tolist(), token_names, amounts.tolist())
+        ]
+        loop_time = time.perf_counter() - start
+
+    registry = PoolRegistry(num_pools)
+    registry.add_pools(reserves_a, reserves_b)
+    start = time.perf_counter()
+    batch_out = registry.swap_many(pair_ids, tokens, amounts)['amount_out']
+    batch_time = time.perf_counter() - start
+
+    divergence = np.max(np.abs(batch_out - np.asarray(loop_out)) / np.maximum(np.abs(loop_out), 1e-12))
+    print(f"swaps={num_swaps} pools={num_pools}")
+    print(f"  SimpleDex loop : {loop_time:.4f}s ({num_swaps / loop_time:,.0f} swaps/s)")
+    print(f"  swap_many      : {batch_time:.4f}s ({num_swaps / batch_time:,.0f} swaps/s)")
+    print(f"  speedup        : {loop_time / batch_time:.1f}x")
+    print(f"  max rel. diff  : {divergence:.2e}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--swaps', type=int, default=100_000)
+    parser.add_argument('--pools', type=int, default=2_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.swaps, args.pools, args.seed)
@@ -0,0 +1,82 @@
+"""
+Differential benchmark of SimpleDex (float) against ExactDex (integer wei math).
+
+For the same random swap stream it reports the throughput of the float path,
+the integer fast path and a Decimal reference, plus how far the float results
+drift from the exact integer results.
+
+Run from the backend directory:
+    python benchmarks/bench_dex_exact.py --swaps 100000
+"""
+import argparse
+import contextlib
+import os
+import random
+import sys
+import time
+from decimal import Decimal, localcontext
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minima_dex import SimpleDex, ExactDex, to_wei  # noqa: E402
+
+
+def decimal_reference(amounts, tokens, reserve_a, reserve_b):
+    """The same integer math evaluated with Decimal, as a slow-path baseline."""
+    with localcontext() as ctx:
+        ctx.prec = 100
+        reserves = {'tokenA': Decimal(reserve_a), 'tokenB': Decimal(reserve_b)}
+        k = reserves['tokenA'] * reserves['tokenB']
+        out = []
+        for token_in, amount in zip(tokens, amounts):
+            token_out = 'tokenB' if token_in == 'tokenA' else 'tokenA'
+            amount_out = reserves[token_out] - (k / (reserves[token_in] + amount)).to_integral_value(rounding='ROUND_FLOOR')
+            reserves[token_in] += amount
+            reserves[token_out] -= amount_out
+            out.append(int(amount_out))
+        return out
+
+
+def run(num_swaps: int, seed: int = 0):
+    rng = random.Random(seed)
+    reserve_a, reserve_b = 1_000_000.0, 750_000.0
+    tokens = [rng.choice(('tokenA', 'tokenB')) for _ in range(num_swaps)]
+    amounts = [round(rng.uniform(0.001, 500.0), 6) for _ in range(num_swaps)]
+    amounts_wei = [to_wei(a) for a in amounts]
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        float_dex = SimpleDex(reserve_a, reserve_b)
+        start = time.perf_counter()
+        float_out = [float_dex.swap_tokens(t, a)['amount_out'] for t, a in zip(tokens, amounts)]
+        float_time = time.perf_counter() - start
+
+        exact_dex = ExactDex.from_token_amounts(reserve_a, reserve_b)
+        start = time.perf_counter()
+        exact_out = [exact_dex.swap_tokens(t, a)['amount_out'] for t, a in zip(tokens, amounts_wei)]
+        exact_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reference_out = decimal_reference(amounts_wei, tokens, to_wei(reserve_a), to_wei(reserve_b))
+    decimal_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(exact_out, reference_out) if a != b)
+    drift = [abs(to_wei(f) - e) for f, e in zip(float_out, exact_out)]
+    diverged = sum(1 for d in drift if d)
+
+    print(f"swaps={num_swaps}")
+    print(f"  float SimpleDex      : {float_time:.4f}s ({num_swaps / float_time:,.0f} swaps/s)")
+    print(f"  integer ExactDex     : {exact_time:.4f}s ({num_swaps / exact_time:,.0f} swaps/s)")
+    print(f"  Decimal reference    : {decimal_time:.4f}s ({num_swaps / decimal_time:,.0f} swaps/s)")
+    print(f"  exact vs Decimal     : {mismatches} mismatching swaps")
+    print(f"  float vs exact       : {diverged}/{num_swaps} swaps diverge")
+    print(f"  float drift (wei)    : max {max(drift):,} mean {sum(drift) / num_swaps:,.0f}")
+    print(f"  final reserves drift : tokenA {abs(to_wei(float_dex.reserves['tokenA']) - exact_dex.reserves['tokenA']):,} wei,"
+          f" tokenB {abs(to_wei(float_dex.reserves['tokenB']) - exact_dex.reserves['tokenB']):,} wei")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--swaps', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.swaps, args.seed)
@@ -0,0 +1,130 @@
+"""
+Measures recording reserve updates and querying candles from ReserveHistory.
+
+For each history size, one pair gets N reserve updates spread evenly over
+30 days. The benchmark then times:
+  - record:      appending one update (what the FirestoreDEX listener pays);
+  - first query: the first candles() call of a process with no checkpoint,
+                 which folds every points file and writes the checkpoint;
+  - cold query:  the first candles() call of a process once the checkpoint
+                 exists, which loads the candle columns instead;
+  - query:       100 candles at 1m and at 1h once caught up, and after 100
+                 new updates;
+  - raw scan:    building the same 100 1h candles by scanning every point,
+                 which is what charting would cost without the candles.
+Flat query times across sizes show a query costs the candles it returns, not
+the number of updates recorded.
+
+Run from the backend directory:
+    python benchmarks/bench_dex_history.py --sizes 100000,1000000
+
+Example output:
+    updates=100,000
+      record              :     0.89 us/op
+      first query         :   320.6 ms
+      cold query          :     1.8 ms
+      query 100 x 1m      :    53.4 us
+      query 100 x 1h      :    52.5 us
+      query after 100 new :   423.6 us
+      raw scan 100 x 1h   :    21.9 ms
+    updates=1,000,000
+      record              :     0.89 us/op
+      first query         :  2791.8 ms
+      cold query          :     2.0 ms
+      query 100 x 1m      :    52.8 us
+      query 100 x 1h      :    53.1 us
+      query after 100 new :   419.7 us
+      raw scan 100 x 1h   :   204.6 ms
+"""
+import argparse
+import glob
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minima_dex_history import ReserveHistory  # noqa: E402
+
+SPAN = 30 * 86400
+
+
+def timed(fn, runs=1):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    return (time.perf_counter() - start) / runs, result
+
+
+def raw_scan(directory, start, end):
+    """Builds hourly candles between start and end from every stored point, without the candle arrays."""
+    data = b''
+    for path in sorted(glob.glob(os.path.join(directory, '*.points'))):
+        with open(path, 'rb') as f:
+            data += f.read()
+    candles = {}
+    for timestamp, reserve_a, reserve_b in struct.iter_unpack('<ddd', data):
+        if not start <= timestamp < end + 3600:
+            continue
+        price = reserve_b / reserve_a
+        bucket = int(timestamp // 3600) * 3600
+        candle = candles.get(bucket)
+        if candle is None:
+            candles[bucket] = [price, price, price, price]
+        else:
+            candle[1] = max(candle[1], price)
+            candle[2] = min(candle[2], price)
+            candle[3] = price
+    return candles
+
+
+def run_size(num_updates: int):
+    directory = tempfile.mkdtemp()
+    try:
+        now = time.time()
+        first = now - SPAN
+        step = SPAN / num_updates
+        writer = ReserveHistory(directory)
+        record_s, _ = timed(lambda: [writer.record("tokenA", "tokenB", 1000.0 + i % 500, 2000.0 - i % 700,
+                                                   timestamp=first + i * step)
+                                     for i in range(num_updates)])
+
+        # A new instance, like another worker process answering its first candles request.
+        reader = ReserveHistory(directory)
+        first_s, _ = timed(lambda: reader.candles("tokenA", "tokenB", "1m", limit=100))
+        cold_s, _ = timed(lambda: ReserveHistory(directory).candles("tokenA", "tokenB", "1m", limit=100))
+        minute_s, _ = timed(lambda: reader.candles("tokenA", "tokenB", "1m", limit=100), runs=200)
+        hour_s, candles = timed(lambda: reader.candles("tokenA", "tokenB", "1h", limit=100), runs=200)
+
+        def after_new_updates():
+            for i in range(100):
+                writer.record("tokenA", "tokenB", 1000.0 + i, 2000.0 - i)
+            return reader.candles("tokenA", "tokenB", "1m", limit=100)
+
+        new_s, _ = timed(after_new_updates, runs=20)
+        pair_directory = reader._pair_directory("tokenA-tokenB")
+        scan_s, _ = timed(lambda: raw_scan(pair_directory, candles[0]["time"], candles[-1]["time"]))
+        writer.close()
+    finally:
+        shutil.rmtree(directory)
+
+    print(f"updates={num_updates:,}")
+    print(f"  record              : {record_s / num_updates * 1e6:8.2f} us/op")
+    print(f"  first query         : {first_s * 1000:7.1f} ms")
+    print(f"  cold query          : {cold_s * 1000:7.1f} ms")
+    print(f"  query 100 x 1m      : {minute_s * 1e6:7.1f} us")
+    print(f"  query 100 x 1h      : {hour_s * 1e6:7.1f} us")
+    print(f"  query after 100 new : {new_s * 1e6:7.1f} us")
+    print(f"  raw scan 100 x 1h   : {scan_s * 1000:7.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='100000,1000000',
+                        help='Comma-separated numbers of recorded updates.')
+    args = parser.parse_args()
+    for size in args.sizes.split(','):
+        run_size(int(size))
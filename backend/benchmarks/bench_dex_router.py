@@ -0,0 +1,85 @@
+"""
+Measures RouteIndex quote latency and incremental update cost.
+
+The synthetic graph has a few hub tokens paired with many long-tail tokens,
+plus random long-tail pairs, which is the shape a real pool set tends to have.
+
+Run from the backend directory:
+    python benchmarks/bench_dex_router.py --pools 3000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minima_dex_router import RouteIndex  # noqa: E402
+
+
+def make_docs(num_pools: int, rng: random.Random):
+    hubs = ["minima", "wMINIMA", "usdt", "custom-token"]
+    tokens = [f"tkn{i}" for i in range(max(num_pools // 3, 2))]
+    docs = {}
+    while len(docs) < num_pools:
+        if rng.random() < 0.6:
+            token_a, token_b = rng.choice(hubs), rng.choice(tokens)
+        else:
+            token_a, token_b = rng.sample(tokens + hubs, 2)
+        if token_a == token_b:
+            continue
+        docs[f"{token_a}-{token_b}"] = {
+            "token_a": token_a,
+            "token_b": token_b,
+            "reserve_a": rng.uniform(1e3, 1e6),
+            "reserve_b": rng.uniform(1e3, 1e6),
+        }
+    return list(docs.values()), tokens + hubs
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def run(num_pools: int, queries: int, max_hops: int, seed: int = 0):
+    rng = random.Random(seed)
+    docs, tokens = make_docs(num_pools, rng)
+    index = RouteIndex()
+
+    start = time.perf_counter()
+    index.load(docs)
+    build_time = time.perf_counter() - start
+
+    latencies = []
+    found = 0
+    for _ in range(queries):
+        token_in, token_out = rng.sample(tokens, 2)
+        start = time.perf_counter()
+        route = index.best_route(token_in, token_out, rng.uniform(1, 1000), max_hops)
+        latencies.append(time.perf_counter() - start)
+        found += route is not None
+
+    start = time.perf_counter()
+    for doc in docs[:1000]:
+        index.update_pool(doc["token_a"], doc["token_b"], doc["reserve_a"] * 1.01, doc["reserve_b"] * 0.99)
+    update_time = (time.perf_counter() - start) / min(len(docs), 1000)
+
+    print(f"pools={len(index)} tokens={len(tokens)} max_hops={max_hops}")
+    print(f"  full build       : {build_time * 1e3:.2f} ms")
+    print(f"  incremental update: {update_time * 1e6:.2f} us/pool")
+    print(f"  quote p50        : {statistics.median(latencies) * 1e6:.1f} us")
+    print(f"  quote p99        : {percentile(latencies, 99) * 1e6:.1f} us")
+    print(f"  routes found     : {found}/{queries}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pools', type=int, default=3000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--max-hops', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.pools, args.queries, args.max_hops, args.seed)
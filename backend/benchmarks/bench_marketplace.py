@@ -0,0 +1,70 @@
+"""
+Measures NFTMarketplace per-operation cost as the marketplace grows.
+
+Each scale builds a marketplace with N listings and 10*N bids, then times
+listing, bidding, best-bid lookup, accepting the highest bid and price-sorted
+browsing. Flat per-op times across scales show the indexes scale.
+
+Run from the backend directory:
+    python benchmarks/bench_marketplace.py --scales 10000,100000
+The full-size run (1M listings / 10M bids) needs several GB of RAM:
+    python benchmarks/bench_marketplace.py --scales 1000000
+"""
+import argparse
+import contextlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minima_nft_marketplace import NFTMarketplace  # noqa: E402
+
+
+def timed(fn, count):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def run_scale(num_listings: int, bids_per_listing: int, rng: random.Random):
+    marketplace = NFTMarketplace()
+    num_bids = num_listings * bids_per_listing
+    owners = [f"MxOwner{i}" for i in range(max(num_listings // 10, 1))]
+    prices = [rng.uniform(1, 10_000) for _ in range(num_listings)]
+    bid_targets = [f"LST_{rng.randint(1, num_listings)}" for _ in range(num_bids)]
+    bid_amounts = [rng.uniform(1, 10_000) for _ in range(num_bids)]
+    sample = [f"LST_{rng.randint(1, num_listings)}" for _ in range(1000)]
+
+    # Every listing and sale is logged at INFO, and structured_log writes to whatever sys.stdout is.
+    # Send those lines to /dev/null: they are still formatted, as in production, but not printed.
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        list_us = timed(lambda: [marketplace.list_nft_for_sale(f"NFT{i}", owners[i % len(owners)], prices[i])
+                                 for i in range(num_listings)], num_listings)
+        bid_us = timed(lambda: [marketplace.place_bid(t, "MxBidder", a) for t, a in zip(bid_targets, bid_amounts)],
+                       num_bids)
+        best_us = timed(lambda: [marketplace.get_highest_bid(t) for t in sample], len(sample))
+        browse_us = timed(lambda: [marketplace.browse_by_price(min_price=rng.uniform(1, 9_000), limit=50)
+                                   for _ in range(100)], 100)
+        accept_us = timed(lambda: [marketplace.accept_highest_bid(t, marketplace.listings[t]['owner'])
+                                   for t in sample], len(sample))
+
+    print(f"listings={num_listings:,} bids={num_bids:,}")
+    print(f"  list_nft_for_sale  : {list_us:8.2f} us/op")
+    print(f"  place_bid          : {bid_us:8.2f} us/op")
+    print(f"  get_highest_bid    : {best_us:8.2f} us/op")
+    print(f"  accept_highest_bid : {accept_us:8.2f} us/op")
+    print(f"  browse_by_price(50): {browse_us:8.2f} us/op")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', default='10000,100000',
+                        help='Comma-separated listing counts to benchmark.')
+    parser.add_argument('--bids-per-listing', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    for scale in args.scales.split(','):
+        run_scale(int(scale), args.bids_per_listing, rng)
@@ -0,0 +1,116 @@
+"""
+Measures DurableMarketplace sustained write throughput and recovery time.
+
+Throughput: several threads place bids concurrently with fsync on, so the
+group commit shares one fsync between writers. Recovery: a marketplace with
+N listings and 10*N bids is snapshotted, a tail of events is appended, and
+the time to reopen it (load snapshot + replay tail) is measured.
+
+Run from the backend directory:
+    python benchmarks/bench_marketplace_log.py --listings 100000 --threads 8
+
+Example output (--listings 50000 --tail-events 50000, 8 threads):
+    durable writes (fsync on)
+      1 thread           : 9,217 events/s
+      8 threads          : 17,203 events/s (2.1 events per fsync)
+    recovery: 50,000 listings, 500,000 bids, 50,000-event tail
+      snapshot write     : 1.33s (8.1 MB)
+      startup (load+replay): 3.19s
+"""
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minima_marketplace_log import DurableMarketplace  # noqa: E402
+
+
+def bench_throughput(directory: str, threads: int, events_per_thread: int):
+    marketplace = DurableMarketplace(directory, snapshot_every=None)
+    for i in range(100):
+        marketplace.list_nft_for_sale(f"NFT{i}", "MxOwner", 10.0)
+    commits_before = marketplace.log.commits
+
+    def writer(seed):
+        rng = random.Random(seed)
+        for _ in range(events_per_thread):
+            marketplace.place_bid(f"LST_{rng.randint(1, 100)}", f"MxBidder{seed}", rng.uniform(1, 100))
+
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    total = threads * events_per_thread
+    commits = marketplace.log.commits - commits_before
+    marketplace.close()
+    return total / elapsed, total / max(commits, 1)
+
+
+def bench_recovery(directory: str, num_listings: int, tail_events: int, rng: random.Random):
+    marketplace = DurableMarketplace(directory, snapshot_every=None, fsync=False)
+    for i in range(num_listings):
+        marketplace.list_nft_for_sale(f"NFT{i}", f"MxOwner{i % 1000}", rng.uniform(1, 1000))
+    for _ in range(num_listings * 10):
+        marketplace.place_bid(f"LST_{rng.randint(1, num_listings)}", f"MxBidder{rng.randint(0, 9999)}",
+                              rng.uniform(1, 1000))
+    start = time.perf_counter()
+    marketplace.snapshot()
+    snapshot_time = time.perf_counter() - start
+    for _ in range(tail_events):
+        marketplace.place_bid(f"LST_{rng.randint(1, num_listings)}", "MxTail", rng.uniform(1, 1000))
+    marketplace.close()
+    snapshot_bytes = sum(os.path.getsize(os.path.join(directory, f))
+                         for f in os.listdir(directory) if f.startswith('snapshot-'))
+
+    start = time.perf_counter()
+    recovered = DurableMarketplace(directory, snapshot_every=None)
+    recovery_time = time.perf_counter() - start
+    assert len(recovered.listings) == num_listings
+    recovered.close()
+    return snapshot_time, snapshot_bytes, recovery_time
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--events-per-thread', type=int, default=2000)
+    parser.add_argument('--listings', type=int, default=100_000)
+    parser.add_argument('--tail-events', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        directory = tempfile.mkdtemp(prefix='marketplace-log-')
+        try:
+            single_rate, _ = bench_throughput(directory, 1, args.events_per_thread)
+        finally:
+            shutil.rmtree(directory)
+        directory = tempfile.mkdtemp(prefix='marketplace-log-')
+        try:
+            rate, group_size = bench_throughput(directory, args.threads, args.events_per_thread)
+        finally:
+            shutil.rmtree(directory)
+        directory = tempfile.mkdtemp(prefix='marketplace-log-')
+        try:
+            snapshot_time, snapshot_bytes, recovery_time = bench_recovery(directory, args.listings,
+                                                                          args.tail_events, rng)
+        finally:
+            shutil.rmtree(directory)
+
+    print("durable writes (fsync on)")
+    print(f"  1 thread           : {single_rate:,.0f} events/s")
+    print(f"  {args.threads} threads          : {rate:,.0f} events/s ({group_size:.1f} events per fsync)")
+    print(f"recovery: {args.listings:,} listings, {args.listings * 10:,} bids, {args.tail_events:,}-event tail")
+    print(f"  snapshot write     : {snapshot_time:.2f}s ({snapshot_bytes / 1e6:.1f} MB)")
+    print(f"  startup (load+replay): {recovery_time:.2f}s")
@@ -0,0 +1,160 @@
+"""
+Measures the memory cost of NFTMarketplace listings and bids with tracemalloc.
+
+Two representations of the same listings and bids are built side by side:
+  - dicts:   the listing dicts, per-bid dicts and per-listing bid heaps the
+             marketplace used to keep;
+  - records: Listing records with interned addresses and a BidBook of
+             parallel arrays, as the marketplace keeps them now;
+and for each the bytes per listing and per bid, the allocated blocks and the
+time of a full gc.collect() over the result are reported. A full
+NFTMarketplace (records plus its indexes) is measured last. Addresses are
+built fresh for every call, as they arrive in API requests, so repeated
+bidders and owners cost what they would in the running service.
+
+Run from the backend directory:
+    python benchmarks/bench_marketplace_memory.py --listings 100000 --bids-per-listing 10
+
+Example output:
+    listings=100,000 bids=1,000,000 owners=10,000 bidders=50,000
+      dicts    :  548 B/listing  7.00 blocks   347 B/bid  5.20 blocks   gc.collect 175.8 ms
+      records  :  235 B/listing  3.10 blocks    45 B/bid  0.55 blocks   gc.collect  90.6 ms
+      records use 43% of the memory per listing and 13% per bid
+      NFTMarketplace: 525 B/listing (with indexes), 46 B/bid, 98.3 MB in total
+"""
+import argparse
+import contextlib
+import gc
+import heapq
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minima_nft_marketplace import BidBook, Listing, NFTMarketplace  # noqa: E402
+
+
+class DictStore:
+    """Listings as NFTMarketplace stored them before Listing and BidBook."""
+
+    def __init__(self):
+        self.listings = {}
+        # listing_id -> heap of (-amount, bid sequence)
+        self.bids = {}
+
+    def add_listing(self, listing_id, token_id, owner_address, price):
+        self.bids[listing_id] = []
+        self.listings[listing_id] = {
+            "token_id": token_id,
+            "owner": owner_address,
+            "price": price,
+            "status": "for_sale",
+            "bids": []
+        }
+
+    def add_bid(self, listing_id, bidder_address, amount):
+        bids = self.listings[listing_id]['bids']
+        bids.append({"bidder": bidder_address, "amount": amount})
+        heapq.heappush(self.bids[listing_id], (-amount, len(bids) - 1))
+
+
+class RecordStore:
+    """Listings as NFTMarketplace stores them now, without its indexes."""
+
+    def __init__(self):
+        self.listings = {}
+
+    def add_listing(self, listing_id, token_id, owner_address, price):
+        self.listings[listing_id] = Listing(token_id, sys.intern(owner_address), price)
+
+    def add_bid(self, listing_id, bidder_address, amount):
+        listing = self.listings[listing_id]
+        if listing.book is None:
+            listing.book = BidBook()
+        listing.book.add(sys.intern(bidder_address), amount)
+
+
+def traced_bytes():
+    return tracemalloc.get_traced_memory()[0]
+
+
+def traced_blocks():
+    return sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+
+
+def measure(store, workload):
+    """Builds the listings and then the bids into `store`; returns bytes and blocks per listing and per bid."""
+    prices, num_owners, bid_targets, bid_amounts, num_bidders = workload
+    gc.collect()
+    tracemalloc.start()
+    start_bytes, start_blocks = traced_bytes(), traced_blocks()
+    for i, price in enumerate(prices):
+        store.add_listing(f"LST_{i + 1}", f"NFT{i}", "MxOwner%d" % (i % num_owners), price)
+    listing_bytes, listing_blocks = traced_bytes(), traced_blocks()
+    for i, (target, amount) in enumerate(zip(bid_targets, bid_amounts)):
+        store.add_bid(target, "MxBidder%d" % (i % num_bidders), amount)
+    bid_bytes, bid_blocks = traced_bytes(), traced_blocks()
+    tracemalloc.stop()
+    return ((listing_bytes - start_bytes) / len(prices), (bid_bytes - listing_bytes) / len(bid_targets),
+            (listing_blocks - start_blocks) / len(prices), (bid_blocks - listing_blocks) / len(bid_targets))
+
+
+def gc_pause():
+    start = time.perf_counter()
+    gc.collect()
+    return time.perf_counter() - start
+
+
+def measure_marketplace(workload):
+    prices, num_owners, bid_targets, bid_amounts, num_bidders = workload
+    marketplace = NFTMarketplace()
+    gc.collect()
+    tracemalloc.start()
+    start_bytes = traced_bytes()
+    # The marketplace logs rejected calls; keep the terminal out of the measurement.
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for i, price in enumerate(prices):
+            marketplace.list_nft_for_sale(f"NFT{i}", "MxOwner%d" % (i % num_owners), price)
+        listing_bytes = traced_bytes()
+        for i, (target, amount) in enumerate(zip(bid_targets, bid_amounts)):
+            marketplace.place_bid(target, "MxBidder%d" % (i % num_bidders), amount)
+    total_bytes = traced_bytes()
+    tracemalloc.stop()
+    print(f"  NFTMarketplace: {(listing_bytes - start_bytes) / len(prices):.0f} B/listing (with indexes), "
+          f"{(total_bytes - listing_bytes) / len(bid_targets):.0f} B/bid, "
+          f"{(total_bytes - start_bytes) / 1e6:.1f} MB in total")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--listings', type=int, default=100_000)
+    parser.add_argument('--bids-per-listing', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    num_bids = args.listings * args.bids_per_listing
+    num_owners = max(args.listings // 10, 1)
+    num_bidders = max(num_bids // 20, 1)
+    # Owner and bidder addresses are built per call, so only their counts are part of the workload.
+    workload = ([rng.uniform(1, 10_000) for _ in range(args.listings)], num_owners,
+                [f"LST_{rng.randint(1, args.listings)}" for _ in range(num_bids)],
+                [rng.uniform(1, 10_000) for _ in range(num_bids)], num_bidders)
+    print(f"listings={args.listings:,} bids={num_bids:,} owners={num_owners:,} bidders={num_bidders:,}")
+
+    results = {}
+    for name, store_type in (("dicts", DictStore), ("records", RecordStore)):
+        store = store_type()
+        per_listing, per_bid, blocks_per_listing, blocks_per_bid = measure(store, workload)
+        pause = gc_pause()
+        results[name] = (per_listing, per_bid)
+        print(f"  {name:<8} : {per_listing:4.0f} B/listing {blocks_per_listing:5.2f} blocks  "
+              f"{per_bid:4.0f} B/bid {blocks_per_bid:5.2f} blocks   gc.collect {pause * 1000:5.1f} ms")
+        del store
+    print(f"  records use {results['records'][0] / results['dicts'][0]:.0%} of the memory per listing "
+          f"and {results['records'][1] / results['dicts'][1]:.0%} per bid")
+
+    measure_marketplace(workload)
@@ -0,0 +1,95 @@
+"""
+Measures the CPU cost of encoding and signing one bridge mint.
+
+Every variant produces the same signed mint(recipient, amount) transaction,
+with nonce, gas, gas price and chain id given so no node is contacted:
+  - per-mint contract:  the original mint_on_evm, which builds a web3
+                        contract object and derives the account per mint;
+  - cached contract:    a long-lived contract object and account, still
+                        using build_transaction and sign_transaction;
+  - MintBinding:        pre-encoded selector and calldata, RLP-encoded and
+                        signed directly (coincurve when installed);
+  - MintBinding (eth_keys): the same without coincurve.
+The binding's output is checked to be byte for byte the cached contract's.
+
+Run from the backend directory:
+    python benchmarks/bench_mint_signing.py --mints 2000
+
+Example output (coincurve installed):
+    per-mint contract       :   6808.4 us/mint       147 mints/s per core
+    cached contract         :    841.2 us/mint     1,189 mints/s per core
+    MintBinding             :     58.7 us/mint    17,039 mints/s per core
+    MintBinding (eth_keys)  :    128.4 us/mint     7,787 mints/s per core
+"""
+import argparse
+import os
+import sys
+import time
+
+from web3 import Web3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from evm_transactions import MintBinding, TransactionSigner  # noqa: E402
+from minima_bridge import BRIDGE_CONTRACT_ABI, MINT_GAS_LIMIT  # noqa: E402
+
+# A well-known local development key; never use it on a real network.
+PRIVATE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+CONTRACT = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+RECIPIENT = Web3.to_checksum_address("0x742d35cc4a95d71c0f4a5e44007b819973e73e77")
+CHAIN_ID = 1337
+GAS_PRICE = 10 ** 9
+
+
+def measure(name, mints, sign):
+    start = time.process_time()
+    for nonce in range(mints):
+        sign(nonce)
+    elapsed = time.process_time() - start
+    print(f"  {name:<24}: {elapsed / mints * 1e6:8.1f} us/mint  {mints / elapsed:8,.0f} mints/s per core")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mints', type=int, default=2000)
+    args = parser.parse_args()
+
+    # No provider: every field build_transaction would look up is given.
+    w3 = Web3()
+    amount = w3.to_wei(1.5, 'ether')
+
+    def per_mint_contract(nonce):
+        contract = w3.eth.contract(address=CONTRACT, abi=BRIDGE_CONTRACT_ABI)
+        account = w3.eth.account.from_key(PRIVATE_KEY)
+        transaction = contract.functions.mint(RECIPIENT, amount).build_transaction({
+            'from': account.address, 'nonce': nonce, 'gas': MINT_GAS_LIMIT, 'gasPrice': GAS_PRICE,
+            'chainId': CHAIN_ID
+        })
+        return w3.eth.account.sign_transaction(transaction, PRIVATE_KEY)
+
+    contract = w3.eth.contract(address=CONTRACT, abi=BRIDGE_CONTRACT_ABI)
+    account = w3.eth.account.from_key(PRIVATE_KEY)
+
+    def cached_contract(nonce):
+        transaction = contract.functions.mint(RECIPIENT, amount).build_transaction({
+            'from': account.address, 'nonce': nonce, 'gas': MINT_GAS_LIMIT, 'gasPrice': GAS_PRICE,
+            'chainId': CHAIN_ID
+        })
+        return account.sign_transaction(transaction)
+
+    binding = MintBinding(TransactionSigner(PRIVATE_KEY, CHAIN_ID), CONTRACT, MINT_GAS_LIMIT)
+    slow_binding = MintBinding(TransactionSigner(PRIVATE_KEY, CHAIN_ID), CONTRACT, MINT_GAS_LIMIT)
+    slow_binding.signer._fast_key = None
+
+    for nonce in (0, 1, 2 ** 40):
+        expected = bytes(cached_contract(nonce).rawTransaction)
+        for candidate in (binding, slow_binding):
+            if candidate.sign_mint(RECIPIENT, amount, nonce, GAS_PRICE)[1] != expected:
+                sys.exit("MintBinding does not match web3's signed transaction.")
+
+    print(f"mints={args.mints}")
+    measure("per-mint contract", args.mints, per_mint_contract)
+    measure("cached contract", args.mints, cached_contract)
+    measure("MintBinding", args.mints, lambda nonce: binding.sign_mint(RECIPIENT, amount, nonce, GAS_PRICE))
+    measure("MintBinding (eth_keys)", args.mints,
+            lambda nonce: slow_binding.sign_mint(RECIPIENT, amount, nonce, GAS_PRICE))
@@ -0,0 +1,154 @@
+"""
+Measures the NFT ownership index: inventory lookups, catch-up and how far it trails the tip.
+
+MinimaNFTModule.get_inventory is timed against indexes of growing size with addresses
+owning k tokens, to show the cost follows k and not the number of indexed
+NFTs; the stub node's call counter confirms they never reach the node. The
+follower then catches up on a stub Minima node's chain of mints and
+transfers from an empty index, and finally follows the chain live while new
+blocks arrive, through a reorg that replaces the last blocks, recording how
+far behind the tip the index was after each block.
+
+Run from the backend directory:
+    python benchmarks/bench_nft_index.py --tokens 10000,100000,1000000
+
+Example output (after the module's nft_module_initialized log line):
+    inventory lookup (mean of 2,000, no node calls: yes)
+      tokens          k=1      k=10     k=100
+      10,000       4.8 us   18.5 us  153.4 us
+      100,000      5.1 us   18.6 us  152.8 us
+      1,000,000    5.0 us   18.8 us  153.5 us
+    catch-up: 2,000 blocks (9,038 changes) in 1.90 s, 1,053 blocks/s
+    live follow: 20 blocks, 1 reorg of 3 blocks; tip lag p50=0.42 s max=1.01 s, inventories match: yes
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from minima_nft import MinimaNFTModule  # noqa: E402
+from minima_nft_index import NFTIndex, NFTIndexFollower  # noqa: E402
+from minima_stub_server import start_stub_server  # noqa: E402
+
+TOKEN = {"name": "Primal", "description": "A benchmark Primal.", "total_supply": 1, "token_decimals": 0}
+LOOKUP_KS = (1, 10, 100)
+
+
+def mint(token_id, address):
+    return {"tokenid": token_id, "address": address, "token": TOKEN}
+
+
+def make_block(height, parent, outputs, fork=""):
+    return {"txpowid": f"0x{fork}{height:x}", "block": height, "parent": parent,
+            "transactions": [{"outputs": outputs}]}
+
+
+def extend(blocks, count, rng, owners, fork=""):
+    """Appends blocks of a few mints and transfers each."""
+    for _ in range(count):
+        height = len(blocks) + 1
+        outputs = [mint(f"0x{fork}{height:x}-{i}", rng.choice(owners)) for i in range(rng.randint(1, 4))]
+        minted = [output["tokenid"] for block in blocks[-50:] for output in block["transactions"][0]["outputs"]
+                  if output.get("token")]
+        outputs += [{"tokenid": rng.choice(minted), "address": rng.choice(owners)}
+                    for _ in range(rng.randint(0, 4)) if minted]
+        blocks.append(make_block(height, blocks[-1]["txpowid"] if blocks else None, outputs, fork))
+    return blocks
+
+
+def expected_inventories(blocks):
+    owners = {}
+    for block in blocks:
+        for output in block["transactions"][0]["outputs"]:
+            owners[output["tokenid"]] = output["address"]
+    inventories = {}
+    for token_id, owner in owners.items():
+        inventories.setdefault(owner, set()).add(token_id)
+    return inventories
+
+
+def bench_lookups(module, sizes, lookups, rng):
+    """Returns {tokens: {k: seconds per lookup}} for indexes filled directly, without a node."""
+    results = {}
+    for size in sizes:
+        index = module.index = NFTIndex(":memory:")
+        # One address per k, then the rest spread over many small holders.
+        outputs = [mint(f"0x{k}-{i:x}", f"Mxk{k}") for k in LOOKUP_KS for i in range(k)]
+        outputs += [mint(f"0x{i:x}", f"Mx{rng.randrange(size // 5 or 1)}") for i in range(size - len(outputs))]
+        index.apply_blocks([{"height": 1, "hash": "0x1", "parent": None, "outputs": outputs}])
+        results[size] = {}
+        for k in LOOKUP_KS:
+            address = f"Mxk{k}"
+            assert len(module.get_inventory(address)) == k
+            start = time.perf_counter()
+            for _ in range(lookups):
+                module.get_inventory(address)
+            results[size][k] = (time.perf_counter() - start) / lookups
+        index.close()
+    return results
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tokens', default='10000,100000,1000000', help='Comma-separated index sizes.')
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--blocks', type=int, default=2000, help='Chain length to catch up on.')
+    parser.add_argument('--live-blocks', type=int, default=20)
+    parser.add_argument('--block-interval', type=float, default=0.5, help='Mean seconds between live blocks.')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help="The follower's polling interval.")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    owners = [f"Mx{i}" for i in range(200)]
+
+    node, url = start_stub_server()
+    lookups = bench_lookups(MinimaNFTModule(url), [int(size) for size in args.tokens.split(',')], args.lookups, rng)
+    no_node_calls = not node.calls
+    print(f"inventory lookup (mean of {args.lookups:,}, no node calls: {'yes' if no_node_calls else 'NO'})")
+    print(f"  {'tokens':<9}" + "".join(f"{f'k={k}':>10}" for k in LOOKUP_KS))
+    for size, per_k in lookups.items():
+        print(f"  {size:<9,}" + "".join(f"{per_k[k] * 1e6:7.1f} us" for k in LOOKUP_KS))
+
+    chain = extend([], args.blocks, rng, owners)
+    with node.lock:
+        node.blocks[:] = chain
+    index = NFTIndex(":memory:")
+    follower = NFTIndexFollower(index, base_url=url, interval=args.poll_interval)
+    start = time.perf_counter()
+    changes = follower.poll_once()
+    elapsed = time.perf_counter() - start
+    print(f"catch-up: {args.blocks:,} blocks ({changes:,} changes) in {elapsed:.2f} s, "
+          f"{args.blocks / elapsed:,.0f} blocks/s")
+
+    follower.start()
+    lags = []
+    reorg_at = args.live_blocks // 2
+    for i in range(args.live_blocks):
+        # Arrivals are jittered so they do not fall into step with the polls.
+        time.sleep(rng.uniform(0, 2 * args.block_interval))
+        if i == reorg_at:
+            # The last three blocks are replaced by a fork one block longer.
+            chain = extend(chain[:-3], 4, rng, owners, fork=f"f{i}")
+        else:
+            chain = extend(chain, 1, rng, owners)
+        with node.lock:
+            node.blocks[:] = chain
+        produced = time.perf_counter()
+        tip = chain[-1]["txpowid"]
+        while index.block_hash(len(chain)) != tip:
+            time.sleep(0.01)
+        lags.append(time.perf_counter() - produced)
+    follower.stop()
+    expected = expected_inventories(chain)
+    match = all({nft["tokenid"] for nft in index.inventory(owner)} == expected.get(owner, set()) for owner in owners)
+    print(f"live follow: {args.live_blocks} blocks, 1 reorg of 3 blocks; tip lag p50={percentile(lags, 0.5):.2f} s "
+          f"max={max(lags):.2f} s, inventories match: {'yes' if match else 'NO'}")
+    node.shutdown()
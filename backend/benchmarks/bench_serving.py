@@ -0,0 +1,182 @@
+"""
+Load-tests the API and reports latency and throughput per endpoint.
+
+Runs a fixed number of concurrent clients against each endpoint for a while
+and prints requests per second, p50/p99 latency and the status codes seen.
+With --url it targets a server that is already running; otherwise it starts
+a demo app twice, once on Werkzeug's threaded development server (what
+`python app.py` runs) and once on serve.py, with upstreams simulated as:
+  - /api/dex/reserves:    a 5 ms Firestore read;
+  - /api/dex/quote:       about 1 ms of pure-Python work;
+  - /api/wallet/balance:  a stalled Minima node that takes --stall seconds;
+  - /api/bridge/stats:    in-memory, no I/O.
+
+Run from the backend directory:
+    python benchmarks/bench_serving.py --duration 10 --clients 32
+    python benchmarks/bench_serving.py --url http://127.0.0.1:5000 --endpoint /api/dex/reserves
+
+Example output (1 core, 32 clients per endpoint, 10 s, stall 20 s):
+    werkzeug (threaded)
+      /api/dex/reserves      :    291 req/s  p50  107.0 ms  p99  191.0 ms  {200: 2912}
+      /api/dex/quote         :    310 req/s  p50  102.8 ms  p99  173.2 ms  {200: 3098}
+      /api/wallet/balance    :      0 req/s  p50      - ms  p99      - ms  {'timeout': 32}
+      /api/bridge/stats      :    312 req/s  p50  101.3 ms  p99  192.9 ms  {200: 3120}
+    serve.py (1 worker)
+      /api/dex/reserves      :    477 req/s  p50   65.2 ms  p99  110.1 ms  {200: 4770}
+      /api/dex/quote         :    593 req/s  p50   53.5 ms  p99   83.8 ms  {200: 5927}
+      /api/wallet/balance    :      3 req/s  p50 10126.7 ms  p99 10127.4 ms  {504: 32}
+      /api/bridge/stats      :    670 req/s  p50   47.7 ms  p99   82.3 ms  {200: 6705}
+"""
+import argparse
+import asyncio
+import collections
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND)
+
+ENDPOINTS = ("/api/dex/reserves", "/api/dex/quote?amount=1000", "/api/wallet/balance", "/api/bridge/stats")
+
+
+def create_demo_app(stall: float):
+    """A Flask app with the API's route layout and simulated upstream latency."""
+    from flask import Flask, jsonify
+
+    demo = Flask(__name__)
+
+    @demo.route('/api/dex/reserves')
+    def reserves():
+        time.sleep(0.005)
+        return jsonify({"reserves": {"MINIMA/USDT": [1000, 2000]}})
+
+    @demo.route('/api/dex/quote')
+    def quote():
+        reserve_in, reserve_out, amount = 10 ** 24, 2 * 10 ** 24, 10 ** 18
+        for _ in range(2000):
+            amount = amount * 997 * reserve_out // (reserve_in * 1000 + amount * 997) or 10 ** 18
+        return jsonify({"amountOut": str(amount)})
+
+    @demo.route('/api/wallet/balance')
+    def balance():
+        time.sleep(stall)
+        return jsonify({"balance": []})
+
+    @demo.route('/api/bridge/stats')
+    def stats():
+        return jsonify({"locked": 0, "confirmed": 0})
+
+    return demo
+
+
+# For `serve.py --app benchmarks.bench_serving:demo_app`; the stall comes from the environment.
+demo_app = create_demo_app(float(os.environ.get("BENCH_SERVING_STALL", "20")))
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+
+
+async def load(url: str, endpoints, clients: int, duration: float, timeout: float):
+    """Runs `clients` request loops per endpoint; returns {endpoint: (latencies, status counter)}."""
+    results = {endpoint: ([], collections.Counter()) for endpoint in endpoints}
+    deadline = time.perf_counter() + duration
+    connector = aiohttp.TCPConnector(limit=0)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async def client(session, endpoint):
+        latencies, statuses = results[endpoint]
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                async with session.get(url + endpoint) as response:
+                    await response.read()
+                    statuses[response.status] += 1
+                    latencies.append(time.perf_counter() - start)
+            except asyncio.TimeoutError:
+                statuses["timeout"] += 1
+            except aiohttp.ClientError:
+                statuses["error"] += 1
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        await asyncio.gather(*(client(session, endpoint) for endpoint in endpoints for _ in range(clients)))
+    return results
+
+
+def report(results, duration):
+    for endpoint, (latencies, statuses) in results.items():
+        ordered = sorted(latencies)
+        p50, p99 = (f"{value * 1000:6.1f}" if value is not None else "     -"
+                    for value in (percentile(ordered, 0.5), percentile(ordered, 0.99)))
+        print(f"  {endpoint.split('?')[0]:<22} : {len(latencies) / duration:6,.0f} req/s  "
+              f"p50 {p50} ms  p99 {p99} ms  {dict(statuses)}")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_listening(port, process, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"Server exited with status {process.returncode}.")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    sys.exit("Server did not start listening.")
+
+
+def run_against(name, command, port, args):
+    env = dict(os.environ, BENCH_SERVING_STALL=str(args.stall))
+    process = subprocess.Popen(command, cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_listening(port, process)
+        results = asyncio.run(load(f"http://127.0.0.1:{port}", ENDPOINTS, args.clients, args.duration,
+                                   args.timeout))
+        print(name)
+        report(results, args.duration)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=args.stall + 5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='A running server to test instead of the demo app.')
+    parser.add_argument('--endpoint', action='append', help='Endpoint to test with --url; repeatable.')
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent clients per endpoint.')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--timeout', type=float, default=15.0, help='Client-side request timeout in seconds.')
+    parser.add_argument('--stall', type=float, default=20.0, help='Seconds the simulated Minima node takes.')
+    parser.add_argument('--workers', type=int, default=1, help='serve.py workers for the demo run.')
+    parser.add_argument('--serve-werkzeug', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_werkzeug:
+        demo_app.run(port=args.serve_werkzeug, threaded=True)
+    elif args.url:
+        endpoints = args.endpoint or ENDPOINTS
+        report(asyncio.run(load(args.url.rstrip("/"), endpoints, args.clients, args.duration, args.timeout)),
+               args.duration)
+    else:
+        print(f"clients={args.clients} per endpoint, duration={args.duration}s, stall={args.stall}s")
+        port = free_port()
+        run_against("werkzeug (threaded)", [sys.executable, os.path.abspath(__file__), "--serve-werkzeug", str(port),
+                                            "--stall", str(args.stall)], port, args)
+        port = free_port()
+        run_against(f"serve.py ({args.workers} worker{'s' if args.workers > 1 else ''})",
+                    [sys.executable, "serve.py", "--app", "benchmarks.bench_serving:demo_app",
+                     "--port", str(port), "--workers", str(args.workers), "--drain-timeout", "1"], port, args)
@@ -0,0 +1,100 @@
+"""
+Measures reading a large Slither report with json.load against the streaming parser.
+
+Writes a synthetic report with N detector findings (plus a printers section
+that the parser has to skip), then times and measures the peak memory
+(tracemalloc) of:
+  - json.load:  loading the whole document, as the original parser did;
+  - summary:    streaming the findings into a ReportSummary;
+  - diff:       streaming a base and a head report that differ by a few findings.
+
+Run from the backend directory:
+    python benchmarks/bench_slither_report.py --findings 200000
+
+Example output (200000 findings, 267 MiB report):
+    json.load               :    3.53s  peak    893.4 MiB
+    streaming summary       :    2.65s  peak      6.6 MiB
+    streaming diff          :    5.08s  peak     29.3 MiB  (new findings: 10)
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from parse_slither_report import IMPACTS, CONFIDENCES, diff_reports, summarize_report  # noqa: E402
+
+
+def finding(i):
+    filename = f"contracts/module{i % 400}/Contract{i % 37}.sol"
+    return {
+        "elements": [
+            {"type": "function", "name": f"transfer{i}", "source_mapping": {
+                "start": i * 10, "length": 120, "filename_relative": filename,
+                "filename_absolute": f"/home/runner/work/Primals/Primals/{filename}", "filename_short": filename,
+                "is_dependency": False, "lines": list(range(i % 500, i % 500 + 12)),
+                "starting_column": 5, "ending_column": 6}},
+            {"type": "node", "name": f"balances[msg.sender] -= amount_{i}", "source_mapping": {
+                "filename_relative": filename, "lines": [i % 500 + 3]}}
+        ],
+        "description": f"Reentrancy in Contract{i % 37}.transfer{i} ({filename}#{i % 500}-{i % 500 + 12}):\n"
+                       "\tExternal calls:\n\t- (success) = msg.sender.call{value: amount}()\n" * 3,
+        "markdown": "Reentrancy in [Contract.transfer](" + filename + ")" * 4,
+        "first_markdown_element": f"{filename}#L{i % 500}",
+        "id": f"{i:064x}",
+        "check": f"check-{i % 60}",
+        "impact": IMPACTS[i % len(IMPACTS)],
+        "confidence": CONFIDENCES[i % len(CONFIDENCES)]
+    }
+
+
+def write_report(path, findings, offset=0):
+    with open(path, "w") as f:
+        f.write('{"success": true, "error": null, "results": {"printers": [')
+        f.write(",".join(json.dumps({"printer": "summary", "description": "x" * 1000}) for _ in range(1000)))
+        f.write('], "detectors": [\n')
+        for i in range(findings):
+            f.write((",\n" if i else "") + json.dumps(finding(i + offset)))
+        f.write("\n]}}\n")
+
+
+def measure(name, run):
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    # A second run under tracemalloc for the peak; tracing slows it down too much to time it.
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--findings', type=int, default=200_000)
+    parser.add_argument('--new', type=int, default=10, help='Findings added to the head report for the diff.')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    base = os.path.join(directory, "base.json")
+    head = os.path.join(directory, "head.json")
+    write_report(base, args.findings)
+    # The head report has every base finding plus `new` findings at the end.
+    write_report(head, args.findings + args.new)
+    print(f"findings={args.findings} report={os.path.getsize(base) / 2 ** 20:.0f} MiB")
+
+    def load():
+        with open(base) as f:
+            return len(json.load(f)["results"]["detectors"])
+
+    for name, run in (("json.load", load),
+                      ("streaming summary", lambda: summarize_report(base)["total"]),
+                      ("streaming diff", lambda: sum(1 for _ in diff_reports(base, head)))):
+        elapsed, peak, result = measure(name, run)
+        extra = f"  (new findings: {result})" if name == "streaming diff" else ""
+        print(f"  {name:<24}: {elapsed:7.2f}s  peak {peak / 2 ** 20:8,.1f} MiB{extra}")
@@ -0,0 +1,138 @@
+"""
+Measures how long a worker takes to import the API, and checks it against a budget.
+
+Each measurement runs in a fresh interpreter with `python -X importtime`:
+  - python startup:    the interpreter alone, for reference;
+  - import app:        the lazy app, as a serve.py worker loads it;
+  - import app, eager: the app plus everything it used to load up front
+                       (web3 via minima_bridge, aiohttp via minima_async and
+                       Firebase, when installed);
+and reports the median wall time, the import time -X importtime records and
+the slowest top-level imports of `import app`. It then times the first
+request to endpoints whose services are created on first use. It exits
+non-zero if `import app` takes longer than --budget-ms or loads any of the
+modules that are meant to stay lazy.
+
+Run from the backend directory:
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 250
+
+Example output (firebase_admin not installed):
+    python startup         :   38.5 ms wall     26.2 ms importing
+    import app             :  222.5 ms wall    172.2 ms importing
+    import app, eager      : 1181.8 ms wall    973.6 ms importing
+    slowest imports of `import app`:
+        flask                        98.8 ms
+        minima_wallet                37.1 ms
+        certifi                      19.6 ms
+        ...
+    first request after import:
+        GET /api/health                     0.8 ms
+        GET /api/bridge/stats               2.9 ms
+        GET /api/marketplace/listings       0.5 ms
+        POST /api/bridge/start            797.4 ms
+    import app took 172.2 ms (budget 250 ms), lazy modules not loaded: OK
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Modules `import app` must not load; each is imported by the service that needs it.
+LAZY_MODULES = ("web3", "aiohttp", "firebase_admin", "google.cloud.firestore", "minima_bridge", "minima_async")
+
+EAGER_IMPORTS = """
+import app, minima_bridge, minima_async
+try:
+    import firebase_admin.firestore
+except ImportError:
+    pass
+"""
+
+FIRST_REQUESTS = """
+import json, time
+import app
+client = app.app.test_client()
+timings = []
+for method, path, body in (("GET", "/api/health", None), ("GET", "/api/bridge/stats", None),
+                           ("GET", "/api/marketplace/listings", None),
+                           ("POST", "/api/bridge/start", {"amount": "1", "evm_address": "not-an-address"})):
+    start = time.perf_counter()
+    client.open(path, method=method, json=body)
+    timings.append((f"{method} {path}", time.perf_counter() - start))
+app.app.extensions['services'].close()
+print(json.dumps(timings))
+"""
+
+
+def parse_importtime(stderr):
+    """Returns [(cumulative microseconds, depth, module)] from -X importtime output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(cumulative), depth, name.strip()))
+    return entries
+
+
+def run(code, cwd):
+    """Runs `code` in a new interpreter; returns (wall seconds, importtime entries, stdout)."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd,
+                            capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode:
+        sys.exit(f"Failed to run {code!r}:\n{result.stderr[-2000:]}")
+    return wall, parse_importtime(result.stderr), result.stdout
+
+
+def measure(name, code, runs, cwd):
+    walls, imports = [], []
+    for _ in range(runs):
+        wall, entries, _ = run(code, cwd)
+        walls.append(wall)
+        # Top-level entries (depth 1) add up to the time spent importing.
+        imports.append(sum(cumulative for cumulative, depth, _ in entries if depth == 1))
+    wall, imported = statistics.median(walls), statistics.median(imports) / 1000
+    print(f"  {name:<22} : {wall * 1000:6.1f} ms wall  {imported:7.1f} ms importing")
+    return imported
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=250.0, help='Allowed import time of `import app`.')
+    parser.add_argument('--top', type=int, default=8, help='Slowest top-level imports to list.')
+    args = parser.parse_args()
+
+    # A scratch directory as the working directory keeps the bridge queue database out of the tree.
+    cwd = tempfile.mkdtemp()
+    prelude = f"import sys; sys.path.insert(0, {os.path.abspath(BACKEND)!r})\n"
+    measure("python startup", "pass", args.runs, cwd)
+    imported = measure("import app", prelude + "import app", args.runs, cwd)
+    measure("import app, eager", prelude + EAGER_IMPORTS, args.runs, cwd)
+
+    _, entries, _ = run(prelude + "import app", cwd)
+    print("  slowest imports of `import app`:")
+    for cumulative, _, name in sorted((e for e in entries if e[1] == 1), reverse=True)[:args.top]:
+        print(f"      {name:<26} {cumulative / 1000:6.1f} ms")
+
+    loaded = sorted({name for _, _, name in entries} & set(LAZY_MODULES))
+
+    _, _, output = run(prelude + FIRST_REQUESTS, cwd)
+    print("  first request after import:")
+    for request, seconds in json.loads(output.splitlines()[-1]):
+        print(f"      {request:<30} {seconds * 1000:8.1f} ms")
+
+    ok = imported <= args.budget_ms and not loaded
+    print(f"  import app took {imported:.1f} ms (budget {args.budget_ms:.0f} ms), "
+          f"{'lazy modules loaded: ' + ', '.join(loaded) if loaded else 'lazy modules not loaded'}: "
+          f"{'OK' if ok else 'FAIL'}")
+    sys.exit(0 if ok else 1)
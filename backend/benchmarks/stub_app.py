@@ -0,0 +1,39 @@
+"""
+The API backed by local stand-ins, for load tests.
+
+Firestore is a StubFirestoreClient seeded with reserves for PAIRS pairs
+(token0-tokenB, token1-tokenB, ...) that takes BENCH_FIRESTORE_LATENCY
+seconds per call, and the wallet routes call the stub Minima node at
+BENCH_MINIMA_URL (see minima_stub_server.py). Serve it from the backend
+directory with:
+    python serve.py --app benchmarks.stub_app:app
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import minima_wallet  # noqa: E402
+from app import PUBLIC_COLLECTION_PATH, create_app  # noqa: E402
+from firestore_stub import StubFirestoreClient  # noqa: E402
+
+PAIRS = 100
+
+
+def create_stub_app(firestore_latency: float, minima_url: str):
+    client = StubFirestoreClient()
+    reserves = client.collection(PUBLIC_COLLECTION_PATH).document('dex').collection('reserves')
+    for i in range(PAIRS):
+        reserves.document(f"token{i}-tokenB").set({
+            "token_a": f"token{i}", "token_b": "tokenB", "reserve_a": 1000.0 + i, "reserve_b": 2000.0 + i
+        })
+    # Seeded without latency; requests pay it.
+    client.latency = firestore_latency
+    minima_wallet.MINIMA_API_URL = minima_url
+    return create_app({"FIRESTORE_CLIENT_FACTORY": lambda: client, "RESERVE_HISTORY_DIR": tempfile.mkdtemp(),
+                       "MARKETPLACE_DIR": tempfile.mkdtemp()})
+
+
+app = create_stub_app(float(os.environ.get("BENCH_FIRESTORE_LATENCY", "0.002")),
+                      os.environ.get("BENCH_MINIMA_URL", minima_wallet.MINIMA_API_URL))
@@ -0,0 +1,296 @@
+"""
+Runs the benchmark suite, stores the results as JSON and compares them against a baseline.
+
+Microbenchmarks time the hot paths at several data sizes, best of --repeat:
+  - dex.swap_tokens:                 SimpleDex swaps in a loop;
+  - dex.swap_many:                   PoolRegistry batch swaps over 1,000 pools;
+  - marketplace.place_bid,
+    marketplace.accept_highest_bid:  on a marketplace of N listings with 10 bids each;
+  - slither.parse_report:            parse_slither_report on a report of N findings.
+Load tests serve benchmarks.stub_app with serve.py (the API on an in-memory
+Firestore and the stub Minima node) and drive /api/dex/reserves and
+/api/wallet/balance with concurrent clients, recording req/s and p99.
+
+Every metric records its unit and whether lower or higher is better.
+`compare` flags a metric as a regression when it is worse than the baseline
+by more than --threshold and exits non-zero if any is. --quick runs the
+smallest size of each benchmark and shorter load tests; its metrics are a
+subset of a full run's, so it can be compared against a full baseline.
+
+Run from the backend directory:
+    python benchmarks/suite.py run --output results.json
+    python benchmarks/suite.py compare benchmarks/baselines/reference.json results.json
+    python benchmarks/suite.py run --quick --compare benchmarks/baselines/reference.json
+
+Example output of `run --quick --compare` (1 CPU, against the reference baseline):
+    metric                                                       baseline            current   change
+    dex.swap_tokens[swaps=10000]                               1.21 us/op         1.19 us/op    -1.7%
+    marketplace.accept_highest_bid[listings=10000]             5.83 us/op         5.82 us/op    -0.2%
+    slither.parse_report[findings=1000]                       18.23 ms/op        19.91 ms/op    +9.2%
+    http./api/dex/reserves[clients=16] req/s               2,776.40 req/s     2,779.00 req/s    +0.1%
+    http./api/wallet/balance[clients=16] p99                     39.96 ms           40.14 ms    +0.5%
+    ...
+    no regressions
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, BACKEND)
+
+# Quiet the modules' structured logs; set before they are imported.
+os.environ.setdefault("PRIMALS_LOG_LEVEL", "ERROR")
+
+from minima_dex import SimpleDex  # noqa: E402
+from minima_dex_engine import PoolRegistry  # noqa: E402
+from minima_nft_marketplace import NFTMarketplace  # noqa: E402
+from parse_slither_report import parse_slither_report  # noqa: E402
+from benchmarks.bench_serving import free_port, load, percentile, wait_until_listening  # noqa: E402
+from benchmarks.bench_slither_report import write_report  # noqa: E402
+
+DEFAULT_THRESHOLD = 0.20
+
+
+class Benchmark(NamedTuple):
+    name: str
+    parameter: str
+    sizes: Tuple[int, ...]
+    unit: str
+    run: Callable[[int], float]
+
+
+MICROBENCHMARKS: List[Benchmark] = []
+
+
+def microbenchmark(name: str, parameter: str, sizes: Tuple[int, ...], unit: str):
+    """Registers fn(size) -> seconds per unit of work; results are reported in `unit` (us or ms)."""
+    def register(fn):
+        MICROBENCHMARKS.append(Benchmark(name, parameter, sizes, unit, fn))
+        return fn
+    return register
+
+
+def _timed(fn: Callable[[], Any], count: int) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) / count
+
+
+@microbenchmark("dex.swap_tokens", "swaps", (10_000, 100_000), "us/op")
+def bench_swap_tokens(swaps: int) -> float:
+    dex = SimpleDex(1_000_000.0, 1_000_000.0)
+    rng = random.Random(1)
+    trades = [(rng.choice(("tokenA", "tokenB")), rng.uniform(1, 100)) for _ in range(swaps)]
+    return _timed(lambda: [dex.swap_tokens(token, amount) for token, amount in trades], swaps)
+
+
+@microbenchmark("dex.swap_many", "batch", (1_000, 100_000), "us/op")
+def bench_swap_many(batch: int) -> float:
+    registry = PoolRegistry()
+    registry.add_pools([1_000_000.0] * 1000, [2_000_000.0] * 1000)
+    rng = random.Random(2)
+    pair_ids = [rng.randrange(1000) for _ in range(batch)]
+    tokens = [rng.randrange(2) for _ in range(batch)]
+    amounts = [rng.uniform(1, 100) for _ in range(batch)]
+    return _timed(lambda: registry.swap_many(pair_ids, tokens, amounts), batch)
+
+
+def _marketplace(listings: int) -> NFTMarketplace:
+    marketplace = NFTMarketplace()
+    rng = random.Random(3)
+    for i in range(listings):
+        marketplace.list_nft_for_sale(f"NFT{i}", f"MxOwner{i % 1000}", rng.uniform(1, 10_000))
+    for i in range(listings * 10):
+        marketplace.place_bid(f"LST_{i % listings + 1}", f"MxBidder{i % 5000}", rng.uniform(1, 10_000))
+    return marketplace
+
+
+@microbenchmark("marketplace.place_bid", "listings", (10_000, 100_000), "us/op")
+def bench_place_bid(listings: int) -> float:
+    marketplace = _marketplace(listings)
+    rng = random.Random(4)
+    bids = [(f"LST_{rng.randint(1, listings)}", rng.uniform(1, 10_000)) for _ in range(10_000)]
+    return _timed(lambda: [marketplace.place_bid(target, "MxBidder", amount) for target, amount in bids], len(bids))
+
+
+@microbenchmark("marketplace.accept_highest_bid", "listings", (10_000, 100_000), "us/op")
+def bench_accept_highest_bid(listings: int) -> float:
+    marketplace = _marketplace(listings)
+    targets = [f"LST_{i}" for i in random.Random(5).sample(range(1, listings + 1), 1000)]
+    owners = [marketplace.listings[target].owner for target in targets]
+    return _timed(lambda: [marketplace.accept_highest_bid(target, owner) for target, owner in zip(targets, owners)],
+                  len(targets))
+
+
+@microbenchmark("slither.parse_report", "findings", (1_000, 10_000), "ms/op")
+def bench_parse_report(findings: int) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "slither-report.json")
+        write_report(path, findings)
+        # parse_slither_report prints every finding; time the parsing, not the terminal.
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            return _timed(lambda: parse_slither_report(path), 1)
+
+
+LOAD_ENDPOINTS = ("/api/dex/reserves?token_a=token0&token_b=tokenB", "/api/wallet/balance")
+
+
+def _start(command: List[str], env: Dict[str, str], port: int) -> subprocess.Popen:
+    process = subprocess.Popen(command, cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_until_listening(port, process)
+    return process
+
+
+def run_load_tests(clients: int, duration: float) -> Dict[str, Dict[str, Any]]:
+    """Serves the stubbed API with serve.py and load-tests each endpoint in turn."""
+    results = {}
+    minima_port, api_port = free_port(), free_port()
+    env = dict(os.environ, BENCH_MINIMA_URL=f"http://127.0.0.1:{minima_port}")
+    processes = []
+    try:
+        # The stand-ins run in their own processes, so they do not share the load generator's CPU time slice.
+        processes.append(_start([sys.executable, "-c", "import time, minima_stub_server as stub; "
+                                 f"stub.start_stub_server(port={minima_port}); time.sleep(1e9)"], env, minima_port))
+        processes.append(_start([sys.executable, "serve.py", "--app", "benchmarks.stub_app:app", "--port", str(api_port),
+                                 "--workers", "1", "--drain-timeout", "1"], env, api_port))
+        url = f"http://127.0.0.1:{api_port}"
+        for endpoint in LOAD_ENDPOINTS:
+            # A short warm-up creates the lazy services and fills the reserves cache.
+            asyncio.run(load(url, [endpoint], 2, 0.5, 10.0))
+            latencies, statuses = asyncio.run(load(url, [endpoint], clients, duration, 10.0))[endpoint]
+            errors = sum(count for status, count in statuses.items() if status != 200)
+            name = f"http.{endpoint.split('?')[0]}[clients={clients}]"
+            results[f"{name} req/s"] = {"value": len(latencies) / duration, "unit": "req/s", "better": "higher"}
+            p99 = percentile(sorted(latencies), 0.99)
+            results[f"{name} p99"] = {"value": p99 * 1000 if p99 is not None else None, "unit": "ms",
+                                      "better": "lower"}
+            results[f"{name} errors"] = {"value": errors, "unit": "requests", "better": "lower"}
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND, capture_output=True,
+                              text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run_suite(quick: bool, repeat: int, only: str = None, clients: int = 16, duration: float = 5.0) -> Dict[str, Any]:
+    results = {}
+    for bench in MICROBENCHMARKS:
+        if only and only not in bench.name:
+            continue
+        for size in (bench.sizes[:1] if quick else bench.sizes):
+            scale = 1e3 if bench.unit.startswith("ms") else 1e6
+            value = min(bench.run(size) for _ in range(repeat)) * scale
+            name = f"{bench.name}[{bench.parameter}={size}]"
+            results[name] = {"value": value, "unit": bench.unit, "better": "lower"}
+            print(f"  {name:<50} {value:10.2f} {bench.unit}", flush=True)
+    if not only or only == "http":
+        for name, result in run_load_tests(clients, 2.0 if quick else duration).items():
+            results[name] = result
+            print(f"  {name:<50} {result['value'] or 0:10.2f} {result['unit']}", flush=True)
+    return {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": quick,
+            "repeat": repeat
+        },
+        "results": results
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Prints each shared metric's change from the baseline; returns the names of the regressions."""
+    for key in ("python", "cpus"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"warning: {key} differs from the baseline ({baseline['meta'].get(key)} vs "
+                  f"{current['meta'].get(key)}); timings may not be comparable")
+
+    def show(value, unit):
+        return "-" if value is None else f"{value:,.2f} {unit}"
+
+    regressions = []
+    print(f"{'metric':<50} {'baseline':>18} {'current':>18} {'change':>8}")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<50} {'-':>18} {show(result['value'], result['unit']):>18}  (new)")
+            continue
+        before, after = base["value"], result["value"]
+        if not before or after is None:
+            # e.g. an error count of zero: any errors now count as a regression.
+            worse = after is None or (after > before if result["better"] == "lower" else after < before)
+            change = "n/a"
+        else:
+            ratio = after / before - 1
+            worse = ratio > threshold if result["better"] == "lower" else ratio < -threshold
+            change = f"{ratio:+.1%}"
+        if worse:
+            regressions.append(name)
+        print(f"{name:<50} {show(before, base['unit']):>18} {show(after, result['unit']):>18} {change:>8}"
+              f"{'  REGRESSION' if worse else ''}")
+    missing = sorted(set(baseline["results"]) - set(current["results"]))
+    if missing and not current["meta"].get("quick"):
+        print(f"not measured: {', '.join(missing)}")
+    print(f"{len(regressions)} regression(s) beyond {threshold:.0%}" if regressions else "no regressions")
+    return regressions
+
+
+def _read(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Run the suite and write the results as JSON.")
+    run_parser.add_argument('--output', help='Where to write the results (default: print only).')
+    run_parser.add_argument('--quick', action='store_true', help='Smallest sizes and 2 s load tests.')
+    run_parser.add_argument('--repeat', type=int, default=3, help='Runs per microbenchmark; the best is kept.')
+    run_parser.add_argument('--only', help='Run only benchmarks whose name contains this, e.g. "marketplace"; '
+                            '"http" runs the load tests.')
+    run_parser.add_argument('--clients', type=int, default=16, help='Concurrent clients per load test.')
+    run_parser.add_argument('--duration', type=float, default=5.0, help='Seconds per load test.')
+    run_parser.add_argument('--compare', metavar='BASELINE', help='Compare against this baseline afterwards.')
+    run_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    compare_parser = commands.add_parser("compare", help="Compare results against a baseline.")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='Allowed relative slowdown before a metric is flagged (0.2 = 20%%).')
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run_suite(args.quick, args.repeat, args.only, args.clients, args.duration)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+                f.write("\n")
+        if args.compare:
+            sys.exit(1 if compare(_read(args.compare), report, args.threshold) else 0)
+    else:
+        sys.exit(1 if compare(_read(args.baseline), _read(args.current), args.threshold) else 0)
@@ -0,0 +1,249 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Tuple
+
+import rlp
+from eth_account import Account
+from eth_utils import keccak, to_checksum_address
+
+# First four bytes of keccak("mint(address,uint256)").
+MINT_SELECTOR = keccak(text="mint(address,uint256)")[:4]
+
+
+class RPCError(Exception):
+    def __init__(self, message: str, code: int = -32000):
+        super().__init__(message)
+        self.code = code
+
+
+def _decode_raw_transaction(raw: bytes) -> Dict[str, Any]:
+    """Returns the nonce, recipient and calldata of a legacy or EIP-1559 transaction."""
+    if raw and raw[0] <= 0x7f:
+        # Typed transaction: [chainId, nonce, maxPriorityFee, maxFee, gas, to, value, data, ...]
+        fields = rlp.decode(raw[1:])
+        nonce, to, data = fields[1], fields[5], fields[7]
+    else:
+        # Legacy: [nonce, gasPrice, gas, to, value, data, v, r, s]
+        fields = rlp.decode(raw)
+        nonce, to, data = fields[0], fields[3], fields[5]
+    return {"nonce": int.from_bytes(nonce, 'big'), "to": to, "data": data}
+
+
+class StubEVMHandler(BaseHTTPRequestHandler):
+    """
+    Answers the Ethereum JSON-RPC methods the bridge uses, including batch requests.
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length))
+        except ValueError:
+            payload = None
+        with self.server.lock:
+            self.server.http_requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if isinstance(payload, list):
+            body = [self._call(item) for item in payload]
+        else:
+            body = self._call(payload)
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _call(self, request: Any) -> Dict[str, Any]:
+        if not isinstance(request, dict) or "method" not in request:
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid request"}}
+        reply = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            reply["result"] = self.server.dispatch(request["method"], request.get("params") or [])
+        except RPCError as e:
+            reply["error"] = {"code": e.code, "message": str(e)}
+        return reply
+
+
+class StubEVMServer(ThreadingHTTPServer):
+    """
+    An in-memory EVM node that accepts signed transactions and mines them.
+
+    Nonces are enforced per sender like a real node: a nonce that was already
+    used is rejected with "nonce too low", a resent transaction with "already
+    known", and a transaction with a future nonce waits until the gap is
+    filled. Accepted transactions get a successful receipt `block_time`
+    seconds later. Calls to mint(address,uint256) are recorded in `mints`.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, chain_id: int = 1337, gas_price: int = 10 ** 9,
+                 block_time: float = 0.0, latency: float = 0.0):
+        super().__init__(address, StubEVMHandler)
+        self.chain_id = chain_id
+        self.gas_price = gas_price
+        self.block_time = block_time
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self.http_requests = 0
+        self.mints: List[Tuple[str, int]] = []
+        self.nonces: Dict[str, int] = {}
+        # sender -> {nonce: (tx_hash, decoded tx)} waiting for a nonce gap to close
+        self.queued: Dict[str, Dict[int, Tuple[str, Dict[str, Any]]]] = {}
+        # tx_hash -> [sender, to, mined_at or None while waiting on a nonce gap]
+        self.transactions: Dict[str, List[Any]] = {}
+        self.started = time.monotonic()
+
+    def block_number(self) -> int:
+        if not self.block_time:
+            return len(self.transactions)
+        return int((time.monotonic() - self.started) / self.block_time)
+
+    def dispatch(self, method: str, params: List[Any]) -> Any:
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            handler = getattr(self, "rpc_" + method, None)
+            if handler is None:
+                raise RPCError(f"Method {method} not found", -32601)
+            return handler(*params)
+
+    def rpc_web3_clientVersion(self):
+        return "StubEVM/1.0"
+
+    def rpc_net_version(self):
+        return str(self.chain_id)
+
+    def rpc_eth_chainId(self):
+        return hex(self.chain_id)
+
+    def rpc_eth_gasPrice(self):
+        return hex(self.gas_price)
+
+    def rpc_eth_blockNumber(self):
+        return hex(self.block_number())
+
+    def rpc_eth_maxPriorityFeePerGas(self):
+        return hex(self.gas_price // 10)
+
+    def rpc_eth_getBlockByNumber(self, block="latest", full=False):
+        number = self.block_number()
+        return {
+            "number": hex(number),
+            "hash": "0x" + keccak(text=str(number)).hex(),
+            "parentHash": "0x" + keccak(text=str(number - 1)).hex(),
+            "timestamp": hex(int(time.time())),
+            "gasLimit": hex(30_000_000),
+            "gasUsed": "0x0",
+            "baseFeePerGas": hex(self.gas_price),
+            "miner": "0x" + "00" * 20,
+            "extraData": "0x",
+            "transactions": []
+        }
+
+    def rpc_eth_estimateGas(self, tx, block="latest"):
+        return hex(60_000)
+
+    def rpc_eth_call(self, tx, block="latest"):
+        return "0x"
+
+    def rpc_eth_getTransactionCount(self, address, block="latest"):
+        return hex(self.nonces.get(to_checksum_address(address), 0))
+
+    def rpc_eth_sendRawTransaction(self, raw_hex):
+        raw = bytes.fromhex(raw_hex[2:] if raw_hex.startswith("0x") else raw_hex)
+        tx_hash = "0x" + keccak(raw).hex()
+        if tx_hash in self.transactions:
+            raise RPCError("already known")
+        try:
+            sender = Account.recover_transaction(raw)
+            tx = _decode_raw_transaction(raw)
+        except Exception as e:
+            raise RPCError(f"invalid transaction: {e}")
+        expected = self.nonces.get(sender, 0)
+        if tx["nonce"] < expected:
+            raise RPCError("nonce too low")
+        pending = self.queued.setdefault(sender, {})
+        if tx["nonce"] in pending:
+            raise RPCError("replacement transaction underpriced")
+        pending[tx["nonce"]] = (tx_hash, tx)
+        self.transactions[tx_hash] = [sender, to_checksum_address(tx["to"]) if tx["to"] else None, None]
+        # Mine everything that is now contiguous with the sender's nonce.
+        while expected in pending:
+            mined_hash, mined_tx = pending.pop(expected)
+            self.transactions[mined_hash][2] = time.monotonic() + self.block_time
+            data = mined_tx["data"]
+            if data[:4] == MINT_SELECTOR and len(data) == 68:
+                self.mints.append((to_checksum_address(data[16:36]), int.from_bytes(data[36:68], 'big')))
+            expected += 1
+        self.nonces[sender] = expected
+        return tx_hash
+
+    def rpc_eth_getTransactionReceipt(self, tx_hash):
+        entry = self.transactions.get(tx_hash)
+        if entry is None or entry[2] is None or entry[2] > time.monotonic():
+            return None
+        sender, to, _ = entry
+        block = hex(self.block_number())
+        return {
+            "transactionHash": tx_hash,
+            "transactionIndex": "0x0",
+            "blockHash": "0x" + keccak(text=block).hex(),
+            "blockNumber": block,
+            "from": sender,
+            "to": to,
+            "contractAddress": None,
+            "cumulativeGasUsed": hex(60_000),
+            "gasUsed": hex(60_000),
+            "effectiveGasPrice": hex(self.gas_price),
+            "logs": [],
+            "logsBloom": "0x" + "00" * 256,
+            "status": "0x1",
+            "type": "0x0"
+        }
+
+
+def start_stub_evm(port: int = 0, chain_id: int = 1337, gas_price: int = 10 ** 9, block_time: float = 0.0,
+                   latency: float = 0.0) -> Tuple[StubEVMServer, str]:
+    """
+    Starts a stub EVM JSON-RPC node in a background thread.
+
+    Args:
+        port: The port to listen on; 0 picks a free one.
+        chain_id: The chain id reported to clients and expected in signatures.
+        gas_price: The gas price reported by eth_gasPrice, in wei.
+        block_time: Seconds until an accepted transaction has a receipt.
+        latency: Seconds to sleep before every HTTP response.
+
+    Returns:
+        The server (call shutdown() to stop it) and its URL. `server.calls`
+        counts calls per method, `server.http_requests` HTTP requests (a
+        batch is one), and `server.mints` lists (recipient, amount) of every
+        mined mint.
+    """
+    server = StubEVMServer(("127.0.0.1", port), chain_id=chain_id, gas_price=gas_price,
+                           block_time=block_time, latency=latency)
+    threading.Thread(target=server.serve_forever, name="stub-evm", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    server, url = start_stub_evm(port=8545)
+    print(f"Stub EVM node listening on {url} (chain id {server.chain_id}; Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,413 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import upstream_timer
+from minima_rpc import DEFAULT_TIMEOUT
+
+# These ship with web3.py; without them nothing can be signed, as in minima_bridge.
+try:
+    from eth_keys import keys
+    from eth_utils import keccak
+except ImportError:
+    keys = None
+    keccak = None
+
+# coincurve's recoverable signatures are several times faster than going through eth_keys.
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
+
+# JSON-RPC error messages (as geth words them) meaning a nonce is already taken.
+NONCE_TAKEN_ERRORS = ("nonce too low", "replacement transaction underpriced")
+
+# First four bytes of keccak("mint(address,uint256)").
+MINT_SELECTOR = bytes.fromhex("40c10f19")
+
+
+class JsonRpcError(Exception):
+    """An error object returned by an Ethereum node for one JSON-RPC call."""
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
+
+    @property
+    def nonce_taken(self) -> bool:
+        message = str(self).lower()
+        return any(error in message for error in NONCE_TAKEN_ERRORS)
+
+    @property
+    def already_known(self) -> bool:
+        return "already known" in str(self).lower()
+
+    @property
+    def underpriced(self) -> bool:
+        """The gas price is below what the node accepts (not a replacement of a used nonce)."""
+        return "underpriced" in str(self).lower() and not self.nonce_taken
+
+
+class EVMBatchClient:
+    """
+    A minimal pooled JSON-RPC client for an Ethereum node that can send many calls in one HTTP request.
+    """
+
+    def __init__(self, node_url: str, pool_size: int = 4, timeout: Tuple[float, float] = DEFAULT_TIMEOUT):
+        self.node_url = node_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._ids = itertools.count(1)
+
+    def call(self, method: str, params: Sequence[Any] = ()) -> Any:
+        """
+        Makes one JSON-RPC call and returns its result.
+
+        Raises:
+            JsonRpcError: If the node answers with an error object.
+            requests.exceptions.RequestException: On transport errors.
+        """
+        result = self.batch([(method, params)])[0]
+        if isinstance(result, JsonRpcError):
+            raise result
+        return result
+
+    def batch(self, calls: Sequence[Tuple[str, Sequence[Any]]]) -> List[Union[Any, JsonRpcError]]:
+        """
+        Sends calls as one JSON-RPC batch.
+
+        Returns:
+            One entry per call, in order: the call's result, or a JsonRpcError
+            if that call failed. Errors do not affect the other calls.
+        """
+        if not calls:
+            return []
+        ids = [next(self._ids) for _ in calls]
+        payload = [{"jsonrpc": "2.0", "id": i, "method": method, "params": list(params)}
+                   for i, (method, params) in zip(ids, calls)]
+        with upstream_timer("evm", calls[0][0] if len(calls) == 1 else "batch"):
+            response = self.session.post(self.node_url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            replies = response.json()
+        if isinstance(replies, dict):
+            # Some nodes answer a whole batch with a single error object.
+            error = replies.get("error") or {}
+            raise JsonRpcError(error.get("message", "Invalid batch response"), error.get("code"))
+        by_id = {reply.get("id"): reply for reply in replies}
+        results = []
+        for i in ids:
+            reply = by_id.get(i)
+            if reply is None:
+                results.append(JsonRpcError("No response for call"))
+            elif reply.get("error"):
+                results.append(JsonRpcError(reply["error"].get("message", ""), reply["error"].get("code")))
+            else:
+                results.append(reply.get("result"))
+        return results
+
+    def close(self):
+        self.session.close()
+
+
+class NonceManager:
+    """
+    Hands out transaction nonces for one account from memory.
+
+    The counter is read from the node's pending transaction count once and
+    then advanced locally, so concurrent senders never get the same nonce
+    and no RPC is needed per transaction. A reserved nonce that ends up
+    unused is released and handed out again first, so it does not leave a
+    gap that would hold back later transactions. resync() moves the counter
+    past nonces used by someone else.
+    """
+
+    def __init__(self, fetch_pending_count: Callable[[], int]):
+        """
+        Args:
+            fetch_pending_count: Returns the account's transaction count
+                                 including pending transactions, e.g.
+                                 lambda: w3.eth.get_transaction_count(address, 'pending').
+        """
+        self._fetch = fetch_pending_count
+        self._lock = threading.Lock()
+        self._next: Optional[int] = None
+        self._released: List[int] = []
+        self.resyncs = 0
+
+    def reserve(self) -> int:
+        """Returns a nonce no other caller of this manager will get."""
+        with self._lock:
+            if self._released:
+                return heapq.heappop(self._released)
+            if self._next is None:
+                self._next = self._fetch()
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def release(self, nonce: int):
+        """Returns a reserved nonce that was never accepted by the node."""
+        with self._lock:
+            if self._next is not None and nonce < self._next and nonce not in self._released:
+                heapq.heappush(self._released, nonce)
+
+    def take_released(self) -> List[int]:
+        """Reserves every released nonce at once, e.g. to fill the gaps with empty transactions."""
+        with self._lock:
+            released = sorted(self._released)
+            self._released = []
+            return released
+
+    def resync(self) -> int:
+        """
+        Re-reads the node's pending count after a nonce was found taken.
+
+        The counter only moves forward: nonces this manager already handed out
+        may still be in flight. Released nonces the node has seen used are dropped.
+        """
+        pending = self._fetch()
+        with self._lock:
+            self.resyncs += 1
+            self._next = pending if self._next is None else max(self._next, pending)
+            self._released = [nonce for nonce in self._released if nonce >= pending]
+            heapq.heapify(self._released)
+            return self._next
+
+    def reset(self):
+        """Forgets everything; the next reserve() reads the count from the node again."""
+        with self._lock:
+            self._next = None
+            self._released = []
+
+
+class ReceiptTracker:
+    """
+    Follows sent transactions until they are mined, polling receipts in JSON-RPC batches.
+    """
+
+    def __init__(self, client: EVMBatchClient, chunk_size: int = 200, resend_after: float = 60.0,
+                 clock=time.monotonic):
+        """
+        Args:
+            client: The EVMBatchClient to poll with.
+            chunk_size: The most receipts requested in one batch.
+            resend_after: Seconds without a receipt after which a transaction
+                          is handed back by stale() to be sent again.
+            clock: Time source, for tests.
+        """
+        self.client = client
+        self.chunk_size = chunk_size
+        self.resend_after = resend_after
+        self.clock = clock
+        self._lock = threading.Lock()
+        # tx_hash -> [key, raw transaction, last sent time]
+        self._pending: Dict[str, List[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def track(self, key: Any, tx_hash: str, raw_transaction: bytes):
+        with self._lock:
+            self._pending[tx_hash] = [key, raw_transaction, self.clock()]
+
+    def forget(self, tx_hash: str):
+        with self._lock:
+            self._pending.pop(tx_hash, None)
+
+    def poll(self) -> Tuple[List[Tuple[Any, Dict[str, Any]]], List[Tuple[Any, Dict[str, Any]]]]:
+        """
+        Fetches the receipts of every tracked transaction.
+
+        Returns:
+            (succeeded, reverted): lists of (key, receipt) for the transactions
+            mined since the last poll. Mined transactions stop being tracked.
+        """
+        with self._lock:
+            hashes = list(self._pending)
+        succeeded, reverted = [], []
+        for start in range(0, len(hashes), self.chunk_size):
+            chunk = hashes[start:start + self.chunk_size]
+            receipts = self.client.batch([("eth_getTransactionReceipt", [h]) for h in chunk])
+            with self._lock:
+                for tx_hash, receipt in zip(chunk, receipts):
+                    if not receipt or isinstance(receipt, JsonRpcError):
+                        continue
+                    entry = self._pending.pop(tx_hash, None)
+                    if entry is None:
+                        continue
+                    ok = int(receipt.get("status") or "0x0", 16) == 1
+                    (succeeded if ok else reverted).append((entry[0], receipt))
+        return succeeded, reverted
+
+    def stale(self) -> List[Tuple[Any, str, bytes]]:
+        """
+        Returns (key, tx_hash, raw transaction) of the transactions that have
+        waited longer than `resend_after`, and restarts their timers. Resending
+        the same bytes is safe: the node either has them or re-adds them.
+        """
+        now = self.clock()
+        with self._lock:
+            stale = [(entry[0], tx_hash, entry[1]) for tx_hash, entry in self._pending.items()
+                     if now - entry[2] >= self.resend_after]
+            for _, tx_hash, _ in stale:
+                self._pending[tx_hash][2] = now
+        return stale
+
+
+def _rlp_length(length: int, offset: int) -> bytes:
+    if length < 56:
+        return bytes((offset + length,))
+    encoded = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes((offset + 55 + len(encoded),)) + encoded
+
+
+def _rlp_list(items: Sequence[Union[int, bytes]]) -> bytes:
+    """RLP-encodes a flat list of integers and byte strings, the shape of a legacy transaction."""
+    parts = []
+    for item in items:
+        if isinstance(item, int):
+            item = item.to_bytes((item.bit_length() + 7) // 8, 'big')
+        if len(item) == 1 and item[0] < 0x80:
+            parts.append(item)
+        else:
+            parts.append(_rlp_length(len(item), 0x80) + item)
+    payload = b"".join(parts)
+    return _rlp_length(len(payload), 0xc0) + payload
+
+
+def _address_bytes(address: str) -> bytes:
+    raw = bytes.fromhex(address[2:] if address[:2] in ("0x", "0X") else address)
+    if len(raw) != 20:
+        raise ValueError(f"Invalid address: {address}")
+    return raw
+
+
+class TransactionSigner:
+    """
+    Signs legacy (EIP-155) transactions for one account and chain.
+
+    The transaction is RLP-encoded and signed directly, skipping web3's
+    field validation and formatting on every call; the result is byte for
+    byte what eth_account's sign_transaction produces.
+    """
+
+    def __init__(self, private_key: str, chain_id: int):
+        """
+        Raises:
+            RuntimeError: If eth_keys (installed with web3.py) is not available.
+        """
+        if keys is None:
+            raise RuntimeError("web3.py is required to sign transactions.")
+        secret = bytes.fromhex(private_key[2:] if private_key.startswith("0x") else private_key)
+        self._key = keys.PrivateKey(secret)
+        self._fast_key = coincurve.PrivateKey(secret) if coincurve else None
+        self.address = self._key.public_key.to_checksum_address()
+        self.address_bytes = _address_bytes(self.address)
+        self.chain_id = chain_id
+
+    def _sign_hash(self, message_hash: bytes) -> Tuple[int, int, int]:
+        if self._fast_key is not None:
+            signature = self._fast_key.sign_recoverable(message_hash, hasher=None)
+            return signature[64], int.from_bytes(signature[:32], 'big'), int.from_bytes(signature[32:64], 'big')
+        signature = self._key.sign_msg_hash(message_hash)
+        return signature.v, signature.r, signature.s
+
+    def sign(self, to: bytes, data: bytes, nonce: int, gas: int, gas_price: int, value: int = 0) -> Tuple[str, bytes]:
+        """
+        Signs a transaction.
+
+        Args:
+            to: The 20-byte recipient address.
+            data: The calldata.
+
+        Returns:
+            (tx_hash, raw_transaction): the hex transaction hash and the bytes to send.
+        """
+        fields = [nonce, gas_price, gas, to, value, data]
+        recovery_id, r, s = self._sign_hash(keccak(_rlp_list(fields + [self.chain_id, 0, 0])))
+        raw = _rlp_list(fields + [recovery_id + 35 + 2 * self.chain_id, r, s])
+        return "0x" + keccak(raw).hex(), raw
+
+
+class MintBinding:
+    """
+    The bridge contract's mint(address,uint256), pre-encoded for one signer.
+
+    The selector and contract address are fixed once; each mint only packs
+    the recipient and amount into the calldata and signs. This replaces a
+    web3 contract object, whose build_transaction re-walks the ABI per call.
+    """
+
+    def __init__(self, signer: TransactionSigner, contract_address: str, gas_limit: int):
+        self.signer = signer
+        self.contract_address = _address_bytes(contract_address)
+        self.gas_limit = gas_limit
+
+    @staticmethod
+    def encode(recipient_address: str, amount_in_wei: int) -> bytes:
+        """Returns the calldata of mint(recipient, amount)."""
+        if not 0 <= amount_in_wei < 2 ** 256:
+            raise ValueError(f"Amount out of range: {amount_in_wei}")
+        return MINT_SELECTOR + bytes(12) + _address_bytes(recipient_address) + amount_in_wei.to_bytes(32, 'big')
+
+    def sign_mint(self, recipient_address: str, amount_in_wei: int, nonce: int, gas_price: int) -> Tuple[str, bytes]:
+        """Signs a mint call. Returns (tx_hash, raw_transaction)."""
+        return self.signer.sign(self.contract_address, self.encode(recipient_address, amount_in_wei),
+                                nonce, self.gas_limit, gas_price)
+
+
+class GasPriceCache:
+    """
+    Reuses the node's gas price for `ttl` seconds instead of asking before every transaction.
+    """
+
+    def __init__(self, fetch_gas_price: Callable[[], int], ttl: float = 10.0, clock=time.monotonic):
+        """
+        Args:
+            fetch_gas_price: Returns the current gas price in wei, e.g. lambda: w3.eth.gas_price.
+            ttl: Seconds a fetched price is reused.
+            clock: Time source, for tests.
+        """
+        self._fetch = fetch_gas_price
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._price: Optional[int] = None
+        self._expires = 0.0
+
+    def get(self) -> int:
+        with self._lock:
+            if self._price is None or self.clock() >= self._expires:
+                self._price = self._fetch()
+                self._expires = self.clock() + self.ttl
+            return self._price
+
+    def invalidate(self):
+        """Makes the next get() fetch a fresh price, e.g. after an underpriced rejection."""
+        with self._lock:
+            self._price = None
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    counter = {"pending": 7}
+    nonces = NonceManager(lambda: counter["pending"])
+    print("Reserved:", [nonces.reserve() for _ in range(3)])
+    nonces.release(8)
+    print("After releasing 8:", nonces.reserve(), nonces.reserve())
+    counter["pending"] = 20  # another process sent transactions from the same account
+    print("After resync:", nonces.resync(), nonces.reserve())
+
+    # A well-known local development key; never use it on a real network.
+    signer = TransactionSigner("0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80", chain_id=1337)
+    mint = MintBinding(signer, "0x5FbDB2315678afecb367f032d93F642f64180aa3", gas_limit=100_000)
+    tx_hash, raw = mint.sign_mint("0x742d35Cc4A95D71C0F4A5E44007b819973E73E77", 10 ** 18, nonce=0, gas_price=10 ** 9)
+    print(f"Signed mint {tx_hash} ({len(raw)} bytes) from {signer.address}")
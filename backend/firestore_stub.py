@@ -0,0 +1,132 @@
+import copy
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class StubSnapshot:
+    """A read of one document, shaped like google.cloud.firestore.DocumentSnapshot."""
+
+    def __init__(self, doc_id: str, data: Optional[Dict[str, Any]]):
+        self.id = doc_id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+
+class StubDocument:
+    def __init__(self, client: 'StubFirestoreClient', path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+
+    def collection(self, name: str) -> 'StubCollection':
+        return StubCollection(self._client, f"{self.path}/{name}")
+
+    def set(self, data: Dict[str, Any]):
+        self._client._write([(self.path, data)])
+
+    def get(self) -> StubSnapshot:
+        return StubSnapshot(self.id, self._client._read(self.path))
+
+
+class StubCollection:
+    def __init__(self, client: 'StubFirestoreClient', path: str):
+        self._client = client
+        self.path = path
+
+    def document(self, doc_id: str) -> StubDocument:
+        return StubDocument(self._client, f"{self.path}/{doc_id}")
+
+    def stream(self) -> Iterator[StubSnapshot]:
+        for path, data in self._client._list(self.path):
+            yield StubSnapshot(path.rsplit('/', 1)[-1], data)
+
+
+class StubBatch:
+    def __init__(self, client: 'StubFirestoreClient'):
+        self._client = client
+        self._writes: List[Tuple[str, Dict[str, Any]]] = []
+
+    def set(self, doc: StubDocument, data: Dict[str, Any]):
+        self._writes.append((doc.path, data))
+
+    def commit(self):
+        self._client._write(self._writes)
+
+
+class StubFirestoreClient:
+    """
+    An in-memory stand-in for the Firestore client, for local runs and load tests.
+
+    Supports what FirestoreDEX uses: nested collection/document references,
+    set, get, stream and batched writes. Each call can sleep for `latency`
+    seconds to simulate the network round trip, and `calls` counts the
+    calls by operation. Pass the class as the app's FIRESTORE_CLIENT_FACTORY.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Args:
+            latency: Seconds every read, write or commit takes.
+        """
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def server_timestamp(self) -> float:
+        """Stands in for firestore.SERVER_TIMESTAMP; documents get the write time in seconds."""
+        return time.time()
+
+    def collection(self, path: str) -> StubCollection:
+        return StubCollection(self, path.strip('/'))
+
+    def batch(self) -> StubBatch:
+        return StubBatch(self)
+
+    def _call(self, operation: str):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    def _write(self, writes: List[Tuple[str, Dict[str, Any]]]):
+        self._call("write")
+        with self._lock:
+            for path, data in writes:
+                self._documents[path] = copy.deepcopy(data)
+
+    def _read(self, path: str) -> Optional[Dict[str, Any]]:
+        self._call("get")
+        with self._lock:
+            return self._documents.get(path)
+
+    def _list(self, path: str) -> List[Tuple[str, Dict[str, Any]]]:
+        self._call("stream")
+        prefix = path + '/'
+        with self._lock:
+            # Direct children only, like a collection query.
+            return [(doc_path, data) for doc_path, data in self._documents.items()
+                    if doc_path.startswith(prefix) and '/' not in doc_path[len(prefix):]]
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    db = StubFirestoreClient(latency=0.002)
+    reserves = db.collection("artifacts/demo/public/data").document('dex').collection('reserves')
+    reserves.document("tokenA-tokenB").set({"reserve_a": 1000, "reserve_b": 2000})
+    batch = db.batch()
+    batch.set(reserves.document("tokenB-tokenC"), {"reserve_a": 50, "reserve_b": 75})
+    batch.commit()
+
+    snapshot = reserves.document("tokenA-tokenB").get()
+    print(f"exists={snapshot.exists} data={snapshot.to_dict()}")
+    print(f"missing exists={reserves.document('tokenX-tokenY').get().exists}")
+    print(f"all reserves: {[doc.to_dict() for doc in reserves.stream()]}")
+    print(f"calls: {db.calls}")
@@ -0,0 +1,293 @@
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from structured_log import get_logger
+
+log = get_logger("metrics")
+
+# Latency buckets in seconds; the same boundaries as minima_rpc.LatencyHistogram.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (metric name, label names, label values, value)
+Sample = Tuple[str, Sequence[str], Sequence[str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """Returns the child for one combination of label values, creating it on first use."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} takes labels {self.label_names}, got {values}.")
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, e.g. requests served."""
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            yield self.name + "_total", self.label_names, values, child.value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "count", "sum", "_lock")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def time(self) -> "_Timer":
+        """Returns a context manager that observes the seconds its block took."""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class Histogram(_Metric):
+    """Counts observations (e.g. latencies in seconds) into fixed buckets, plus their count and sum."""
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def samples(self):
+        bucket_names = self.label_names + ("le",)
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts, count, total = list(child.counts), child.count, child.sum
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                yield self.name + "_bucket", bucket_names, values + (_format_value(bound),), cumulative
+            yield self.name + "_count", self.label_names, values, count
+            yield self.name + "_sum", self.label_names, values, total
+
+
+class Collected(_Metric):
+    """
+    A gauge or counter read at scrape time from a callback, e.g. a queue depth
+    or a cache's hit count. Nothing is recorded on the hot path.
+    """
+
+    def __init__(self, name: str, help: str, type: str = "gauge", labels: Sequence[str] = (),
+                 collect: Optional[Callable[[], Iterable[Tuple[Sequence[str], float]]]] = None):
+        """
+        Args:
+            type: "gauge", or "counter" for values that only grow.
+            collect: Returns (label values, value) pairs; for a metric without labels, [((), value)].
+        """
+        super().__init__(name, help, labels)
+        self.type = type
+        self.collect = collect
+
+    def samples(self):
+        if self.collect is None:
+            return
+        try:
+            collected = list(self.collect())
+        except Exception as e:
+            log.error("metric_collect_failed", metric=self.name, error=str(e))
+            return
+        name = self.name + "_total" if self.type == "counter" else self.name
+        for values, value in collected:
+            yield name, self.label_names, tuple(values), value
+
+
+class Registry:
+    """A set of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if (type(existing) is not type(metric) or existing.type != metric.type
+                        or existing.label_names != metric.label_names):
+                    raise ValueError(f"Metric {metric.name} is already registered differently.")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def collected(self, name: str, help: str, type: str = "gauge", labels: Sequence[str] = (),
+                  collect=None) -> Collected:
+        """Registers a metric read from `collect` at scrape time; registering it again replaces the callback."""
+        metric = self._register(Collected(name, help, type, labels))
+        metric.collect = collect
+        return metric
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            # Version 0.0.4 names a counter family after its samples, with the _total suffix.
+            family = metric.name + "_total" if metric.type == "counter" else metric.name
+            lines.append(f"# HELP {family} {_escape(metric.help)}")
+            lines.append(f"# TYPE {family} {metric.type}")
+            for name, label_names, values, value in metric.samples():
+                lines.append(f"{name}{_format_labels(label_names, values)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# The process-wide registry that /metrics renders. Each process has its own:
+# with several serve.py workers, a scrape sees only the worker that answered it.
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to handle an API request, by route.", ("route", "method", "status"))
+
+# Outcome is "ok" or "error"; operation is the RPC method, endpoint or Firestore call.
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "upstream_request_duration_seconds", "Latency of calls to Firestore, the Minima node and EVM nodes.",
+    ("service", "operation", "outcome"))
+
+
+def observe_upstream(service: str, operation: str, seconds: float, error: bool = False):
+    UPSTREAM_LATENCY.labels(service, operation, "error" if error else "ok").observe(seconds)
+
+
+class upstream_timer:
+    """
+    Times a block as one upstream call; the outcome is "error" if it raises.
+
+        with upstream_timer("firestore", "get_reserves"):
+            doc = doc_ref.get()
+    """
+    __slots__ = ("service", "operation", "start")
+
+    def __init__(self, service: str, operation: str):
+        self.service = service
+        self.operation = operation
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe_upstream(self.service, self.operation, time.perf_counter() - self.start, exc_type is not None)
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    registry = Registry()
+    requests_served = registry.counter("demo_requests", "Requests served.", ("route",))
+    latency = registry.histogram("demo_latency_seconds", "Request latency.", ("route",))
+    queue = [1, 2, 3]
+    registry.collected("demo_queue_depth", "Items waiting.", collect=lambda: [((), len(queue))])
+
+    for ms in (0.4, 3, 7, 120):
+        requests_served.labels("/api/dex/quote").inc()
+        latency.labels("/api/dex/quote").observe(ms / 1000)
+    with latency.labels("/api/bridge/stats").time():
+        time.sleep(0.002)
+
+    print(registry.render())
+
+    observations = 1_000_000
+    child = latency.labels("/api/dex/quote")
+    start = time.perf_counter()
+    for _ in range(observations):
+        child.observe(0.004)
+    print(f"observe(): {(time.perf_counter() - start) / observations * 1e9:.0f} ns per call")
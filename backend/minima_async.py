@@ -0,0 +1,177 @@
+import asyncio
+import random
+import time
+from typing import Dict, Any, Iterable, List, Optional
+
+import aiohttp
+
+from metrics import observe_upstream
+from minima_rpc import LatencyHistogram, RETRY_STATUSES
+from minima_wallet import MINIMA_API_URL
+
+
+class AsyncMinimaClient:
+    """
+    An asyncio client for a Minima node's API, for fanning out many queries at once.
+
+    Requests share one keep-alive aiohttp session and run concurrently under a
+    bounded semaphore. Idempotent GETs are retried with jittered backoff like
+    MinimaRPCClient does. Use it as an async context manager.
+    """
+
+    def __init__(self, base_url: str = MINIMA_API_URL, concurrency: int = 50, timeout: float = 10.0,
+                 retries: int = 2, backoff: float = 0.1, max_backoff: float = 2.0):
+        """
+        Initializes the client.
+
+        Args:
+            base_url: The Minima node API URL.
+            concurrency: The maximum number of requests in flight (and open connections).
+            timeout: The total timeout in seconds of a single request.
+            retries: How many times a failed GET is retried.
+            backoff: The base backoff in seconds; doubled on each retry.
+            max_backoff: The upper bound for a single backoff sleep.
+        """
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> 'AsyncMinimaClient':
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _observe(self, endpoint: str, elapsed_ms: float, error: bool):
+        histogram = self.histograms.get(endpoint)
+        if histogram is None:
+            histogram = self.histograms[endpoint] = LatencyHistogram()
+        histogram.observe(elapsed_ms, error)
+        observe_upstream("minima", endpoint, elapsed_ms / 1000, error)
+
+    async def request(self, method: str, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                      json: Any = None, retries: Optional[int] = None) -> Any:
+        """
+        Calls an API endpoint and returns the decoded JSON response.
+
+        Raises:
+            aiohttp.ClientError or asyncio.TimeoutError: If the call still fails after all retries.
+        """
+        if self._session is None:
+            raise RuntimeError("AsyncMinimaClient must be used inside 'async with'.")
+        if retries is None:
+            retries = self.retries if method == "GET" else 0
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                start = time.perf_counter()
+                try:
+                    async with self._session.request(method, url, params=params, json=json) as response:
+                        if response.status in RETRY_STATUSES and attempt < retries:
+                            raise aiohttp.ClientResponseError(response.request_info, response.history,
+                                                              status=response.status)
+                        response.raise_for_status()
+                        result = await response.json(content_type=None)
+                except (aiohttp.ClientConnectionError, aiohttp.ClientResponseError, asyncio.TimeoutError) as e:
+                    self._observe(endpoint, (time.perf_counter() - start) * 1000, True)
+                    retryable = not isinstance(e, aiohttp.ClientResponseError) or e.status in RETRY_STATUSES
+                    if not retryable or attempt >= retries:
+                        raise
+                else:
+                    self._observe(endpoint, (time.perf_counter() - start) * 1000, False)
+                    return result
+            # Back off outside the semaphore so other requests can use the slot.
+            await asyncio.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+            attempt += 1
+
+    async def get_balance(self, address: Optional[str] = None) -> Any:
+        """Async counterpart of minima_wallet.get_balance."""
+        params = {"address": address} if address else None
+        return await self.request("GET", "balance", params=params)
+
+    async def get_inventory(self, address: str) -> Any:
+        """Queries the node's 'tokens' endpoint for the tokens held by an address."""
+        return await self.request("POST", "tokens", json={"address": address}, retries=self.retries)
+
+    async def _fan_out(self, fetch, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        # dict.fromkeys drops repeated keys while keeping the first-seen order.
+        unique = list(dict.fromkeys(keys))
+        outcomes = await asyncio.gather(*(fetch(key) for key in unique), return_exceptions=True)
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        for key, outcome in zip(unique, outcomes):
+            if isinstance(outcome, BaseException):
+                if not isinstance(outcome, Exception):
+                    raise outcome
+                errors[key] = str(outcome) or type(outcome).__name__
+            else:
+                results[key] = outcome
+        return {"results": results, "errors": errors}
+
+    async def get_balances(self, addresses: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetches the balances of many addresses concurrently.
+
+        Returns:
+            {"results": {address: balance}, "errors": {address: message}}. A
+            failing address only lands in "errors"; the others still return.
+        """
+        return await self._fan_out(self.get_balance, addresses)
+
+    async def get_inventories(self, addresses: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetches the token inventories of many addresses concurrently, with the
+        same partial-result shape as get_balances.
+        """
+        return await self._fan_out(self.get_inventory, addresses)
+
+
+async def _with_client(method: str, addresses: List[str], base_url: str, concurrency: int):
+    async with AsyncMinimaClient(base_url, concurrency=concurrency) as client:
+        return await getattr(client, method)(addresses)
+
+
+def get_balances(addresses: Iterable[str], base_url: str = MINIMA_API_URL,
+                 concurrency: int = 50) -> Dict[str, Dict[str, Any]]:
+    """
+    Blocking wrapper around AsyncMinimaClient.get_balances for synchronous callers such as Flask views.
+    """
+    return asyncio.run(_with_client("get_balances", list(addresses), base_url, concurrency))
+
+
+def get_inventories(addresses: Iterable[str], base_url: str = MINIMA_API_URL,
+                    concurrency: int = 50) -> Dict[str, Dict[str, Any]]:
+    """
+    Blocking wrapper around AsyncMinimaClient.get_inventories.
+    """
+    return asyncio.run(_with_client("get_inventories", list(addresses), base_url, concurrency))
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    from minima_stub_server import start_stub_server
+
+    server, url = start_stub_server(latency=0.05)
+    addresses = [f"Mx{i:040d}" for i in range(200)] + ["Mx" + "0" * 40]
+
+    start = time.perf_counter()
+    balances = get_balances(addresses, base_url=url)
+    elapsed = time.perf_counter() - start
+    print(f"Fetched {len(balances['results'])} balances ({len(balances['errors'])} errors) "
+          f"in {elapsed * 1000:.0f} ms with a 50 ms node round trip.")
+    server.shutdown()
@@ -1,6 +1,20 @@
 import json
+import threading
 import time
-from typing import Dict, Any, Union
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Any, List, Optional, Union
+
+import requests
+
+from evm_transactions import (EVMBatchClient, GasPriceCache, JsonRpcError, MintBinding, NonceManager, ReceiptTracker,
+                              TransactionSigner, NONCE_TAKEN_ERRORS)
+from minima_bridge_queue import BRIDGE_QUEUE_PATH, CHANGE_RETENTION, BridgeQueue
+from minima_bridge_status import BridgeStatusStore
+from metrics import upstream_timer
+from minima_dex import to_wei
+from minima_rpc import get_client
+from minima_wallet import MINIMA_API_URL, send_transaction
+from structured_log import get_logger
 
 # This library is not installed by default in our environment.
 # In a real-world scenario, you would install it with: pip install web3
@@ -11,7 +25,6 @@ except ImportError:
     Web3 = None
     HTTPProvider = None
     geth_poa_middleware = None
-    print("Warning: web3.py not found. Bridge functionality will be simulated.")
 
 # Mock Minima Wallet Module for demonstration purposes
 # In a real application, you would import the actual file.
@@ -25,6 +38,20 @@ def get_balance(address: str) -> Union[Dict[str, Any], None]:
 EVM_NODE_URL = "https://placeholder-evm-node.com/rpc"
 EVM_PRIVATE_KEY = "0x..."  # Replace with a real private key for testing
 BRIDGE_CONTRACT_ADDRESS = "0x..." # Replace with the deployed bridge contract address
+MINIMA_LOCK_ADDRESS = "MxLockAddress123456789"
+# The only Minima token the bridge mints against (Minima itself); locks of any other token are ignored.
+BRIDGED_TOKEN_ID = "0x00"
+
+log = get_logger("bridge")
+
+if Web3 is None:
+    log.warning("web3_missing", detail="bridge functionality will be simulated")
+
+# Gas limit for one mint call. Fixing it skips an eth_estimateGas round trip per mint.
+MINT_GAS_LIMIT = 100_000
+
+# Seconds a fetched gas price is reused for new mints.
+GAS_PRICE_TTL = 10.0
 
 # The ABI is a JSON representation of your smart contract's interface.
 # It tells web3.py how to interact with the contract's functions.
@@ -44,27 +71,85 @@ BRIDGE_CONTRACT_ABI = json.loads("""
 ]
 """)
 
-def connect_to_evm() -> Union[Web3, None]:
+
+def connect_to_evm(node_url: str = EVM_NODE_URL) -> Union[Web3, None]:
     """
     Connects to the EVM blockchain node.
     """
     if not Web3:
-        print("Web3 library is not available. Skipping EVM connection.")
+        log.warning("evm_connect_skipped", reason="web3 not installed")
         return None
     try:
-        w3 = Web3(HTTPProvider(EVM_NODE_URL))
+        w3 = Web3(HTTPProvider(node_url))
         # Use a PoA middleware for networks like BSC, Polygon, or local testnets.
         w3.middleware_onion.inject(geth_poa_middleware, layer=0)
         if w3.is_connected():
-            print("Successfully connected to EVM node.")
+            log.info("evm_connected", node_url=node_url)
             return w3
         else:
-            print("Failed to connect to EVM node.")
+            log.error("evm_connect_failed", node_url=node_url, error="node not reachable")
             return None
     except Exception as e:
-        print(f"Error connecting to EVM node: {e}")
+        log.error("evm_connect_failed", node_url=node_url, error=str(e))
         return None
 
+
+_nonce_managers: Dict[tuple, NonceManager] = {}
+_nonce_managers_lock = threading.Lock()
+
+
+def get_nonce_manager(w3: Web3, address: str) -> NonceManager:
+    """
+    Returns the process-wide NonceManager of an account on the node `w3` is connected to.
+    """
+    key = (getattr(w3.provider, 'endpoint_uri', None), address)
+    with _nonce_managers_lock:
+        manager = _nonce_managers.get(key)
+        if manager is None:
+            manager = _nonce_managers[key] = NonceManager(
+                lambda: w3.eth.get_transaction_count(address, 'pending'))
+        return manager
+
+
+_mint_bindings: Dict[tuple, MintBinding] = {}
+_gas_prices: Dict[str, GasPriceCache] = {}
+_bindings_lock = threading.Lock()
+
+
+def get_mint_binding(w3: Web3, private_key: Optional[str] = None, contract_address: Optional[str] = None,
+                     gas_limit: int = MINT_GAS_LIMIT) -> MintBinding:
+    """
+    Returns the process-wide pre-encoded mint call for a signing key and
+    contract on the node `w3` is connected to. The chain id is read once.
+    Defaults to EVM_PRIVATE_KEY and BRIDGE_CONTRACT_ADDRESS.
+    """
+    private_key = private_key or EVM_PRIVATE_KEY
+    contract_address = contract_address or BRIDGE_CONTRACT_ADDRESS
+    key = (getattr(w3.provider, 'endpoint_uri', None), private_key, contract_address.lower(), gas_limit)
+    with _bindings_lock:
+        binding = _mint_bindings.get(key)
+    if binding is None:
+        binding = MintBinding(TransactionSigner(private_key, w3.eth.chain_id), contract_address, gas_limit)
+        with _bindings_lock:
+            binding = _mint_bindings.setdefault(key, binding)
+    return binding
+
+
+def get_gas_price_cache(w3: Web3) -> GasPriceCache:
+    """Returns the process-wide gas price cache of the node `w3` is connected to."""
+    key = getattr(w3.provider, 'endpoint_uri', None)
+    with _bindings_lock:
+        cache = _gas_prices.get(key)
+        if cache is None:
+            cache = _gas_prices[key] = GasPriceCache(lambda: w3.eth.gas_price, ttl=GAS_PRICE_TTL)
+        return cache
+
+
+def _nonce_taken(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(taken in message for taken in NONCE_TAKEN_ERRORS)
+
+
 def mint_on_evm(w3: Web3, recipient_address: str, amount: float) -> Union[str, None]:
     """
     Calls the 'mint' function on the EVM bridge smart contract.
@@ -75,7 +160,7 @@ def mint_on_evm(w3: Web3, recipient_address: str, amount: float) -> Union[str, N
         amount (float): The amount of tokens to mint.
     """
     if not w3:
-        print("Cannot mint; not connected to EVM.")
+        log.error("mint_failed", recipient=recipient_address, error="not connected to EVM")
         return None
 
     try:
@@ -83,64 +168,446 @@ def mint_on_evm(w3: Web3, recipient_address: str, amount: float) -> Union[str, N
         # This example assumes 18 decimals, like most standard ERC-20 tokens.
         amount_in_wei = w3.to_wei(amount, 'ether')
 
-        # Load the smart contract
-        contract = w3.eth.contract(address=BRIDGE_CONTRACT_ADDRESS, abi=BRIDGE_CONTRACT_ABI)
+        # The contract call, chain id and gas price are cached per node
+        mint = get_mint_binding(w3)
+        gas_prices = get_gas_price_cache(w3)
+        gas_price = gas_prices.get()
 
-        # Get the transaction count for the nonce
-        from_address = w3.eth.account.from_key(EVM_PRIVATE_KEY).address
-        nonce = w3.eth.get_transaction_count(from_address)
-
-        # Build the transaction
-        transaction = contract.functions.mint(
-            recipient_address,
-            amount_in_wei
-        ).build_transaction({
-            'from': from_address,
-            'nonce': nonce
-        })
+        # Reserve a nonce locally; concurrent mints never share one
+        nonces = get_nonce_manager(w3, mint.signer.address)
+        nonce = nonces.reserve()
+    except Exception as e:
+        log.error("mint_failed", recipient=recipient_address, error=str(e))
+        return None
 
-        # Sign the transaction with the private key
-        signed_txn = w3.eth.account.sign_transaction(transaction, EVM_PRIVATE_KEY)
+    try:
+        # Encode and sign the mint(recipient, amount) transaction
+        tx_hash, raw_transaction = mint.sign_mint(recipient_address, amount_in_wei, nonce, gas_price)
+    except Exception as e:
+        nonces.release(nonce)
+        log.error("mint_failed", recipient=recipient_address, error=str(e))
+        return None
 
+    try:
         # Send the signed transaction
-        tx_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-        print(f"EVM Mint Transaction sent. Hash: {w3.to_hex(tx_hash)}")
+        with upstream_timer("evm", "eth_sendRawTransaction"):
+            w3.eth.send_raw_transaction(raw_transaction)
+        log.info("mint_sent", recipient=recipient_address, amount=amount, tx_hash=tx_hash)
 
         # Return the transaction hash
-        return w3.to_hex(tx_hash)
+        return tx_hash
+    except ValueError as e:
+        # The node rejected it: either the nonce was used elsewhere or it is free again.
+        if _nonce_taken(e):
+            nonces.resync()
+        else:
+            nonces.release(nonce)
+            if "underpriced" in str(e).lower():
+                gas_prices.invalidate()
+        log.error("mint_failed", recipient=recipient_address, error=str(e))
+        return None
     except Exception as e:
-        print(f"Error minting on EVM: {e}")
+        log.error("mint_failed", recipient=recipient_address, error=str(e))
+        return None
+
+
+class BridgeMinter:
+    """
+    Signs and sends bridge mints through one long-lived Web3 connection.
+
+    The connection, the pre-encoded mint call and the chain id are set up
+    once, and the gas price is cached for GAS_PRICE_TTL seconds. Nonces
+    come from the account's NonceManager, and signed transactions can be
+    sent as one JSON-RPC batch, so a whole batch of mints goes out in a
+    single round trip. Use one minter per signing key.
+    """
+
+    def __init__(self, node_url: str = EVM_NODE_URL, private_key: str = EVM_PRIVATE_KEY,
+                 contract_address: str = BRIDGE_CONTRACT_ADDRESS, gas_limit: int = MINT_GAS_LIMIT):
+        """
+        Connects to the EVM node.
+
+        Raises:
+            RuntimeError: If web3.py is not installed.
+            ConnectionError: If the node cannot be reached.
+        """
+        if not Web3:
+            raise RuntimeError("web3.py is required to mint on the EVM side.")
+        self.w3 = connect_to_evm(node_url)
+        if self.w3 is None:
+            raise ConnectionError(f"Cannot connect to EVM node at {node_url}.")
+        self.rpc = EVMBatchClient(node_url)
+        self.mint = get_mint_binding(self.w3, private_key, contract_address, gas_limit)
+        self.signer = self.mint.signer
+        self.chain_id = self.signer.chain_id
+        self.gas_limit = gas_limit
+        self.gas_price = get_gas_price_cache(self.w3)
+        self.nonces = get_nonce_manager(self.w3, self.signer.address)
+
+    def sign_mint(self, recipient_address: str, amount_in_wei: int, nonce: int, gas_price: int):
+        """
+        Signs a mint(recipient, amount) transaction.
+
+        Returns:
+            (tx_hash, raw_transaction) of the signed transaction.
+        """
+        return self.mint.sign_mint(recipient_address, amount_in_wei, nonce, gas_price)
+
+    def sign_noop(self, nonce: int, gas_price: int):
+        """Signs an empty transfer to ourselves, used to fill a nonce gap."""
+        return self.signer.sign(self.signer.address_bytes, b"", nonce, 21_000, gas_price)
+
+    def send_raw(self, raw_transaction: bytes) -> str:
+        return self.w3.to_hex(self.w3.eth.send_raw_transaction(raw_transaction))
+
+    def send_raw_many(self, raw_transactions: List[bytes]) -> List[Union[str, JsonRpcError]]:
+        """Sends signed transactions in one JSON-RPC batch; returns a tx hash or error per transaction."""
+        return self.rpc.batch([("eth_sendRawTransaction", [self.w3.to_hex(raw)]) for raw in raw_transactions])
+
+    def get_receipts(self, tx_hashes: List[str]) -> List[Optional[Dict[str, Any]]]:
+        receipts = self.rpc.batch([("eth_getTransactionReceipt", [tx_hash]) for tx_hash in tx_hashes])
+        return [None if isinstance(receipt, JsonRpcError) else receipt for receipt in receipts]
+
+
+def start_bridge_transfer(store: BridgeStatusStore, evm_address: str, amount, token_id: str = BRIDGED_TOKEN_ID,
+                          lock_address: str = MINIMA_LOCK_ADDRESS) -> Dict[str, Any]:
+    """
+    Starts a transfer to the EVM side by sending the funds to the bridge's lock address on Minima.
+
+    The EVM recipient travels in state variable 0 of the lock transaction,
+    where LockPoller reads it. The transfer is recorded as locked until the
+    bridge picks it up.
+
+    Returns:
+        The new transfer, or {"error": ...} if Minima did not accept the lock.
+
+    Raises:
+        ValueError: If the token is not the bridged token, or the EVM address or the amount is invalid.
+    """
+    if token_id != BRIDGED_TOKEN_ID:
+        raise ValueError(f"Only token {BRIDGED_TOKEN_ID} can be bridged.")
+    if not Web3 or not Web3.is_address(evm_address):
+        raise ValueError("Invalid EVM recipient address.")
+    try:
+        amount_in_wei = to_wei(amount)
+    except (ValueError, ArithmeticError):
+        raise ValueError("Invalid amount.")
+    if amount_in_wei <= 0:
+        raise ValueError("Amount must be positive.")
+    recipient = Web3.to_checksum_address(evm_address)
+    result = send_transaction(lock_address, amount, token_id, state={"0": recipient})
+    txid = ((result or {}).get("response") or {}).get("txpowid")
+    if not txid:
+        return {"error": (result or {}).get("error") or "Minima did not accept the lock transaction."}
+    return store.record_lock(txid, recipient, amount, token_id)
+
+
+def parse_lock(entry: Dict[str, Any], lock_address: str = MINIMA_LOCK_ADDRESS,
+               token_id: str = BRIDGED_TOKEN_ID) -> Optional[Dict[str, Any]]:
+    """
+    Extracts a bridge lock from a Minima history entry.
+
+    Lock transactions carry the EVM recipient in state variable 0. Only the
+    outputs that pay `token_id` to `lock_address` count towards the locked
+    amount, so change returned to the sender and other tokens are never
+    minted. The amount is summed as decimals and kept as a string so it
+    converts to wei exactly. Returns None for entries that are not bridge
+    locks.
+    """
+    txid = entry.get("txpowid")
+    recipient = (entry.get("state") or {}).get("0")
+    if not txid or not recipient:
+        return None
+    amount = Decimal(0)
+    for output in entry.get("outputs") or []:
+        if output.get("address") != lock_address or output.get("tokenid") != token_id:
+            continue
+        try:
+            amount += Decimal(str(output.get("amount")))
+        except InvalidOperation:
+            return None
+    if not amount.is_finite() or amount <= 0:
         return None
+    return {"txid": txid, "recipient": recipient, "amount": str(amount)}
+
+
+class LockPoller:
+    """
+    Pulls new lock transactions for the bridge address from the Minima node
+    into a BridgeQueue.
+
+    The node's transaction history is read page by page from a saved offset,
+    and only payments of `token_id` to the lock address are queued.
+    Each page is queued together with the advanced offset in one transaction,
+    so a crash re-reads at most the page in progress, and those locks are
+    dropped as duplicates.
+    """
+
+    def __init__(self, queue: BridgeQueue, lock_address: str = MINIMA_LOCK_ADDRESS,
+                 base_url: str = MINIMA_API_URL, page_size: int = 100, interval: float = 5.0,
+                 token_id: str = BRIDGED_TOKEN_ID):
+        self.queue = queue
+        self.lock_address = lock_address
+        self.token_id = token_id
+        self.client = get_client(base_url)
+        self.page_size = page_size
+        self.interval = interval
+        self.cursor_name = f"history:{lock_address}"
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll_once(self) -> int:
+        """Reads every new history page and returns the number of newly queued locks."""
+        added = 0
+        while True:
+            offset = self.queue.get_cursor(self.cursor_name)
+            result = self.client.get("history", params={"address": self.lock_address, "offset": offset,
+                                                        "max": self.page_size})
+            entries = result.get("response") or []
+            locks = [lock for lock in (parse_lock(entry, self.lock_address, self.token_id) for entry in entries)
+                     if lock is not None]
+            added += self.queue.enqueue_many(locks, cursor_name=self.cursor_name, cursor=offset + len(entries))
+            if len(entries) < self.page_size:
+                return added
+
+    def _run(self):
+        while True:
+            try:
+                added = self.poll_once()
+                if added:
+                    log.info("locks_queued", added=added)
+            except requests.exceptions.RequestException as e:
+                log.error("lock_poll_failed", error=str(e))
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        """Starts polling in a background thread every `interval` seconds."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="bridge-lock-poller", daemon=True)
+            self._thread.start()
 
-def monitor_minima_for_locks():
-    """
-    Simulates monitoring the Minima blockchain for new "lock" transactions.
-    """
-    print("Starting Minima bridge monitor...")
-    
-    # Placeholder for a real Minima listening mechanism
-    minima_lock_address = "MxLockAddress123456789"
-    evm_recipient_address = "0x742d35Cc4A95D71C0F4A5E44007b819973E73E77" # Placeholder
-
-    # In a real bridge, you would check for new transactions periodically or via an event listener.
-    # We will simulate a single event.
-    print(f"Checking {minima_lock_address} for new lock transactions...")
-    time.sleep(2) # Simulate network delay
-
-    # Simulate a transaction being detected
-    print("Detected a new lock transaction on Minima: 10 wMINIMA to bridge!")
-    
-    # This is where the bridge would fetch the EVM recipient address from the Minima transaction.
-    # We'll use our placeholder recipient for now.
-    amount_to_mint = 10.0
-    
-    # Call the function to mint on the EVM side
-    # A real bridge would have a sophisticated queue and state management system.
-    w3 = connect_to_evm()
-    if w3:
-        mint_on_evm(w3, evm_recipient_address, amount_to_mint)
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+class MintWorker:
+    """
+    Mints queued locks on the EVM side and follows them until they are mined.
+
+    Each round signs a batch of queued locks with consecutive nonces, records
+    the signed transactions in the queue and sends them all in one JSON-RPC
+    batch, without waiting for receipts. Receipts of everything in flight are
+    then polled in batches as well. Because the exact signed bytes are stored
+    before sending, a restart resends the same transactions instead of
+    signing new ones, so a lock is minted at most once.
+
+    As the queue's only writer, the worker also trims the queue's change feed
+    to the latest `change_retention` changes after every round.
+    """
+
+    def __init__(self, queue: BridgeQueue, minter: BridgeMinter, batch_size: int = 50, interval: float = 1.0,
+                 resend_after: float = 60.0, change_retention: int = CHANGE_RETENTION):
+        """
+        Args:
+            queue: The BridgeQueue to take locks from.
+            minter: The BridgeMinter to sign and send with.
+            batch_size: Mints signed and sent per round.
+            interval: Seconds between rounds when the queue is drained.
+            resend_after: Seconds without a receipt before a mint is sent again.
+            change_retention: Changes kept in the queue's feed for its followers.
+        """
+        self.queue = queue
+        self.minter = minter
+        self.batch_size = batch_size
+        self.interval = interval
+        self.change_retention = change_retention
+        self.tracker = ReceiptTracker(minter.rpc, resend_after=resend_after)
+        for entry in queue.submitted():
+            self.tracker.track(entry['txid'], entry['tx_hash'], entry['raw_tx'])
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _send(self, signed: List[tuple]) -> int:
+        """
+        Sends (txid, nonce, tx_hash, raw_tx) entries in one batch and records
+        the outcome in the queue. Returns how many the node accepted.
+        """
+        results = self.minter.send_raw_many([raw for _, _, _, raw in signed])
+        submitted, taken, underpriced = [], [], []
+        for entry, result in zip(signed, results):
+            txid, nonce = entry[0], entry[1]
+            if not isinstance(result, JsonRpcError) or result.already_known:
+                submitted.append(entry)
+            elif result.nonce_taken:
+                taken.append(entry)
+            elif result.underpriced:
+                # The cached gas price went stale; the lock is signed again at a fresh price.
+                underpriced.append(txid)
+                self.minter.nonces.release(nonce)
+            else:
+                # The nonce stays unused; it is handed out again to close the gap.
+                log.error("mint_rejected", txid=txid, nonce=nonce, error=str(result))
+                self.queue.mark_failed(txid, str(result))
+                self.minter.nonces.release(nonce)
+        if taken:
+            # Our own transaction may have been mined already (a resend); otherwise
+            # another transaction used the nonce and the lock is signed again.
+            receipts = self.minter.get_receipts([entry[2] for entry in taken])
+            submitted += [entry for entry, receipt in zip(taken, receipts) if receipt]
+            lost = [entry[0] for entry, receipt in zip(taken, receipts) if not receipt]
+            if lost:
+                self.queue.requeue_many(lost)
+                self.minter.nonces.resync()
+        if underpriced:
+            self.queue.requeue_many(underpriced)
+            self.minter.gas_price.invalidate()
+        for txid, _, tx_hash, raw in submitted:
+            self.tracker.track(txid, tx_hash, raw)
+        self.queue.mark_submitted_many(entry[0] for entry in submitted)
+        return len(submitted)
+
+    def _fill_gaps(self, gas_price: int):
+        gaps = self.minter.nonces.take_released()
+        if gaps:
+            noops = [self.minter.sign_noop(nonce, gas_price)[1] for nonce in gaps]
+            for nonce, result in zip(gaps, self.minter.send_raw_many(noops)):
+                if isinstance(result, JsonRpcError) and not (result.already_known or result.nonce_taken):
+                    log.error("nonce_gap_fill_failed", nonce=nonce, error=str(result))
+
+    def process_once(self) -> int:
+        """Signs and sends one batch of queued locks. Returns the number submitted."""
+        leftover = self.queue.signed()
+        if leftover:
+            # Signed before a crash or a send error: the same bytes go out again.
+            self._send([(e['txid'], e['nonce'], e['tx_hash'], e['raw_tx']) for e in leftover])
+        entries = self.queue.next_queued(self.batch_size)
+        gas_price = self.minter.gas_price.get()
+        signed = []
+        for entry in entries:
+            try:
+                recipient = Web3.to_checksum_address(entry['recipient'])
+                amount_in_wei = to_wei(entry['amount'])
+            except ValueError as e:
+                self.queue.mark_failed(entry['txid'], f"Invalid lock: {e}")
+                continue
+            nonce = self.minter.nonces.reserve()
+            try:
+                tx_hash, raw = self.minter.sign_mint(recipient, amount_in_wei, nonce, gas_price)
+            except Exception:
+                self.minter.nonces.release(nonce)
+                raise
+            signed.append((entry['txid'], nonce, tx_hash, raw))
+        self.queue.mark_signed_many(signed)
+        submitted = self._send(signed) if signed else 0
+        if len(entries) < self.batch_size:
+            self._fill_gaps(gas_price)
+        return submitted
+
+    def poll_receipts(self) -> int:
+        """Records the mints mined since the last poll and resends stuck ones. Returns how many were mined."""
+        succeeded, reverted = self.tracker.poll()
+        self.queue.mark_confirmed_many(txid for txid, _ in succeeded)
+        for txid, receipt in reverted:
+            self.queue.mark_failed(txid, f"Mint reverted in block {int(receipt['blockNumber'], 16)}.")
+        stale = self.tracker.stale()
+        if stale:
+            for (txid, tx_hash, _), result in zip(stale, self.minter.send_raw_many([raw for _, _, raw in stale])):
+                if isinstance(result, JsonRpcError) and result.nonce_taken and not self.minter.get_receipts([tx_hash])[0]:
+                    self.tracker.forget(tx_hash)
+                    self.queue.requeue_many([txid])
+                    self.minter.nonces.resync()
+        return len(succeeded) + len(reverted)
+
+    def _run(self):
+        while not self._stop.is_set():
+            submitted = 0
+            try:
+                submitted = self.process_once()
+                self.poll_receipts()
+                self.queue.trim_changes(self.change_retention)
+            except Exception as e:
+                log.error("mint_round_failed", error=str(e))
+            if submitted < self.batch_size and self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        """Starts minting in a background thread."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="bridge-mint-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+def monitor_minima_for_locks(lock_address: str = MINIMA_LOCK_ADDRESS, queue_path: str = BRIDGE_QUEUE_PATH,
+                             minima_url: str = MINIMA_API_URL, evm_node_url: str = EVM_NODE_URL):
+    """
+    Runs the bridge: polls Minima for lock transactions and mints them on the EVM side until interrupted.
+    """
+    log.info("bridge_monitor_started", lock_address=lock_address, queue_path=queue_path)
+    queue = BridgeQueue(queue_path)
+    minter = BridgeMinter(node_url=evm_node_url)
+    poller = LockPoller(queue, lock_address, base_url=minima_url)
+    worker = MintWorker(queue, minter)
+    poller.start()
+    worker.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        poller.stop()
+        worker.stop()
+        queue.close()
 
 # --- Main Bridge Execution ---
 if __name__ == '__main__':
-    monitor_minima_for_locks()
-        
+    import os
+    import tempfile
+
+    from evm_stub_server import start_stub_evm
+    from minima_stub_server import start_stub_server
+
+    # Run the whole pipeline against local stand-ins for both chains.
+    minima, minima_url = start_stub_server()
+    evm, evm_url = start_stub_evm()
+    recipient = "0x742d35Cc4A95D71C0F4A5E44007b819973E73E77"
+    for i in range(250):
+        minima.history.append({"txpowid": f"0x{i:064x}", "state": {"0": recipient},
+                               "outputs": [{"address": MINIMA_LOCK_ADDRESS, "tokenid": BRIDGED_TOKEN_ID,
+                                            "amount": "10"}]})
+    # The same lock seen twice must only be minted once.
+    minima.history.append(dict(minima.history[0]))
+    # A lock of any other token must never be minted.
+    minima.history.append({"txpowid": "0x" + "ff" * 32, "state": {"0": recipient},
+                           "outputs": [{"address": MINIMA_LOCK_ADDRESS, "tokenid": "0x" + "ee" * 32,
+                                        "amount": "1000000"}]})
+
+    queue_path = os.path.join(tempfile.mkdtemp(), "bridge_queue.db")
+    queue = BridgeQueue(queue_path)
+    # A well-known local development key; never use it on a real network.
+    minter = BridgeMinter(node_url=evm_url,
+                          private_key="0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80",
+                          contract_address="0x5FbDB2315678afecb367f032d93F642f64180aa3")
+    poller = LockPoller(queue, base_url=minima_url)
+    worker = MintWorker(queue, minter)
+
+    start = time.perf_counter()
+    print(f"Queued {poller.poll_once()} locks.")
+    while worker.process_once() or len(worker.tracker):
+        worker.poll_receipts()
+    elapsed = time.perf_counter() - start
+    print(f"Queue: {queue.counts()}")
+    print(f"Minted {len(evm.mints)} times in {elapsed:.2f}s; "
+          f"eth_getTransactionCount calls: {evm.calls.get('eth_getTransactionCount', 0)}")
+    minima.shutdown()
+    evm.shutdown()
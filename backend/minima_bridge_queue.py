@@ -0,0 +1,295 @@
+import contextlib
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+# Lifecycle of a lock in the queue:
+#   locked    -> the API sent the lock on Minima; the poller has not seen it yet
+#   queued    -> detected on Minima, waiting to be minted
+#   signed    -> a mint transaction was signed; its raw bytes are stored so a
+#                restart resends exactly the same transaction (same nonce)
+#   submitted -> the EVM node accepted the mint transaction
+#   confirmed -> the mint was mined successfully
+#   failed    -> the lock cannot be minted (bad recipient or amount, rejected or reverted mint)
+LOCKED = 'locked'
+QUEUED = 'queued'
+SIGNED = 'signed'
+SUBMITTED = 'submitted'
+CONFIRMED = 'confirmed'
+FAILED = 'failed'
+
+# Shared by the bridge worker, which writes the queue, and the API, which follows it.
+BRIDGE_QUEUE_PATH = "bridge_queue.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS locks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    txid TEXT NOT NULL UNIQUE,
+    recipient TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    status TEXT NOT NULL,
+    nonce INTEGER,
+    tx_hash TEXT,
+    raw_tx BLOB,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS locks_by_status ON locks (status, seq);
+CREATE TABLE IF NOT EXISTS cursors (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+-- Append-only feed of the locks that changed, so readers in other processes
+-- can follow the queue without rescanning it.
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    lock_seq INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS locks_inserted AFTER INSERT ON locks BEGIN
+    INSERT INTO changes (lock_seq) VALUES (NEW.seq);
+END;
+CREATE TRIGGER IF NOT EXISTS locks_updated AFTER UPDATE OF status, tx_hash ON locks BEGIN
+    INSERT INTO changes (lock_seq) VALUES (NEW.seq);
+END;
+"""
+
+_COLUMNS = ('seq', 'txid', 'recipient', 'amount', 'status', 'nonce', 'tx_hash', 'raw_tx', 'error', 'created', 'updated')
+
+# Cursor holding the last change number deleted by prune_changes.
+_PRUNED_CURSOR = "changes:pruned"
+
+# How many of the latest changes trim_changes keeps. A follower that falls
+# further behind than this reloads every lock, so it only costs a reload
+# after a long outage.
+CHANGE_RETENTION = 100_000
+
+# The columns a status reader needs; leaves out the signed transaction bytes.
+_STATUS_COLUMNS = ('txid', 'recipient', 'amount', 'status', 'tx_hash', 'error', 'created', 'updated')
+
+
+class BridgeQueue:
+    """
+    A durable queue of Minima lock transactions waiting to be minted on the EVM side.
+
+    Backed by SQLite, so queued locks and poll cursors survive restarts. Locks
+    are deduplicated by their Minima txid: seeing the same lock twice (a
+    re-poll, an overlapping cursor) never queues a second mint. The poller's
+    cursor is saved in the same transaction as the locks it covers. Locks the
+    API sent are recorded as locked before the poller sees them, so every
+    process following the queue can report them.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens (or creates) the queue database.
+
+        Args:
+            path: The SQLite database file, or ":memory:" for a throwaway queue.
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _write(self, sql: str, rows: List[Tuple]) -> int:
+        with self._transaction() as conn:
+            # rowcount, unlike total_changes, leaves out the rows the change-feed triggers add.
+            return conn.executemany(sql, rows).rowcount
+
+    def _rows(self, sql: str, params: Tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(zip(_COLUMNS, row)) for row in self._conn.execute(sql, params)]
+
+    def record_lock(self, txid: str, recipient: str, amount) -> bool:
+        """Records a lock the API just sent on Minima; returns False if its txid is already in the queue."""
+        now = time.time()
+        return self._write("INSERT OR IGNORE INTO locks (txid, recipient, amount, status, created, updated)"
+                           " VALUES (?, ?, ?, ?, ?, ?)", [(txid, recipient, str(amount), LOCKED, now, now)]) == 1
+
+    def enqueue_many(self, locks: Iterable[Dict[str, Any]], cursor_name: Optional[str] = None,
+                     cursor: Optional[int] = None) -> int:
+        """
+        Queues lock transactions, skipping any txid already in the queue.
+
+        A lock recorded by record_lock is queued with the recipient and
+        amount seen on chain.
+
+        Args:
+            locks: Dictionaries with "txid", "recipient" and "amount".
+            cursor_name: If given, saves `cursor` under this name in the same transaction.
+            cursor: The poll position after these locks.
+
+        Returns:
+            The number of newly queued locks.
+        """
+        now = time.time()
+        rows = [(lock['txid'], lock['recipient'], str(lock['amount']), QUEUED, now, now) for lock in locks]
+        with self._transaction() as conn:
+            added = conn.executemany(
+                "INSERT INTO locks (txid, recipient, amount, status, created, updated) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (txid) DO UPDATE SET recipient = excluded.recipient, amount = excluded.amount,"
+                " status = excluded.status, updated = excluded.updated WHERE locks.status = ?",
+                [row + (LOCKED,) for row in rows]).rowcount
+            if cursor_name is not None:
+                conn.execute("INSERT OR REPLACE INTO cursors (name, value) VALUES (?, ?)", (cursor_name, cursor))
+        return added
+
+    def enqueue(self, txid: str, recipient: str, amount) -> bool:
+        """Queues one lock; returns False if its txid was already queued."""
+        return self.enqueue_many([{"txid": txid, "recipient": recipient, "amount": amount}]) == 1
+
+    def get_cursor(self, name: str, default: int = 0) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cursors WHERE name = ?", (name,)).fetchone()
+        return default if row is None else row[0]
+
+    def get(self, txid: str) -> Optional[Dict[str, Any]]:
+        """Returns the queue entry of a lock txid, or None."""
+        rows = self._rows("SELECT * FROM locks WHERE txid = ?", (txid,))
+        return rows[0] if rows else None
+
+    def next_queued(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Returns up to `limit` locks waiting to be minted, oldest first."""
+        return self._rows("SELECT * FROM locks WHERE status = ? ORDER BY seq LIMIT ?", (QUEUED, limit))
+
+    def signed(self) -> List[Dict[str, Any]]:
+        """Returns the locks whose mint was signed but not yet accepted, in nonce order."""
+        return self._rows("SELECT * FROM locks WHERE status = ? ORDER BY nonce", (SIGNED,))
+
+    def submitted(self) -> List[Dict[str, Any]]:
+        """Returns the locks whose mint was sent but not yet mined."""
+        return self._rows("SELECT * FROM locks WHERE status = ? ORDER BY nonce", (SUBMITTED,))
+
+    def mark_signed_many(self, entries: Iterable[Tuple[str, int, str, bytes]]) -> int:
+        """Records (txid, nonce, tx_hash, raw_tx) of signed mints before they are sent."""
+        now = time.time()
+        return self._write("UPDATE locks SET status = ?, nonce = ?, tx_hash = ?, raw_tx = ?, updated = ?"
+                           " WHERE txid = ?",
+                           [(SIGNED, nonce, tx_hash, raw, now, txid) for txid, nonce, tx_hash, raw in entries])
+
+    def mark_submitted_many(self, txids: Iterable[str]) -> int:
+        now = time.time()
+        return self._write("UPDATE locks SET status = ?, updated = ? WHERE txid = ?",
+                           [(SUBMITTED, now, txid) for txid in txids])
+
+    def mark_confirmed_many(self, txids: Iterable[str]) -> int:
+        now = time.time()
+        return self._write("UPDATE locks SET status = ?, updated = ? WHERE txid = ?",
+                           [(CONFIRMED, now, txid) for txid in txids])
+
+    def requeue_many(self, txids: Iterable[str]) -> int:
+        """Drops the signed transactions of these locks and queues them to be signed again."""
+        now = time.time()
+        return self._write("UPDATE locks SET status = ?, nonce = NULL, tx_hash = NULL, raw_tx = NULL, updated = ?"
+                           " WHERE txid = ?", [(QUEUED, now, txid) for txid in txids])
+
+    def mark_failed(self, txid: str, error: str) -> int:
+        return self._write("UPDATE locks SET status = ?, error = ?, updated = ? WHERE txid = ?",
+                           [(FAILED, error, time.time(), txid)])
+
+    def last_change(self) -> int:
+        """Returns the sequence number of the latest change, 0 if there is none."""
+        with self._lock:
+            # Pruning may have emptied the feed; its position is then the last pruned change.
+            return self._conn.execute("SELECT MAX(COALESCE((SELECT MAX(seq) FROM changes), 0),"
+                                      " COALESCE((SELECT value FROM cursors WHERE name = ?), 0))",
+                                      (_PRUNED_CURSOR,)).fetchone()[0]
+
+    def changes_since(self, seq: int, limit: int = 1000) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Returns the locks changed after change number `seq`.
+
+        Each lock is returned once, in its current state, even if it changed
+        several times in the range.
+
+        Returns:
+            (entries, last_seq): the changed locks without their signed
+            transactions, and the change number to pass next time.
+        """
+        columns = ", ".join(f"l.{column}" for column in _STATUS_COLUMNS)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT c.seq, {columns} FROM changes c JOIN locks l ON l.seq = c.lock_seq"
+                                      " WHERE c.seq > ? ORDER BY c.seq LIMIT ?", (seq, limit)).fetchall()
+        entries = {}
+        for row in rows:
+            entries.pop(row[1], None)
+            entries[row[1]] = dict(zip(_STATUS_COLUMNS, row[1:]))
+        return list(entries.values()), rows[-1][0] if rows else seq
+
+    def iter_statuses(self, batch_size: int = 5000) -> Iterator[Dict[str, Any]]:
+        """Yields every lock without its signed transaction, oldest first, reading `batch_size` rows at a time."""
+        columns = ", ".join(_STATUS_COLUMNS)
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(f"SELECT seq, {columns} FROM locks WHERE seq > ? ORDER BY seq LIMIT ?",
+                                          (last, batch_size)).fetchall()
+            for row in rows:
+                yield dict(zip(_STATUS_COLUMNS, row[1:]))
+            if len(rows) < batch_size:
+                return
+            last = rows[-1][0]
+
+    def prune_changes(self, seq: int) -> int:
+        """
+        Deletes the changes up to and including `seq`.
+
+        A reader whose cursor is behind pruned_through() has missed changes
+        and has to reload every lock with iter_statuses.
+        """
+        with self._transaction() as conn:
+            pruned = conn.execute("DELETE FROM changes WHERE seq <= ?", (seq,)).rowcount
+            conn.execute("INSERT INTO cursors (name, value) VALUES (?, ?)"
+                         " ON CONFLICT (name) DO UPDATE SET value = MAX(value, excluded.value)", (_PRUNED_CURSOR, seq))
+        return pruned
+
+    def trim_changes(self, keep: int = CHANGE_RETENTION) -> int:
+        """
+        Prunes all but the latest `keep` changes. Returns the number deleted.
+
+        Unlike prune_changes with a reader's own cursor, this is safe with
+        any number of followers: only one that is more than `keep` changes
+        behind has to reload.
+        """
+        through = self.last_change() - keep
+        if through <= self.pruned_through():
+            return 0
+        return self.prune_changes(through)
+
+    def pruned_through(self) -> int:
+        """Returns the last change number deleted by prune_changes, 0 if none was."""
+        return self.get_cursor(_PRUNED_CURSOR)
+
+    def counts(self) -> Dict[str, int]:
+        """Returns the number of locks in each status."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM locks GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    queue = BridgeQueue(":memory:")
+    lock = {"txid": "0x" + "01" * 32, "recipient": "0x742d35Cc4A95D71C0F4A5E44007b819973E73E77", "amount": "10"}
+    print("Queued:", queue.enqueue_many([lock], cursor_name="history", cursor=1))
+    print("Queued again:", queue.enqueue_many([lock], cursor_name="history", cursor=1))
+    print("Cursor:", queue.get_cursor("history"))
+    print("Counts:", queue.counts())
@@ -0,0 +1,324 @@
+import threading
+import time
+from typing import Dict, Any, Iterable, Optional
+
+from minima_bridge_queue import BridgeQueue, LOCKED, QUEUED, SIGNED, SUBMITTED, CONFIRMED, FAILED
+from minima_dex_stream import Subscription
+from structured_log import get_logger
+
+log = get_logger("bridge_status")
+
+# Lifecycle of a bridge transfer as users see it:
+#   locked    -> the funds were sent to the lock address on Minima
+#   queued    -> the bridge saw the lock and will mint it
+#   submitted -> the mint transaction was signed and sent to the EVM node
+#   confirmed -> the mint was mined
+#   failed    -> the lock cannot be minted, or the mint reverted
+
+# Topic that receives changes of every transfer.
+ALL_TRANSFERS = "*"
+
+# Allowed moves. Observers can miss intermediate states (a mint may be sent
+# and mined between two reads of the queue), so a transfer may skip ahead.
+# submitted -> queued happens when the mint's nonce was taken and it is signed again.
+TRANSITIONS = {
+    LOCKED: frozenset({QUEUED, SUBMITTED, CONFIRMED, FAILED}),
+    QUEUED: frozenset({SUBMITTED, CONFIRMED, FAILED}),
+    SUBMITTED: frozenset({QUEUED, CONFIRMED, FAILED}),
+    CONFIRMED: frozenset(),
+    FAILED: frozenset(),
+}
+
+# A signed mint is reported as submitted: its EVM hash is already known.
+_QUEUE_STATUSES = {LOCKED: LOCKED, QUEUED: QUEUED, SIGNED: SUBMITTED, SUBMITTED: SUBMITTED, CONFIRMED: CONFIRMED,
+                   FAILED: FAILED}
+
+
+class BridgeTransfer:
+    """
+    An immutable snapshot of one transfer. Updates replace the whole record,
+    so a reader never sees a half-applied change.
+    """
+
+    __slots__ = ('txid', 'status', 'recipient', 'amount', 'token_id', 'evm_tx_hash', 'error', 'created',
+                 'updated', 'version')
+
+    def __init__(self, txid: str, status: str, recipient: str, amount: str, token_id: str = "0x00",
+                 evm_tx_hash: Optional[str] = None, error: Optional[str] = None,
+                 created: Optional[float] = None, updated: Optional[float] = None, version: int = 0):
+        self.txid = txid
+        self.status = status
+        self.recipient = recipient
+        self.amount = amount
+        self.token_id = token_id
+        self.evm_tx_hash = evm_tx_hash
+        self.error = error
+        self.created = time.time() if created is None else created
+        self.updated = self.created if updated is None else updated
+        self.version = version
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "transactionId": self.txid,
+            "status": self.status,
+            "recipient": self.recipient,
+            "amount": self.amount,
+            "tokenId": self.token_id,
+            "evmTxHash": self.evm_tx_hash,
+            "error": self.error,
+            "createdAt": self.created,
+            "updatedAt": self.updated,
+            "version": self.version
+        }
+
+
+class BridgeStatusStore:
+    """
+    An in-memory index of bridge transfers for status lookups.
+
+    Transfers are keyed by their Minima lock txid and can also be found by
+    the hash of their EVM mint transaction; both lookups are a dictionary
+    read without locking. Every accepted state change is offered to
+    subscribers of that transfer (or of all transfers), so clients can wait
+    for updates instead of polling. Records use __slots__ to keep a few
+    hundred thousand transfers in memory cheaply.
+
+    Given a BridgeQueue, new locks are also written to it, so they outlive
+    the process and reach the stores of other processes following the queue.
+    """
+
+    def __init__(self, queue: Optional[BridgeQueue] = None):
+        self.queue = queue
+        self._lock = threading.Lock()
+        self._transfers: Dict[str, BridgeTransfer] = {}
+        # EVM tx hash (lowercase) -> lock txid. A mint that was signed again keeps its old hash too.
+        self._by_hash: Dict[str, str] = {}
+        self._counts: Dict[str, int] = {}
+        # transfer id -> set of subscriptions
+        self._topics: Dict[str, set] = {}
+        self.version = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._transfers)
+
+    def get(self, transfer_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a transfer by its Minima lock txid or its EVM mint transaction hash, or None.
+        """
+        transfer = self._transfers.get(transfer_id)
+        if transfer is None:
+            txid = self._by_hash.get(transfer_id.lower())
+            transfer = self._transfers.get(txid) if txid else None
+        return transfer.to_dict() if transfer else None
+
+    def counts(self) -> Dict[str, int]:
+        """Returns the number of transfers in each status."""
+        with self._lock:
+            return {status: count for status, count in self._counts.items() if count}
+
+    def record_lock(self, txid: str, recipient: str, amount, token_id: str = "0x00") -> Dict[str, Any]:
+        """
+        Records a transfer whose lock was just sent on Minima.
+
+        Returns the transfer as it now stands, even if a follower mirrored the
+        queue's row (or a later status) into the store first.
+        """
+        if self.queue is not None:
+            self.queue.record_lock(txid, recipient, amount)
+        update = self.update(txid, LOCKED, recipient=recipient, amount=str(amount), token_id=token_id)
+        return update if update is not None else self.get(txid)
+
+    def update(self, txid: str, status: str, recipient: Optional[str] = None, amount: Optional[str] = None,
+               token_id: Optional[str] = None, evm_tx_hash: Optional[str] = None, error: Optional[str] = None,
+               created: Optional[float] = None, updated: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Moves a transfer to `status`, creating it if it is new.
+
+        Fields left as None keep their current value, except the EVM hash of a
+        transfer sent back to the queue, whose old mint was dropped.
+
+        Returns:
+            The updated transfer, or None if the move is not allowed (e.g. out
+            of a final state) or nothing changed.
+        """
+        if status not in TRANSITIONS:
+            raise ValueError(f"Unknown bridge status: {status}")
+        if evm_tx_hash:
+            # The record and the hash index share one string.
+            evm_tx_hash = evm_tx_hash.lower()
+        with self._lock:
+            current = self._transfers.get(txid)
+            if current is None:
+                transfer = BridgeTransfer(txid, status, recipient or "", amount or "0", token_id or "0x00",
+                                          evm_tx_hash, error, created=created, updated=updated)
+            else:
+                if status != current.status and status not in TRANSITIONS[current.status]:
+                    self.rejected += 1
+                    return None
+                if status != QUEUED:
+                    evm_tx_hash = evm_tx_hash or current.evm_tx_hash
+                if status == current.status and evm_tx_hash == current.evm_tx_hash and error is None:
+                    return None
+                transfer = BridgeTransfer(txid, status, recipient or current.recipient, amount or current.amount,
+                                          token_id or current.token_id, evm_tx_hash, error or current.error,
+                                          created=current.created, updated=updated or time.time())
+                self._counts[current.status] -= 1
+            self.version += 1
+            transfer.version = self.version
+            self._transfers[txid] = transfer
+            self._counts[status] = self._counts.get(status, 0) + 1
+            if evm_tx_hash:
+                self._by_hash[evm_tx_hash] = txid
+            update = transfer.to_dict()
+            # Offered under the lock so subscribers get a transfer's changes in order.
+            for topic in (txid, ALL_TRANSFERS):
+                for subscription in self._topics.get(topic, ()):
+                    subscription._offer(txid, update)
+        return update
+
+    def apply_queue_entry(self, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Mirrors one BridgeQueue entry (as returned by BridgeQueue.changes_since) into the store."""
+        return self.update(entry['txid'], _QUEUE_STATUSES[entry['status']], recipient=entry['recipient'],
+                           amount=entry['amount'], evm_tx_hash=entry.get('tx_hash'), error=entry.get('error'),
+                           created=entry.get('created'), updated=entry.get('updated'))
+
+    def subscribe(self, transfer_ids: Optional[Iterable[str]] = None) -> Subscription:
+        """
+        Subscribes to changes of the given transfers (lock txids or EVM hashes), or of all transfers if none are given.
+
+        The subscription keeps only the latest state per transfer until it is read.
+        """
+        topics = []
+        for transfer_id in transfer_ids or ():
+            transfer = self.get(transfer_id)
+            topics.append(transfer["transactionId"] if transfer else transfer_id)
+        subscription = Subscription(self, list(dict.fromkeys(topics)) or [ALL_TRANSFERS])
+        with self._lock:
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[topic]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len({s for subscribers in self._topics.values() for s in subscribers})
+
+
+class BridgeStatusFollower:
+    """
+    Keeps a BridgeStatusStore in step with a BridgeQueue.
+
+    The first sync loads every lock in the queue; later syncs read only the
+    queue's change feed, so the store can live in a different process than
+    the bridge worker (e.g. the API server) and still see every change.
+
+    A follower that finds changes pruned before it read them reloads every
+    lock. Followers do not prune by default: several of them (the API and a
+    monitor, or more than one worker) would keep pruning past each other's
+    cursors and reloading. The bridge's MintWorker trims the feed to a
+    retention window instead, see BridgeQueue.trim_changes.
+    """
+
+    def __init__(self, store: BridgeStatusStore, queue: BridgeQueue, interval: float = 0.5, batch_size: int = 5000,
+                 prune: bool = False):
+        """
+        Args:
+            store: The store to keep current.
+            queue: The queue to follow.
+            interval: Seconds between syncs of the background thread.
+            batch_size: Locks or changes read per query.
+            prune: Whether to delete the changes this follower has applied.
+                Only for a follower that is the feed's sole reader.
+        """
+        self.store = store
+        self.queue = queue
+        self.interval = interval
+        self.batch_size = batch_size
+        self.prune = prune
+        self.cursor: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll_once(self) -> int:
+        """Applies every queue change since the last call. Returns the number of transfers that changed."""
+        changed = 0
+        start = self.cursor
+        if self.cursor is None:
+            changed += self._reload()
+        while True:
+            cursor = self.cursor
+            entries, self.cursor = self.queue.changes_since(cursor, self.batch_size)
+            if self.queue.pruned_through() > cursor:
+                # Checked after the read: changes pruned before it may be missing from `entries`.
+                changed += self._reload()
+                continue
+            for entry in entries:
+                changed += self.store.apply_queue_entry(entry) is not None
+            if not entries:
+                break
+        if self.prune and self.cursor != start:
+            self.queue.prune_changes(self.cursor)
+        return changed
+
+    def _reload(self) -> int:
+        # Read the feed position first: changes made while loading are applied again, which is harmless.
+        self.cursor = self.queue.last_change()
+        changed = 0
+        for entry in self.queue.iter_statuses(self.batch_size):
+            changed += self.store.apply_queue_entry(entry) is not None
+        return changed
+
+    def _run(self):
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e:
+                log.error("bridge_status_sync_failed", error=str(e))
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        """Starts syncing in a background thread every `interval` seconds."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="bridge-status-follower", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    queue = BridgeQueue(":memory:")
+    store = BridgeStatusStore(queue)
+    follower = BridgeStatusFollower(store, queue, prune=True)
+    txid = "0x" + "01" * 32
+    tx_hash = "0x" + "ab" * 32
+
+    store.record_lock(txid, "0x742d35Cc4A95D71C0F4A5E44007b819973E73E77", "10")
+    print("Persisted:", queue.get(txid)["status"])
+    subscription = store.subscribe([txid])
+    queue.enqueue(txid, "0x742d35Cc4A95D71C0F4A5E44007b819973E73E77", "10")
+    queue.mark_signed_many([(txid, 0, tx_hash, b"")])
+    follower.poll_once()
+    print("Update:", [update["status"] for update in subscription.get(timeout=0)])
+    queue.mark_confirmed_many([txid])
+    follower.poll_once()
+    print("By EVM hash:", store.get(tx_hash))
+    print("Counts:", store.counts())
+    print("Changes left in the feed:", len(queue.changes_since(0)[0]))
+    subscription.close()
@@ -1,5 +1,79 @@
-import json
-from typing import Dict, Any
+import threading
+from decimal import Decimal
+from typing import Dict, Any, Union
+
+from structured_log import get_logger
+
+# Fixed-point scale of the ERC20 tokens in minima_dex.sol (18 decimals, like web3's to_wei(..., 'ether')).
+WEI_DECIMALS = 18
+FEE_DENOMINATOR = 10_000
+
+log = get_logger("dex")
+
+
+def to_wei(amount: Union[int, float, str, Decimal], decimals: int = WEI_DECIMALS) -> int:
+    """
+    Converts a token amount to its integer base-unit value.
+
+    Floats are converted through their shortest repr, which is what web3's
+    to_wei does, so the result matches the value mint_on_evm sends on-chain.
+    Fractions beyond `decimals` places are truncated.
+    """
+    if isinstance(amount, bool):
+        raise ValueError("Invalid amount.")
+    if isinstance(amount, int):
+        return amount * 10 ** decimals
+    text = str(amount) if not isinstance(amount, str) else amount.strip()
+    if 'e' in text.lower() or isinstance(amount, Decimal):
+        # Rare shapes (scientific notation, Decimal input) take the slow path.
+        return int(Decimal(text).scaleb(decimals))
+    negative = text.startswith('-')
+    whole, _, frac = text.lstrip('+-').partition('.')
+    frac = (frac + '0' * decimals)[:decimals]
+    value = int(whole or '0') * 10 ** decimals + int(frac or '0')
+    return -value if negative else value
+
+
+def from_wei(amount: int, decimals: int = WEI_DECIMALS) -> Decimal:
+    """Converts an integer base-unit value back to an exact token amount."""
+    return Decimal(amount).scaleb(-decimals)
+
+
+def get_amount_out(amount_in: int, reserve_in: int, reserve_out: int, k: int, fee_bps: int = 0) -> int:
+    """
+    Computes a swap's output with uint256 math on the reserves before the swap.
+
+    `amountOut = reserveOut - k / (reserveIn + amountIn)` with Solidity's
+    truncating division. This is the constant product formula MinimaDEX.swap
+    is meant to apply; the deployed contract counts the input twice, see
+    contract_amount_out. A non-zero `fee_bps` takes a fee from the input
+    before it is priced, rounding the priced amount down; the contract
+    charges no fee, so this is only for what-if runs.
+    Plain Python ints only, so this is safe to call in tight loops.
+    """
+    if fee_bps:
+        amount_in = amount_in * (FEE_DENOMINATOR - fee_bps) // FEE_DENOMINATOR
+    return reserve_out - k // (reserve_in + amount_in)
+
+
+def contract_amount_out(amount_in: int, balance_in: int, balance_out: int, k: int) -> int:
+    """
+    Computes a swap's output exactly as the deployed MinimaDEX.swap does.
+
+    The contract reads `reserveIn = balanceOf(this)` after `transferFrom`, so
+    the balance already includes `amountIn`, and then adds `amountIn` again:
+    `amountOut = balanceOut - k / (balanceIn + 2 * amountIn)`, with the
+    balances taken before the swap. It therefore pays out more than the
+    constant product allows. Use this to reconcile with on-chain swaps.
+
+    Raises:
+        ValueError: Where the contract's subtraction underflows and the swap reverts.
+    """
+    amount_out = balance_out - k // (balance_in + 2 * amount_in)
+    if amount_out < 0:
+        raise ValueError("MinimaDEX.swap reverts: the output underflows.")
+    return amount_out
+
 
 class SimpleDex:
     """
@@ -7,6 +81,10 @@ class SimpleDex:
     
     This class simulates a liquidity pool and provides functions to swap tokens,
     calculate prices, and add liquidity.
+
+    Writes to the pool are serialized by a per-pool lock. Reserves are never
+    mutated in place: each write swaps in a new dict, so readers take one
+    consistent snapshot without locking.
     """
 
     def __init__(self, token_a_reserve: float, token_b_reserve: float):
@@ -22,7 +100,8 @@ class SimpleDex:
             'tokenB': token_b_reserve
         }
         self.k = token_a_reserve * token_b_reserve
-        print(f"DEX initialized with reserves: {self.reserves}")
+        self._lock = threading.Lock()
+        log.info("dex_initialized", reserves=self.reserves)
 
     def get_price(self, token_in: str, token_out: str) -> float:
         """
@@ -35,10 +114,11 @@ class SimpleDex:
         Returns:
             The exchange rate (amount of token_out per 1 unit of token_in).
         """
-        if token_in not in self.reserves or token_out not in self.reserves:
+        reserves = self.reserves
+        if token_in not in reserves or token_out not in reserves:
             raise ValueError("Invalid token. Must be 'tokenA' or 'tokenB'.")
 
-        return self.reserves[token_out] / self.reserves[token_in]
+        return reserves[token_out] / reserves[token_in]
 
     def swap_tokens(self, token_in: str, amount_in: float) -> Dict[str, Any]:
         """
@@ -58,21 +138,25 @@ class SimpleDex:
         else:
             raise ValueError("Invalid token. Must be 'tokenA' or 'tokenB'.")
 
-        current_reserve_in = self.reserves[token_in]
-        current_reserve_out = self.reserves[token_out]
+        with self._lock:
+            current_reserve_in = self.reserves[token_in]
+            current_reserve_out = self.reserves[token_out]
 
-        # Constant Product Formula: (x + dx) * (y - dy) = k
-        new_reserve_in = current_reserve_in + amount_in
-        new_reserve_out = self.k / new_reserve_in
-        
-        amount_out = current_reserve_out - new_reserve_out
-        
-        # Update reserves
-        self.reserves[token_in] = new_reserve_in
-        self.reserves[token_out] = new_reserve_out
-        
-        print(f"Swap executed: {amount_in} {token_in} -> {amount_out} {token_out}")
-        print(f"New reserves: {self.reserves}")
+            # Constant Product Formula: (x + dx) * (y - dy) = k
+            new_reserve_in = current_reserve_in + amount_in
+            new_reserve_out = self.k / new_reserve_in
+
+            amount_out = current_reserve_out - new_reserve_out
+
+            # Update reserves
+            reserves = dict(self.reserves)
+            reserves[token_in] = new_reserve_in
+            reserves[token_out] = new_reserve_out
+            self.reserves = reserves
+
+        # Swaps are the hot path: one in every 1000 is logged.
+        log.info("swap", every=1000, token_in=token_in, amount_in=amount_in, token_out=token_out,
+                 amount_out=amount_out, reserves=reserves)
 
         return {
             "status": True,
@@ -91,18 +175,104 @@ class SimpleDex:
         Returns:
             A dictionary with the result of adding liquidity.
         """
-        self.reserves['tokenA'] += amount_a
-        self.reserves['tokenB'] += amount_b
-        self.k = self.reserves['tokenA'] * self.reserves['tokenB']
-        
-        print(f"Liquidity added: {amount_a} TokenA, {amount_b} TokenB")
-        print(f"New reserves: {self.reserves}")
+        with self._lock:
+            reserves = {
+                'tokenA': self.reserves['tokenA'] + amount_a,
+                'tokenB': self.reserves['tokenB'] + amount_b
+            }
+            self.k = reserves['tokenA'] * reserves['tokenB']
+            self.reserves = reserves
+
+        log.info("liquidity_added", amount_a=amount_a, amount_b=amount_b, reserves=reserves)
         
         return {
             "status": True,
             "message": "Liquidity added successfully."
         }
 
+
+class ExactDex(SimpleDex):
+    """
+    A SimpleDex that keeps reserves as integer base units (wei) instead of floats.
+
+    Swaps apply the constant product formula with the same truncating uint256
+    division as minima_dex.sol, so there is no float drift. The deployed
+    contract counts the input twice and pays out more (see
+    contract_amount_out), so compare on-chain swaps with that function, not
+    with this class. Reserves and amounts are plain Python ints; use to_wei /
+    from_wei at the edges. Swaps do not print, so the class can be driven at
+    reconciliation volume.
+    """
+
+    def __init__(self, token_a_reserve: int, token_b_reserve: int, fee_bps: int = 0):
+        """
+        Initializes the DEX with integer reserves.
+
+        Args:
+            token_a_reserve: The initial reserve of Token A, in base units.
+            token_b_reserve: The initial reserve of Token B, in base units.
+            fee_bps: A what-if swap fee in basis points. The deployed contract charges none.
+                With a fee, k is recomputed from the reserves after every swap.
+        """
+        if not isinstance(token_a_reserve, int) or not isinstance(token_b_reserve, int):
+            raise ValueError("Reserves must be integers in base units. Use to_wei() to convert.")
+        if not 0 <= fee_bps < FEE_DENOMINATOR:
+            raise ValueError("fee_bps must be between 0 and 9999.")
+        self.fee_bps = fee_bps
+        super().__init__(token_a_reserve, token_b_reserve)
+
+    @classmethod
+    def from_token_amounts(cls, token_a_reserve: float, token_b_reserve: float, fee_bps: int = 0,
+                           decimals: int = WEI_DECIMALS) -> 'ExactDex':
+        """Builds an ExactDex from human-readable token amounts."""
+        return cls(to_wei(token_a_reserve, decimals), to_wei(token_b_reserve, decimals), fee_bps)
+
+    def swap_tokens(self, token_in: str, amount_in: int) -> Dict[str, Any]:
+        """
+        Executes a swap with the contract's integer rounding, on the pre-swap reserves.
+
+        Args:
+            token_in: The token being swapped in.
+            amount_in: The amount of token_in to swap, in base units.
+
+        Returns:
+            A dictionary with the swap result, including the amount received in base units.
+        """
+        if token_in == 'tokenA':
+            token_out = 'tokenB'
+        elif token_in == 'tokenB':
+            token_out = 'tokenA'
+        else:
+            raise ValueError("Invalid token. Must be 'tokenA' or 'tokenB'.")
+        if not isinstance(amount_in, int) or amount_in < 0:
+            raise ValueError("amount_in must be a non-negative integer in base units.")
+
+        with self._lock:
+            reserves = dict(self.reserves)
+            amount_out = get_amount_out(amount_in, reserves[token_in], reserves[token_out], self.k, self.fee_bps)
+            reserves[token_in] += amount_in
+            reserves[token_out] -= amount_out
+            self.reserves = reserves
+            if self.fee_bps:
+                # The fee stays in the pool and grows it, so the next swap is
+                # priced on the new product; keeping the old k would let a
+                # later trader take the fee back out.
+                self.k = reserves['tokenA'] * reserves['tokenB']
+
+        return {
+            "status": True,
+            "amount_out": amount_out,
+            "token_out": token_out
+        }
+
+    def add_liquidity(self, amount_a: int, amount_b: int) -> Dict[str, Any]:
+        """
+        Adds integer liquidity to the pool, recomputing k like MinimaDEX.addLiquidity.
+        """
+        if not isinstance(amount_a, int) or not isinstance(amount_b, int):
+            raise ValueError("Liquidity amounts must be integers in base units.")
+        return super().add_liquidity(amount_a, amount_b)
+
 # --- Example Usage ---
 if __name__ == '__main__':
     # Initialize the DEX with a 1:1 price ratio
@@ -127,3 +297,9 @@ if __name__ == '__main__':
     print("\n--- Adding Liquidity ---")
     liquidity_result = dex.add_liquidity(100, 100)
     print("Liquidity Result:", liquidity_result)
+
+    # Example 5: Exact integer mode, with the contract's uint256 rounding
+    print("\n--- Exact (wei) Swap of 50 TokenA ---")
+    exact_dex = ExactDex.from_token_amounts(1000, 1000)
+    exact_result = exact_dex.swap_tokens('tokenA', to_wei(50))
+    print("Exact Swap Result:", exact_result, "=", from_wei(exact_result["amount_out"]), "TokenB")
@@ -0,0 +1,327 @@
+import argparse
+import csv
+import json
+import math
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from minima_dex import FEE_DENOMINATOR
+from minima_dex_engine import TOKEN_A, TOKEN_B
+
+# Event kinds in a replay stream.
+EVENT_SWAP = 0
+EVENT_LIQUIDITY = 1
+_EVENT_KINDS = {'swap': EVENT_SWAP, 'liquidity': EVENT_LIQUIDITY}
+_TOKEN_CODES = {'tokenA': TOKEN_A, 'tokenB': TOKEN_B}
+
+# Events replayed per chunk; bounds the Python objects a replay holds at once.
+CHUNK_SIZE = 65_536
+
+
+class Events(NamedTuple):
+    """
+    A swap/liquidity event stream as column arrays.
+
+    For a swap, `token_in` and `amount` (the amount in) are set; for a
+    liquidity event, `amount` and `amount_b` are the Token A and Token B added.
+    """
+    kind: np.ndarray
+    token_in: np.ndarray
+    amount: np.ndarray
+    amount_b: np.ndarray
+
+
+class Scenario(NamedTuple):
+    """The pool a stream is replayed against: starting reserves and swap fee."""
+    name: str
+    reserve_a: float
+    reserve_b: float
+    fee_bps: int = 0
+
+
+def _iter_rows(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, newline='') as f:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def read_events(path: str) -> Events:
+    """
+    Streams recorded events from a CSV or JSONL file into column arrays.
+
+    Each row is {"type": "swap", "token_in": "tokenA", "amount_in": 50} or
+    {"type": "liquidity", "amount_a": 100, "amount_b": 100}; CSV files use
+    those names as column headers and leave unused columns empty. Rows are
+    parsed one at a time, so only the columns are ever held in memory.
+
+    Raises:
+        ValueError: If a row has an unknown type or token, a missing or non-finite
+            amount, or a negative liquidity amount.
+    """
+    kinds, tokens = array('b'), array('b')
+    amounts, amounts_b = array('d'), array('d')
+    for line, row in enumerate(_iter_rows(path), 1):
+        try:
+            kind = _EVENT_KINDS[row['type']]
+            if kind == EVENT_SWAP:
+                tokens.append(_TOKEN_CODES[row['token_in']])
+                amounts.append(float(row['amount_in']))
+                amounts_b.append(0.0)
+            else:
+                tokens.append(TOKEN_A)
+                amounts.append(float(row['amount_a']))
+                amounts_b.append(float(row['amount_b']))
+                if not amounts[-1] >= 0 or not amounts_b[-1] >= 0:
+                    raise ValueError("liquidity amounts must not be negative")
+            if not math.isfinite(amounts[-1]) or not math.isfinite(amounts_b[-1]):
+                raise ValueError("amounts must be finite")
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"{path}:{line}: invalid event {row!r} ({e!r})") from None
+        kinds.append(kind)
+    # The arrays are wrapped, not copied.
+    return Events(np.frombuffer(kinds, dtype=np.int8), np.frombuffer(tokens, dtype=np.int8),
+                  np.frombuffer(amounts, dtype=np.float64), np.frombuffer(amounts_b, dtype=np.float64))
+
+
+def _summary(values: np.ndarray) -> Dict[str, float]:
+    if not len(values):
+        return {"mean": 0.0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+    p50, p99 = np.percentile(values, [50, 99])
+    return {"mean": float(values.mean()), "p50": float(p50), "p99": float(p99), "max": float(values.max())}
+
+
+def check_scenario(scenario: Scenario):
+    """
+    Raises:
+        ValueError: If the scenario's reserves are not positive or its fee is outside 0-9999 bps.
+    """
+    if not (0 < scenario.reserve_a < math.inf and 0 < scenario.reserve_b < math.inf):
+        raise ValueError(f"{scenario.name}: reserves must be positive, got "
+                         f"{scenario.reserve_a:g} and {scenario.reserve_b:g}.")
+    if not 0 <= scenario.fee_bps < FEE_DENOMINATOR:
+        raise ValueError(f"{scenario.name}: fee_bps must be between 0 and 9999, got {scenario.fee_bps}.")
+
+
+def replay(events: Events, scenario: Scenario) -> Dict[str, Any]:
+    """
+    Replays an event stream through a constant-product pool and reports how it fared.
+
+    Swaps use SimpleDex's formula, with the fee taken from the input before
+    pricing like get_amount_out and left in the pool for liquidity providers.
+    Swaps with a non-positive amount are skipped. Liquidity events are
+    treated as deposits into one LP position alongside the starting reserves.
+
+    Returns:
+        Counts, volume and fees per token; slippage (execution price against
+        the spot price before the swap, fee included) and price impact (the
+        spot price move the swap caused), both in basis points; and the LP
+        position's value in Token B at the final price against simply holding
+        the deposited tokens.
+
+    Raises:
+        ValueError: If the scenario is invalid; see check_scenario().
+    """
+    check_scenario(scenario)
+    reserve_a, reserve_b = float(scenario.reserve_a), float(scenario.reserve_b)
+    deposited_a, deposited_b = reserve_a, reserve_b
+    keep = (FEE_DENOMINATOR - scenario.fee_bps) / FEE_DENOMINATOR
+    volume = [0.0, 0.0]
+    fees = [0.0, 0.0]
+    swaps = liquidity = skipped = 0
+    count = len(events.kind)
+    slippage = np.empty(count)
+    impact = np.empty(count)
+
+    for start in range(0, count, CHUNK_SIZE):
+        end = start + CHUNK_SIZE
+        chunk = zip(events.kind[start:end].tolist(), events.token_in[start:end].tolist(),
+                    events.amount[start:end].tolist(), events.amount_b[start:end].tolist())
+        for kind, token_in, amount, amount_b in chunk:
+            if kind == EVENT_LIQUIDITY:
+                reserve_a += amount
+                reserve_b += amount_b
+                deposited_a += amount
+                deposited_b += amount_b
+                liquidity += 1
+                continue
+            if amount <= 0:
+                skipped += 1
+                continue
+            if token_in == TOKEN_A:
+                reserve_in, reserve_out = reserve_a, reserve_b
+            else:
+                reserve_in, reserve_out = reserve_b, reserve_a
+            amount_priced = amount * keep
+            amount_out = reserve_out * amount_priced / (reserve_in + amount_priced)
+            spot = reserve_out / reserve_in
+            new_in = reserve_in + amount
+            new_out = reserve_out - amount_out
+            slippage[swaps] = 1 - amount_out / (amount * spot)
+            impact[swaps] = 1 - new_out / new_in / spot
+            volume[token_in] += amount
+            fees[token_in] += amount - amount_priced
+            swaps += 1
+            if token_in == TOKEN_A:
+                reserve_a, reserve_b = new_in, new_out
+            else:
+                reserve_b, reserve_a = new_in, new_out
+
+    price = reserve_b / reserve_a
+    lp_value = reserve_a * price + reserve_b
+    hold_value = deposited_a * price + deposited_b
+    return {
+        "scenario": scenario.name,
+        "fee_bps": scenario.fee_bps,
+        "swaps": swaps,
+        "liquidity_events": liquidity,
+        "skipped": skipped,
+        "volume": {"tokenA": volume[TOKEN_A], "tokenB": volume[TOKEN_B]},
+        "fees": {"tokenA": fees[TOKEN_A], "tokenB": fees[TOKEN_B]},
+        "slippage_bps": _summary(slippage[:swaps] * 10_000),
+        "price_impact_bps": _summary(impact[:swaps] * 10_000),
+        "final_reserves": {"tokenA": reserve_a, "tokenB": reserve_b},
+        "final_price": price,
+        "lp_value": lp_value,
+        "hold_value": hold_value,
+        "fee_value": fees[TOKEN_A] * price + fees[TOKEN_B],
+        "lp_vs_hold": lp_value / hold_value - 1
+    }
+
+
+# Column order and dtypes of an event stream in shared memory; float columns first keeps them aligned.
+_SHARED_LAYOUT = (('amount', np.float64), ('amount_b', np.float64), ('kind', np.int8), ('token_in', np.int8))
+
+
+def _shared_size(length: int) -> int:
+    return sum(np.dtype(dtype).itemsize for _, dtype in _SHARED_LAYOUT) * length
+
+
+def _shared_views(buffer, length: int) -> Events:
+    columns, offset = {}, 0
+    for name, dtype in _SHARED_LAYOUT:
+        columns[name] = np.ndarray(length, dtype=dtype, buffer=buffer, offset=offset)
+        offset += np.dtype(dtype).itemsize * length
+    return Events(**columns)
+
+
+class SharedEvents:
+    """
+    An event stream copied once into a shared memory block.
+
+    Worker processes attach to the block by name and read the columns in
+    place, so a sweep does not pickle the stream to every worker. The
+    creating process owns the block; close() unlinks it.
+    """
+
+    def __init__(self, events: Events):
+        self.length = len(events.kind)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(_shared_size(self.length), 1))
+        self.name = self._shm.name
+        self.events = _shared_views(self._shm.buf, self.length)
+        for name, _ in _SHARED_LAYOUT:
+            getattr(self.events, name)[:] = getattr(events, name)
+
+    def close(self):
+        # Views into the block must go before it can be closed.
+        self.events = None
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# The stream a pool worker attached to, set by _attach_worker.
+_worker_stream: Optional[Tuple[shared_memory.SharedMemory, Events]] = None
+
+
+def _attach_worker(name: str, length: int):
+    global _worker_stream
+    shm = shared_memory.SharedMemory(name=name)
+    _worker_stream = (shm, _shared_views(shm.buf, length))
+
+
+def _replay_in_worker(scenario: Scenario) -> Dict[str, Any]:
+    return replay(_worker_stream[1], scenario)
+
+
+def sweep(events: Events, scenarios: Sequence[Scenario], processes: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Replays one event stream against many scenarios, one scenario per task in a process pool.
+
+    Args:
+        events: The stream, e.g. from read_events().
+        scenarios: The pools to evaluate.
+        processes: Worker processes (default: one per CPU, at most one per
+                   scenario). With 1, scenarios run in this process.
+
+    Returns:
+        The replay() result of every scenario, in the order given.
+
+    Raises:
+        ValueError: If a scenario is invalid, before any is replayed.
+    """
+    for scenario in scenarios:
+        check_scenario(scenario)
+    processes = min(processes or os.cpu_count() or 1, len(scenarios))
+    if processes <= 1:
+        return [replay(events, scenario) for scenario in scenarios]
+    with SharedEvents(events) as shared, \
+            ProcessPoolExecutor(processes, initializer=_attach_worker, initargs=(shared.name, shared.length)) as pool:
+        return list(pool.map(_replay_in_worker, scenarios))
+
+
+def scenario_grid(reserve_a: float, reserve_b: float, fees_bps: Sequence[int],
+                  depths: Sequence[float] = (1.0,)) -> List[Scenario]:
+    """
+    Builds one scenario per fee and liquidity depth, a multiplier on the starting reserves.
+
+    Raises:
+        ValueError: If a scenario would be invalid; see check_scenario().
+    """
+    grid = [Scenario(f"fee={fee_bps}bps depth={depth:g}x", reserve_a * depth, reserve_b * depth, fee_bps)
+            for depth in depths for fee_bps in fees_bps]
+    for scenario in grid:
+        check_scenario(scenario)
+    return grid
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replays recorded swap and liquidity events against a grid of pools.")
+    parser.add_argument('events', help='A .csv or .jsonl file of events; see read_events().')
+    parser.add_argument('--reserves', default='1000000,1000000', help='Starting Token A and Token B reserves.')
+    parser.add_argument('--fees', default='0,5,30,100', help='Comma-separated swap fees in basis points.')
+    parser.add_argument('--depths', default='0.5,1,2', help='Comma-separated multipliers on the reserves.')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help='Print the full results as JSON.')
+    args = parser.parse_args()
+
+    try:
+        reserve_a, reserve_b = (float(value) for value in args.reserves.split(','))
+        grid = scenario_grid(reserve_a, reserve_b, [int(fee) for fee in args.fees.split(',')],
+                             [float(depth) for depth in args.depths.split(',')])
+        stream = read_events(args.events)
+    except ValueError as e:
+        parser.error(str(e))
+    results = sweep(stream, grid, args.processes)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{len(stream.kind):,} events")
+        print(f"{'scenario':<24} {'slip p50':>9} {'slip p99':>9} {'impact p99':>10} {'fees':>12} {'LP vs hold':>10}")
+        for result in results:
+            print(f"{result['scenario']:<24} {result['slippage_bps']['p50']:8.1f}b {result['slippage_bps']['p99']:8.1f}b "
+                  f"{result['price_impact_bps']['p99']:9.1f}b {result['fee_value']:12.2f} {result['lp_vs_hold']:+10.2%}")
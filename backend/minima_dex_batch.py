@@ -0,0 +1,108 @@
+import threading
+from typing import Dict, Any
+
+from structured_log import get_logger
+
+log = get_logger("dex_batch")
+
+
+class ReserveWriteBuffer:
+    """
+    Collects reserve updates for a short window and writes them in bulk.
+
+    Meant for the event indexer, which produces reserve changes for hundreds of
+    pools per block: every pair is written at most once per window (the last
+    update wins) through FirestoreDEX.update_reserves_many.
+    """
+
+    def __init__(self, dex, window: float = 1.0, max_pending: int = 5000):
+        """
+        Initializes the buffer.
+
+        Args:
+            dex: The FirestoreDEX (or anything with update_reserves_many) to write to.
+            window: Seconds between automatic flushes once start() is called.
+            max_pending: Number of distinct pairs that triggers an early flush.
+        """
+        self.dex = dex
+        self.window = window
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.received = 0
+        self.flushed = 0
+
+    def add(self, token_a: str, token_b: str, reserve_a, reserve_b):
+        """Queues an update, replacing any pending update for the same pair."""
+        key = f"{token_a}-{token_b}"
+        with self._lock:
+            self._pending.pop(key, None)
+            self._pending[key] = {
+                "token_a": token_a,
+                "token_b": token_b,
+                "reserve_a": reserve_a,
+                "reserve_b": reserve_b
+            }
+            self.received += 1
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self.flush()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> Dict[str, int]:
+        """
+        Writes all pending updates now and returns the write summary.
+
+        Updates that could not be written go back into the buffer for the
+        next flush, unless a newer update for the same pair has arrived.
+        """
+        with self._lock:
+            updates = list(self._pending.values())
+            self._pending = {}
+        if not updates:
+            return {"written": 0, "batches": 0, "failed": 0}
+        failed = []
+        try:
+            result = self.dex.update_reserves_many(updates, failed_updates=failed)
+        except Exception:
+            self._restore(updates)
+            raise
+        self._restore(failed)
+        self.flushed += result["written"]
+        return result
+
+    def _restore(self, updates):
+        if not updates:
+            return
+        with self._lock:
+            restored = {f"{update['token_a']}-{update['token_b']}": update for update in updates}
+            # Newer updates replace the restored ones and keep their place after them.
+            restored.update(self._pending)
+            self._pending = restored
+
+    def _run(self):
+        while not self._stop.wait(self.window):
+            try:
+                self.flush()
+            except Exception as e:
+                log.error("reserve_flush_failed", error=str(e))
+
+    def start(self):
+        """Starts flushing in a background thread every `window` seconds."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="reserve-write-buffer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops the background thread and writes anything still pending."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+class _Fetch:
+    """One in-flight read, with the result or exception its waiters share."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+
+class ReservesCache:
+    """
+    A read-through, in-process cache in front of FirestoreDEX.get_reserves.
+
+    Entries live in a bounded LRU and expire after a per-pair TTL. Concurrent
+    misses for the same pair share a single Firestore read (and its error),
+    and entries are invalidated when FirestoreDEX.update_reserves fires.
+    """
+
+    def __init__(self, dex, max_entries: int = 1024, ttl: float = 5.0, wait_timeout: float = 10.0,
+                 clock=time.monotonic):
+        """
+        Initializes the cache.
+
+        Args:
+            dex: The FirestoreDEX (or anything with get_reserves(token_a, token_b)) to read through to.
+            max_entries: The maximum number of pairs kept before the least recently used is evicted.
+            ttl: The default number of seconds an entry stays fresh.
+            wait_timeout: Seconds a reader waits for another thread's read of the same pair before giving up.
+            clock: The time source, injectable for tests.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.dex = dex
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        # pair key -> (expires_at, reserves)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # pair key -> TTL override; at most max_entries of them
+        self._ttls: Dict[str, float] = {}
+        # pair key -> the in-flight fetch
+        self._inflight: Dict[str, _Fetch] = {}
+        # In-flight fetches invalidated since they started; their results are not stored.
+        # Keys leave when their fetch finishes, so this is never larger than _inflight.
+        self._stale: set = set()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.wait_timeouts = 0
+
+    @staticmethod
+    def _key(token_a: str, token_b: str) -> str:
+        return f"{token_a}-{token_b}"
+
+    def set_ttl(self, token_a: str, token_b: str, ttl: Optional[float]):
+        """
+        Overrides the TTL of one pair. Pass None to go back to the default.
+
+        Raises:
+            ValueError: If max_entries pairs already have an override.
+        """
+        key = self._key(token_a, token_b)
+        with self._lock:
+            if ttl is None:
+                self._ttls.pop(key, None)
+            elif key in self._ttls or len(self._ttls) < self.max_entries:
+                self._ttls[key] = ttl
+            else:
+                raise ValueError(f"At most {self.max_entries} pairs can have a TTL override.")
+
+    def get_reserves(self, token_a: str, token_b: str) -> Dict[str, Any]:
+        """
+        Returns the reserves for a pair, reading Firestore only on a miss.
+        Error results are passed through without being cached.
+
+        A reader that joins another thread's read gets that read's result or
+        exception. If the read takes longer than wait_timeout, it gets an error
+        result instead.
+        """
+        key = self._key(token_a, token_b)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    if entry[0] > self._clock():
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return entry[1]
+                    del self._entries[key]
+                fetch = self._inflight.get(key)
+                if fetch is None:
+                    self.misses += 1
+                    fetch = self._inflight[key] = _Fetch()
+                    break
+                self.coalesced += 1
+            # Another thread is already fetching this pair; wait for its result.
+            if not fetch.done.wait(self.wait_timeout):
+                with self._lock:
+                    self.wait_timeouts += 1
+                return {"error": "Timed out waiting for reserves from the database."}
+            if fetch.error is not None:
+                raise fetch.error
+            if fetch.result is not None:
+                return fetch.result
+            # The leader's read was invalidated while it ran; read the newer reserves.
+
+        try:
+            reserves = self.dex.get_reserves(token_a, token_b)
+            with self._lock:
+                if key not in self._stale:
+                    # Waiters share the result, errors included; a stale one sends them back to read again.
+                    fetch.result = reserves
+                    if reserves and "error" not in reserves:
+                        self._store(key, reserves)
+            return reserves
+        except Exception as e:
+            fetch.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                self._stale.discard(key)
+            fetch.done.set()
+
+    def _store(self, key: str, reserves: Dict[str, Any]):
+        expires_at = self._clock() + self._ttls.get(key, self.ttl)
+        self._entries[key] = (expires_at, reserves)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, token_a: str, token_b: str, *args):
+        """
+        Drops a pair from the cache. Extra arguments are ignored so this can be
+        registered directly with FirestoreDEX.add_listener.
+        """
+        key = self._key(token_a, token_b)
+        with self._lock:
+            if key in self._inflight:
+                self._stale.add(key)
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """Drops every cached pair."""
+        with self._lock:
+            self._stale.update(self._inflight)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "wait_timeouts": self.wait_timeouts,
+                "entries": len(self._entries),
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0
+            }
@@ -0,0 +1,424 @@
+import contextlib
+import threading
+import time
+
+import numpy as np
+from typing import Dict, Any, Optional, Sequence, Union
+
+# Token side codes used by the batch APIs. They mirror the 'tokenA' / 'tokenB'
+# keys that SimpleDex uses for its reserves.
+TOKEN_A = 0
+TOKEN_B = 1
+_TOKEN_CODES = {'tokenA': TOKEN_A, 'tokenB': TOKEN_B}
+
+
+class PoolRegistry:
+    """
+    A multi-pool AMM engine that keeps every pool's reserves in contiguous NumPy arrays.
+
+    Each registered pool gets an integer pair id that indexes into the reserve
+    arrays. Swaps and quotes are evaluated for a whole batch at once with the same
+    constant product formula as SimpleDex, so thousands of pairs can be driven
+    without a Python-level loop per swap.
+
+    Pools are striped over LOCK_STRIPES locks. A swap batch holds the stripes
+    of the pools it touches, taken in ascending order, so batches on different
+    pools run side by side. Registering pools is serialized by a separate
+    lock, and growing the arrays holds every stripe.
+
+    Reads take no lock. Each stripe has a version that a writer makes odd
+    while it holds the stripe and even again when it lets go, so a reader
+    copies the reserves it needs and keeps the copy only if the versions of
+    its stripes were even and unchanged around it; otherwise it reads again.
+    A read therefore never sees one reserve of a pool updated without the other.
+    """
+
+    # Number of locks the pools are striped over.
+    LOCK_STRIPES = 64
+
+    # swap_many applies a batch pool-round by pool-round when its rounds are
+    # at least this many swaps wide on average, and with a log-step scan otherwise.
+    MIN_ROUND_WIDTH = 16
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Initializes an empty registry.
+
+        Args:
+            capacity: The number of pools to preallocate room for. The arrays grow
+                      automatically when more pools are registered.
+        """
+        capacity = max(int(capacity), 1)
+        self._reserve_a = np.zeros(capacity, dtype=np.float64)
+        self._reserve_b = np.zeros(capacity, dtype=np.float64)
+        self._k = np.zeros(capacity, dtype=np.float64)
+        self._size = 0
+        self._ids_by_key: Dict[str, int] = {}
+        self._keys: list = []
+        self._lock = threading.Lock()
+        self._pool_locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        # Bumped by writers on taking and on releasing a stripe; odd while one holds it.
+        self._versions = np.zeros(self.LOCK_STRIPES, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _stripes(self, pair_ids: np.ndarray) -> np.ndarray:
+        """Returns the distinct stripes of `pair_ids`, in ascending order."""
+        return np.flatnonzero(np.bincount(pair_ids % self.LOCK_STRIPES, minlength=self.LOCK_STRIPES))
+
+    @contextlib.contextmanager
+    def _locked(self, pair_ids: np.ndarray):
+        # Ascending stripe order keeps two batches from deadlocking on each other.
+        stripes = self._stripes(pair_ids)
+        for stripe in stripes.tolist():
+            self._pool_locks[stripe].acquire()
+        self._versions[stripes] += 1
+        try:
+            yield
+        finally:
+            self._versions[stripes] += 1
+            for stripe in reversed(stripes.tolist()):
+                self._pool_locks[stripe].release()
+
+    def _read(self, pair_ids: np.ndarray):
+        """Returns consistent copies of the Token A reserves, Token B reserves and k of `pair_ids`."""
+        stripes = self._stripes(pair_ids)
+        while True:
+            before = self._versions[stripes]
+            reserve_a = self._reserve_a[pair_ids]
+            reserve_b = self._reserve_b[pair_ids]
+            k = self._k[pair_ids]
+            if not (before & 1).any() and np.array_equal(before, self._versions[stripes]):
+                return reserve_a, reserve_b, k
+            # A writer holds one of the stripes; let it finish before reading again.
+            time.sleep(0)
+
+    def _grow(self, needed: int):
+        capacity = len(self._k)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        # Swaps write into the arrays being replaced, so all of them wait for the copy.
+        with self._locked(np.arange(self.LOCK_STRIPES)):
+            for name in ('_reserve_a', '_reserve_b', '_k'):
+                old = getattr(self, name)
+                new = np.zeros(capacity, dtype=np.float64)
+                new[:self._size] = old[:self._size]
+                setattr(self, name, new)
+
+    def add_pool(self, token_a_reserve: float, token_b_reserve: float, key: Optional[str] = None) -> int:
+        """
+        Registers a new pool and returns its pair id.
+
+        Args:
+            token_a_reserve: The initial reserve amount for Token A.
+            token_b_reserve: The initial reserve amount for Token B.
+            key: An optional lookup key for the pool, e.g. "minima-custom-token".
+
+        Returns:
+            The integer pair id of the new pool.
+        """
+        if token_a_reserve <= 0 or token_b_reserve <= 0:
+            raise ValueError("Initial reserves must be positive.")
+        with self._lock:
+            if key is not None and key in self._ids_by_key:
+                raise ValueError(f"Pool '{key}' is already registered.")
+
+            pair_id = self._size
+            self._grow(pair_id + 1)
+            self._reserve_a[pair_id] = token_a_reserve
+            self._reserve_b[pair_id] = token_b_reserve
+            self._k[pair_id] = token_a_reserve * token_b_reserve
+            self._size += 1
+            self._keys.append(key)
+            if key is not None:
+                self._ids_by_key[key] = pair_id
+        return pair_id
+
+    def add_pools(self, token_a_reserves: Sequence[float], token_b_reserves: Sequence[float]) -> np.ndarray:
+        """
+        Registers many pools at once.
+
+        Args:
+            token_a_reserves: Initial Token A reserves, one per pool.
+            token_b_reserves: Initial Token B reserves, one per pool.
+
+        Returns:
+            An array with the pair ids of the new pools.
+        """
+        reserves_a = np.asarray(token_a_reserves, dtype=np.float64)
+        reserves_b = np.asarray(token_b_reserves, dtype=np.float64)
+        if reserves_a.shape != reserves_b.shape or reserves_a.ndim != 1:
+            raise ValueError("Reserve arrays must be one-dimensional and of equal length.")
+        if np.any(reserves_a <= 0) or np.any(reserves_b <= 0):
+            raise ValueError("Initial reserves must be positive.")
+
+        with self._lock:
+            start = self._size
+            end = start + len(reserves_a)
+            self._grow(end)
+            self._reserve_a[start:end] = reserves_a
+            self._reserve_b[start:end] = reserves_b
+            self._k[start:end] = reserves_a * reserves_b
+            self._size = end
+            self._keys.extend([None] * len(reserves_a))
+        return np.arange(start, end)
+
+    def pair_id(self, key: str) -> int:
+        """Returns the pair id registered under `key`."""
+        try:
+            return self._ids_by_key[key]
+        except KeyError:
+            raise ValueError(f"Unknown pool '{key}'.") from None
+
+    def get_reserves(self, pair_id: int) -> Dict[str, float]:
+        """
+        Returns the reserves of one pool in the same shape as SimpleDex.reserves.
+        """
+        pair_ids = np.asarray([pair_id])
+        self._check_ids(pair_ids)
+        reserve_a, reserve_b, _ = self._read(pair_ids)
+        return {
+            'tokenA': float(reserve_a[0]),
+            'tokenB': float(reserve_b[0])
+        }
+
+    def get_price(self, pair_id: int, token_in: str, token_out: str) -> float:
+        """
+        Calculates the exchange rate (amount of token_out per 1 unit of token_in) of one pool.
+        """
+        reserves = self.get_reserves(pair_id)
+        if token_in not in reserves or token_out not in reserves:
+            raise ValueError("Invalid token. Must be 'tokenA' or 'tokenB'.")
+        return reserves[token_out] / reserves[token_in]
+
+    def add_liquidity(self, pair_id: int, amount_a: float, amount_b: float) -> Dict[str, Any]:
+        """
+        Adds liquidity to one pool and recomputes its invariant, like SimpleDex.add_liquidity.
+        """
+        pair_ids = np.asarray([pair_id])
+        self._check_ids(pair_ids)
+        with self._locked(pair_ids):
+            self._reserve_a[pair_id] += amount_a
+            self._reserve_b[pair_id] += amount_b
+            self._k[pair_id] = self._reserve_a[pair_id] * self._reserve_b[pair_id]
+        return {
+            "status": True,
+            "message": "Liquidity added successfully."
+        }
+
+    def _check_ids(self, pair_ids: np.ndarray):
+        if pair_ids.size and (pair_ids.min() < 0 or pair_ids.max() >= self._size):
+            raise ValueError("Unknown pair id in batch.")
+
+    def _prepare_batch(self, pair_ids, tokens_in, amounts_in):
+        pair_ids = np.asarray(pair_ids, dtype=np.intp)
+        tokens = token_codes(tokens_in)
+        amounts = np.asarray(amounts_in, dtype=np.float64)
+        if not (pair_ids.shape == tokens.shape == amounts.shape) or pair_ids.ndim != 1:
+            raise ValueError("pair_ids, tokens_in and amounts_in must be one-dimensional and of equal length.")
+        self._check_ids(pair_ids)
+        if np.any(amounts < 0):
+            raise ValueError("Swap amounts must be non-negative.")
+        return pair_ids, tokens, amounts
+
+    def quote_many(self, pair_ids: Sequence[int], tokens_in: Union[Sequence[str], Sequence[int]],
+                   amounts_in: Sequence[float]) -> Dict[str, Any]:
+        """
+        Quotes a batch of swaps against the current reserves without changing them.
+
+        Every quote is evaluated independently, as if it were the only swap
+        executed next on its pool.
+
+        Args:
+            pair_ids: The pool of each swap.
+            tokens_in: The token swapped in, as 'tokenA'/'tokenB' or TOKEN_A/TOKEN_B.
+            amounts_in: The amount of token_in for each swap.
+
+        Returns:
+            A dictionary with the amounts out and the token out of every swap.
+        """
+        pair_ids, tokens, amounts = self._prepare_batch(pair_ids, tokens_in, amounts_in)
+        is_a = tokens == TOKEN_A
+        reserve_a, reserve_b, k = self._read(pair_ids)
+        reserve_in = np.where(is_a, reserve_a, reserve_b)
+        reserve_out = np.where(is_a, reserve_b, reserve_a)
+
+        # Constant Product Formula: (x + dx) * (y - dy) = k
+        amount_out = reserve_out - k / (reserve_in + amounts)
+        return {
+            "status": True,
+            "amount_out": amount_out,
+            "token_out": 1 - tokens
+        }
+
+    def swap_many(self, pair_ids: Sequence[int], tokens_in: Union[Sequence[str], Sequence[int]],
+                  amounts_in: Sequence[float]) -> Dict[str, Any]:
+        """
+        Executes a batch of swaps and updates the pool reserves.
+
+        Swaps that hit the same pool are applied in batch order, so each one sees
+        the reserves left behind by the previous one, exactly as a loop over
+        SimpleDex.swap_tokens would. Batches spread over many pools are applied
+        one round of per-pool swaps at a time with SimpleDex's arithmetic, so
+        the results are identical; batches concentrated on a few pools use a
+        log-step scan instead, which matches up to float rounding.
+
+        Args:
+            pair_ids: The pool of each swap.
+            tokens_in: The token swapped in, as 'tokenA'/'tokenB' or TOKEN_A/TOKEN_B.
+            amounts_in: The amount of token_in for each swap.
+
+        Returns:
+            A dictionary with the amounts out and the token out of every swap,
+            in the order the swaps were given.
+        """
+        pair_ids, tokens, amounts = self._prepare_batch(pair_ids, tokens_in, amounts_in)
+        n = len(pair_ids)
+        if n == 0:
+            return {"status": True, "amount_out": np.zeros(0), "token_out": np.zeros(0, dtype=np.int8)}
+
+        with self._locked(pair_ids):
+            # Group swaps by pool while keeping their batch order within each pool.
+            # NumPy radix-sorts 16-bit keys, which is several times faster than its int64 sort.
+            order = np.argsort(_narrow(pair_ids, self._size), kind='stable')
+            pid = pair_ids[order]
+            positions = np.arange(n)
+            seg_start = np.ones(n, dtype=bool)
+            seg_start[1:] = pid[1:] != pid[:-1]
+            seg_first = np.maximum.accumulate(np.where(seg_start, positions, 0))
+            # rank: how many earlier swaps of the batch hit the same pool.
+            rank = positions - seg_first
+            longest = int(rank.max()) + 1
+            if longest * self.MIN_ROUND_WIDTH <= n:
+                amount_out = self._swap_rounds(order, rank, longest, pair_ids, tokens, amounts)
+            else:
+                amount_out = self._swap_scan(order, pid, seg_start, seg_first, longest, tokens, amounts)
+        return {
+            "status": True,
+            "amount_out": amount_out,
+            "token_out": 1 - tokens
+        }
+
+    def _swap_rounds(self, order, rank, longest, pair_ids, tokens, amounts) -> np.ndarray:
+        # Round r applies the r-th swap of every pool in the batch. The pools of
+        # one round are distinct, so a round is a single vectorized SimpleDex
+        # step with the same arithmetic as swap_tokens.
+        by_round = np.argsort(_narrow(rank, longest), kind='stable')
+        batch_index = order[by_round]
+        bounds = np.searchsorted(rank[by_round], np.arange(longest + 1))
+        pid = pair_ids[batch_index]
+        is_a = tokens[batch_index] == TOKEN_A
+        amt = amounts[batch_index]
+        k = self._k[pid]
+        out = np.empty(len(pid))
+        for r in range(longest):
+            lo, hi = bounds[r], bounds[r + 1]
+            p, a = pid[lo:hi], is_a[lo:hi]
+            reserve_a = self._reserve_a[p]
+            reserve_b = self._reserve_b[p]
+            # Constant Product Formula: (x + dx) * (y - dy) = k
+            new_reserve_in = np.where(a, reserve_a, reserve_b) + amt[lo:hi]
+            new_reserve_out = k[lo:hi] / new_reserve_in
+            out[lo:hi] = np.where(a, reserve_b, reserve_a) - new_reserve_out
+            self._reserve_a[p] = np.where(a, new_reserve_in, new_reserve_out)
+            self._reserve_b[p] = np.where(a, new_reserve_out, new_reserve_in)
+        amount_out = np.empty(len(pid))
+        amount_out[batch_index] = out
+        return amount_out
+
+    def _swap_scan(self, order, pid, seg_start, seg_first, longest, tokens, amounts) -> np.ndarray:
+        n = len(pid)
+        positions = np.arange(n)
+        is_a = tokens[order] == TOKEN_A
+        amt = amounts[order]
+        k = self._k[pid]
+
+        # With k fixed, a pool's state is fully described by its Token A reserve x:
+        #   swap dx of A in:  x -> x + dx               = [[1, dx], [0, 1]] . x
+        #   swap dy of B in:  x -> k / (k / x + dy)     = [[1, 0], [dy / k, 1]] . x
+        # Both are Moebius maps, so the state before every swap is a segmented
+        # prefix product of 2x2 matrices, computed here with a log-step scan.
+        m_a = np.ones(n)
+        m_b = np.where(is_a, amt, 0.0)
+        m_c = np.where(is_a, 0.0, amt / k)
+        m_d = np.ones(n)
+        offset = 1
+        while offset < longest:
+            idx = positions[offset:]
+            idx = idx[idx - offset >= seg_first[idx]]
+            prev = idx - offset
+            a_i, b_i, c_i, d_i = m_a[idx], m_b[idx], m_c[idx], m_d[idx]
+            a_j, b_j, c_j, d_j = m_a[prev], m_b[prev], m_c[prev], m_d[prev]
+            new_a = a_i * a_j + b_i * c_j
+            new_b = a_i * b_j + b_i * d_j
+            new_c = c_i * a_j + d_i * c_j
+            new_d = c_i * b_j + d_i * d_j
+            # The maps are projective, so rescaling keeps entries bounded without changing them.
+            scale = np.maximum(np.maximum(np.abs(new_a), np.abs(new_b)), np.maximum(np.abs(new_c), np.abs(new_d)))
+            m_a[idx], m_b[idx], m_c[idx], m_d[idx] = new_a / scale, new_b / scale, new_c / scale, new_d / scale
+            offset *= 2
+
+        start_a = self._reserve_a[pid]
+        start_b = self._reserve_b[pid]
+        after_a = (m_a * start_a + m_b) / (m_c * start_a + m_d)
+        before_a = np.where(seg_start, start_a, np.roll(after_a, 1))
+        before_b = np.where(seg_start, start_b, k / before_a)
+
+        # Apply the SimpleDex update to each swap's starting reserves.
+        reserve_in = np.where(is_a, before_a, before_b)
+        reserve_out = np.where(is_a, before_b, before_a)
+        new_reserve_in = reserve_in + amt
+        new_reserve_out = k / new_reserve_in
+        amount_out_sorted = reserve_out - new_reserve_out
+
+        seg_last = np.ones(n, dtype=bool)
+        seg_last[:-1] = seg_start[1:]
+        last_pid = pid[seg_last]
+        last_is_a = is_a[seg_last]
+        self._reserve_a[last_pid] = np.where(last_is_a, new_reserve_in[seg_last], new_reserve_out[seg_last])
+        self._reserve_b[last_pid] = np.where(last_is_a, new_reserve_out[seg_last], new_reserve_in[seg_last])
+
+        amount_out = np.empty(n)
+        amount_out[order] = amount_out_sorted
+        return amount_out
+
+
+def _narrow(values: np.ndarray, bound: int) -> np.ndarray:
+    """Returns non-negative values below `bound` as uint16 when they fit, the sort key NumPy radix-sorts."""
+    return values.astype(np.uint16) if bound <= 1 << 16 else values
+
+
+def token_codes(tokens_in: Union[Sequence[str], Sequence[int]]) -> np.ndarray:
+    """
+    Converts 'tokenA'/'tokenB' names (or TOKEN_A/TOKEN_B codes) to an array of codes.
+    """
+    tokens = np.asarray(tokens_in)
+    if tokens.dtype.kind in 'iub':
+        # Checked before narrowing, so an out-of-range code cannot wrap around to a valid one.
+        if tokens.size and (tokens.min() < TOKEN_A or tokens.max() > TOKEN_B):
+            raise ValueError("Invalid token. Must be 'tokenA' or 'tokenB'.")
+        return tokens.astype(np.int8)
+    try:
+        codes = np.fromiter((_TOKEN_CODES[t] for t in tokens.ravel()), dtype=np.int8, count=tokens.size)
+    except KeyError:
+        raise ValueError("Invalid token. Must be 'tokenA' or 'tokenB'.") from None
+    return codes.reshape(tokens.shape)
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    registry = PoolRegistry()
+    pool = registry.add_pool(1000, 1000, key="tokenA-tokenB")
+    registry.add_pools([500, 2000], [500, 4000])
+
+    print("--- Quoting a batch ---")
+    quote = registry.quote_many([0, 1, 2], ['tokenA', 'tokenB', 'tokenA'], [50, 10, 100])
+    print("Quote:", quote)
+
+    print("\n--- Swapping a batch (two swaps on pool 0) ---")
+    result = registry.swap_many([0, 1, 0], ['tokenA', 'tokenA', 'tokenB'], [50, 10, 20])
+    print("Swap Result:", result)
+    print("Pool 0 reserves:", registry.get_reserves(pool))
@@ -0,0 +1,502 @@
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from structured_log import get_logger
+
+log = get_logger("dex_history")
+
+RESERVE_HISTORY_DIR = "reserve_history"
+
+# Candle intervals by name, in seconds.
+INTERVALS = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400}
+
+# Seconds of candles kept per interval; older fine-grained candles survive only in the coarser ones.
+RETENTION = {60: 7 * 86400, 300: 30 * 86400, 3600: 365 * 86400, 86400: None}
+
+# One reserve update as stored on disk: unix time, reserve_a, reserve_b.
+_POINT = struct.Struct('<ddd')
+
+# Points files are rotated by the writer's clock, one per pair per segment.
+SEGMENT_SECONDS = 86400
+
+# Points folded between checkpoints of a pair's candles.
+CHECKPOINT_EVERY = 10_000
+
+# Latest points, by time, kept to measure a late point's reserve change against its neighbours.
+VOLUME_WINDOW = 256
+
+CHECKPOINT_MAGIC = b'PRHIST01'
+_CHECKPOINT_HEADER = struct.Struct('<QIIB')
+_CHECKPOINT_SEGMENT = struct.Struct('<qQ')
+_COUNT = struct.Struct('<I')
+_CRC = struct.Struct('<I')
+
+
+def _column_bytes(column: array) -> bytes:
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _read_column(typecode: str, data: bytes, offset: int, count: int) -> Tuple[array, int]:
+    column = array(typecode)
+    end = offset + count * column.itemsize
+    if end > len(data):
+        raise ValueError("Checkpoint ends inside a column.")
+    column.frombytes(data[offset:end])
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column, end
+
+
+class CandleSeries:
+    """
+    OHLC candles of one pair at one interval, as parallel arrays ordered by
+    start time. A point in the latest candle (the usual case) updates it in
+    place and a point past it appends a new candle, so recording is O(1) and
+    a range query is a bisect plus the candles it returns.
+
+    Each candle keeps the times of its first and last points, so a point that
+    lands late (e.g. from another worker) moves the open or close only if it
+    is earlier or later than every point the candle has seen.
+    """
+    __slots__ = ('interval', 'retention', 'start', 'open', 'high', 'low', 'close', 'volume', 'updates',
+                 'first_time', 'last_time')
+
+    # Column names and array types, in checkpoint order.
+    COLUMNS = (('start', 'q'), ('open', 'd'), ('high', 'd'), ('low', 'd'), ('close', 'd'), ('volume', 'd'),
+               ('updates', 'q'), ('first_time', 'd'), ('last_time', 'd'))
+
+    def __init__(self, interval: int, retention: Optional[int] = None):
+        self.interval = interval
+        self.retention = retention
+        for name, typecode in self.COLUMNS:
+            setattr(self, name, array(typecode))
+
+    def __len__(self):
+        return len(self.start)
+
+    def _columns(self):
+        return [getattr(self, name) for name, _ in self.COLUMNS]
+
+    def add(self, timestamp: float, price: float, volume: float):
+        bucket = int(timestamp // self.interval) * self.interval
+        count = len(self.start)
+        if count and bucket == self.start[-1]:
+            i = count - 1
+        elif not count or bucket > self.start[-1]:
+            self._insert(count, bucket, timestamp, price, volume)
+            self._expire(bucket)
+            return
+        else:
+            # A point older than the latest candle, e.g. from a worker whose write landed late.
+            i = bisect_left(self.start, bucket)
+            if self.start[i] != bucket:
+                if i == 0 and self.retention and bucket < self.start[-1] - self.retention:
+                    return
+                self._insert(i, bucket, timestamp, price, volume)
+                return
+        if timestamp >= self.last_time[i]:
+            self.close[i] = price
+            self.last_time[i] = timestamp
+        if timestamp < self.first_time[i]:
+            self.open[i] = price
+            self.first_time[i] = timestamp
+        if price > self.high[i]:
+            self.high[i] = price
+        if price < self.low[i]:
+            self.low[i] = price
+        self.volume[i] += volume
+        self.updates[i] += 1
+
+    def add_volume(self, timestamp: float, volume: float):
+        """Adds volume to the candle holding `timestamp`, if it is still kept."""
+        bucket = int(timestamp // self.interval) * self.interval
+        i = bisect_left(self.start, bucket)
+        if i < len(self.start) and self.start[i] == bucket:
+            self.volume[i] += volume
+
+    def _insert(self, i: int, bucket: int, timestamp: float, price: float, volume: float):
+        for column, value in ((self.open, price), (self.high, price), (self.low, price), (self.close, price),
+                              (self.volume, volume), (self.updates, 1), (self.first_time, timestamp),
+                              (self.last_time, timestamp)):
+            column.insert(i, value)
+        # The start goes in last, so the other columns are never shorter than it.
+        self.start.insert(i, bucket)
+
+    def _expire(self, latest: int):
+        # Expired candles are dropped an eighth of the retention at a time, not one per new candle,
+        # so the arrays are not shifted on every append.
+        if self.retention is None or self.start[0] >= latest - self.retention - self.retention // 8:
+            return
+        cut = bisect_left(self.start, latest - self.retention)
+        for column in self._columns():
+            del column[:cut]
+
+    def to_bytes(self) -> bytes:
+        """Encodes the candles column by column."""
+        return _COUNT.pack(len(self.start)) + b''.join(_column_bytes(column) for column in self._columns())
+
+    def load(self, data: bytes, offset: int) -> int:
+        """Replaces the candles with ones encoded by to_bytes at `offset`; returns the offset past them."""
+        (count,) = _COUNT.unpack_from(data, offset)
+        offset += _COUNT.size
+        for name, typecode in self.COLUMNS:
+            column, offset = _read_column(typecode, data, offset, count)
+            setattr(self, name, column)
+        return offset
+
+    def range(self, start: Optional[float], end: float, limit: int) -> List[Dict[str, Any]]:
+        """
+        Returns up to `limit` candles that start between `start` and `end`:
+        the earliest ones from `start`, or the latest ones up to `end` when
+        `start` is None.
+        """
+        hi = bisect_right(self.start, end)
+        if start is None:
+            lo = max(hi - limit, 0)
+        else:
+            lo = bisect_left(self.start, start)
+            hi = min(hi, lo + limit)
+        return [{
+            "time": self.start[i],
+            "open": self.open[i],
+            "high": self.high[i],
+            "low": self.low[i],
+            "close": self.close[i],
+            "volume": self.volume[i],
+            "updates": self.updates[i]
+        } for i in range(lo, hi)]
+
+
+class PairHistory:
+    """
+    The candles of one pair, folded in from its points files as they grow.
+
+    The folded state (the candle columns of every interval, the read offset
+    in each points file and the latest points by time) is checkpointed to
+    candles.bin every CHECKPOINT_EVERY points. A process that has not read
+    the pair yet starts from the checkpoint, so its first query costs the
+    candles kept plus the points recorded since, not the whole history.
+    Points files from two or more segments ago, once fully folded into a
+    checkpoint, are deleted; writers have moved past them by then.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.checkpoint_path = os.path.join(directory, 'candles.bin')
+        self._reset()
+        self.lock = threading.Lock()
+        # (inode, mtime, size) of the checkpoint last loaded or written, to notice other writers' checkpoints.
+        self._checkpoint_stat: Optional[Tuple[int, int, int]] = None
+
+    def _reset(self):
+        self.points = 0
+        self.unsaved = 0
+        # segment -> bytes of its points file folded; deleted segments stay, fully folded.
+        self.offsets: Dict[int, int] = {}
+        # The latest points by time, for the change in reserve_a that stands in for volume.
+        self.window_time = array('d')
+        self.window_reserve = array('d')
+        # Whether points older than the window were dropped from it.
+        self.window_trimmed = False
+        self.series = {interval: CandleSeries(interval, RETENTION[interval]) for interval in INTERVALS.values()}
+
+    def _segments(self) -> List[Tuple[int, str]]:
+        found = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return found
+        for name in names:
+            if name.endswith('.points'):
+                try:
+                    found.append((int(name[:-len('.points')]), os.path.join(self.directory, name)))
+                except ValueError:
+                    continue
+        return sorted(found)
+
+    def catch_up(self, now: float):
+        """
+        Folds in the points appended since the last call, by this or any other
+        process, and checkpoints and compacts when due. The caller holds the lock.
+        """
+        segments = self._segments()
+        self._sync_checkpoint({segment for segment, _ in segments})
+        sizes = {}
+        for segment, path in segments:
+            sizes[segment] = self._fold(segment, path)
+        if None in sizes.values():
+            # Another process compacted files while they were read; its checkpoint covers them.
+            self._sync_checkpoint({segment for segment, _ in self._segments()})
+            segments = [(segment, path) for segment, path in segments if sizes[segment] is not None]
+        current = int(now // SEGMENT_SECONDS)
+        done = [path for segment, path in segments
+                if segment <= current - 2 and self.offsets.get(segment) == sizes[segment]]
+        if self.unsaved >= CHECKPOINT_EVERY or (done and self.unsaved) or (self.points and not self._checkpoint_stat):
+            self._write_checkpoint()
+        if done and not self.unsaved:
+            for path in done:
+                os.remove(path)
+
+    def _fold(self, segment: int, path: str) -> Optional[int]:
+        """Folds the new points of one points file; returns the bytes of it folded so far, or None if it is gone."""
+        offset = self.offsets.get(segment, 0)
+        try:
+            with open(path, 'rb') as f:
+                length = (os.fstat(f.fileno()).st_size - offset) // _POINT.size * _POINT.size
+                if length <= 0:
+                    return offset
+                f.seek(offset)
+                data = f.read(length)
+        except FileNotFoundError:
+            return None
+        self.offsets[segment] = offset + len(data)
+        values = array('d')
+        values.frombytes(data)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        # The file interleaves (time, reserve_a, reserve_b); slicing splits it into columns.
+        for timestamp, reserve_a, reserve_b in zip(values[0::3], values[1::3], values[2::3]):
+            self._add(timestamp, reserve_a, reserve_b)
+        return self.offsets[segment]
+
+    def _add(self, timestamp: float, reserve_a: float, reserve_b: float):
+        self.points += 1
+        self.unsaved += 1
+        # Reserve updates carry no trade sizes; the change in reserve_a from the previous
+        # point by time stands in for the volume traded.
+        times, reserves = self.window_time, self.window_reserve
+        j = bisect_right(times, timestamp)
+        volume = 0.0
+        next_change = None
+        if j or not self.window_trimmed:
+            if j:
+                volume = abs(reserve_a - reserves[j - 1])
+            if j < len(times):
+                # A late point: the next point's change is now measured from it.
+                before = abs(reserves[j] - reserves[j - 1]) if j else 0.0
+                next_change = (times[j], abs(reserves[j] - reserve_a) - before)
+            times.insert(j, timestamp)
+            reserves.insert(j, reserve_a)
+            if len(times) >= 2 * VOLUME_WINDOW:
+                del times[:VOLUME_WINDOW]
+                del reserves[:VOLUME_WINDOW]
+                self.window_trimmed = True
+        # else: older than every point in the window; its neighbours are unknown, so it counts no volume.
+        for series in self.series.values():
+            if reserve_a > 0:
+                series.add(timestamp, reserve_b / reserve_a, volume)
+            if next_change:
+                series.add_volume(*next_change)
+
+    def _write_checkpoint(self):
+        data = bytearray(CHECKPOINT_MAGIC)
+        data += _CHECKPOINT_HEADER.pack(self.points, len(self.offsets), len(self.window_time), self.window_trimmed)
+        for segment, offset in sorted(self.offsets.items()):
+            data += _CHECKPOINT_SEGMENT.pack(segment, offset)
+        data += _column_bytes(self.window_time) + _column_bytes(self.window_reserve)
+        for interval in sorted(self.series):
+            data += self.series[interval].to_bytes()
+        data += _CRC.pack(zlib.crc32(data))
+        # Written under a private name and renamed, so readers in other processes see all of it or none.
+        tmp_path = f"{self.checkpoint_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+        st = os.stat(self.checkpoint_path)
+        self._checkpoint_stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+        self.unsaved = 0
+
+    def _sync_checkpoint(self, existing: set):
+        """
+        Loads the checkpoint if this process has read nothing yet, or if it
+        covers points of files that were deleted before this process read them.
+        """
+        try:
+            st = os.stat(self.checkpoint_path)
+        except FileNotFoundError:
+            return
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if key == self._checkpoint_stat:
+            return
+        try:
+            with open(self.checkpoint_path, 'rb') as f:
+                data = f.read()
+            state = self._decode_checkpoint(data)
+        except (ValueError, struct.error) as e:
+            # Left for the next checkpoint to replace; the points files still cover what was not compacted.
+            log.error("history_checkpoint_skipped", path=self.checkpoint_path, error=str(e))
+            self._checkpoint_stat = key
+            return
+        self._checkpoint_stat = key
+        offsets = state['offsets']
+        missed = any(segment not in existing and offset > self.offsets.get(segment, 0)
+                     for segment, offset in offsets.items())
+        if self.points and not missed:
+            return
+        self._reset()
+        self.points = state['points']
+        self.offsets = offsets
+        self.window_time, self.window_reserve = state['window_time'], state['window_reserve']
+        self.window_trimmed = state['window_trimmed']
+        self.series = state['series']
+
+    @staticmethod
+    def _decode_checkpoint(data: bytes) -> Dict[str, Any]:
+        if not data.startswith(CHECKPOINT_MAGIC) or len(data) < len(CHECKPOINT_MAGIC) + _CHECKPOINT_HEADER.size:
+            raise ValueError("Not a reserve history checkpoint.")
+        (crc,) = _CRC.unpack_from(data, len(data) - _CRC.size)
+        if zlib.crc32(memoryview(data)[:-_CRC.size]) != crc:
+            raise ValueError("Reserve history checkpoint is corrupt.")
+        offset = len(CHECKPOINT_MAGIC)
+        points, num_segments, window, trimmed = _CHECKPOINT_HEADER.unpack_from(data, offset)
+        offset += _CHECKPOINT_HEADER.size
+        offsets = {}
+        for _ in range(num_segments):
+            segment, folded = _CHECKPOINT_SEGMENT.unpack_from(data, offset)
+            offsets[segment] = folded
+            offset += _CHECKPOINT_SEGMENT.size
+        window_time, offset = _read_column('d', data, offset, window)
+        window_reserve, offset = _read_column('d', data, offset, window)
+        series = {}
+        for interval in sorted(INTERVALS.values()):
+            series[interval] = CandleSeries(interval, RETENTION[interval])
+            offset = series[interval].load(data, offset)
+        return {"points": points, "offsets": offsets, "window_time": window_time, "window_reserve": window_reserve,
+                "window_trimmed": bool(trimmed), "series": series}
+
+
+class ReserveHistory:
+    """
+    Price history of every DEX pair, as OHLC candles at 1m, 5m, 1h and 1d.
+
+    Every reserve update is appended to the pair's current points file as
+    one fixed-size record written with a single O_APPEND write, so the
+    workers of a pre-forked server can all record into the same directory.
+    Points stay row records because one write per point is what keeps
+    concurrent appends whole; the history is kept columnar in each pair's
+    candle checkpoint. Points files are rotated every SEGMENT_SECONDS by the
+    writer's clock and deleted once folded into a checkpoint.
+
+    Readers fold new points into in-memory candle arrays when a pair is
+    queried, so a query costs the points recorded since the last one (at
+    most CHECKPOINT_EVERY for a process's first query) plus the candles it
+    returns, however long the history is.
+
+    The price is reserve_b / reserve_a, the price of token_a in token_b.
+    Intervals with no updates have no candle.
+    """
+
+    def __init__(self, directory: str = RESERVE_HISTORY_DIR, clock=time.time):
+        """
+        Args:
+            directory: Where each pair's points files and checkpoint are kept; created if missing.
+            clock: The time source for recorded updates and file rotation, injectable for tests.
+        """
+        self.directory = directory
+        self._clock = clock
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # pair -> (segment, fd, the previous segment's fd); the previous one is closed a rotation
+        # later, so a thread still writing through it is not cut off.
+        self._files: Dict[str, Tuple[int, int, Optional[int]]] = {}
+        self._pairs: Dict[str, PairHistory] = {}
+
+    def _pair_directory(self, pair: str) -> str:
+        return os.path.join(self.directory, quote(pair, safe=''))
+
+    def record(self, token_a: str, token_b: str, reserve_a, reserve_b, timestamp: Optional[float] = None):
+        """Appends one reserve update; usable directly as a FirestoreDEX listener."""
+        pair = f"{token_a}-{token_b}"
+        now = self._clock()
+        point = _POINT.pack(now if timestamp is None else timestamp, float(reserve_a), float(reserve_b))
+        segment = int(now // SEGMENT_SECONDS)
+        entry = self._files.get(pair)
+        if entry is None or segment > entry[0]:
+            with self._lock:
+                entry = self._files.get(pair)
+                if entry is None or segment > entry[0]:
+                    directory = self._pair_directory(pair)
+                    os.makedirs(directory, exist_ok=True)
+                    fd = os.open(os.path.join(directory, f"{segment}.points"),
+                                 os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                    if entry is not None and entry[2] is not None:
+                        os.close(entry[2])
+                    entry = self._files[pair] = (segment, fd, entry[1] if entry else None)
+        os.write(entry[1], point)
+
+    def _pair(self, pair: str) -> Optional[PairHistory]:
+        history = self._pairs.get(pair)
+        if history is None:
+            directory = self._pair_directory(pair)
+            # Only pairs with a history get one in memory, whatever pairs are asked for.
+            if not os.path.isdir(directory):
+                return None
+            with self._lock:
+                history = self._pairs.setdefault(pair, PairHistory(directory))
+        return history
+
+    def candles(self, token_a: str, token_b: str, interval: str = "1m", start: Optional[float] = None,
+                end: Optional[float] = None, limit: int = 500) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns candles of a pair.
+
+        Args:
+            interval: One of INTERVALS.
+            start: Unix time; candles starting at or after it, oldest first.
+            end: Unix time; candles starting at or before it (default now).
+            limit: The most candles to return; without `start`, the latest ones.
+
+        Returns:
+            A list of {"time", "open", "high", "low", "close", "volume", "updates"}
+            dicts ordered by time, or None if the pair has no history.
+        """
+        history = self._pair(f"{token_a}-{token_b}")
+        if history is None:
+            return None
+        now = self._clock()
+        with history.lock:
+            history.catch_up(now)
+            return history.series[INTERVALS[interval]].range(start, now if end is None else end, limit)
+
+    def close(self):
+        with self._lock:
+            for _, fd, previous in self._files.values():
+                os.close(fd)
+                if previous is not None:
+                    os.close(previous)
+            self._files.clear()
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    import random
+    import tempfile
+
+    history = ReserveHistory(tempfile.mkdtemp())
+    rng = random.Random(1)
+    reserve_a, reserve_b = 1000.0, 2000.0
+    now = time.time()
+    for i in range(10_000):
+        trade = rng.uniform(-5, 5)
+        reserve_b = reserve_a * reserve_b / (reserve_a + trade)
+        reserve_a += trade
+        history.record("tokenA", "tokenB", reserve_a, reserve_b, timestamp=now - 86400 + i * 8.64)
+
+    for candle in history.candles("tokenA", "tokenB", "1h", limit=3):
+        print(candle)
+    print(f"1d candles: {history.candles('tokenA', 'tokenB', '1d')}")
+    print(f"Unknown pair: {history.candles('tokenA', 'tokenC')}")
+    history.close()
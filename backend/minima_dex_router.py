@@ -0,0 +1,228 @@
+import threading
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+from structured_log import get_logger
+
+log = get_logger("dex_router")
+
+
+class RouteIndex:
+    """
+    An in-memory graph of DEX pools used to find the best multi-hop swap route.
+
+    Pools are loaded from the reserve documents FirestoreDEX stores (one
+    document per "{token_a}-{token_b}" pair) and kept current with
+    update_pool, so quotes never touch Firestore.
+
+    Reads take no lock. Reserve updates replace a pool's tuple in place;
+    adding or removing a pool publishes a new adjacency mapping
+    (copy-on-write), so a best_route running on another thread keeps
+    walking the graph it started with.
+    """
+
+    def __init__(self):
+        # pool key -> (token_a, token_b, reserve_a, reserve_b). Updates replace
+        # the whole tuple, so a concurrent best_route never prices a pool from
+        # one update's reserve_a and another's reserve_b.
+        self._pools: Dict[str, tuple] = {}
+        # token -> {neighbor token -> (pool keys)}. Never mutated once published.
+        self._adjacency: Dict[str, Dict[str, Tuple[str, ...]]] = {}
+        # Serializes writers; readers never take it.
+        self._write_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pools)
+
+    def load(self, reserve_docs: Iterable[Dict[str, Any]]):
+        """
+        Rebuilds the index from reserve documents.
+
+        Args:
+            reserve_docs: Dictionaries shaped like the documents written by
+                          FirestoreDEX.update_reserves.
+        """
+        pools: Dict[str, tuple] = {}
+        adjacency: Dict[str, Dict[str, Tuple[str, ...]]] = {}
+        for doc in reserve_docs:
+            try:
+                pool = self._pool(doc['token_a'], doc['token_b'], doc['reserve_a'], doc['reserve_b'])
+            except (KeyError, TypeError, ValueError) as e:
+                log.warning("reserve_doc_skipped", doc=doc, error=str(e))
+                continue
+            key = f"{pool[0]}-{pool[1]}"
+            if key not in pools:
+                for src, dst in ((pool[0], pool[1]), (pool[1], pool[0])):
+                    neighbors = adjacency.setdefault(src, {})
+                    neighbors[dst] = neighbors.get(dst, ()) + (key,)
+            pools[key] = pool
+        with self._write_lock:
+            self._pools = pools
+            self._adjacency = adjacency
+
+    @staticmethod
+    def _pool(token_a: str, token_b: str, reserve_a: float, reserve_b: float) -> tuple:
+        if token_a == token_b:
+            raise ValueError("A pool needs two different tokens.")
+        return (token_a, token_b, float(reserve_a), float(reserve_b))
+
+    def update_pool(self, token_a: str, token_b: str, reserve_a: float, reserve_b: float):
+        """
+        Inserts or updates one pool. This is the incremental path used when
+        FirestoreDEX.update_reserves fires.
+        """
+        pool = self._pool(token_a, token_b, reserve_a, reserve_b)
+        key = f"{token_a}-{token_b}"
+        with self._write_lock:
+            pools = self._pools
+            exists = key in pools
+            # Written into the dict readers share, whether the key is new or not: readers
+            # only look pools up by key, never iterate the dict, and a lookup sees the old
+            # or the new tuple even while an insert resizes it. A new pool is reachable
+            # once the adjacency below is published.
+            pools[key] = pool
+            if exists:
+                return
+            adjacency = dict(self._adjacency)
+            for src, dst in ((token_a, token_b), (token_b, token_a)):
+                neighbors = dict(adjacency.get(src, {}))
+                neighbors[dst] = neighbors.get(dst, ()) + (key,)
+                adjacency[src] = neighbors
+            self._adjacency = adjacency
+
+    def remove_pool(self, token_a: str, token_b: str):
+        """Removes a pool from the index, if present."""
+        key = f"{token_a}-{token_b}"
+        with self._write_lock:
+            if key not in self._pools:
+                return
+            adjacency = dict(self._adjacency)
+            for src, dst in ((token_a, token_b), (token_b, token_a)):
+                neighbors = dict(adjacency[src])
+                neighbors[dst] = tuple(k for k in neighbors[dst] if k != key)
+                if not neighbors[dst]:
+                    del neighbors[dst]
+                if neighbors:
+                    adjacency[src] = neighbors
+                else:
+                    del adjacency[src]
+            self._adjacency = adjacency
+            # A reader still holding the old adjacency may look the pool up; it skips keys that are gone.
+            pools = dict(self._pools)
+            del pools[key]
+            self._pools = pools
+
+    @staticmethod
+    def _best_hop(pools: Dict[str, tuple], adjacency: Dict[str, Dict[str, Tuple[str, ...]]],
+                  token_in: str, token_out: str, amount_in: float):
+        """Returns (amount_out, pool_key) for the best single pool between two tokens."""
+        best_out = 0.0
+        best_key = None
+        for key in adjacency[token_in][token_out]:
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            token_a, _, reserve_a, reserve_b = pool
+            if token_a == token_in:
+                reserve_in, reserve_out = reserve_a, reserve_b
+            else:
+                reserve_in, reserve_out = reserve_b, reserve_a
+            if reserve_in <= 0 or reserve_out <= 0:
+                continue
+            # Constant Product Formula with k = reserve_in * reserve_out
+            amount_out = reserve_out * amount_in / (reserve_in + amount_in)
+            if amount_out > best_out:
+                best_out = amount_out
+                best_key = key
+        return best_out, best_key
+
+    def best_route(self, token_in: str, token_out: str, amount_in: float,
+                   max_hops: int = 3) -> Optional[Dict[str, Any]]:
+        """
+        Finds the route of at most `max_hops` pools that returns the most token_out.
+
+        Args:
+            token_in: The token being swapped in.
+            token_out: The token wanted.
+            amount_in: The amount of token_in to swap.
+            max_hops: The maximum number of pools on the route.
+
+        Returns:
+            A dictionary with the token path, the pools used, the amount after
+            every hop ("amounts", ending with "amount_out") and the final amount
+            out, or None if no route exists.
+        """
+        if amount_in <= 0:
+            raise ValueError("amount_in must be positive.")
+        if max_hops < 1:
+            raise ValueError("max_hops must be at least 1.")
+        # One consistent view of the graph for the whole search.
+        reserves, adjacency = self._pools, self._adjacency
+        if token_in == token_out or token_in not in adjacency or token_out not in adjacency:
+            return None
+
+        target_neighbors = adjacency[token_out]
+        best = None
+        # Each layer maps a reachable token to (amount, token path, pool path, amounts after each hop).
+        # Only the best way of reaching a token after h hops is carried forward.
+        frontier = {token_in: (amount_in, (token_in,), (), ())}
+        for hop in range(1, max_hops + 1):
+            last_hop = hop == max_hops
+            next_frontier = {}
+            for token, (amount, path, pools, amounts) in frontier.items():
+                if token in target_neighbors:
+                    amount_out, key = self._best_hop(reserves, adjacency, token, token_out, amount)
+                    if key is not None and (best is None or amount_out > best[0]):
+                        best = (amount_out, path + (token_out,), pools + (key,), amounts + (amount_out,))
+                if last_hop:
+                    continue
+                neighbors = adjacency[token]
+                if hop == max_hops - 1:
+                    # The next hop has to end at token_out, so only its
+                    # neighbors are worth visiting; walk the smaller side.
+                    if len(target_neighbors) < len(neighbors):
+                        neighbors = [t for t in target_neighbors if t in neighbors]
+                    else:
+                        neighbors = [t for t in neighbors if t in target_neighbors]
+                for neighbor in neighbors:
+                    if neighbor == token_out or neighbor in path:
+                        continue
+                    amount_out, key = self._best_hop(reserves, adjacency, token, neighbor, amount)
+                    if key is None:
+                        continue
+                    current = next_frontier.get(neighbor)
+                    if current is None or amount_out > current[0]:
+                        next_frontier[neighbor] = (amount_out, path + (neighbor,), pools + (key,),
+                                                   amounts + (amount_out,))
+            if not next_frontier:
+                break
+            frontier = next_frontier
+
+        if best is None:
+            return None
+        amount_out, path, pools, amounts = best
+        return {
+            "token_in": token_in,
+            "token_out": token_out,
+            "amount_in": amount_in,
+            "amount_out": amount_out,
+            "path": list(path),
+            "pools": list(pools),
+            "amounts": list(amounts)
+        }
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    index = RouteIndex()
+    index.load([
+        {"token_a": "minima", "token_b": "custom-token", "reserve_a": 1000, "reserve_b": 1000},
+        {"token_a": "minima", "token_b": "wMINIMA", "reserve_a": 5000, "reserve_b": 5000},
+        {"token_a": "wMINIMA", "token_b": "custom-token", "reserve_a": 8000, "reserve_b": 9000},
+    ])
+
+    print("--- Best route for 100 minima -> custom-token ---")
+    print(index.best_route("minima", "custom-token", 100))
+
+    print("\n--- After a reserve update on the direct pool ---")
+    index.update_pool("minima", "custom-token", 1000, 2000)
+    print(index.best_route("minima", "custom-token", 100))
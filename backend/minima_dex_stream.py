@@ -0,0 +1,110 @@
+import json
+import threading
+from typing import Dict, Any, Iterable, List, Optional
+
+# Topic that receives updates for every pair.
+ALL_PAIRS = "*"
+
+
+class Subscription:
+    """
+    One client's mailbox of pending reserve updates.
+
+    The mailbox keeps only the latest update per pair, so a burst of writes to a
+    pair is coalesced into a single event for clients that have not caught up.
+    """
+
+    def __init__(self, broadcaster: 'ReserveBroadcaster', topics: List[str]):
+        self.broadcaster = broadcaster
+        self.topics = topics
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def _offer(self, key: str, update: Dict[str, Any]):
+        with self._cond:
+            # Re-inserting moves the pair to the end, keeping delivery in update order.
+            self._pending.pop(key, None)
+            self._pending[key] = update
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Waits for updates and returns all pending ones, oldest first.
+        Returns an empty list on timeout or once the subscription is closed.
+        """
+        with self._cond:
+            if not self._pending and not self.closed:
+                self._cond.wait(timeout)
+            updates = list(self._pending.values())
+            self._pending.clear()
+            return updates
+
+    def close(self):
+        """Unsubscribes and wakes up any waiting reader."""
+        self.broadcaster.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class ReserveBroadcaster:
+    """
+    Fans out reserve changes to subscribed clients, with one topic per pair.
+
+    Register publish with FirestoreDEX.add_listener. Publishing costs one
+    mailbox write per subscriber of the pair, so load follows the update rate
+    rather than the number of polling clients.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # topic -> set of subscriptions
+        self._topics: Dict[str, set] = {}
+
+    def subscribe(self, pairs: Optional[Iterable[str]] = None) -> Subscription:
+        """
+        Subscribes to updates for the given "{token_a}-{token_b}" pairs, or to all pairs if none are given.
+        """
+        topics = list(dict.fromkeys(pairs)) if pairs else [ALL_PAIRS]
+        subscription = Subscription(self, topics)
+        with self._lock:
+            for topic in topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[topic]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len({s for subscribers in self._topics.values() for s in subscribers})
+
+    def publish(self, token_a: str, token_b: str, reserve_a, reserve_b):
+        """
+        Publishes a reserve change. Has the FirestoreDEX listener signature.
+        """
+        key = f"{token_a}-{token_b}"
+        update = {
+            "pair": key,
+            "token_a": token_a,
+            "token_b": token_b,
+            "reserve_a": reserve_a,
+            "reserve_b": reserve_b
+        }
+        with self._lock:
+            subscribers = self._topics.get(key, set()) | self._topics.get(ALL_PAIRS, set())
+        for subscription in subscribers:
+            subscription._offer(key, update)
+
+
+def sse_event(data: Dict[str, Any], event: str = "reserves") -> str:
+    """Formats one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,590 @@
+import contextlib
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from minima_nft_marketplace import LISTING_STATUSES, NFTMarketplace
+from structured_log import get_logger
+
+log = get_logger("marketplace_log")
+
+# Default directory of the API's marketplace log and snapshots.
+MARKETPLACE_DIR = "marketplace_data"
+
+# Event types stored in the log.
+EVENT_LIST = 1
+EVENT_BID = 2
+EVENT_ACCEPT = 3
+
+# Record header: payload length, CRC32 of (sequence, type, payload), sequence, type.
+_RECORD_HEADER = struct.Struct('<IIQB')
+_CRC_PART = struct.Struct('<QB')
+_LIST = struct.Struct('<Qd')
+_BID = struct.Struct('<Qd')
+_ACCEPT = struct.Struct('<Q')
+_STR_LEN = struct.Struct('<H')
+
+SNAPSHOT_MAGIC = b'PMKTSNP1'
+_SNAPSHOT_HEADER = struct.Struct('<QQII')
+_SNAPSHOT_LISTING = struct.Struct('<QIIdBI')
+_SNAPSHOT_BID = struct.Struct('<Id')
+_CRC = struct.Struct('<I')
+
+
+def _pack_str(value: str) -> bytes:
+    data = value.encode('utf-8')
+    return _STR_LEN.pack(len(data)) + data
+
+
+def _unpack_str(buf: bytes, offset: int) -> Tuple[str, int]:
+    (length,) = _STR_LEN.unpack_from(buf, offset)
+    offset += _STR_LEN.size
+    return buf[offset:offset + length].decode('utf-8'), offset + length
+
+
+def encode_event(event_type: int, listing_number: int, text: str, amount: float = 0.0, text2: str = '') -> bytes:
+    """Encodes the payload of a list, bid or accept event."""
+    if event_type == EVENT_LIST:
+        return _LIST.pack(listing_number, amount) + _pack_str(text) + _pack_str(text2)
+    if event_type == EVENT_BID:
+        return _BID.pack(listing_number, amount) + _pack_str(text)
+    if event_type == EVENT_ACCEPT:
+        return _ACCEPT.pack(listing_number) + _pack_str(text)
+    raise ValueError(f"Unknown event type {event_type}.")
+
+
+def decode_event(event_type: int, payload: bytes) -> Dict[str, Any]:
+    """Decodes an event payload back into a dictionary."""
+    if event_type == EVENT_LIST:
+        number, price = _LIST.unpack_from(payload)
+        token_id, offset = _unpack_str(payload, _LIST.size)
+        owner, _ = _unpack_str(payload, offset)
+        return {"type": "list", "listing_id": f"LST_{number}", "token_id": token_id, "owner": owner, "price": price}
+    if event_type == EVENT_BID:
+        number, amount = _BID.unpack_from(payload)
+        bidder, _ = _unpack_str(payload, _BID.size)
+        return {"type": "bid", "listing_id": f"LST_{number}", "bidder": bidder, "amount": amount}
+    if event_type == EVENT_ACCEPT:
+        (number,) = _ACCEPT.unpack_from(payload)
+        owner, _ = _unpack_str(payload, _ACCEPT.size)
+        return {"type": "accept", "listing_id": f"LST_{number}", "owner": owner}
+    raise ValueError(f"Unknown event type {event_type}.")
+
+
+def _segment_name(first_seq: int) -> str:
+    return f"events-{first_seq:020d}.log"
+
+
+def _snapshot_name(seq: int) -> str:
+    return f"snapshot-{seq:020d}.bin"
+
+
+def _list_files(directory: str, prefix: str, suffix: str) -> List[Tuple[int, str]]:
+    found = []
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(suffix):
+            try:
+                found.append((int(name[len(prefix):-len(suffix)]), os.path.join(directory, name)))
+            except ValueError:
+                continue
+    return sorted(found)
+
+
+def _fsync_directory(directory: str):
+    # Makes renames and new files durable; not supported on every platform.
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def read_segment(path: str) -> Iterator[Tuple[int, int, bytes, int]]:
+    """
+    Yields (sequence, event type, payload, end offset) for every intact record
+    of a log segment. Stops at the first torn or corrupt record.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset + _RECORD_HEADER.size <= len(data):
+        length, crc, seq, event_type = _RECORD_HEADER.unpack_from(data, offset)
+        start = offset + _RECORD_HEADER.size
+        end = start + length
+        if end > len(data):
+            return
+        payload = data[start:end]
+        if zlib.crc32(payload, zlib.crc32(_CRC_PART.pack(seq, event_type))) != crc:
+            return
+        yield seq, event_type, payload, end
+        offset = end
+
+
+class MarketplaceEventLog:
+    """
+    An append-only, segmented write-ahead log of marketplace events with group commit.
+
+    append() buffers a record in memory; wait_durable() writes and fsyncs.
+    Whichever waiting thread gets the commit lock first flushes everything
+    buffered so far, so concurrent writers share a single fsync.
+    """
+
+    def __init__(self, directory: str, next_seq: int = 1, fsync: bool = True):
+        """
+        Opens (or starts) the newest segment in `directory` for appending.
+
+        Args:
+            directory: Where segments and snapshots live.
+            next_seq: The sequence number the next record gets.
+            fsync: Whether commits call os.fsync. Turning it off trades durability for speed.
+        """
+        self.directory = directory
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self._state_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._buffer = bytearray()
+        self.next_seq = next_seq
+        self.durable_seq = next_seq - 1
+        self.commits = 0
+        segments = _list_files(directory, 'events-', '.log')
+        path = segments[-1][1] if segments else os.path.join(directory, _segment_name(next_seq))
+        self._file = open(path, 'ab')
+
+    def append(self, event_type: int, payload: bytes) -> int:
+        """Buffers one record and returns its sequence number."""
+        with self._state_lock:
+            seq = self.next_seq
+            self.next_seq += 1
+            crc = zlib.crc32(payload, zlib.crc32(_CRC_PART.pack(seq, event_type)))
+            self._buffer += _RECORD_HEADER.pack(len(payload), crc, seq, event_type)
+            self._buffer += payload
+            return seq
+
+    def wait_durable(self, seq: int):
+        """Blocks until the record with sequence `seq` (and all before it) is on disk."""
+        if self.durable_seq >= seq:
+            return
+        with self._commit_lock:
+            if self.durable_seq >= seq:
+                return
+            self._commit()
+
+    def _commit(self):
+        # Caller holds the commit lock.
+        with self._state_lock:
+            data = self._buffer
+            last_seq = self.next_seq - 1
+            self._buffer = bytearray()
+        if data:
+            try:
+                self._write(data)
+            except Exception:
+                # Put the records back ahead of any appended since, so the next commit writes them in order.
+                with self._state_lock:
+                    self._buffer = data + self._buffer
+                raise
+            self.commits += 1
+        self.durable_seq = last_seq
+
+    def _write(self, data: bytes):
+        """
+        Writes and syncs records at the end of the segment. If that fails, the
+        segment is cut back to where it ended, so no partial record is left
+        for the next write to follow.
+        """
+        end = self._file.tell()
+        try:
+            self._file.write(data)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        except Exception:
+            path = self._file.name
+            with contextlib.suppress(OSError):
+                self._file.close()
+            os.truncate(path, end)
+            self._file = open(path, 'ab')
+            raise
+
+    def flush(self):
+        """Makes everything appended so far durable."""
+        with self._commit_lock:
+            self._commit()
+
+    def rotate(self) -> int:
+        """
+        Flushes and starts a new segment. Returns the last sequence number in
+        the previous segments, i.e. the point a snapshot taken now covers.
+        """
+        with self._commit_lock, self._state_lock:
+            # Holding the state lock keeps appends out until the new segment is open.
+            data = self._buffer
+            last_seq = self.next_seq - 1
+            # On failure the records stay buffered and the current segment stays open.
+            self._write(data)
+            self._buffer = bytearray()
+            if data:
+                self.commits += 1
+            self.durable_seq = last_seq
+            self._file.close()
+            self._file = open(os.path.join(self.directory, _segment_name(last_seq + 1)), 'ab')
+            _fsync_directory(self.directory)
+            return last_seq
+
+    def close(self):
+        with self._commit_lock:
+            self._commit()
+            self._file.close()
+
+
+def capture_state(marketplace: NFTMarketplace) -> Tuple[int, List[tuple]]:
+    """
+    Takes what a snapshot needs from a marketplace no one is writing to.
+
+    Returns:
+        The next listing id and one (number, token id, owner, price, status
+        code, bid book, bid count) tuple per listing.
+    """
+    rows = []
+    for listing_id, listing in marketplace.listings.items():
+        book = listing.book
+        rows.append((int(listing_id[4:]), listing.token_id, listing.owner, listing.price, listing.status_code,
+                     book, len(book) if book else 0))
+    return marketplace.next_listing_id, rows
+
+
+def encode_snapshot(marketplace: NFTMarketplace, seq: int, state: Optional[Tuple[int, List[tuple]]] = None) -> bytes:
+    """
+    Encodes a compact binary snapshot of the marketplace state as of `seq`.
+    Strings (token ids and addresses) are stored once in a string table.
+
+    Args:
+        marketplace: The marketplace to encode, if `state` is not given.
+        seq: The last event the snapshot covers.
+        state: A capture_state-shaped result to encode instead of the live state.
+    """
+    next_listing_id, rows = state or capture_state(marketplace)
+    strings: Dict[str, int] = {}
+
+    def ref(value: str) -> int:
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    body = bytearray()
+    for number, token_id, owner, price, status_code, book, num_bids in rows:
+        # Snapshots store the listing's status code, so the codes in LISTING_STATUSES must not change.
+        body += _SNAPSHOT_LISTING.pack(number, ref(token_id), ref(owner), price, status_code, num_bids)
+        for i in range(num_bids):
+            body += _SNAPSHOT_BID.pack(ref(book.bidders[i]), book.amounts[i])
+
+    data = bytearray(SNAPSHOT_MAGIC)
+    data += _SNAPSHOT_HEADER.pack(seq, next_listing_id, len(strings), len(rows))
+    for value in strings:
+        data += _pack_str(value)
+    data += body
+    data += _CRC.pack(zlib.crc32(data))
+    return bytes(data)
+
+
+def write_snapshot(directory: str, data: bytes, seq: int) -> str:
+    """Atomically writes encoded snapshot bytes and returns the file path."""
+    path = os.path.join(directory, _snapshot_name(seq))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_directory(directory)
+    return path
+
+
+def load_snapshot(path: str, marketplace: NFTMarketplace) -> int:
+    """
+    Restores a snapshot into an empty marketplace and returns the sequence it covers.
+
+    Raises:
+        ValueError: If the file is not a valid snapshot.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(SNAPSHOT_MAGIC) or len(data) < len(SNAPSHOT_MAGIC) + _SNAPSHOT_HEADER.size + _CRC.size:
+        raise ValueError(f"{path} is not a marketplace snapshot.")
+    (crc,) = _CRC.unpack_from(data, len(data) - _CRC.size)
+    if zlib.crc32(memoryview(data)[:-_CRC.size]) != crc:
+        raise ValueError(f"Snapshot {path} is corrupt.")
+
+    offset = len(SNAPSHOT_MAGIC)
+    seq, next_listing_id, num_strings, num_listings = _SNAPSHOT_HEADER.unpack_from(data, offset)
+    offset += _SNAPSHOT_HEADER.size
+    strings = []
+    for _ in range(num_strings):
+        value, offset = _unpack_str(data, offset)
+        strings.append(value)
+    for _ in range(num_listings):
+        number, token_ref, owner_ref, price, status, num_bids = _SNAPSHOT_LISTING.unpack_from(data, offset)
+        offset += _SNAPSHOT_LISTING.size
+        bids = []
+        for _ in range(num_bids):
+            bidder_ref, amount = _SNAPSHOT_BID.unpack_from(data, offset)
+            offset += _SNAPSHOT_BID.size
+            bids.append((strings[bidder_ref], amount))
+        marketplace._insert_listing(f"LST_{number}", strings[token_ref], strings[owner_ref], price,
+                                    LISTING_STATUSES[status], bids)
+    marketplace.next_listing_id = max(marketplace.next_listing_id, next_listing_id)
+    return seq
+
+
+class CorruptLogError(ValueError):
+    """The event log is damaged somewhere other than a torn tail, so replaying it would lose events."""
+
+
+def _torn_tail(path: str, offset: int) -> bool:
+    """
+    Tells whether the bytes of a segment from `offset` on are one partially
+    written record: a header cut short, or a record that runs to or past the
+    end of the file. Anything else is corruption in the middle of the log.
+    """
+    size = os.path.getsize(path)
+    if size - offset < _RECORD_HEADER.size:
+        return True
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        (length, _, _, _) = _RECORD_HEADER.unpack(f.read(_RECORD_HEADER.size))
+    return offset + _RECORD_HEADER.size + length >= size
+
+
+class DurableMarketplace(NFTMarketplace):
+    """
+    An NFTMarketplace whose state survives restarts.
+
+    Every successful list, bid and accept is appended to a MarketplaceEventLog
+    and made durable (group-committed) before the call returns. Every
+    `snapshot_every` events a background thread writes a compact binary
+    snapshot and drops older segments. On startup the latest snapshot is
+    loaded and only the log tail after it is replayed.
+
+    Writes keep NFTMarketplace's locking: an event is appended (a short,
+    in-memory step) while its writer holds the listing's stripe lock, or the
+    index lock for a new listing, just before it is applied. Events on one
+    listing are therefore logged in the order they were applied, and events
+    on different listings commute. The wait for durability happens outside
+    every lock, which is where the time goes.
+
+    Snapshots are copy-on-write. Writers stop only while the log rotates and
+    the listing dict is copied; while the copy is encoded, a listing's first
+    bid or sale saves its status and bids as they were, and the encoder reads
+    that saved state instead. A listing's other fields never change.
+    """
+
+    def __init__(self, directory: str, snapshot_every: Optional[int] = 100_000, fsync: bool = True):
+        """
+        Recovers state from `directory` and opens the log for appending.
+
+        Args:
+            directory: Where the event log and snapshots are stored.
+            snapshot_every: Events between automatic snapshots; None disables them.
+            fsync: Whether commits call os.fsync.
+
+        Raises:
+            CorruptLogError: If a record other than the last one of the newest segment is damaged.
+        """
+        super().__init__()
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        # None while recovering, so replayed events are not logged again.
+        self.log: Optional[MarketplaceEventLog] = None
+        self._written = threading.local()
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_thread: Optional[threading.Thread] = None
+        # listing id -> (status code, bid book, bid count) before its first change since the
+        # running snapshot's copy; None when no snapshot is being encoded.
+        self._preserved: Optional[Dict[str, tuple]] = None
+        os.makedirs(directory, exist_ok=True)
+        last_seq = self._recover()
+        self.log = MarketplaceEventLog(directory, next_seq=last_seq + 1, fsync=fsync)
+
+    def _recover(self) -> int:
+        snapshot_seq = 0
+        for seq, path in reversed(_list_files(self.directory, 'snapshot-', '.bin')):
+            try:
+                snapshot_seq = load_snapshot(path, self)
+                break
+            except (ValueError, struct.error, KeyError, IndexError) as e:
+                log.error("snapshot_skipped", path=path, error=str(e))
+                NFTMarketplace.__init__(self)
+
+        last_seq = snapshot_seq
+        segments = _list_files(self.directory, 'events-', '.log')
+        for i, (_, path) in enumerate(segments):
+            good_end = 0
+            for seq, event_type, payload, end in read_segment(path):
+                good_end = end
+                if seq <= snapshot_seq:
+                    continue
+                if seq != last_seq + 1:
+                    raise CorruptLogError(f"Event {last_seq + 1} is missing from the log; found {seq} in {path}.")
+                self._apply(decode_event(event_type, payload))
+                last_seq = seq
+            size = os.path.getsize(path)
+            if good_end == size:
+                continue
+            if i < len(segments) - 1 or not _torn_tail(path, good_end):
+                # Dropping the rest would lose intact events and leave a gap; an operator has to look.
+                raise CorruptLogError(f"Corrupt record at offset {good_end} of {path}.")
+            # A torn write from a crash; drop the partial record.
+            log.warning("torn_record_truncated", path=path, offset=good_end, dropped_bytes=size - good_end)
+            with open(path, 'r+b') as f:
+                f.truncate(good_end)
+        self.replayed_to = last_seq
+        self._snapshot_seq = snapshot_seq
+        return last_seq
+
+    def _apply(self, event: Dict[str, Any]):
+        listing_id = event['listing_id']
+        if event['type'] == 'list':
+            self._insert_listing(listing_id, event['token_id'], event['owner'], event['price'])
+        elif event['type'] == 'bid':
+            self._add_bid(listing_id, event['bidder'], event['amount'])
+        else:
+            self._complete_sale(listing_id)
+
+    # NFTMarketplace calls these under the lock that orders the event; each
+    # one is logged before it is applied, so it is never visible unlogged.
+
+    def _insert_listing(self, listing_id, token_id, owner_address, price, status='for_sale', bids=()):
+        if self.log is not None:
+            self._written.seq = self.log.append(EVENT_LIST, encode_event(EVENT_LIST, int(listing_id[4:]), token_id,
+                                                                         float(price), owner_address))
+        return super()._insert_listing(listing_id, token_id, owner_address, price, status, bids)
+
+    def _preserve(self, listing_id):
+        # Caller holds the listing's stripe lock.
+        preserved = self._preserved
+        if preserved is not None and listing_id not in preserved:
+            listing = self.listings[listing_id]
+            book = listing.book
+            preserved[listing_id] = (listing.status_code, book, len(book) if book else 0)
+
+    def _add_bid(self, listing_id, bidder_address, bid_amount):
+        self._preserve(listing_id)
+        if self.log is not None:
+            self._written.seq = self.log.append(EVENT_BID, encode_event(EVENT_BID, int(listing_id[4:]), bidder_address,
+                                                                        float(bid_amount)))
+        super()._add_bid(listing_id, bidder_address, bid_amount)
+
+    def _complete_sale(self, listing_id):
+        self._preserve(listing_id)
+        if self.log is not None:
+            owner = self.listings[listing_id].owner
+            self._written.seq = self.log.append(EVENT_ACCEPT, encode_event(EVENT_ACCEPT, int(listing_id[4:]), owner))
+        super()._complete_sale(listing_id)
+
+    def _after_write(self):
+        seq = self._written.seq
+        self.log.wait_durable(seq)
+        if self.snapshot_every and seq - self._snapshot_seq >= self.snapshot_every:
+            self._start_snapshot()
+
+    def _start_snapshot(self):
+        # The thread releases the lock, so at most one snapshot runs (or is starting) at a time.
+        if not self._snapshot_lock.acquire(blocking=False):
+            return
+        self._snapshot_thread = threading.Thread(target=self._snapshot_in_background, name="marketplace-snapshot",
+                                                 daemon=True)
+        self._snapshot_thread.start()
+
+    def _snapshot_in_background(self):
+        try:
+            self._snapshot()
+        except Exception as e:
+            # The log still has every event, so the next threshold just tries again.
+            log.error("snapshot_failed", directory=self.directory, error=str(e))
+        finally:
+            self._snapshot_lock.release()
+
+    def list_nft_for_sale(self, token_id, owner_address, price):
+        listing = super().list_nft_for_sale(token_id, owner_address, price)
+        if listing is not None:
+            self._after_write()
+        return listing
+
+    def place_bid(self, listing_id, bidder_address, bid_amount):
+        placed = super().place_bid(listing_id, bidder_address, bid_amount)
+        if placed:
+            self._after_write()
+        return placed
+
+    def accept_highest_bid(self, listing_id, owner_address):
+        accepted = super().accept_highest_bid(listing_id, owner_address)
+        if accepted:
+            self._after_write()
+        return accepted
+
+    @contextlib.contextmanager
+    def _all_writers_stopped(self):
+        # Stripe locks before the index lock, the order accept_highest_bid takes them in.
+        with contextlib.ExitStack() as stack:
+            for lock in self._listing_locks:
+                stack.enter_context(lock)
+            stack.enter_context(self._index_lock)
+            yield
+
+    def snapshot(self) -> Optional[str]:
+        """
+        Writes a snapshot of the current state and deletes the segments and
+        snapshots it supersedes. Returns the snapshot path.
+        """
+        if not self._snapshot_lock.acquire(blocking=False):
+            return None  # Another thread is already taking one.
+        try:
+            return self._snapshot()
+        finally:
+            self._snapshot_lock.release()
+
+    def _snapshot(self) -> str:
+        # Caller holds the snapshot lock.
+        # Rotating with every writer stopped makes the new segment start exactly after the snapshot.
+        with self._all_writers_stopped():
+            seq = self.log.rotate()
+            self._snapshot_seq = seq
+            # One allocation; a list of item tuples would wake the cycle collector under the locks.
+            listings = self.listings.copy()
+            next_listing_id = self.next_listing_id
+            self._preserved = {}
+        try:
+            rows = []
+            for listing_id, listing in listings.items():
+                # The stripe lock orders this read against the listing's _preserve and change.
+                with self._listing_lock(listing_id):
+                    preserved = self._preserved.get(listing_id)
+                    if preserved is None:
+                        book = listing.book
+                        preserved = (listing.status_code, book, len(book) if book else 0)
+                rows.append((int(listing_id[4:]), listing.token_id, listing.owner, listing.price) + preserved)
+        finally:
+            self._preserved = None
+        path = write_snapshot(self.directory, encode_snapshot(self, seq, (next_listing_id, rows)), seq)
+        for first_seq, old_path in _list_files(self.directory, 'events-', '.log'):
+            if first_seq <= seq:
+                os.remove(old_path)
+        for snap_seq, old_path in _list_files(self.directory, 'snapshot-', '.bin'):
+            if snap_seq < seq:
+                os.remove(old_path)
+        return path
+
+    def close(self):
+        thread = self._snapshot_thread
+        if thread is not None:
+            thread.join()
+        self.log.close()
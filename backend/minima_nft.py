@@ -1,6 +1,12 @@
 import json
 import requests
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from minima_nft_index import NFTIndex
+from minima_rpc import get_client
+from structured_log import get_logger
+
+log = get_logger("nft")
 
 class MinimaNFTModule:
     """
@@ -10,24 +16,28 @@ class MinimaNFTModule:
     NFTs by communicating with a Minima node's API.
     """
 
-    def __init__(self, minima_api_url: str):
+    def __init__(self, minima_api_url: str, index: Optional[NFTIndex] = None):
         """
         Initializes the NFT module with the Minima node API URL.
+
+        Args:
+            minima_api_url: The Minima node API URL.
+            index: A local ownership index kept current by an NFTIndexFollower.
+                   When given, inventories are read from it instead of the node.
         """
         self.api_url = minima_api_url
-        print(f"Minima NFT module initialized for API: {self.api_url}")
+        self.client = get_client(minima_api_url)
+        self.index = index
+        log.info("nft_module_initialized", api_url=self.api_url)
 
     def _call_minima_api(self, endpoint: str, payload: Dict[str, Any]) -> Any:
         """
         Private helper function to make a POST request to the Minima node's API.
         """
-        url = f"{self.api_url}/{endpoint}"
         try:
-            response = requests.post(url, json=payload, timeout=5)
-            response.raise_for_status()
-            return response.json()
+            return self.client.post(endpoint, payload, timeout=5)
         except requests.exceptions.RequestException as e:
-            print(f"Error calling Minima API: {e}")
+            log.error("minima_api_failed", endpoint=endpoint, error=str(e))
             return {"status": False, "error": str(e)}
 
     def mint_nft(self, owner_address: str, nft_name: str, description: str) -> Dict[str, Any]:
@@ -42,7 +52,7 @@ class MinimaNFTModule:
         Returns:
             A dictionary with the result of the minting process.
         """
-        print(f"Attempting to mint NFT: '{nft_name}' for address: {owner_address}")
+        log.info("nft_mint_requested", name=nft_name, owner=owner_address)
         
         # A real NFT mint would require more complex metadata and possibly an image.
         # This is a simplified example of the 'createtoken' command.
@@ -57,7 +67,7 @@ class MinimaNFTModule:
         
         # In a real scenario, this would call the Minima node's 'createtoken' endpoint.
         # For this example, we simulate a successful response.
-        print("Simulating API call to create NFT token...")
+        log.debug("nft_mint_simulated", name=nft_name)
         
         # Simulating a transaction hash
         mock_tx_hash = "0x" + "abcdef1234567890" * 4 
@@ -80,7 +90,7 @@ class MinimaNFTModule:
         Returns:
             A dictionary with the result of the transfer.
         """
-        print(f"Attempting to transfer NFT {token_id} from {sender_address} to {receiver_address}")
+        log.info("nft_transfer_requested", token_id=token_id, sender=sender_address, receiver=receiver_address)
 
         # In a real scenario, this would call the Minima node's 'send' endpoint.
         # We simulate the process.
@@ -89,7 +99,7 @@ class MinimaNFTModule:
             "amount": "1",
             "tokenid": token_id
         }
-        print("Simulating API call to transfer token...")
+        log.debug("nft_transfer_simulated", token_id=token_id)
         
         mock_tx_hash = "0x" + "fedcba9876543210" * 4
         return {
@@ -101,6 +111,9 @@ class MinimaNFTModule:
     def get_inventory(self, address: str) -> List[Dict[str, Any]]:
         """
         Retrieves a list of all NFTs owned by a given Minima address.
+
+        With an index, this is a lookup of the address's tokens in the local
+        store and never calls the node, so gallery views cost no node queries.
         
         Args:
             address: The Minima address to check.
@@ -108,7 +121,10 @@ class MinimaNFTModule:
         Returns:
             A list of dictionaries, where each dictionary represents an NFT.
         """
-        print(f"Fetching NFT inventory for address: {address}")
+        if self.index is not None:
+            return self.index.inventory(address)
+
+        log.debug("nft_inventory_requested", address=address)
         
         # This would call the Minima node's 'tokens' or similar endpoint.
         # We simulate a response with two NFTs for this example.
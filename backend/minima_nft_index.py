@@ -0,0 +1,364 @@
+import contextlib
+import sqlite3
+import threading
+from typing import Dict, Any, Iterable, List, Optional
+
+import requests
+
+from minima_rpc import get_client
+from minima_wallet import MINIMA_API_URL
+from structured_log import get_logger
+
+log = get_logger("nft_index")
+
+# Kept next to the bridge queue; the API reads it while the follower writes it.
+NFT_INDEX_PATH = "nft_index.db"
+
+# How many recent blocks keep their hash and undo entries. A reorg within this
+# depth rewinds block by block; a deeper one rebuilds the index from scratch.
+REORG_DEPTH = 256
+
+# The token id of Minima itself, which is never an NFT.
+MINIMA_TOKEN_ID = "0x00"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    tokenid TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    name TEXT,
+    description TEXT,
+    total_supply INTEGER NOT NULL,
+    token_decimals INTEGER NOT NULL,
+    block INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tokens_by_owner ON tokens (owner, tokenid);
+-- The owner each token had before a block changed it (NULL: minted in that
+-- block), replayed backwards to roll the block back.
+CREATE TABLE IF NOT EXISTS undo (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    block INTEGER NOT NULL,
+    tokenid TEXT NOT NULL,
+    owner TEXT
+);
+CREATE INDEX IF NOT EXISTS undo_by_block ON undo (block);
+CREATE TABLE IF NOT EXISTS blocks (
+    height INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+_INVENTORY_COLUMNS = ('tokenid', 'name', 'description', 'total_supply', 'token_decimals')
+
+# The cursor holding the height of the last indexed block.
+_CURSOR = "block"
+
+
+class NFTIndex:
+    """
+    A local index of NFT ownership, built from Minima blocks.
+
+    Backed by SQLite, with the tokens keyed by token id and indexed by owner,
+    so an inventory is one index range scan over the k tokens an address owns
+    and never a node query. Every indexed block is applied in the same
+    transaction as the cursor that covers it, and records how to undo itself
+    for the last `reorg_depth` blocks, so a follower can rewind after a reorg.
+    """
+
+    def __init__(self, path: str, reorg_depth: int = REORG_DEPTH):
+        """
+        Opens (or creates) the index database.
+
+        Args:
+            path: The SQLite database file, or ":memory:" for a throwaway index.
+            reorg_depth: How many recent blocks can be rolled back.
+        """
+        self.path = path
+        self.reorg_depth = reorg_depth
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def height(self) -> int:
+        """Returns the height of the last indexed block, 0 before the first one."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cursors WHERE name = ?", (_CURSOR,)).fetchone()
+        return 0 if row is None else row[0]
+
+    def block_hash(self, height: int) -> Optional[str]:
+        """Returns the hash the block at `height` was indexed with, if it is still within the reorg depth."""
+        with self._lock:
+            row = self._conn.execute("SELECT hash FROM blocks WHERE height = ?", (height,)).fetchone()
+        return None if row is None else row[0]
+
+    def inventory(self, address: str) -> List[Dict[str, Any]]:
+        """Returns the NFTs an address owns, ordered by token id."""
+        columns = ", ".join(_INVENTORY_COLUMNS)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {columns} FROM tokens WHERE owner = ? ORDER BY tokenid",
+                                      (address,)).fetchall()
+        return [dict(zip(_INVENTORY_COLUMNS, row)) for row in rows]
+
+    def owner_of(self, token_id: str) -> Optional[str]:
+        """Returns the current owner of an NFT, or None for a token the index has not seen."""
+        with self._lock:
+            row = self._conn.execute("SELECT owner FROM tokens WHERE tokenid = ?", (token_id,)).fetchone()
+        return None if row is None else row[0]
+
+    def apply_blocks(self, blocks: Iterable[Dict[str, Any]]) -> int:
+        """
+        Indexes consecutive blocks that follow the current cursor and advances it.
+
+        All blocks are written in one transaction. The caller checks that they
+        extend the indexed chain; see NFTIndexFollower.
+
+        Args:
+            blocks: Parsed blocks, see parse_block().
+
+        Returns:
+            The number of ownership changes applied.
+        """
+        changes = 0
+        with self._transaction() as conn:
+            height = None
+            for block in blocks:
+                height = block['height']
+                for output in block['outputs']:
+                    changes += self._apply_output(conn, height, output)
+                conn.execute("INSERT OR REPLACE INTO blocks (height, hash) VALUES (?, ?)", (height, block['hash']))
+            if height is None:
+                return 0
+            conn.execute("INSERT OR REPLACE INTO cursors (name, value) VALUES (?, ?)", (_CURSOR, height))
+            # Blocks past the reorg depth can no longer be rolled back, so their undo entries go.
+            conn.execute("DELETE FROM undo WHERE block <= ?", (height - self.reorg_depth,))
+            conn.execute("DELETE FROM blocks WHERE height <= ?", (height - self.reorg_depth,))
+        return changes
+
+    @staticmethod
+    def _apply_output(conn: sqlite3.Connection, height: int, output: Dict[str, Any]) -> int:
+        token_id, address = output['tokenid'], output['address']
+        row = conn.execute("SELECT owner FROM tokens WHERE tokenid = ?", (token_id,)).fetchone()
+        if row is None:
+            token = output.get('token')
+            # Only outputs that create a single, indivisible token are NFT mints.
+            if not token or int(token.get('total_supply', 0)) != 1 or int(token.get('token_decimals', 0)) != 0:
+                return 0
+            conn.execute("INSERT INTO tokens (tokenid, owner, name, description, total_supply, token_decimals, block)"
+                         " VALUES (?, ?, ?, ?, 1, 0, ?)",
+                         (token_id, address, token.get('name'), token.get('description'), height))
+            conn.execute("INSERT INTO undo (block, tokenid, owner) VALUES (?, ?, NULL)", (height, token_id))
+            return 1
+        if row[0] == address:
+            return 0
+        conn.execute("UPDATE tokens SET owner = ? WHERE tokenid = ?", (address, token_id))
+        conn.execute("INSERT INTO undo (block, tokenid, owner) VALUES (?, ?, ?)", (height, token_id, row[0]))
+        return 1
+
+    def rewind(self, height: int) -> bool:
+        """
+        Rolls the index back to the state after block `height`.
+
+        Returns:
+            False if blocks past `height` are beyond the reorg depth; the index
+            is then left unchanged and has to be rebuilt with reset().
+        """
+        with self._transaction() as conn:
+            current = conn.execute("SELECT value FROM cursors WHERE name = ?", (_CURSOR,)).fetchone()
+            current = 0 if current is None else current[0]
+            if height >= current:
+                return True
+            oldest = conn.execute("SELECT MIN(height) FROM blocks").fetchone()[0]
+            if oldest is None or oldest > height + 1:
+                return False
+            undo = conn.execute("SELECT seq, tokenid, owner FROM undo WHERE block > ? ORDER BY seq DESC",
+                                (height,)).fetchall()
+            for _, token_id, owner in undo:
+                if owner is None:
+                    conn.execute("DELETE FROM tokens WHERE tokenid = ?", (token_id,))
+                else:
+                    conn.execute("UPDATE tokens SET owner = ? WHERE tokenid = ?", (owner, token_id))
+            conn.execute("DELETE FROM undo WHERE block > ?", (height,))
+            conn.execute("DELETE FROM blocks WHERE height > ?", (height,))
+            conn.execute("INSERT OR REPLACE INTO cursors (name, value) VALUES (?, ?)", (_CURSOR, height))
+        return True
+
+    def reset(self):
+        """Empties the index, so the next poll reindexes from the first block."""
+        with self._transaction() as conn:
+            for table in ("tokens", "undo", "blocks", "cursors"):
+                conn.execute(f"DELETE FROM {table}")
+
+    def counts(self) -> Dict[str, int]:
+        """Returns the number of indexed NFTs and distinct owners."""
+        with self._lock:
+            tokens, owners = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT owner) FROM tokens").fetchone()
+        return {"tokens": tokens, "owners": owners}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def parse_block(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Extracts the token outputs of a block from the node's "txpow" response.
+
+    A block carries its "txpowid", "block" height and "parent" id, and the
+    outputs of its transactions. An output that creates a token also carries
+    the token's details under "token". Minima outputs are skipped.
+    Returns None for a malformed entry.
+    """
+    height = entry.get("block")
+    block_hash = entry.get("txpowid")
+    if height is None or not block_hash:
+        return None
+    outputs = []
+    for transaction in entry.get("transactions") or []:
+        for output in transaction.get("outputs") or []:
+            token_id, address = output.get("tokenid"), output.get("address")
+            if token_id and address and token_id != MINIMA_TOKEN_ID:
+                outputs.append({"tokenid": token_id, "address": address, "token": output.get("token")})
+    return {"height": int(height), "hash": block_hash, "parent": entry.get("parent"), "outputs": outputs}
+
+
+class NFTIndexFollower:
+    """
+    Keeps an NFTIndex in step with the chain tip of a Minima node.
+
+    Each poll reads the tip height from "status" and fetches the blocks after
+    the index's cursor from "txpow", up to `page_size` per transaction. A
+    block whose parent is not the indexed block before it means the chain
+    was reorganised: the index rewinds one block and tries again until it is
+    back on the node's chain. A node that rolled back below the cursor is
+    followed down the same way.
+    """
+
+    def __init__(self, index: NFTIndex, base_url: str = MINIMA_API_URL, page_size: int = 100,
+                 interval: float = 1.0):
+        self.index = index
+        self.client = get_client(base_url)
+        self.page_size = page_size
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _fetch_block(self, height: int) -> Optional[Dict[str, Any]]:
+        result = self.client.get("txpow", params={"block": height})
+        return parse_block(result.get("response") or {}) if result.get("status") else None
+
+    def _rewind(self, height: int) -> int:
+        if self.index.rewind(height):
+            log.warning("nft_index_rewound", height=height)
+            return height
+        log.warning("nft_index_reset", height=height, reason="reorg deeper than the kept blocks")
+        self.index.reset()
+        return 0
+
+    def poll_once(self) -> int:
+        """Indexes every block up to the node's tip and returns the number of ownership changes."""
+        changes = 0
+        tip = int(self.client.get("status")["response"]["chain"]["block"])
+        height = self.index.height()
+        if height > tip:
+            height = self._rewind(tip)
+        # A reorg can replace the indexed blocks without the tip moving past them,
+        # so the last indexed block is checked against the node first.
+        while height:
+            block = self._fetch_block(height)
+            if block is None:
+                return changes
+            if block['hash'] == self.index.block_hash(height):
+                break
+            height = self._rewind(height - 1)
+        while height < tip:
+            expected = self.index.block_hash(height) if height else None
+            page: List[Dict[str, Any]] = []
+            forked = missing = False
+            for next_height in range(height + 1, min(tip, height + self.page_size) + 1):
+                block = self._fetch_block(next_height)
+                if block is None or block['height'] != next_height:
+                    missing = True
+                    break
+                if expected is not None and block['parent'] != expected:
+                    forked = True
+                    break
+                page.append(block)
+                expected = block['hash']
+            if page:
+                changes += self.index.apply_blocks(page)
+                height = page[-1]['height']
+            if forked and not page:
+                height = self._rewind(height - 1)
+            elif missing:
+                # The node does not serve the block yet; pick it up on the next poll.
+                return changes
+        return changes
+
+    def _run(self):
+        while True:
+            try:
+                changes = self.poll_once()
+                if changes:
+                    log.info("nft_index_updated", changes=changes, height=self.index.height())
+            except (requests.exceptions.RequestException, KeyError, TypeError, ValueError) as e:
+                log.error("nft_index_poll_failed", error=str(e))
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        """Starts following the chain in a background thread, polling every `interval` seconds."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="nft-index-follower", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+def _block(height: int, parent: Optional[str], outputs: List[Dict[str, Any]], fork: str = "") -> Dict[str, Any]:
+    return {"txpowid": f"0x{fork}{height:062x}", "block": height, "parent": parent,
+            "transactions": [{"txpowid": f"0x{fork}{height:060x}01", "outputs": outputs}]}
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    from minima_stub_server import start_stub_server
+
+    minima, minima_url = start_stub_server()
+    genesis = {"tokenid": "0x" + "11" * 32, "address": "Mx1234",
+               "token": {"name": "PrimalsGenesis", "description": "The first Primal.", "total_supply": 1,
+                         "token_decimals": 0}}
+    minima.blocks.append(_block(1, None, [genesis]))
+    minima.blocks.append(_block(2, minima.blocks[-1]["txpowid"], [{"tokenid": genesis["tokenid"], "address": "Mx5678"}]))
+
+    index = NFTIndex(":memory:")
+    follower = NFTIndexFollower(index, base_url=minima_url)
+    print(f"Indexed {follower.poll_once()} changes up to block {index.height()}.")
+    print("Mx5678 owns:", index.inventory("Mx5678"))
+
+    # Block 2 is replaced by a fork in which the transfer never happened.
+    minima.blocks[1:] = [_block(2, minima.blocks[0]["txpowid"], [], fork="f"),
+                         _block(3, None, [], fork="f")]
+    minima.blocks[2]["parent"] = minima.blocks[1]["txpowid"]
+    follower.poll_once()
+    print(f"After the reorg, at block {index.height()}: Mx1234 owns {index.inventory('Mx1234')}")
+    minima.shutdown()
@@ -1,16 +1,310 @@
+import base64
+import bisect
 import json
+import sys
+import threading
+from array import array
+from collections.abc import Mapping
+
+from structured_log import get_logger
+
+log = get_logger("marketplace")
+
+# Listing statuses by code; the codes are also stored in marketplace snapshots, so only append.
+LISTING_STATUSES = ('for_sale', 'sold')
+FOR_SALE, SOLD = 0, 1
+STATUS_CODES = {status: code for code, status in enumerate(LISTING_STATUSES)}
+
+
+class SortedKeyList:
+    """
+    A sorted list split into bounded buckets, so inserts and removals cost
+    O(sqrt n) element moves instead of O(n) for one flat list.
+
+    A published bucket is never changed: add and remove build the changed
+    bucket anew and swap it in with one assignment, and splitting or dropping
+    a bucket publishes new bucket lists, so readers walk without a lock and
+    see each bucket from before or after a change. Writers must be
+    serialized by the caller.
+    """
+
+    LOAD = 64
+
+    def __init__(self):
+        # (buckets, the last value of each bucket), replaced together when buckets split or go
+        self._state = ([], [])
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for bucket in self._state[0]:
+            yield from bucket
+
+    def add(self, value):
+        lists, maxes = self._state
+        if not lists:
+            self._state = ([[value]], [value])
+        else:
+            i = bisect.bisect_left(maxes, value)
+            if i == len(maxes):
+                i -= 1
+                bucket = lists[i] + [value]
+            else:
+                bucket = lists[i][:]
+                bisect.insort(bucket, value)
+            if len(bucket) > 2 * self.LOAD:
+                half = bucket[self.LOAD:]
+                bucket = bucket[:self.LOAD]
+                self._state = (lists[:i] + [bucket, half] + lists[i + 1:],
+                               maxes[:i] + [bucket[-1], half[-1]] + maxes[i + 1:])
+            else:
+                lists[i] = bucket
+                maxes[i] = bucket[-1]
+        self._len += 1
+
+    def remove(self, value):
+        """Removes a value; returns False if it was not present."""
+        lists, maxes = self._state
+        i = bisect.bisect_left(maxes, value)
+        if i == len(maxes):
+            return False
+        bucket = lists[i]
+        j = bisect.bisect_left(bucket, value)
+        if bucket[j] != value:
+            return False
+        bucket = bucket[:]
+        del bucket[j]
+        if bucket:
+            lists[i] = bucket
+            maxes[i] = bucket[-1]
+        else:
+            self._state = (lists[:i] + lists[i + 1:], maxes[:i] + maxes[i + 1:])
+        self._len -= 1
+        return True
+
+    def irange(self, minimum, maximum, reverse=False):
+        """Yields the values v with minimum <= v <= maximum, in order (or reversed)."""
+        lists, maxes = self._state
+        if not lists:
+            return
+        # Each bucket is read from `lists` once, so a bucket swapped in mid-walk is never mixed with its old copy.
+        if not reverse:
+            i = bisect.bisect_left(maxes, minimum)
+            if i == len(maxes):
+                return
+            bucket = lists[i]
+            j = bisect.bisect_left(bucket, minimum)
+            while True:
+                for value in bucket[j:]:
+                    if value > maximum:
+                        return
+                    yield value
+                i += 1
+                if i == len(lists):
+                    return
+                bucket, j = lists[i], 0
+        else:
+            i = bisect.bisect_right(maxes, maximum)
+            if i == len(maxes):
+                i -= 1
+                bucket = lists[i]
+                j = len(bucket)
+            else:
+                bucket = lists[i]
+                j = bisect.bisect_right(bucket, maximum)
+            while True:
+                for k in range(j - 1, -1, -1):
+                    value = bucket[k]
+                    if value < minimum:
+                        return
+                    yield value
+                i -= 1
+                if i < 0:
+                    return
+                bucket = lists[i]
+                j = len(bucket)
+
+
+class BidBook:
+    """
+    The bids on one listing, as parallel arrays plus the position of the highest bid.
+
+    Bids are only ever added, until a sale drops the whole book, so the
+    highest bid is kept up to date on insert instead of in a heap. A bid
+    costs a pointer to its (interned) bidder address and an 8-byte amount.
+    """
+    __slots__ = ('bidders', 'amounts', 'best')
+
+    def __init__(self):
+        self.bidders = []
+        self.amounts = array('d')
+        self.best = -1
+
+    def __len__(self):
+        # The amount is appended second, so this counts only fully written bids.
+        return len(self.amounts)
+
+    def add(self, bidder_address, amount):
+        self.bidders.append(bidder_address)
+        self.amounts.append(amount)
+        # Set last, so a lock-free reader never sees a position past the arrays.
+        # Earlier bids win ties, like max() over the bids list did.
+        if self.best < 0 or amount > self.amounts[self.best]:
+            self.best = len(self.amounts) - 1
+
+    def highest(self):
+        best = self.best
+        if best < 0:
+            return None
+        return {"bidder": self.bidders[best], "amount": self.amounts[best]}
+
+    def to_list(self):
+        return [{"bidder": bidder, "amount": amount} for bidder, amount in zip(self.bidders, self.amounts)]
+
+
+class Listing(Mapping):
+    """
+    A compact listing record that reads like the listing dict it replaces.
+
+    listing['token_id'], listing['owner'], listing['price'], listing['status']
+    and listing['bids'] (a fresh list of {"bidder", "amount"} dicts) work as
+    before and to_dict() gives a JSON-ready copy, but the record holds five
+    slots: the status as a code and the bids in a BidBook, created on the
+    first bid.
+    """
+    __slots__ = ('token_id', 'owner', 'price', 'status_code', 'book')
+
+    _KEYS = ('token_id', 'owner', 'price', 'status', 'bids')
+
+    def __init__(self, token_id, owner, price, status_code=FOR_SALE):
+        self.token_id = token_id
+        self.owner = owner
+        self.price = price
+        self.status_code = status_code
+        self.book = None
+
+    @property
+    def status(self):
+        return LISTING_STATUSES[self.status_code]
+
+    @property
+    def bids(self):
+        book = self.book
+        return book.to_list() if book else []
+
+    @property
+    def bid_count(self):
+        book = self.book
+        return len(book) if book else 0
+
+    def __getitem__(self, key):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self._KEYS}
+
+    def __repr__(self):
+        return f"Listing({self.to_dict()!r})"
+
 
 class NFTMarketplace:
     """
     A class to simulate the backend logic of an NFT marketplace.
     This module handles listing, bidding, and selling NFTs.
     It works with a simple in-memory state for demonstration.
+
+    Listings are compact Listing records whose bids sit in parallel arrays
+    with the best bid tracked on insert, so placing a bid and reading the best
+    bid are O(1). Addresses are interned, so each distinct address is stored
+    once. Listings are also indexed by token_id, owner and status, each
+    index keeping listing numbers in order, and for-sale listings are kept
+    sorted by price for browsing.
+
+    It is safe to share between request threads. Bids and sales take the lock
+    of their listing's stripe, so a bid cannot land while that listing is being
+    sold, and writers on different listings do not wait for each other. The
+    shared indexes are guarded by one short-held lock. Reads, including index
+    walks, take no lock: writers publish new state in an order that keeps
+    every intermediate state readable, and the sorted indexes are replaced
+    bucket by bucket rather than changed in place.
     """
 
+    # Number of locks the listings are striped over.
+    LOCK_STRIPES = 64
+
     def __init__(self):
+        # listing_id -> Listing
         self.listings = {}
-        self.bids = {}
         self.next_listing_id = 1
+        # token_id -> listing_id of the listing currently for sale
+        self.active_by_token = {}
+        # token_id / owner -> a listing_id, or a sorted list of listing numbers once there is more than one
+        self.listings_by_token = {}
+        self.listings_by_owner = {}
+        # status -> sorted listing numbers
+        self.listings_by_status = {status: SortedKeyList() for status in LISTING_STATUSES}
+        # Sorted (price, listing number, listing_id) of every for-sale listing
+        self.price_index = SortedKeyList()
+        self._listing_locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        self._index_lock = threading.Lock()
+
+    def _listing_lock(self, listing_id):
+        return self._listing_locks[hash(listing_id) % len(self._listing_locks)]
+
+    @staticmethod
+    def _add_to_index(index, key, listing_id):
+        # Most tokens and owners have a single listing; a bare id is far smaller than a one-element list.
+        listings = index.get(key)
+        number = int(listing_id[4:])
+        if listings is None:
+            index[key] = listing_id
+        elif isinstance(listings, str):
+            index[key] = sorted((int(listings[4:]), number))
+        else:
+            # New listings get the highest number, so this is an append except when restoring.
+            bisect.insort(listings, number)
+
+    @staticmethod
+    def _index_numbers(index, key):
+        """Returns the listing numbers under `key`, in ascending order."""
+        listings = index.get(key)
+        if listings is None:
+            return ()
+        if isinstance(listings, str):
+            return (int(listings[4:]),)
+        return tuple(listings)
+
+    @classmethod
+    def _index_members(cls, index, key):
+        return tuple(f"LST_{number}" for number in cls._index_numbers(index, key))
+
+    @staticmethod
+    def _price_key(listing_id, listing):
+        return (listing.price, int(listing_id[4:]), listing_id)
+
+    def _set_status(self, listing_id, listing, status_code):
+        number = int(listing_id[4:])
+        with self._index_lock:
+            self.listings_by_status[listing.status].remove(number)
+            if listing.status_code == FOR_SALE:
+                self.price_index.remove(self._price_key(listing_id, listing))
+                if self.active_by_token.get(listing.token_id) == listing_id:
+                    del self.active_by_token[listing.token_id]
+            listing.status_code = status_code
+            self.listings_by_status[listing.status].add(number)
+            if status_code == FOR_SALE:
+                self.price_index.add(self._price_key(listing_id, listing))
+                self.active_by_token[listing.token_id] = listing_id
 
     def list_nft_for_sale(self, token_id, owner_address, price):
         """
@@ -22,24 +316,51 @@ class NFTMarketplace:
             price (float): The list price of the NFT.
 
         Returns:
-            dict: The new listing details or None if listing fails.
+            Listing: The new listing (a read-only mapping) or None if listing fails.
         """
-        if token_id in self.listings:
-            print(f"Error: NFT with ID {token_id} is already listed.")
+        with self._index_lock:
+            if token_id in self.active_by_token:
+                listing = None
+            else:
+                listing = self._insert_listing(f"LST_{self.next_listing_id}", token_id, owner_address, price)
+        if listing is None:
+            log.warning("listing_rejected", every=100, token_id=token_id, reason="already listed")
             return None
-        
-        listing_id = f"LST_{self.next_listing_id}"
-        self.next_listing_id += 1
-        
-        self.listings[listing_id] = {
-            "token_id": token_id,
-            "owner": owner_address,
-            "price": price,
-            "status": "for_sale",
-            "bids": []
-        }
-        print(f"NFT {token_id} successfully listed by {owner_address} for {price} MINIMA.")
-        return self.listings[listing_id]
+
+        log.info("listed", token_id=token_id, owner=owner_address, price=price)
+        return listing
+
+    def _insert_listing(self, listing_id, token_id, owner_address, price, status='for_sale', bids=()):
+        """
+        Adds a listing and indexes it, without validation. Also used to restore
+        saved state. The caller holds the index lock (or is the only thread).
+        """
+        status_code = STATUS_CODES[status]
+        listing = Listing(token_id, sys.intern(owner_address), price, status_code)
+        self.listings[listing_id] = listing
+        self.next_listing_id = max(self.next_listing_id, int(listing_id[4:]) + 1)
+        self._add_to_index(self.listings_by_token, token_id, listing_id)
+        self._add_to_index(self.listings_by_owner, listing.owner, listing_id)
+        self.listings_by_status[status].add(int(listing_id[4:]))
+        if status_code == FOR_SALE:
+            self.price_index.add(self._price_key(listing_id, listing))
+            self.active_by_token[token_id] = listing_id
+        for bidder_address, bid_amount in bids:
+            self._add_bid(listing_id, bidder_address, bid_amount)
+        return listing
+
+    def _add_bid(self, listing_id, bidder_address, bid_amount):
+        listing = self.listings[listing_id]
+        book = listing.book
+        if book is None:
+            book = listing.book = BidBook()
+        book.add(sys.intern(bidder_address), bid_amount)
+
+    def _complete_sale(self, listing_id):
+        listing = self.listings[listing_id]
+        self._set_status(listing_id, listing, SOLD)
+        # One assignment drops every bid; a reader holds either the old book or none.
+        listing.book = None
 
     def place_bid(self, listing_id, bidder_address, bid_amount):
         """
@@ -53,17 +374,16 @@ class NFTMarketplace:
         Returns:
             bool: True if the bid was successful, False otherwise.
         """
-        if listing_id not in self.listings or self.listings[listing_id]['status'] != 'for_sale':
-            print(f"Error: Listing {listing_id} not found or not for sale.")
+        with self._listing_lock(listing_id):
+            listing = self.listings.get(listing_id)
+            placed = listing is not None and listing.status_code == FOR_SALE
+            if placed:
+                self._add_bid(listing_id, bidder_address, bid_amount)
+        if not placed:
+            log.warning("bid_rejected", every=100, listing_id=listing_id, reason="not found or not for sale")
             return False
 
-        listing = self.listings[listing_id]
-        new_bid = {
-            "bidder": bidder_address,
-            "amount": bid_amount
-        }
-        listing['bids'].append(new_bid)
-        print(f"Bid of {bid_amount} MINIMA placed on listing {listing_id} by {bidder_address}.")
+        log.debug("bid_placed", listing_id=listing_id, bidder=bidder_address, amount=bid_amount)
         return True
 
     def accept_highest_bid(self, listing_id, owner_address):
@@ -77,31 +397,219 @@ class NFTMarketplace:
         Returns:
             bool: True if the sale was successful, False otherwise.
         """
-        if listing_id not in self.listings or self.listings[listing_id]['owner'] != owner_address:
-            print("Error: Invalid listing ID or not the owner.")
-            return False
+        with self._listing_lock(listing_id):
+            listing = self.listings.get(listing_id)
+            if listing is None or listing.owner != owner_address:
+                log.warning("sale_rejected", every=100, listing_id=listing_id, reason="invalid listing or not the owner")
+                return False
 
-        listing = self.listings[listing_id]
-        if not listing['bids']:
-            print("Error: No bids to accept.")
-            return False
-
-        # Find the highest bid
-        highest_bid = max(listing['bids'], key=lambda bid: bid['amount'])
+            if not listing.bid_count:
+                log.warning("sale_rejected", every=100, listing_id=listing_id, reason="no bids")
+                return False
 
-        # Simulate the sale and token transfer
-        listing['status'] = 'sold'
-        print(f"Sale successful! NFT {listing['token_id']} sold to {highest_bid['bidder']} for {highest_bid['amount']} MINIMA.")
+            # Find the highest bid
+            highest_bid = self.get_highest_bid(listing_id)
 
-        # Simulate clearing the bids for this listing
-        listing['bids'] = []
+            # Simulate the sale and token transfer, then clear the bids for this listing
+            self._complete_sale(listing_id)
+        log.info("sold", listing_id=listing_id, token_id=listing.token_id, buyer=highest_bid['bidder'],
+                 amount=highest_bid['amount'])
 
         return True
 
+    def get_highest_bid(self, listing_id):
+        """Returns the highest bid on a listing in O(1), or None if there is none."""
+        listing = self.listings.get(listing_id)
+        if listing is None:
+            return None
+        book = listing.book
+        return book.highest() if book else None
+
     def get_all_listings(self):
-        """Returns all current listings on the marketplace."""
+        """Returns all current listings on the marketplace, keyed by listing id; see Listing.to_dict for JSON."""
         return self.listings
 
+    def get_listings_by_token(self, token_id):
+        """Returns every listing (past and present) of an NFT, keyed by listing id."""
+        return {lid: self.listings[lid] for lid in self._index_members(self.listings_by_token, token_id)}
+
+    def get_listings_by_owner(self, owner_address):
+        """Returns every listing created by an owner, keyed by listing id."""
+        return {lid: self.listings[lid] for lid in self._index_members(self.listings_by_owner, owner_address)}
+
+    def get_listings_by_status(self, status):
+        """Returns every listing with the given status ('for_sale' or 'sold'), keyed by listing id."""
+        numbers = list(self.listings_by_status.get(status, ()))
+        return {f"LST_{number}": self.listings[f"LST_{number}"] for number in numbers}
+
+    def _project(self, listing_id, listing, include_bids):
+        # One read of the book, so the count, best bid and bids all describe the same state.
+        book = listing.book
+        highest_bid = book.highest() if book else None
+        view = {
+            "id": listing_id,
+            "token_id": listing.token_id,
+            "owner": listing.owner,
+            "price": listing.price,
+            "status": listing.status,
+            "bid_count": len(book) if book else 0,
+            "highest_bid": highest_bid['amount'] if highest_bid else None
+        }
+        if include_bids:
+            view['bids'] = book.to_list() if book else []
+        return view
+
+    @staticmethod
+    def _encode_cursor(key):
+        return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        try:
+            return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor.") from None
+
+    def query_listings(self, status=None, owner=None, min_price=None, max_price=None, sort='recency',
+                       order='desc', limit=50, cursor=None, include_bids=False):
+        """
+        Returns one page of listings matching the filters, as compact projections.
+
+        Pages are keyset-based: pass the returned next_cursor to get the next
+        page. Recency pages walk the listing numbers of the owner index when an
+        owner is given, else of the status index when a status is given, else
+        all of them; price pages walk the price index, or sort the owner's
+        listings for sale when an owner is given. Listings walked are checked
+        against the other filters, so a page costs its size plus the listings
+        those filters skip: a price bound on a recency page, or a status on an
+        owner page, can walk many listings when few of them match.
+
+        Args:
+            status (str): Only listings with this status ('for_sale' or 'sold').
+            owner (str): Only listings created by this address.
+            min_price (float): Lowest price to include.
+            max_price (float): Highest price to include.
+            sort (str): 'recency' (listing order) or 'price'. Price sorting covers listings for sale.
+            order (str): 'desc' or 'asc'.
+            limit (int): Page size.
+            cursor (str): The next_cursor of the previous page.
+            include_bids (bool): Include each listing's bids.
+
+        Returns:
+            dict: {"listings": [...], "next_cursor": str or None}
+        """
+        if sort not in ('recency', 'price'):
+            raise ValueError("sort must be 'recency' or 'price'.")
+        if order not in ('asc', 'desc'):
+            raise ValueError("order must be 'asc' or 'desc'.")
+        if sort == 'price' and status not in (None, 'for_sale'):
+            raise ValueError("Sorting by price is only available for listings for sale.")
+        if limit < 1:
+            raise ValueError("limit must be positive.")
+        if sort == 'price':
+            status = 'for_sale'
+        descending = order == 'desc'
+        after = self._decode_cursor(cursor) if cursor else None
+        if after is not None:
+            if sort == 'price':
+                valid = (isinstance(after, list) and len(after) == 2
+                         and isinstance(after[0], (int, float)) and isinstance(after[1], int))
+            else:
+                valid = isinstance(after, int)
+            if not valid:
+                raise ValueError("Invalid cursor.")
+
+        status_code = None if status is None else STATUS_CODES.get(status, -1)
+
+        def matches(listing):
+            return ((status_code is None or listing.status_code == status_code)
+                    and (owner is None or listing.owner == owner)
+                    and (min_price is None or listing.price >= min_price)
+                    and (max_price is None or listing.price <= max_price))
+
+        def walk(numbers):
+            # numbers are ascending; the cursor is the last listing number returned.
+            if descending:
+                end = len(numbers) if after is None else bisect.bisect_left(numbers, after)
+                return ((numbers[i], f"LST_{numbers[i]}") for i in range(end - 1, -1, -1))
+            start = 0 if after is None else bisect.bisect_right(numbers, after)
+            return ((numbers[i], f"LST_{numbers[i]}") for i in range(start, len(numbers)))
+
+        if status_code == -1:
+            candidates = iter(())
+        elif owner is not None and sort == 'price':
+            # Price order within one owner's listings: sort just their listings for sale.
+            keyed = []
+            for number in self._index_numbers(self.listings_by_owner, owner):
+                listing = self.listings[f"LST_{number}"]
+                if matches(listing):
+                    keyed.append(([listing.price, number], f"LST_{number}"))
+            keyed.sort(reverse=descending)
+            candidates = (c for c in keyed if after is None or (c[0] < after if descending else c[0] > after))
+        elif owner is not None:
+            candidates = walk(self._index_numbers(self.listings_by_owner, owner))
+        elif sort == 'price':
+            lower = (float('-inf'),) if min_price is None else (min_price,)
+            upper = (float('inf'),) if max_price is None else (max_price, float('inf'))
+            if after is not None:
+                if descending:
+                    upper = min(upper, (after[0], after[1], ''))
+                else:
+                    lower = max(lower, (after[0], after[1] + 1))
+            candidates = (([p, n], lid) for p, n, lid in self.price_index.irange(lower, upper, reverse=descending))
+        elif status_code is not None:
+            index = self.listings_by_status[status]
+            if descending:
+                numbers = index.irange(0, float('inf') if after is None else after - 1, reverse=True)
+            else:
+                numbers = index.irange(0 if after is None else after + 1, float('inf'))
+            candidates = ((n, f"LST_{n}") for n in numbers)
+        else:
+            if descending:
+                start = self.next_listing_id - 1 if after is None else after - 1
+                numbers = range(start, 0, -1)
+            else:
+                start = 1 if after is None else after + 1
+                numbers = range(start, self.next_listing_id)
+            candidates = ((n, f"LST_{n}") for n in numbers)
+
+        page = []
+        last_key = None
+        has_more = False
+        for key, listing_id in candidates:
+            listing = self.listings.get(listing_id)
+            if listing is None or not matches(listing):
+                continue
+            if len(page) == limit:
+                has_more = True
+                break
+            page.append(self._project(listing_id, listing, include_bids))
+            last_key = key
+
+        return {
+            "listings": page,
+            "next_cursor": self._encode_cursor(last_key) if has_more else None
+        }
+
+    def browse_by_price(self, min_price=None, max_price=None, limit=50, descending=False):
+        """
+        Returns for-sale listings sorted by price, as (listing_id, listing) pairs.
+
+        Args:
+            min_price (float): Lowest price to include, if given.
+            max_price (float): Highest price to include, if given.
+            limit (int): Maximum number of listings to return.
+            descending (bool): Most expensive first instead of cheapest first.
+        """
+        lower = (float('-inf'),) if min_price is None else (min_price,)
+        upper = (float('inf'),) if max_price is None else (max_price, float('inf'))
+        results = []
+        for _, _, listing_id in self.price_index.irange(lower, upper, reverse=descending):
+            if len(results) >= limit:
+                break
+            results.append((listing_id, self.listings[listing_id]))
+        return results
+
 if __name__ == '__main__':
     marketplace = NFTMarketplace()
     
@@ -124,5 +632,5 @@ if __name__ == '__main__':
     print("\n")
     
     print("--- Final Listings State ---")
-    print(json.dumps(marketplace.get_all_listings(), indent=2))
+    print(json.dumps({lid: listing.to_dict() for lid, listing in marketplace.get_all_listings().items()}, indent=2))
       
@@ -0,0 +1,186 @@
+import bisect
+import random
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import observe_upstream
+
+# Default (connect, read) timeouts in seconds for calls to the Minima node.
+DEFAULT_TIMEOUT = (3.0, 10.0)
+
+# HTTP statuses worth retrying: the node or a proxy in front of it is briefly unavailable.
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+
+class LatencyHistogram:
+    """
+    A fixed-bucket latency histogram (milliseconds) with count and sum.
+    """
+
+    BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.errors = 0
+
+    def observe(self, elapsed_ms: float, error: bool = False):
+        self.counts[bisect.bisect_left(self.BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Returns the upper bound of the bucket holding the q-th quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.BUCKETS_MS[i] if i < len(self.BUCKETS_MS) else float('inf')
+        return float('inf')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": self.total_ms / self.count if self.count else None,
+            "p50_ms": self.quantile(0.5),
+            "p99_ms": self.quantile(0.99),
+            "buckets": dict(zip([str(b) for b in self.BUCKETS_MS] + ["+Inf"], self.counts))
+        }
+
+
+class MinimaRPCClient:
+    """
+    A pooled, keep-alive HTTP client for a Minima node's API.
+
+    All calls share one requests.Session with a bounded connection pool, carry
+    a (connect, read) timeout, and are retried with jittered exponential
+    backoff on connection errors and 502/503/504 responses. Latency is
+    recorded per endpoint.
+    """
+
+    def __init__(self, base_url: str, pool_size: int = 10, timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+                 retries: int = 2, backoff: float = 0.1, max_backoff: float = 2.0):
+        """
+        Initializes the client.
+
+        Args:
+            base_url: The Minima node API URL, e.g. "http://localhost:9002".
+            pool_size: The maximum number of open keep-alive connections. Callers
+                       beyond that block until a connection is free.
+            timeout: The default (connect, read) timeout in seconds.
+            retries: How many times a failed idempotent call is retried.
+            backoff: The base backoff in seconds; doubled on each retry.
+            max_backoff: The upper bound for a single backoff sleep.
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+
+    def _sleep_before_retry(self, attempt: int):
+        # "Full jitter": a random sleep up to the exponential bound spreads retries out.
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    def _observe(self, endpoint: str, elapsed_ms: float, error: bool):
+        with self._lock:
+            histogram = self._histograms.get(endpoint)
+            if histogram is None:
+                histogram = self._histograms[endpoint] = LatencyHistogram()
+            histogram.observe(elapsed_ms, error)
+        observe_upstream("minima", endpoint, elapsed_ms / 1000, error)
+
+    def request(self, method: str, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                json: Any = None, timeout: Union[float, Tuple[float, float], None] = None,
+                retries: Optional[int] = None) -> Any:
+        """
+        Calls an API endpoint and returns the decoded JSON response.
+
+        Args:
+            method: The HTTP method, "GET" or "POST".
+            endpoint: The endpoint path, e.g. "balance".
+            params: Optional query parameters.
+            json: Optional JSON body.
+            timeout: Overrides the default timeout for this call.
+            retries: Overrides the retry count. Pass 0 for calls that must not be
+                     repeated, such as sending a transaction.
+
+        Raises:
+            requests.exceptions.RequestException: If the call still fails after all retries.
+        """
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, params=params, json=json, timeout=timeout)
+                if response.status_code in RETRY_STATUSES and attempt < retries:
+                    self._observe(endpoint, (time.perf_counter() - start) * 1000, True)
+                    self._sleep_before_retry(attempt)
+                    attempt += 1
+                    continue
+                response.raise_for_status()
+                result = response.json()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self._observe(endpoint, (time.perf_counter() - start) * 1000, True)
+                if attempt >= retries:
+                    raise
+                self._sleep_before_retry(attempt)
+                attempt += 1
+                continue
+            except (requests.exceptions.RequestException, ValueError):
+                self._observe(endpoint, (time.perf_counter() - start) * 1000, True)
+                raise
+            self._observe(endpoint, (time.perf_counter() - start) * 1000, False)
+            return result
+
+    def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        return self.request("GET", endpoint, params=params, **kwargs)
+
+    def post(self, endpoint: str, payload: Any = None, **kwargs) -> Any:
+        # POSTs may create tokens or move funds, so they are not retried unless asked.
+        kwargs.setdefault("retries", 0)
+        return self.request("POST", endpoint, json=payload, **kwargs)
+
+    def latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the latency histogram of every endpoint called so far."""
+        with self._lock:
+            return {endpoint: h.to_dict() for endpoint, h in self._histograms.items()}
+
+    def close(self):
+        self.session.close()
+
+
+_clients: Dict[str, MinimaRPCClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url: str) -> MinimaRPCClient:
+    """
+    Returns the process-wide client for a Minima API URL, creating it on first use.
+    """
+    key = base_url.rstrip('/')
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = MinimaRPCClient(key)
+        return client
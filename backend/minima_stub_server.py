@@ -0,0 +1,148 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Tuple
+from urllib.parse import urlparse, parse_qs
+
+
+class StubMinimaHandler(BaseHTTPRequestHandler):
+    """
+    Answers the Minima node endpoints the backend uses with canned responses.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like a real node
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, payload: Dict[str, Any]):
+        server = self.server
+        url = urlparse(self.path)
+        endpoint = url.path.strip('/').split('/')[-1]
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        address = params.get("address") or payload.get("address")
+        with server.lock:
+            server.calls[endpoint] = server.calls.get(endpoint, 0) + 1
+            server.connections.add(self.client_address)
+            server.in_flight += 1
+            server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+            fail = server.fail_next > 0 or random.random() < server.fail_rate or address in server.fail_addresses
+            if server.fail_next > 0:
+                server.fail_next -= 1
+        try:
+            if server.latency:
+                time.sleep(server.latency)
+            self._respond(endpoint, params, payload, address, fail)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _respond(self, endpoint: str, params: Dict[str, str], payload: Dict[str, Any], address, fail: bool):
+        server = self.server
+        if fail:
+            self._reply(503, {"status": False, "error": "stub node unavailable"})
+            return
+        if endpoint == "status":
+            with server.lock:
+                # With blocks appended, the tip follows them, so truncating the list rolls the chain back.
+                tip = len(server.blocks) or server.block
+            self._reply(200, {"status": True, "response": {"chain": {"block": tip}}})
+        elif endpoint == "balance":
+            self._reply(200, {"status": True, "response": [
+                {"tokenid": "0x00", "token": "Minima", "confirmed": "123.45", "address": address}
+            ]})
+        elif endpoint == "history":
+            offset = int(params.get("offset", 0))
+            count = int(params.get("max", 100))
+            with server.lock:
+                entries = server.history[offset:offset + count]
+            self._reply(200, {"status": True, "response": entries})
+        elif endpoint == "txpow":
+            height = int(params.get("block", 0))
+            with server.lock:
+                block = server.blocks[height - 1] if 0 < height <= len(server.blocks) else None
+            if block is None:
+                self._reply(200, {"status": False, "error": f"block {height} not found"})
+            else:
+                self._reply(200, {"status": True, "response": block})
+        elif endpoint == "send":
+            self._reply(200, {"status": True, "response": {"txpowid": "0x" + "ab" * 32, **params}})
+        else:
+            self._reply(200, {"status": True, "response": {"endpoint": endpoint, "payload": payload}})
+
+    def do_GET(self):
+        self._handle({})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            payload = {}
+        self._handle(payload if isinstance(payload, dict) else {})
+
+
+class StubMinimaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connection bursts from concurrent clients.
+    request_queue_size = 1024
+
+
+def start_stub_server(port: int = 0, latency: float = 0.0, fail_rate: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Starts a stub Minima node in a background thread.
+
+    Args:
+        port: The port to listen on; 0 picks a free one.
+        latency: Seconds to sleep before every response, to simulate a remote node.
+        fail_rate: Probability of answering 503 instead of a result.
+
+    Returns:
+        The server (call shutdown() to stop it) and its base URL. `server.calls`
+        counts requests per endpoint, `server.connections` the distinct client
+        sockets seen, and setting `server.fail_next` fails that many calls.
+        Calls for an address in `server.fail_addresses` always fail.
+        `server.peak_in_flight` is the most requests ever handled at once.
+        Transactions appended to `server.history` are served, in order, by
+        the "history" endpoint (paged with its offset/max parameters).
+        Blocks appended to `server.blocks` are served by "txpow" (block N is
+        `server.blocks[N - 1]`) and move the tip "status" reports.
+    """
+    server = StubMinimaServer(("127.0.0.1", port), StubMinimaHandler)
+    server.latency = latency
+    server.fail_rate = fail_rate
+    server.fail_next = 0
+    server.fail_addresses = set()
+    server.in_flight = 0
+    server.peak_in_flight = 0
+    server.block = 1
+    server.calls = {}
+    server.history = []
+    server.blocks = []
+    server.connections = set()
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, name="stub-minima", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    server, url = start_stub_server(port=9002)
+    print(f"Stub Minima node listening on {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
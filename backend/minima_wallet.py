@@ -2,6 +2,11 @@ import requests
 import json
 from typing import Dict, Any, Union
 
+from minima_rpc import get_client
+from structured_log import get_logger
+
+log = get_logger("wallet")
+
 # This is a placeholder base URL for the Minima node's API.
 # In a real-world application, this would be configured to point to your running Minima node.
 MINIMA_API_URL = "http://localhost:9002"
@@ -12,11 +17,10 @@ def get_status() -> Dict[str, Any]:
     This is useful for checking if the node is running and synchronized.
     """
     try:
-        response = requests.get(f"{MINIMA_API_URL}/status")
-        response.raise_for_status()  # Raises an HTTPError for bad responses (4xx or 5xx)
-        return response.json()
+        # Raises an HTTPError for bad responses (4xx or 5xx) once retries are exhausted
+        return get_client(MINIMA_API_URL).get("status")
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching Minima status: {e}")
+        log.error("minima_status_failed", error=str(e))
         return {"error": str(e)}
 
 def get_balance(address: str = None) -> Union[Dict[str, Any], None]:
@@ -28,18 +32,15 @@ def get_balance(address: str = None) -> Union[Dict[str, Any], None]:
                        If None, it fetches the balances for all addresses.
     """
     try:
-        if address:
-            params = {"address": address}
-            response = requests.get(f"{MINIMA_API_URL}/balance", params=params)
-        else:
-            response = requests.get(f"{MINIMA_API_URL}/balance")
-        response.raise_for_status()
-        return response.json()
+        params = {"address": address} if address else None
+        return get_client(MINIMA_API_URL).get("balance", params=params)
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching balance: {e}")
+        log.error("minima_balance_failed", address=address, error=str(e))
         return None
 
-def send_transaction(recipient_address: str, amount: float, token_id: str = "0x00") -> Dict[str, Any]:
+
+def send_transaction(recipient_address: str, amount: float, token_id: str = "0x00",
+                     state: Dict[str, str] = None) -> Dict[str, Any]:
     """
     Sends a transaction from the wallet to a recipient.
     
@@ -47,6 +48,7 @@ def send_transaction(recipient_address: str, amount: float, token_id: str = "0x0
         recipient_address (str): The Minima address of the recipient.
         amount (float): The amount of tokens to send.
         token_id (str): The ID of the token to send. Default is "0x00" for Minima.
+        state (dict): Optional state variables to attach, e.g. {"0": "0x..."}.
     """
     try:
         # The 'send' command requires URL-encoding. The requests library handles this.
@@ -55,13 +57,14 @@ def send_transaction(recipient_address: str, amount: float, token_id: str = "0x0
             "amount": amount,
             "tokenid": token_id
         }
+        if state:
+            params["state"] = json.dumps(state)
         
         # The Minima API endpoint for sending a transaction is 'send'.
-        response = requests.get(f"{MINIMA_API_URL}/send", params=params)
-        response.raise_for_status()
-        return response.json()
+        # It is never retried: a retry after a lost response could send the funds twice.
+        return get_client(MINIMA_API_URL).get("send", params=params, retries=0)
     except requests.exceptions.RequestException as e:
-        print(f"Error sending transaction: {e}")
+        log.error("minima_send_failed", recipient=recipient_address, token_id=token_id, error=str(e))
         return {"error": str(e)}
 
 # --- Example Usage (simulated) ---
@@ -1,45 +1,492 @@
+import argparse
+import hashlib
 import json
+import re
+import sys
+from typing import Dict, Any, Iterable, Iterator, List, Optional, TextIO
 
+# Slither's impact levels, most severe first.
+IMPACTS = ("High", "Medium", "Low", "Informational", "Optimization")
+CONFIDENCES = ("High", "Medium", "Low")
 
-def parse_slither_report(report_file="slither-report.json"):
+SARIF_LEVELS = {"High": "error", "Medium": "warning", "Low": "note", "Informational": "note", "Optimization": "note"}
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+# Characters read from the report at a time.
+CHUNK_SIZE = 1 << 20
+
+_STRUCTURE = re.compile(r'[\[\]{}"]')
+_SCALAR_END = re.compile(r'[,\]}\s]')
+_SCALAR_ENDS = ",]} \t\n\r"
+_WHITESPACE = " \t\n\r"
+_DECODER = json.JSONDecoder()
+
+
+class ReportFormatError(ValueError):
+    """The report is not valid JSON or not shaped like a Slither report."""
+
+
+class JSONStream:
+    """
+    Walks a JSON document read from a text file a chunk at a time.
+
+    Only the value being read is held in memory: skipped values are scanned
+    for their end without being decoded or kept, and consumed input is dropped.
+    Use iter_object/iter_array to walk containers; after each key or element
+    they yield, the caller must read_value() or skip_value() it.
+    """
+
+    def __init__(self, file: TextIO, chunk_size: int = CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Appends the next chunk; returns False at the end of the file."""
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def _consume(self, end: int):
+        self.pos = end
+        if self.pos > self.chunk_size:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character, or "" at the end of the document."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            self._consume(self.pos)
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ReportFormatError(f"Expected '{char}' in the report, found '{self.peek() or 'end of file'}'.")
+        self._consume(self.pos + 1)
+
+    def _fill_at_least(self, size: int) -> bool:
+        """Appends at least `size` more characters unless the file ends first. Returns False if nothing was left."""
+        before = len(self.buf)
+        while len(self.buf) < before + size and self._fill():
+            pass
+        return len(self.buf) > before
+
+    def read_value(self) -> Any:
+        """Decodes and returns the next value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except ValueError as e:
+                # Most likely the value runs past the buffer. Reading as much
+                # again as is buffered keeps retries linear for huge values.
+                if self._fill_at_least(max(self.chunk_size, len(self.buf) - self.pos)):
+                    continue
+                raise ReportFormatError(f"Invalid JSON in the report: {e}")
+            if self.buf[end - 1] not in '"]}' and (end == len(self.buf) or self.buf[end] not in _SCALAR_ENDS):
+                # A number may continue in the next chunk ("-1" of "-1.5e10").
+                if self._fill():
+                    continue
+            self._consume(end)
+            return value
+
+    def skip_value(self):
+        """
+        Moves past the next value without decoding it.
+
+        Only the nesting depth and whether the scan is inside a string carry
+        over from one chunk to the next, so the part of the value already
+        scanned is dropped and skipping a value of any size holds about one
+        chunk of it.
+        """
+        char = self.peek()
+        i = self.pos
+        if char not in '"[{':
+            while True:
+                match = _SCALAR_END.search(self.buf, i)
+                if match:
+                    self._consume(match.start())
+                    return
+                i = len(self.buf)
+                if not self._fill():
+                    self._consume(i)
+                    return
+        depth = 0
+        in_string = False
+        while True:
+            if i == len(self.buf):
+                # Everything buffered is part of the value being skipped. Inside
+                # a string, keep one backslash if the buffer ends in an odd run,
+                # since it escapes the first character of the next chunk.
+                run = 0
+                while in_string and run < len(self.buf) and self.buf[-1 - run] == '\\':
+                    run += 1
+                self.buf, self.pos = '\\' * (run % 2), 0
+                i = len(self.buf)
+                if not self._fill():
+                    raise ReportFormatError("Unterminated string in the report." if in_string
+                                            else "Unexpected end of the report.")
+            if in_string:
+                quote = self.buf.find('"', i)
+                if quote < 0:
+                    i = len(self.buf)
+                    continue
+                backslashes = 0
+                while quote > backslashes and self.buf[quote - 1 - backslashes] == '\\':
+                    backslashes += 1
+                i = quote + 1
+                in_string = backslashes % 2 == 1
+            else:
+                match = _STRUCTURE.search(self.buf, i)
+                if match is None:
+                    i = len(self.buf)
+                    continue
+                i = match.end()
+                char = match.group()
+                if char == '"':
+                    in_string = True
+                    continue
+                depth += 1 if char in '[{' else -1
+            if depth == 0 and not in_string:
+                self._consume(i)
+                return
+
+    def iter_object(self) -> Iterator[str]:
+        """Yields the keys of the object at the current position."""
+        self.expect('{')
+        first = True
+        while True:
+            char = self.peek()
+            if char == '}':
+                self._consume(self.pos + 1)
+                return
+            if not first:
+                self.expect(',')
+            if self.peek() != '"':
+                raise ReportFormatError("Expected an object key in the report.")
+            key = self.read_value()
+            self.expect(':')
+            first = False
+            yield key
+
+    def iter_array(self) -> Iterator[int]:
+        """Yields the index of each element of the array at the current position."""
+        self.expect('[')
+        index = 0
+        while True:
+            if self.peek() == ']':
+                self._consume(self.pos + 1)
+                return
+            if index:
+                self.expect(',')
+            yield index
+            index += 1
+
+
+def iter_detectors(report: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the entries of results.detectors of a Slither JSON report one at a time.
+
+    Raises:
+        ReportFormatError: If the report is malformed, or Slither reported that it failed.
+    """
+    stream = JSONStream(report, chunk_size)
+    if stream.peek() != '{':
+        raise ReportFormatError("The report is not a JSON object.")
+    for key in stream.iter_object():
+        if key == "error":
+            error = stream.read_value()
+            if error:
+                raise ReportFormatError(f"Slither failed: {error}")
+        elif key == "results" and stream.peek() == '{':
+            for results_key in stream.iter_object():
+                if results_key == "detectors" and stream.peek() == '[':
+                    for _ in stream.iter_array():
+                        yield stream.read_value()
+                else:
+                    stream.skip_value()
+        else:
+            stream.skip_value()
+
+
+def finding_location(issue: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns the file and first line of a finding's first element."""
+    elements = issue.get("elements") or []
+    source_mapping = (elements[0].get("source_mapping") or {}) if elements else {}
+    filename = next((source_mapping[key] for key in ("filename_relative", "filename", "filename_short",
+                                                     "filename_absolute") if source_mapping.get(key)), "N/A")
+    lines = source_mapping.get("lines") or [None]
+    return {"file": filename, "line": lines[0]}
+
+
+def fingerprint(issue: Dict[str, Any]) -> str:
+    """
+    Identifies a finding across reports.
+
+    Built from the check and the type, name and file of each element, not
+    from line numbers, so a finding that only moved is not reported as new.
+    """
+    parts = [issue.get("check", "")]
+    for element in issue.get("elements") or []:
+        source_mapping = element.get("source_mapping") or {}
+        parts.append(f"{element.get('type', '')}:{element.get('name', '')}:"
+                     f"{source_mapping.get('filename_relative') or source_mapping.get('filename', '')}")
+    if len(parts) == 1:
+        parts.append(issue.get("description", ""))
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+
+def summarize_finding(issue: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns the fields of a finding that summaries and diffs report."""
+    return {
+        "id": fingerprint(issue),
+        "check": issue.get("check", "N/A"),
+        "impact": issue.get("impact", "N/A"),
+        "confidence": issue.get("confidence", "N/A"),
+        "description": (issue.get("description") or "No description available.").strip(),
+        **finding_location(issue)
+    }
+
+
+def iter_findings(report_file: str, min_impact: Optional[str] = None, impacts: Optional[Iterable[str]] = None,
+                  min_confidence: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the summarized findings of a report, filtered by severity.
+
+    Args:
+        report_file: The path of a Slither JSON report.
+        min_impact: Keep findings of this impact or more severe, e.g. "Medium".
+        impacts: Keep only these impacts.
+        min_confidence: Keep findings of this confidence or higher.
+    """
+    allowed = set(impacts) if impacts else None
+    if min_impact:
+        allowed = (allowed or set(IMPACTS)) & set(IMPACTS[:IMPACTS.index(min_impact) + 1])
+    confidences = set(CONFIDENCES[:CONFIDENCES.index(min_confidence) + 1]) if min_confidence else None
+    with open(report_file, "r") as f:
+        for issue in iter_detectors(f):
+            if allowed is not None and issue.get("impact") not in allowed:
+                continue
+            if confidences is not None and issue.get("confidence") not in confidences:
+                continue
+            yield summarize_finding(issue)
+
+
+class ReportSummary:
+    """
+    Counts findings by impact, confidence, check and file.
+
+    Memory grows with the number of distinct checks and files, not with the
+    number of findings.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.by_impact: Dict[str, int] = {}
+        self.by_confidence: Dict[str, int] = {}
+        self.by_check: Dict[str, Dict[str, Any]] = {}
+        self.by_file: Dict[str, int] = {}
+
+    def add(self, finding: Dict[str, Any]):
+        self.total += 1
+        self.by_impact[finding["impact"]] = self.by_impact.get(finding["impact"], 0) + 1
+        self.by_confidence[finding["confidence"]] = self.by_confidence.get(finding["confidence"], 0) + 1
+        check = self.by_check.setdefault(finding["check"], {"impact": finding["impact"], "count": 0})
+        check["count"] += 1
+        self.by_file[finding["file"]] = self.by_file.get(finding["file"], 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        def severity(impact):
+            return IMPACTS.index(impact) if impact in IMPACTS else len(IMPACTS)
+
+        return {
+            "total": self.total,
+            "by_impact": dict(sorted(self.by_impact.items(), key=lambda item: severity(item[0]))),
+            "by_confidence": self.by_confidence,
+            "by_check": dict(sorted(self.by_check.items(),
+                                    key=lambda item: (severity(item[1]["impact"]), -item[1]["count"]))),
+            "by_file": dict(sorted(self.by_file.items(), key=lambda item: -item[1]))
+        }
+
+
+def summarize_report(report_file: str, **filters) -> Dict[str, Any]:
+    """Streams a report and returns its ReportSummary as a dictionary. Accepts iter_findings' filters."""
+    summary = ReportSummary()
+    for finding in iter_findings(report_file, **filters):
+        summary.add(finding)
+    return summary.to_dict()
+
+
+def write_sarif(findings: Iterable[Dict[str, Any]], out: TextIO) -> int:
+    """
+    Writes findings as a SARIF 2.1.0 log, one result at a time. Returns the number written.
+
+    Rules are collected on the way and written after the results, so no
+    finding is held in memory.
+    """
+    out.write(f'{{"version": "2.1.0", "$schema": "{SARIF_SCHEMA}", "runs": [{{"results": [')
+    rules: Dict[str, str] = {}
+    count = 0
+    for finding in findings:
+        rules.setdefault(finding["check"], finding["impact"])
+        result = {
+            "ruleId": finding["check"],
+            "level": SARIF_LEVELS.get(finding["impact"], "note"),
+            "message": {"text": finding["description"]},
+            "partialFingerprints": {"slitherFinding/v1": finding["id"]},
+            "locations": [{"physicalLocation": {
+                "artifactLocation": {"uri": finding["file"]},
+                **({"region": {"startLine": finding["line"]}} if finding["line"] else {})
+            }}],
+            "properties": {"impact": finding["impact"], "confidence": finding["confidence"]}
+        }
+        out.write((",\n" if count else "\n") + json.dumps(result))
+        count += 1
+    driver = {
+        "name": "Slither",
+        "informationUri": "https://github.com/crytic/slither",
+        "rules": [{"id": check, "properties": {"impact": impact}} for check, impact in rules.items()]
+    }
+    out.write(f'\n], "tool": {{"driver": {json.dumps(driver)}}}}}]}}\n')
+    return count
+
+
+def diff_reports(base_file: str, head_file: str, **filters) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the findings of `head_file` that are not in `base_file`.
+
+    Only the base report's fingerprints (with their counts, so a second copy
+    of a known finding is still new) are kept in memory. Accepts
+    iter_findings' filters, applied to both reports.
+    """
+    known: Dict[str, int] = {}
+    for finding in iter_findings(base_file, **filters):
+        known[finding["id"]] = known.get(finding["id"], 0) + 1
+    for finding in iter_findings(head_file, **filters):
+        remaining = known.get(finding["id"], 0)
+        if remaining:
+            known[finding["id"]] = remaining - 1
+        else:
+            yield finding
+
+
+def print_finding(finding: Dict[str, Any]):
+    location = finding["file"] if finding["line"] is None else f"{finding['file']}:{finding['line']}"
+    print(f"\n[Slither] Severity: {finding['impact']}")
+    print(f"Check: {finding['check']}")
+    print(f"Description: {finding['description']}")
+    print(f"Location: {location}")
+    print("-" * 40)
+
+
+def parse_slither_report(report_file="slither-report.json", **filters):
     """
 Parses a Slither JSON report and prints a formatted summary of the findings.
+Findings are streamed, so reports of any size are read in bounded memory.
     """
     try:
-        with open(report_file, "r") as f:
-            data = json.load(f)
+        findings = iter_findings(report_file, **filters)
+        first = next(findings, None)
     except FileNotFoundError:
         print(f"Error: The report file '{report_file}' was not found.")
         return
+    except ReportFormatError as e:
+        print(f"Error: {e}")
+        return
 
-    issues = data.get("results", {}).get("detectors", [])
-    if not issues:
+    if first is None:
         print("No issues found in the Slither report.")
         return
 
     print("--- Slither Analysis Report ---")
-    for issue in issues:
-        # Safely get data to prevent KeyErrors
-        impact = issue.get("impact", "N/A")
-        check = issue.get("check", "N/A")
-        description = issue.get("description", "No description available.")
-
-        # Safely handle source mapping
-        source_location = "N/A"
-        elements = issue.get("elements", [])
-        if elements:
-            source_mapping = elements[0].get("source_mapping", {})
-            filename = source_mapping.get("filename", "N/A")
-            lines = source_mapping.get("lines", ["N/A"])[0]
-            source_location = f"{filename}:{lines}"
-
-        print(f"\n[Slither] Severity: {impact}")
-        print(f"Check: {check}")
-        print(f"Description: {description}")
-        print(f"Location: {source_location}")
-        print("-" * 40)
+    print_finding(first)
+    try:
+        for finding in findings:
+            print_finding(finding)
+    except ReportFormatError as e:
+        print(f"Error: {e}")
     print("--- End of Report ---")
 
 
+def _write_findings(findings: Iterable[Dict[str, Any]], output_format: str, out: TextIO) -> int:
+    """Writes findings as text, JSON lines or SARIF. Returns how many were written."""
+    if output_format == "sarif":
+        return write_sarif(findings, out)
+    count = 0
+    for finding in findings:
+        if output_format == "json":
+            out.write(json.dumps(finding) + "\n")
+        else:
+            location = finding["file"] if finding["line"] is None else f"{finding['file']}:{finding['line']}"
+            out.write(f"[{finding['impact']}] {finding['check']} at {location}\n")
+        count += 1
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ("print", "summary", "diff"):
+        # The original usage: parse_slither_report.py [report]
+        argv = ["print"] + argv
+
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument("--min-impact", choices=IMPACTS, help="Only findings of this impact or more severe.")
+    filters.add_argument("--impact", action="append", choices=IMPACTS, dest="impacts",
+                         help="Only findings of this impact (repeatable).")
+    filters.add_argument("--min-confidence", choices=CONFIDENCES)
+    parser = argparse.ArgumentParser(description="Streams and summarizes Slither JSON reports.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    print_command = commands.add_parser("print", parents=[filters], help="Print every finding (the default).")
+    print_command.add_argument("report", nargs="?", default="slither-report.json")
+    summary_command = commands.add_parser("summary", parents=[filters],
+                                          help="Aggregate findings by impact, check and file.")
+    summary_command.add_argument("report", nargs="?", default="slither-report.json")
+    summary_command.add_argument("--format", choices=("json", "sarif"), default="json")
+    summary_command.add_argument("--output", help="Write to this file instead of stdout.")
+    diff_command = commands.add_parser("diff", parents=[filters],
+                                       help="List findings in HEAD that are not in BASE; exits 1 if there are any.")
+    diff_command.add_argument("base")
+    diff_command.add_argument("head")
+    diff_command.add_argument("--format", choices=("text", "json", "sarif"), default="text")
+    diff_command.add_argument("--output", help="Write to this file instead of stdout.")
+    args = parser.parse_args(argv)
+    selected = {"min_impact": args.min_impact, "impacts": args.impacts, "min_confidence": args.min_confidence}
+
+    if args.command == "print":
+        parse_slither_report(args.report, **selected)
+        return 0
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        if args.command == "summary":
+            if args.format == "sarif":
+                write_sarif(iter_findings(args.report, **selected), out)
+            else:
+                json.dump(summarize_report(args.report, **selected), out, indent=2)
+                out.write("\n")
+            return 0
+        new = _write_findings(diff_reports(args.base, args.head, **selected), args.format, out)
+        print(f"{new} new finding(s).", file=sys.stderr)
+        return 1 if new else 0
+    except (OSError, ReportFormatError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
 if __name__ == "__main__":
-    parse_slither_report()
+    sys.exit(main())
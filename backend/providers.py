@@ -0,0 +1,121 @@
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from structured_log import get_logger
+
+log = get_logger("providers")
+
+
+class ProviderUnavailable(RuntimeError):
+    """Raised when a service could not be created, e.g. because its configuration is missing."""
+
+    def __init__(self, name: str, cause: Exception):
+        super().__init__(f"{name} is unavailable: {cause}")
+        self.name = name
+        self.cause = cause
+
+
+class LazyProvider:
+    """
+    Creates a service on first use and hands out the same instance afterwards.
+
+    Creation runs once even when many threads ask at the same time. If the
+    factory fails, callers get ProviderUnavailable and the failure is
+    remembered for `retry_interval` seconds, so a broken configuration does
+    not make every request pay for another failing connection attempt.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], retry_interval: float = 30.0,
+                 clock=time.monotonic):
+        """
+        Initializes the provider without creating anything.
+
+        Args:
+            name: The service name used in errors, e.g. "Firestore".
+            factory: Called with no arguments to create the service.
+            retry_interval: Seconds a failed creation is reported before it is attempted again.
+            clock: The time source, injectable for tests.
+        """
+        self.name = name
+        self._factory = factory
+        self.retry_interval = retry_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._instance: Any = None
+        self._initialized = False
+        self._error: Optional[ProviderUnavailable] = None
+        self._failed_at = 0.0
+        self.init_seconds: Optional[float] = None
+
+    @property
+    def initialized(self) -> bool:
+        return self._initialized
+
+    def get(self) -> Any:
+        """Returns the service, creating it on the first call."""
+        if self._initialized:
+            return self._instance
+        with self._lock:
+            if self._initialized:
+                return self._instance
+            if self._error and self._clock() - self._failed_at < self.retry_interval:
+                raise self._error
+            start = time.perf_counter()
+            try:
+                self._instance = self._factory()
+            except ProviderUnavailable as e:
+                # A service this one depends on is down; report that one rather than wrapping it.
+                self._error = e
+                self._failed_at = self._clock()
+                raise
+            except Exception as e:
+                log.error("provider_failed", provider=self.name, error=str(e))
+                self._error = ProviderUnavailable(self.name, e)
+                self._failed_at = self._clock()
+                raise self._error from e
+            self.init_seconds = time.perf_counter() - start
+            self._error = None
+            self._initialized = True
+            return self._instance
+
+    def peek(self) -> Any:
+        """Returns the service if it has been created, else None, without creating it."""
+        return self._instance if self._initialized else None
+
+    def reset(self):
+        """Forgets the instance (and any remembered failure) so the next get() creates a new one."""
+        with self._lock:
+            self._instance = None
+            self._initialized = False
+            self._error = None
+
+    def status(self) -> str:
+        if self._initialized:
+            return "ready"
+        return "failed" if self._error else "not started"
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    def connect():
+        print("Connecting...")
+        time.sleep(0.1)
+        return {"connected": True}
+
+    provider = LazyProvider("Example service", connect)
+    print(f"Before first use: {provider.status()}")
+    threads = [threading.Thread(target=provider.get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"After 8 concurrent calls: {provider.status()}, {provider.get()} "
+          f"(created once in {provider.init_seconds:.2f}s)")
+
+    broken = LazyProvider("Broken service", lambda: {}["missing config"], retry_interval=60)
+    for _ in range(2):
+        try:
+            broken.get()
+        except ProviderUnavailable as e:
+            print(f"Error: {e}")
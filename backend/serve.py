@@ -0,0 +1,389 @@
+"""
+Production server for the Flask API.
+
+Runs the WSGI app behind an aiohttp event loop in one or more pre-forked
+worker processes that share the listening socket. Each request is handed
+to a bounded thread pool picked by its route, so a slow upstream (Firestore
+for the DEX routes, the Minima node for the wallet and bridge routes) can
+only tie up its own pool. Routes have concurrency limits (excess requests
+get 503 with Retry-After) and timeouts (504), and SIGTERM/SIGINT drain
+in-flight requests before exiting.
+
+The API runs in a single worker by default: its SSE broadcaster, reserve
+cache, route index and metrics registry live in the process, so with
+several workers, reserve updates and metrics seen by one worker are
+missing from the others. (Bridge transfers are kept in the bridge queue,
+which every worker follows.) Only use --workers for apps that keep no
+such state.
+
+Usage, from the backend directory:
+    python serve.py --port 5000
+    python serve.py --app some_module:app --workers 4
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import importlib
+import io
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Any, Callable, List, NamedTuple, Optional, Tuple
+from urllib.parse import unquote
+
+from aiohttp import web
+
+from metrics import REGISTRY
+from structured_log import get_logger
+
+log = get_logger("serve")
+
+
+class RoutePolicy(NamedTuple):
+    """How requests under a path prefix are run."""
+    prefix: str
+    pool: str
+    max_concurrency: int
+    timeout: Optional[float]
+    streaming: bool = False
+
+
+# Matched by longest prefix. Streams hold a thread for as long as the client
+# stays connected, so they get their own pool and no timeout.
+ROUTE_POLICIES = (
+    RoutePolicy("/api/dex/reserves/stream", "stream", 256, None, streaming=True),
+    RoutePolicy("/api/bridge/status/stream", "stream", 256, None, streaming=True),
+    RoutePolicy("/api/dex/update-reserves/bulk", "firestore", 4, 30.0),
+    # Served from local reserve history files, so not held to the Firestore pool.
+    RoutePolicy("/api/dex/candles", "default", 64, 5.0),
+    RoutePolicy("/api/dex/", "firestore", 64, 5.0),
+    RoutePolicy("/api/wallet/", "minima", 32, 10.0),
+    RoutePolicy("/api/bridge/start", "minima", 16, 15.0),
+    RoutePolicy("/api/bridge/", "default", 64, 5.0),
+    RoutePolicy("/", "default", 64, 10.0),
+)
+
+# Threads per pool; a pool's routes can never run more handlers at once than this.
+POOL_SIZES = {"default": 16, "firestore": 32, "minima": 16, "stream": 256}
+
+
+def load_app(spec: str) -> Callable:
+    """Imports "module:attribute" and returns the WSGI app."""
+    module_name, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attribute or "app")
+
+
+class _Limiter:
+    """Counts in-flight handlers of one route. Only touched from the event loop thread."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, _future=None):
+        self.in_flight -= 1
+
+
+def _json_error(status: int, message: str, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    return web.json_response({"error": message}, status=status, headers=headers)
+
+
+class WSGIServer:
+    """
+    Serves a WSGI app from an aiohttp event loop.
+
+    The handler of every request runs in its route's thread pool. A slot
+    under the route's concurrency limit is held until the handler has really
+    finished, even after a timeout was answered, so a stuck upstream keeps
+    shedding load instead of piling threads up.
+    """
+
+    def __init__(self, wsgi_app: Callable, policies=ROUTE_POLICIES, pool_sizes: Dict[str, int] = None,
+                 drain_timeout: float = 30.0):
+        self.wsgi_app = wsgi_app
+        self.policies = sorted(policies, key=lambda policy: len(policy.prefix), reverse=True)
+        self.pools = {name: concurrent.futures.ThreadPoolExecutor(size, thread_name_prefix=f"wsgi-{name}")
+                      for name, size in (pool_sizes or POOL_SIZES).items()}
+        self.limiters = {policy.prefix: _Limiter(policy.max_concurrency) for policy in self.policies}
+        self.drain_timeout = drain_timeout
+        self.draining = False
+        self.timeouts = 0
+        self._streams: set = set()
+        REGISTRY.collected("server_in_flight_requests", "Requests being handled, by route policy.", "gauge",
+                           ("route",), lambda: (((prefix,), limiter.in_flight)
+                                                for prefix, limiter in self.limiters.items()))
+        REGISTRY.collected("server_rejected_requests", "Requests refused with 503 at the concurrency limit.",
+                           "counter", ("route",), lambda: (((prefix,), limiter.rejected)
+                                                           for prefix, limiter in self.limiters.items()))
+        REGISTRY.collected("server_timeouts", "Requests answered with 504.", "counter", (),
+                           lambda: [((), self.timeouts)])
+
+    def policy_for(self, path: str) -> RoutePolicy:
+        return next(policy for policy in self.policies if path.startswith(policy.prefix))
+
+    def in_flight(self) -> int:
+        return sum(limiter.in_flight for limiter in self.limiters.values())
+
+    def _environ(self, request: web.Request, body: bytes) -> Dict[str, Any]:
+        host, _, port = (request.host or "localhost").partition(":")
+        path, _, query = request.raw_path.partition("?")
+        environ = {
+            "REQUEST_METHOD": request.method,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": unquote(path, "latin-1"),
+            "QUERY_STRING": query,
+            "SERVER_NAME": host,
+            "SERVER_PORT": port or ("443" if request.secure else "80"),
+            "SERVER_PROTOCOL": f"HTTP/{request.version.major}.{request.version.minor}",
+            "REMOTE_ADDR": request.remote or "",
+            "CONTENT_TYPE": request.headers.get("Content-Type", ""),
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": request.scheme,
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in request.headers.items():
+            key = "HTTP_" + name.upper().replace("-", "_")
+            if key not in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH"):
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def _call(self, environ: Dict[str, Any], streaming: bool) -> Tuple[int, List[Tuple[str, str]], Any]:
+        """Runs the app in a pool thread; returns (status, headers, body bytes or the body iterator)."""
+        started: List[Any] = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+            return lambda data: None  # The legacy write() callable; Flask never uses it.
+
+        result = self.wsgi_app(environ, start_response)
+        if streaming:
+            iterator = iter(result)
+            # Flask calls start_response lazily for streamed bodies; pull the first chunk to get it.
+            first = next(iterator, None)
+            status, headers = started
+            return int(status.split()[0]), headers, (first, iterator, result)
+        try:
+            body = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        status, headers = started
+        return int(status.split()[0]), headers, body
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        if self.draining:
+            return _json_error(503, "Server is shutting down", {"Connection": "close", "Retry-After": "1"})
+        policy = self.policy_for(request.path)
+        limiter = self.limiters[policy.prefix]
+        if not limiter.try_acquire():
+            return _json_error(503, "Server busy", {"Retry-After": "1"})
+        try:
+            environ = self._environ(request, await request.read())
+        except Exception:
+            limiter.release()
+            raise
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.pools[policy.pool], self._call, environ, policy.streaming)
+        future.add_done_callback(limiter.release)
+        try:
+            status, headers, body = await asyncio.wait_for(asyncio.shield(future), policy.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return _json_error(504, "Request timed out")
+        if not policy.streaming:
+            return web.Response(body=body, status=status, headers=headers)
+        return await self._stream(request, policy, status, headers, body)
+
+    async def _stream(self, request: web.Request, policy: RoutePolicy, status: int, headers, body) -> web.StreamResponse:
+        first, iterator, result = body
+        limiter = self.limiters[policy.prefix]
+        # The stream keeps its concurrency slot until it ends.
+        limiter.in_flight += 1
+        response = web.StreamResponse(status=status, headers=[(k, v) for k, v in headers
+                                                              if k.lower() != "content-length"])
+        loop = asyncio.get_running_loop()
+        pool = self.pools[policy.pool]
+        pending = None
+        self._streams.add(response)
+        try:
+            await response.prepare(request)
+            chunk = first
+            while chunk is not None and not self.draining:
+                if chunk:
+                    await response.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+                pending = pool.submit(next, iterator, None)
+                chunk = await asyncio.wrap_future(pending)
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            self._streams.discard(response)
+            self._end_stream(loop, pool, result, limiter, pending)
+        return response
+
+    @staticmethod
+    def _end_stream(loop, pool, result, limiter: _Limiter, pending: Optional[concurrent.futures.Future]):
+        """
+        Closes a stream's body and then returns its concurrency slot.
+
+        A client that disconnects can leave a pool thread inside next() on the
+        body; closing a generator that is still running raises, so the close
+        waits for that call to return. The slot is returned on the event loop
+        whatever the close does.
+        """
+        def release():
+            try:
+                loop.call_soon_threadsafe(limiter.release)
+            except RuntimeError:
+                pass  # The loop is gone; so is the limiter.
+
+        def close(_future=None):
+            try:
+                if hasattr(result, "close"):
+                    result.close()
+            except Exception as e:
+                log.warning("stream_close_failed", error=str(e))
+            finally:
+                release()
+
+        if pending is not None and not pending.done():
+            # Runs in the pool thread as soon as the pending next() returns.
+            pending.add_done_callback(close)
+            return
+        try:
+            pool.submit(close)
+        except RuntimeError:
+            close()  # The pool was shut down.
+
+    async def drain(self):
+        """Refuses new requests, then waits up to drain_timeout for in-flight ones to finish."""
+        self.draining = True
+        deadline = time.monotonic() + self.drain_timeout
+        while self.in_flight() > len(self._streams) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": {prefix: limiter.in_flight for prefix, limiter in self.limiters.items()},
+            "rejected": {prefix: limiter.rejected for prefix, limiter in self.limiters.items()},
+            "timeouts": self.timeouts
+        }
+
+
+async def _serve(sock: socket.socket, app_spec: str, drain_timeout: float):
+    server = WSGIServer(load_app(app_spec), drain_timeout=drain_timeout)
+    application = web.Application(client_max_size=8 * 1024 * 1024)
+    application.router.add_route("*", "/{path:.*}", server.handle)
+    runner = web.AppRunner(application, handle_signals=False, access_log=None)
+    await runner.setup()
+    site = web.SockSite(runner, sock)
+    await site.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    log.info("worker_started", pid=os.getpid(), app=app_spec, address=list(sock.getsockname()))
+    await stop.wait()
+
+    log.info("worker_draining", pid=os.getpid(), in_flight=server.in_flight())
+    await server.drain()
+    await site.stop()
+    await runner.cleanup()
+    server.close()
+    log.info("worker_stopped", pid=os.getpid())
+
+
+def run_worker(sock: socket.socket, app_spec: str, drain_timeout: float):
+    asyncio.run(_serve(sock, app_spec, drain_timeout))
+
+
+def serve(app_spec: str = "app:app", host: str = "127.0.0.1", port: int = 5000, workers: int = 1,
+          drain_timeout: float = 30.0):
+    """
+    Listens on host:port and serves `app_spec` from `workers` processes.
+
+    The app is imported in each worker after the fork, so background threads
+    it starts at import run in the process that serves it. A worker that
+    dies is replaced; SIGTERM or SIGINT stops all workers gracefully.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.setblocking(False)
+    log.info("listening", url=f"http://{host}:{sock.getsockname()[1]}", workers=workers)
+    if workers <= 1 or not hasattr(os, "fork"):
+        run_worker(sock, app_spec, drain_timeout)
+        return
+
+    children: Dict[int, bool] = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                run_worker(sock, app_spec, drain_timeout)
+            finally:
+                os._exit(0)
+        children[pid] = True
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    for _ in range(workers):
+        spawn()
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.pop(pid, None)
+        if not stopping:
+            log.warning("worker_exited", pid=pid, status=status, action="restarting")
+            spawn()
+    sock.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serves the Flask API with pre-forked async workers.")
+    parser.add_argument('--app', default='app:app', help='The WSGI app as "module:attribute".')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes; more than one only for apps without in-process state.')
+    parser.add_argument('--drain-timeout', type=float, default=30.0,
+                        help='Seconds to wait for in-flight requests on shutdown.')
+    args = parser.parse_args()
+    serve(args.app, args.host, args.port, args.workers, args.drain_timeout)
@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict
+
+# Set PRIMALS_LOG_LEVEL=DEBUG to see per-swap and per-bid events.
+LOG_LEVEL = os.environ.get("PRIMALS_LOG_LEVEL", "INFO").upper()
+
+_ROOT = "primals"
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line: time, level, logger, event and the event's fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage()
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout is at the time, like print(), so redirect_stdout still silences it."""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+
+def _configure_root() -> logging.Logger:
+    root = logging.getLogger(_ROOT)
+    if not root.handlers:
+        handler = _StdoutHandler()
+        handler.setFormatter(JSONFormatter())
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL)
+        # Our records are already formatted; do not print them again through the root logger.
+        root.propagate = False
+    return root
+
+
+class StructuredLogger:
+    """
+    A leveled logger whose events are a name plus keyword fields.
+
+    Events below the logger's level cost one level check. Hot-path events can
+    be sampled with `every`: only the 1st, (every+1)th, ... occurrence of the
+    event is written, with a "sampled" field saying how many it stands for.
+
+        log = get_logger("dex")
+        log.info("swap", every=1000, token_in="tokenA", amount_in=50)
+    """
+
+    def __init__(self, name: str):
+        _configure_root()
+        self._logger = logging.getLogger(f"{_ROOT}.{name}")
+        # event -> occurrences, for sampling; an unlocked count may skip or repeat a sample, which is fine.
+        self._seen: Dict[str, int] = {}
+
+    def is_enabled(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def _log(self, level: int, event: str, every: int, fields: Dict[str, Any]):
+        if not self._logger.isEnabledFor(level):
+            return
+        if every > 1:
+            seen = self._seen.get(event, 0)
+            self._seen[event] = seen + 1
+            if seen % every:
+                return
+            fields["sampled"] = every
+        self._logger.log(level, event, extra={"fields": fields})
+
+    def debug(self, event: str, every: int = 1, **fields):
+        self._log(logging.DEBUG, event, every, fields)
+
+    def info(self, event: str, every: int = 1, **fields):
+        self._log(logging.INFO, event, every, fields)
+
+    def warning(self, event: str, every: int = 1, **fields):
+        self._log(logging.WARNING, event, every, fields)
+
+    def error(self, event: str, every: int = 1, **fields):
+        self._log(logging.ERROR, event, every, fields)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(name)
+
+
+# --- Example Usage ---
+if __name__ == '__main__':
+    log = get_logger("example")
+    log.info("started", version=1)
+    for i in range(2500):
+        log.info("swap", every=1000, swap=i)
+    log.debug("hidden", detail="only shown with PRIMALS_LOG_LEVEL=DEBUG")
+    log.error("mint_failed", txid="0xabc", error="nonce too low")
+
+    calls = 1_000_000
+    start = time.perf_counter()
+    for i in range(calls):
+        log.debug("swap", token_in="tokenA", amount_in=i)
+    print(f"disabled debug(): {(time.perf_counter() - start) / calls * 1e9:.0f} ns per call")
+    start = time.perf_counter()
+    for i in range(calls):
+        log.info("swap", every=1_000_000, token_in="tokenA", amount_in=i)
+    print(f"sampled info() (1 in 1,000,000): {(time.perf_counter() - start) / calls * 1e9:.0f} ns per call")
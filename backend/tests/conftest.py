@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend modules are flat scripts; make them importable as top-level modules.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
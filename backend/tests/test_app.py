@@ -0,0 +1,106 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app import create_app
+from firestore_stub import StubFirestoreClient
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def make_app(tmp_path, **config):
+    return create_app({"RESERVE_HISTORY_DIR": str(tmp_path / "history"), "MARKETPLACE_DIR": None,
+                       "BRIDGE_QUEUE_PATH": str(tmp_path / "bridge.db"), **config})
+
+
+def test_importing_and_creating_the_app_loads_no_clients():
+    script = ("import sys, app; app.create_app({'MARKETPLACE_DIR': None}); "
+              "print(sorted(m for m in ('firebase_admin', 'google.cloud.firestore', 'web3', 'minima_bridge', "
+              "'aiohttp', 'minima_async') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND, capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_creating_the_app_creates_no_services(tmp_path):
+    created = []
+
+    def firestore():
+        created.append("firestore")
+        return StubFirestoreClient()
+
+    app = make_app(tmp_path, FIRESTORE_CLIENT_FACTORY=firestore)
+    services = app.extensions['services']
+    assert set(services.status().values()) == {"not started"}
+    response = app.test_client().get("/api/health")
+    assert response.status_code == 200
+    assert set(response.get_json().values()) == {"not started"}
+    assert created == []
+    assert not os.path.exists(tmp_path / "bridge.db")
+    assert services.bridge_status_follower is None
+
+
+class FailingFirestore:
+    calls = 0
+
+    def __init__(self):
+        FailingFirestore.calls += 1
+        raise RuntimeError("no credentials")
+
+
+@pytest.fixture
+def broken_firestore_app(tmp_path):
+    FailingFirestore.calls = 0
+    app = make_app(tmp_path, FIRESTORE_CLIENT_FACTORY=FailingFirestore, PROVIDER_RETRY_INTERVAL=3600)
+    yield app
+    app.extensions['services'].close()
+
+
+def test_a_broken_service_fails_only_its_endpoints(broken_firestore_app):
+    client = broken_firestore_app.test_client()
+    for path in ("/api/dex/reserves?token_a=A&token_b=B", "/api/dex/quote?token_in=A&token_out=B&amount_in=1"):
+        response = client.get(path)
+        assert response.status_code == 503
+        assert response.get_json() == {"error": "Firestore is unavailable: no credentials"}
+
+    assert client.get("/api/marketplace/listings").status_code == 200
+    assert client.get("/api/bridge/stats").status_code == 200
+    assert client.get("/api/dex/candles?token_a=A&token_b=B").status_code == 404
+    assert client.get("/metrics").status_code == 200
+    health = client.get("/api/health").get_json()
+    assert (health["Firestore"], health["DEX"], health["Marketplace"]) == ("failed", "failed", "ready")
+
+
+def test_a_failed_service_is_not_retried_on_every_request(broken_firestore_app):
+    client = broken_firestore_app.test_client()
+    for _ in range(5):
+        assert client.get("/api/dex/reserves?token_a=A&token_b=B").status_code == 503
+    assert FailingFirestore.calls == 1
+
+
+def test_a_failed_service_recovers_after_its_retry_interval(tmp_path):
+    state = {"up": False, "calls": 0}
+
+    def firestore():
+        state["calls"] += 1
+        if not state["up"]:
+            raise RuntimeError("no credentials")
+        return StubFirestoreClient()
+
+    app = make_app(tmp_path, FIRESTORE_CLIENT_FACTORY=firestore, PROVIDER_RETRY_INTERVAL=3600)
+    services = app.extensions['services']
+    clock = [0.0]
+    for provider in services.providers:
+        provider._clock = lambda: clock[0]
+    client = app.test_client()
+    assert client.get("/api/dex/cache-stats").status_code == 503
+    state["up"] = True
+    clock[0] = 3599
+    assert client.get("/api/dex/cache-stats").status_code == 503
+    assert state["calls"] == 1
+    clock[0] = 3600
+    assert client.get("/api/dex/cache-stats").status_code == 200
+    assert state["calls"] == 2
+    assert services.status()["Firestore"] == "ready"
+    services.close()
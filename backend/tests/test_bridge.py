@@ -0,0 +1,58 @@
+import pytest
+
+from minima_bridge import BRIDGED_TOKEN_ID, MINIMA_LOCK_ADDRESS, LockPoller, parse_lock, start_bridge_transfer
+from minima_bridge_queue import BridgeQueue
+from minima_stub_server import start_stub_server
+
+RECIPIENT = "0x742d35Cc4A95D71C0F4A5E44007b819973E73E77"
+FOREIGN_TOKEN = "0x" + "ee" * 32
+
+
+def lock_entry(txid, outputs):
+    return {"txpowid": txid, "state": {"0": RECIPIENT}, "outputs": outputs}
+
+
+def output(amount, token_id=BRIDGED_TOKEN_ID, address=MINIMA_LOCK_ADDRESS):
+    return {"address": address, "tokenid": token_id, "amount": amount}
+
+
+def test_parse_lock_counts_only_bridged_token_paid_to_lock_address():
+    entry = lock_entry("0x01", [output("1.5"), output("2"), output("99", address="MxSenderChange"),
+                                output("1000", token_id=FOREIGN_TOKEN)])
+    assert parse_lock(entry) == {"txid": "0x01", "recipient": RECIPIENT, "amount": "3.5"}
+
+
+def test_parse_lock_ignores_foreign_token_lock():
+    assert parse_lock(lock_entry("0x02", [output("1000000", token_id=FOREIGN_TOKEN)])) is None
+
+
+@pytest.mark.parametrize("entry", [
+    lock_entry("0x03", []),
+    lock_entry("0x04", [output("0")]),
+    lock_entry("0x05", [output("not a number")]),
+    {"txpowid": "0x06", "outputs": [output("10")]},
+])
+def test_parse_lock_rejects_entries_that_are_not_locks(entry):
+    assert parse_lock(entry) is None
+
+
+def test_lock_poller_ignores_foreign_token_lock():
+    server, url = start_stub_server()
+    try:
+        server.history.extend([
+            lock_entry("0x" + "01" * 32, [output("10")]),
+            lock_entry("0x" + "02" * 32, [output("1000000", token_id=FOREIGN_TOKEN)]),
+        ])
+        queue = BridgeQueue(":memory:")
+        assert LockPoller(queue, base_url=url).poll_once() == 1
+        assert queue.get("0x" + "01" * 32)["amount"] == "10"
+        assert queue.get("0x" + "02" * 32) is None
+        # The cursor still moves past the ignored entry.
+        assert queue.get_cursor(f"history:{MINIMA_LOCK_ADDRESS}") == 2
+    finally:
+        server.shutdown()
+
+
+def test_start_bridge_transfer_rejects_other_tokens():
+    with pytest.raises(ValueError):
+        start_bridge_transfer(None, RECIPIENT, "10", token_id=FOREIGN_TOKEN)
@@ -0,0 +1,159 @@
+import threading
+
+import pytest
+from web3 import Web3
+
+from evm_stub_server import start_stub_evm
+from evm_transactions import JsonRpcError, NonceManager, ReceiptTracker
+from minima_bridge import BridgeMinter, MintWorker
+from minima_bridge_queue import BridgeQueue
+
+# A well-known local development key; never use it on a real network.
+PRIVATE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+CONTRACT = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+RECIPIENT = "0x742d35Cc4A95D71C0F4A5E44007b819973E73E77"
+
+
+def txid(i):
+    return f"0x{i:064x}"
+
+
+def test_nonce_manager_reads_the_node_once_and_reuses_released_nonces():
+    fetches = []
+    nonces = NonceManager(lambda: fetches.append(1) or 7)
+    assert [nonces.reserve() for _ in range(3)] == [7, 8, 9]
+    nonces.release(8)
+    nonces.release(8)
+    nonces.release(42)  # never handed out
+    assert nonces.reserve() == 8
+    assert nonces.reserve() == 10
+    assert len(fetches) == 1
+
+
+def test_nonce_manager_hands_out_unique_nonces_across_threads():
+    nonces = NonceManager(lambda: 0)
+    taken = []
+    lock = threading.Lock()
+
+    def worker():
+        mine = [nonces.reserve() for _ in range(500)]
+        with lock:
+            taken.extend(mine)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(taken) == list(range(4000))
+
+
+def test_nonce_manager_resync_only_moves_forward():
+    pending = [0]
+    nonces = NonceManager(lambda: pending[0])
+    for _ in range(5):
+        nonces.reserve()
+    nonces.release(1)
+    nonces.release(4)
+    # Someone else used nonces up to 2; our in-flight 3 and 4 still count.
+    pending[0] = 3
+    assert nonces.resync() == 5
+    assert nonces.take_released() == [4]
+    pending[0] = 9
+    assert nonces.resync() == 9
+
+
+class FakeBatchClient:
+    def __init__(self):
+        self.receipts = {}
+        self.batches = []
+
+    def batch(self, calls):
+        self.batches.append(len(calls))
+        return [self.receipts.get(params[0]) for _, params in calls]
+
+
+def test_receipt_tracker_polls_in_chunks_and_reports_reverts():
+    client = FakeBatchClient()
+    clock = [0.0]
+    tracker = ReceiptTracker(client, chunk_size=2, resend_after=30, clock=lambda: clock[0])
+    for i in range(5):
+        tracker.track(i, f"0x{i}", b"raw")
+    client.receipts["0x1"] = {"status": "0x1", "blockNumber": "0x5"}
+    client.receipts["0x3"] = {"status": "0x0", "blockNumber": "0x5"}
+    client.receipts["0x4"] = JsonRpcError("unknown")
+    succeeded, reverted = tracker.poll()
+    assert client.batches == [2, 2, 1]
+    assert [key for key, _ in succeeded] == [1] and [key for key, _ in reverted] == [3]
+    assert len(tracker) == 3
+    clock[0] = 31
+    assert sorted(key for key, _, _ in tracker.stale()) == [0, 2, 4]
+    assert tracker.stale() == []
+
+
+@pytest.fixture
+def evm():
+    server, url = start_stub_evm()
+    yield server, url
+    server.shutdown()
+
+
+def mint_all(worker):
+    for _ in range(100):
+        worker.process_once()
+        worker.poll_receipts()
+        if not (worker.queue.next_queued(1) or worker.queue.signed() or len(worker.tracker)):
+            return
+    raise AssertionError("the queue did not drain")
+
+
+def test_mint_worker_mints_each_lock_once_in_batches(evm, tmp_path):
+    server, url = evm
+    queue = BridgeQueue(str(tmp_path / "queue.db"))
+    queue.enqueue_many([{"txid": txid(i), "recipient": RECIPIENT, "amount": "1.5"} for i in range(120)])
+    queue.enqueue_many([{"txid": txid(500), "recipient": "not-an-address", "amount": "1"}])
+    worker = MintWorker(queue, BridgeMinter(node_url=url, private_key=PRIVATE_KEY, contract_address=CONTRACT),
+                        batch_size=50)
+    mint_all(worker)
+    assert queue.counts() == {"confirmed": 120, "failed": 1}
+    assert server.mints == [(Web3.to_checksum_address(RECIPIENT), 15 * 10 ** 17)] * 120
+    # One pending-count read, and sends and receipts go out in batches rather than per mint.
+    assert server.calls["eth_getTransactionCount"] == 1
+    assert server.calls["eth_sendRawTransaction"] == 120
+    assert server.http_requests < 30
+
+
+def test_a_restarted_worker_resends_signed_mints_instead_of_signing_new_ones(evm, tmp_path):
+    server, url = evm
+    path = str(tmp_path / "queue.db")
+    queue = BridgeQueue(path)
+    queue.enqueue_many([{"txid": txid(i), "recipient": RECIPIENT, "amount": "2"} for i in range(3)])
+    minter = BridgeMinter(node_url=url, private_key=PRIVATE_KEY, contract_address=CONTRACT)
+    # Crash after signing and recording the mints, before sending them.
+    signed = [(entry["txid"], minter.nonces.reserve()) for entry in queue.next_queued()]
+    queue.mark_signed_many([(lock_txid, nonce, *minter.sign_mint(RECIPIENT, 2 * 10 ** 18, nonce, server.gas_price))
+                            for lock_txid, nonce in signed])
+    recorded = {entry["txid"]: entry["tx_hash"] for entry in queue.signed()}
+
+    worker = MintWorker(BridgeQueue(path), minter)
+    mint_all(worker)
+    assert {lock_txid: queue.get(lock_txid)["tx_hash"] for lock_txid in recorded} == recorded
+    assert len(server.mints) == 3
+    assert queue.counts() == {"confirmed": 3}
+
+
+def test_a_mint_whose_nonce_was_taken_is_signed_again(evm, tmp_path):
+    server, url = evm
+    queue = BridgeQueue(str(tmp_path / "queue.db"))
+    minter = BridgeMinter(node_url=url, private_key=PRIVATE_KEY, contract_address=CONTRACT)
+    worker = MintWorker(queue, minter)
+    queue.enqueue_many([{"txid": txid(1), "recipient": RECIPIENT, "amount": "1"}])
+    mint_all(worker)
+    # Another process with the same key uses the next nonce behind the worker's back.
+    _, raw = minter.sign_noop(1, server.gas_price)
+    minter.send_raw(raw)
+    queue.enqueue_many([{"txid": txid(2), "recipient": RECIPIENT, "amount": "1"}])
+    mint_all(worker)
+    assert queue.get(txid(2))["status"] == "confirmed"
+    assert queue.get(txid(2))["nonce"] == 2
+    assert len(server.mints) == 2
@@ -0,0 +1,159 @@
+from minima_bridge_queue import CONFIRMED, LOCKED, QUEUED, BridgeQueue
+from minima_bridge_status import BridgeStatusFollower, BridgeStatusStore
+
+RECIPIENT = "0x742d35Cc4A95D71C0F4A5E44007b819973E73E77"
+
+
+def txid(i):
+    return f"0x{i:064x}"
+
+
+def lock(i, amount="10"):
+    return {"txid": txid(i), "recipient": RECIPIENT, "amount": amount}
+
+
+def test_enqueue_is_idempotent_and_saves_the_cursor():
+    queue = BridgeQueue(":memory:")
+    assert queue.enqueue_many([lock(1), lock(2)], cursor_name="history", cursor=2) == 2
+    assert queue.enqueue_many([lock(2), lock(3)], cursor_name="history", cursor=3) == 1
+    assert queue.get_cursor("history") == 3
+    assert [entry["txid"] for entry in queue.next_queued()] == [txid(1), txid(2), txid(3)]
+
+
+def test_signed_mints_keep_their_bytes_until_requeued():
+    queue = BridgeQueue(":memory:")
+    queue.enqueue_many([lock(1), lock(2)])
+    queue.mark_signed_many([(txid(1), 7, "0xaa", b"raw-1"), (txid(2), 6, "0xbb", b"raw-2")])
+    assert [(entry["nonce"], entry["raw_tx"]) for entry in queue.signed()] == [(6, b"raw-2"), (7, b"raw-1")]
+    queue.requeue_many([txid(1)])
+    entry = queue.get(txid(1))
+    assert (entry["status"], entry["nonce"], entry["raw_tx"]) == (QUEUED, None, None)
+
+
+def test_changes_feed_returns_each_lock_once_in_its_latest_state():
+    queue = BridgeQueue(":memory:")
+    queue.enqueue_many([lock(1), lock(2)])
+    queue.mark_signed_many([(txid(1), 0, "0xaa", b"")])
+    queue.mark_confirmed_many([txid(1)])
+    entries, last = queue.changes_since(0)
+    assert [(entry["txid"], entry["status"]) for entry in entries] == [(txid(2), QUEUED), (txid(1), CONFIRMED)]
+    assert last == queue.last_change()
+    assert queue.changes_since(last) == ([], last)
+
+
+def test_a_recorded_lock_is_persisted_and_queued_with_the_on_chain_values(tmp_path):
+    path = str(tmp_path / "queue.db")
+    store = BridgeStatusStore(BridgeQueue(path))
+    store.record_lock(txid(1), RECIPIENT, "10")
+    # A new process sees the locked transfer.
+    reopened = BridgeQueue(path)
+    assert reopened.get(txid(1))["status"] == LOCKED
+    other = BridgeStatusStore()
+    BridgeStatusFollower(other, reopened).poll_once()
+    assert other.get(txid(1))["status"] == LOCKED
+    # The poller's sighting queues it, with the amount that was actually locked.
+    assert reopened.enqueue_many([lock(1, amount="9.5")]) == 1
+    assert reopened.enqueue_many([lock(1, amount="9.5")]) == 0
+    entry = reopened.get(txid(1))
+    assert (entry["status"], entry["amount"]) == (QUEUED, "9.5")
+    BridgeStatusFollower(other, reopened).poll_once()
+    assert other.get(txid(1))["status"] == QUEUED
+
+
+class RacingQueue(BridgeQueue):
+    """Lets a follower (and the lock poller) see a recorded lock before the store records it itself."""
+
+    def record_lock(self, txid, recipient, amount):
+        added = super().record_lock(txid, recipient, amount)
+        if self.sighted:
+            self.enqueue_many([lock(1)])
+        self.follower.poll_once()
+        return added
+
+
+def test_a_lock_the_follower_mirrored_first_is_still_returned():
+    for sighted, status in ((False, LOCKED), (True, QUEUED)):
+        queue = RacingQueue(":memory:")
+        store = BridgeStatusStore(queue)
+        queue.follower, queue.sighted = BridgeStatusFollower(store, queue), sighted
+        transfer = store.record_lock(txid(1), RECIPIENT, "10")
+        assert transfer is not None and (transfer["transactionId"], transfer["status"]) == (txid(1), status)
+
+
+def test_follower_prunes_the_changes_it_applied():
+    queue = BridgeQueue(":memory:")
+    store = BridgeStatusStore()
+    follower = BridgeStatusFollower(store, queue, prune=True)
+    queue.enqueue_many([lock(1), lock(2)])
+    follower.poll_once()
+    queue.mark_signed_many([(txid(1), 0, "0xaa", b"")])
+    queue.mark_confirmed_many([txid(1)])
+    assert follower.poll_once() == 1
+    assert queue.changes_since(0)[0] == []
+    assert store.get("0xaa")["status"] == CONFIRMED
+    # The feed keeps counting after it was emptied.
+    queue.mark_failed(txid(2), "reverted")
+    assert follower.poll_once() == 1
+    assert store.counts() == {CONFIRMED: 1, "failed": 1}
+
+
+def test_a_follower_behind_a_prune_reloads(tmp_path):
+    path = str(tmp_path / "queue.db")
+    queue = BridgeQueue(path)
+    first, second = BridgeStatusStore(), BridgeStatusStore()
+    first_follower = BridgeStatusFollower(first, queue, prune=True)
+    second_follower = BridgeStatusFollower(second, BridgeQueue(path))
+    queue.enqueue_many([lock(1), lock(2)])
+    first_follower.poll_once()
+    second_follower.poll_once()
+    queue.mark_signed_many([(txid(1), 0, "0xaa", b"")])
+    queue.mark_confirmed_many([txid(1)])
+    # The first follower prunes changes the second has not read yet.
+    first_follower.poll_once()
+    second_follower.poll_once()
+    assert second.get(txid(1))["status"] == CONFIRMED
+    assert second.get(txid(2))["status"] == QUEUED
+    queue.mark_failed(txid(2), "reverted")
+    second_follower.poll_once()
+    assert second.get(txid(2))["status"] == "failed"
+
+
+class CountingFollower(BridgeStatusFollower):
+    reloads = 0
+
+    def _reload(self):
+        self.reloads += 1
+        return super()._reload()
+
+
+def test_followers_do_not_prune_each_other_by_default(tmp_path):
+    path = str(tmp_path / "queue.db")
+    queue = BridgeQueue(path)
+    followers = [CountingFollower(BridgeStatusStore(), BridgeQueue(path)) for _ in range(2)]
+    for i in range(5):
+        queue.enqueue_many([lock(i)])
+        for follower in followers:
+            follower.poll_once()
+    assert [follower.reloads for follower in followers] == [1, 1]
+    assert queue.pruned_through() == 0
+
+
+def test_trim_keeps_the_latest_changes_for_followers_within_the_window(tmp_path):
+    path = str(tmp_path / "queue.db")
+    queue = BridgeQueue(path)
+    near, far = (CountingFollower(BridgeStatusStore(), BridgeQueue(path)) for _ in range(2))
+    queue.enqueue_many([lock(i) for i in range(10)])
+    near.poll_once()
+    far.poll_once()
+    queue.enqueue_many([lock(i) for i in range(10, 20)])
+    near.poll_once()
+    queue.enqueue_many([lock(i) for i in range(20, 25)])
+    assert queue.trim_changes(keep=8) == 17
+    assert queue.trim_changes(keep=8) == 0
+    assert len(queue.changes_since(0)[0]) == 8
+    # Five changes behind: still in the window, so no reload.
+    assert near.poll_once() == 5 and near.reloads == 1
+    # Fifteen behind: the changes it missed are gone, so it reloads once and catches up.
+    far.poll_once()
+    assert far.reloads == 2
+    assert far.store.counts() == {QUEUED: 25}
@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from minima_dex import SimpleDex, get_amount_out
+from minima_dex_backtest import (EVENT_LIQUIDITY, EVENT_SWAP, Events, Scenario, read_events, replay,
+                                 scenario_grid, sweep)
+from minima_dex_engine import TOKEN_A, TOKEN_B
+
+CSV = """type,token_in,amount_in,amount_a,amount_b
+swap,tokenA,50,,
+liquidity,,,100,200
+swap,tokenB,25.5,,
+"""
+
+JSONL = """{"type": "swap", "token_in": "tokenA", "amount_in": 50}
+{"type": "liquidity", "amount_a": 100, "amount_b": 200}
+
+{"type": "swap", "token_in": "tokenB", "amount_in": 25.5}
+"""
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.mark.parametrize("name, text", [("events.csv", CSV), ("events.jsonl", JSONL)])
+def test_events_are_read_into_columns(tmp_path, name, text):
+    events = read_events(write(tmp_path, name, text))
+    assert events.kind.tolist() == [EVENT_SWAP, EVENT_LIQUIDITY, EVENT_SWAP]
+    assert events.token_in.tolist() == [TOKEN_A, TOKEN_A, TOKEN_B]
+    assert events.amount.tolist() == [50.0, 100.0, 25.5]
+    assert events.amount_b.tolist() == [0.0, 200.0, 0.0]
+
+
+@pytest.mark.parametrize("row, message", [
+    ('{"type": "burn", "amount_in": 1}', "KeyError('burn')"),
+    ('{"type": "swap", "token_in": "tokenC", "amount_in": 1}', "KeyError('tokenC')"),
+    ('{"type": "swap", "token_in": "tokenA"}', "KeyError('amount_in')"),
+    ('{"type": "swap", "token_in": "tokenA", "amount_in": "lots"}', "could not convert string to float"),
+    ('{"type": "swap", "token_in": "tokenA", "amount_in": "inf"}', "amounts must be finite"),
+    ('{"type": "liquidity", "amount_a": -1, "amount_b": 5}', "liquidity amounts must not be negative"),
+    ('{"type": "liquidity", "amount_a": 1, "amount_b": -5}', "liquidity amounts must not be negative"),
+])
+def test_invalid_rows_name_their_line(tmp_path, row, message):
+    path = write(tmp_path, "events.jsonl", '{"type": "swap", "token_in": "tokenA", "amount_in": 1}\n' + row + "\n")
+    with pytest.raises(ValueError) as e:
+        read_events(path)
+    assert str(e.value).startswith(f"{path}:2: invalid event")
+    assert message in str(e.value)
+
+
+def test_an_empty_csv_cell_is_a_missing_amount(tmp_path):
+    path = write(tmp_path, "events.csv", "type,token_in,amount_in\nswap,tokenA,\n")
+    with pytest.raises(ValueError, match=f"{path}:1: invalid event"):
+        read_events(path)
+
+
+SWAPS = [(TOKEN_A, 5_000.0), (TOKEN_B, 12_000.0), (TOKEN_A, 800.0)]
+
+
+def swap_events(swaps, liquidity=()):
+    kinds = [EVENT_SWAP] * len(swaps) + [EVENT_LIQUIDITY] * len(liquidity)
+    tokens = [token for token, _ in swaps] + [TOKEN_A] * len(liquidity)
+    amounts = [amount for _, amount in swaps] + [amount_a for amount_a, _ in liquidity]
+    amounts_b = [0.0] * len(swaps) + [amount_b for _, amount_b in liquidity]
+    return Events(np.array(kinds, dtype=np.int8), np.array(tokens, dtype=np.int8), np.array(amounts),
+                  np.array(amounts_b))
+
+
+def test_fee_free_replay_matches_simple_dex():
+    result = replay(swap_events(SWAPS), Scenario("plain", 100_000, 200_000))
+    dex = SimpleDex(100_000.0, 200_000.0)
+    for token, amount in SWAPS:
+        dex.swap_tokens("tokenA" if token == TOKEN_A else "tokenB", amount)
+    assert result["final_reserves"]["tokenA"] == pytest.approx(dex.reserves["tokenA"])
+    assert result["final_reserves"]["tokenB"] == pytest.approx(dex.reserves["tokenB"])
+    assert result["swaps"] == 3
+    assert result["volume"] == {"tokenA": 5_800.0, "tokenB": 12_000.0}
+    assert result["fees"] == {"tokenA": 0.0, "tokenB": 0.0}
+
+
+def test_slippage_and_impact_of_one_swap():
+    reserve_a, reserve_b, amount = 10**24, 2 * 10**24, 10**22
+    k = reserve_a * reserve_b
+    result = replay(swap_events([(TOKEN_A, float(amount))]), Scenario("fee", reserve_a, reserve_b, 30))
+    amount_out = get_amount_out(amount, reserve_a, reserve_b, k, 30)
+    spot = reserve_b / reserve_a
+    assert result["slippage_bps"]["p50"] == pytest.approx((1 - amount_out / (amount * spot)) * 10_000)
+    new_price = (reserve_b - amount_out) / (reserve_a + amount)
+    assert result["price_impact_bps"]["max"] == pytest.approx((1 - new_price / spot) * 10_000)
+    # The fee is taken from the input and stays in the pool.
+    assert result["fees"]["tokenA"] == pytest.approx(amount * 30 / 10_000)
+    assert result["final_reserves"]["tokenA"] == pytest.approx(reserve_a + amount)
+
+
+def test_non_positive_swaps_are_skipped():
+    result = replay(swap_events([(TOKEN_A, 0.0), (TOKEN_B, -5.0), (TOKEN_A, 10.0)]), Scenario("s", 1000, 1000))
+    assert (result["swaps"], result["skipped"]) == (1, 2)
+
+
+def test_lp_against_hold():
+    events = swap_events([(TOKEN_A, 50_000.0)], liquidity=[(10_000.0, 20_000.0)])
+    result = replay(events, Scenario("lp", 100_000, 200_000))
+    reserve_a, reserve_b = result["final_reserves"]["tokenA"], result["final_reserves"]["tokenB"]
+    price = reserve_b / reserve_a
+    assert result["final_price"] == pytest.approx(price)
+    assert result["hold_value"] == pytest.approx(110_000 * price + 220_000)
+    assert result["lp_value"] == pytest.approx(2 * reserve_b)
+    # Without fees, a price move leaves the LP behind holding.
+    assert result["lp_vs_hold"] < 0
+    with_fees = replay(events, Scenario("lp", 100_000, 200_000, 100))
+    assert with_fees["lp_vs_hold"] > result["lp_vs_hold"]
+    assert with_fees["fee_value"] == pytest.approx(500 * with_fees["final_price"])
+
+
+@pytest.mark.parametrize("reserves", [(0, 1000), (1000, 0), (0, 0), (-5, 1000)])
+def test_non_positive_reserves_are_rejected(reserves):
+    with pytest.raises(ValueError, match="reserves must be positive"):
+        replay(swap_events(SWAPS), Scenario("bad", *reserves))
+    with pytest.raises(ValueError, match="reserves must be positive"):
+        scenario_grid(*reserves, fees_bps=[0])
+
+
+def test_grid_rejects_non_positive_depths_and_bad_fees():
+    with pytest.raises(ValueError, match="reserves must be positive"):
+        scenario_grid(1000, 1000, [0], depths=[1, 0])
+    with pytest.raises(ValueError, match="fee_bps"):
+        scenario_grid(1000, 1000, [10_000])
+
+
+def test_sweep_in_processes_matches_replay():
+    events = swap_events(SWAPS * 100, liquidity=[(1_000.0, 2_000.0)])
+    grid = scenario_grid(100_000, 200_000, [0, 30], depths=[0.5, 1])
+    assert sweep(events, grid, processes=2) == [replay(events, scenario) for scenario in grid]
+
+
+def test_sweep_rejects_a_bad_scenario_before_starting():
+    with pytest.raises(ValueError, match="reserves must be positive"):
+        sweep(swap_events(SWAPS), [Scenario("good", 1000, 1000), Scenario("bad", 0, 1000)], processes=2)
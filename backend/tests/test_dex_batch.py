@@ -0,0 +1,122 @@
+import pytest
+
+from app import MAX_BATCH_WRITES, FirestoreDEX
+from firestore_stub import StubFirestoreClient
+from minima_dex_batch import ReserveWriteBuffer
+
+
+def update(token_a, token_b, reserve_a, reserve_b=1000.0):
+    return {"token_a": token_a, "token_b": token_b, "reserve_a": reserve_a, "reserve_b": reserve_b}
+
+
+class FailingCommits(StubFirestoreClient):
+    """A stub client whose batch commits fail for the batch numbers in `failing`."""
+
+    def __init__(self, failing):
+        super().__init__()
+        self.failing = set(failing)
+        self.commits = 0
+
+    def _write(self, writes):
+        if len(writes) > 1:
+            self.commits += 1
+            if self.commits in self.failing:
+                raise ConnectionError("commit failed")
+        super()._write(writes)
+
+
+@pytest.fixture
+def client():
+    return StubFirestoreClient()
+
+
+@pytest.fixture
+def dex(client):
+    dex = FirestoreDEX(client)
+    dex.notified = []
+    dex.add_listener(lambda *args: dex.notified.append(args))
+    return dex
+
+
+def test_update_reserves_many_writes_only_the_last_update_per_pair(dex, client):
+    result = dex.update_reserves_many([update("a", "b", 1.0), update("c", "d", 2.0), update("a", "b", 3.0)])
+    assert result == {"written": 2, "batches": 1, "failed": 0}
+    assert client.calls == {"write": 1}
+    assert dex.get_reserves("a", "b")["reserve_a"] == 3.0
+    # Listeners hear each written pair once, in the order of its last update.
+    assert dex.notified == [("c", "d", 2.0, 1000.0), ("a", "b", 3.0, 1000.0)]
+
+
+def test_update_reserves_many_splits_into_firestore_sized_batches(dex, client):
+    updates = [update(f"t{i}", "b", float(i)) for i in range(2 * MAX_BATCH_WRITES + 1)]
+    assert dex.update_reserves_many(updates) == {"written": len(updates), "batches": 3, "failed": 0}
+    assert client.calls["write"] == 3
+    assert len(dex.get_all_reserves()) == len(updates)
+
+
+def test_a_failed_batch_is_counted_and_not_notified():
+    client = FailingCommits(failing={2})
+    dex = FirestoreDEX(client)
+    notified = []
+    dex.add_listener(lambda *args: notified.append(args[0]))
+    updates = [update(f"t{i}", "b", float(i)) for i in range(MAX_BATCH_WRITES + 10)]
+    assert dex.update_reserves_many(updates) == {"written": MAX_BATCH_WRITES, "batches": 1, "failed": 10}
+    assert len(notified) == MAX_BATCH_WRITES
+    assert "error" in dex.get_reserves(f"t{MAX_BATCH_WRITES}", "b")
+
+
+def test_write_buffer_keeps_the_last_update_per_pair(dex, client):
+    buffer = ReserveWriteBuffer(dex)
+    for i in range(100):
+        buffer.add("a", "b", float(i), 1000.0)
+        buffer.add(f"t{i % 10}", "b", float(i), 1000.0)
+    assert buffer.pending() == 11
+    assert buffer.flush() == {"written": 11, "batches": 1, "failed": 0}
+    assert (buffer.received, buffer.flushed) == (200, 11)
+    assert dex.get_reserves("a", "b")["reserve_a"] == 99.0
+    assert dex.get_reserves("t3", "b")["reserve_a"] == 93.0
+    assert buffer.flush() == {"written": 0, "batches": 0, "failed": 0}
+
+
+def test_write_buffer_flushes_early_when_full(dex, client):
+    buffer = ReserveWriteBuffer(dex, max_pending=5)
+    for i in range(12):
+        buffer.add(f"t{i}", "b", 1.0, 1.0)
+    assert client.calls["write"] == 2
+    assert buffer.pending() == 2
+
+
+def test_write_buffer_stop_writes_what_is_pending(dex):
+    buffer = ReserveWriteBuffer(dex, window=60)
+    buffer.start()
+    buffer.add("a", "b", 5.0, 6.0)
+    buffer.stop()
+    assert dex.get_reserves("a", "b")["reserve_b"] == 6.0
+
+
+def test_write_buffer_keeps_updates_that_failed_to_write():
+    client = FailingCommits(failing={1})
+    dex = FirestoreDEX(client)
+    buffer = ReserveWriteBuffer(dex)
+    buffer.add("a", "b", 1.0, 1.0)
+    buffer.add("c", "d", 2.0, 2.0)
+    assert buffer.flush() == {"written": 0, "batches": 0, "failed": 2}
+    # A newer update for a failed pair wins over the one being retried.
+    buffer.add("a", "b", 3.0, 3.0)
+    assert buffer.pending() == 2
+    assert buffer.flush() == {"written": 2, "batches": 1, "failed": 0}
+    assert dex.get_reserves("a", "b")["reserve_a"] == 3.0
+    assert dex.get_reserves("c", "d")["reserve_a"] == 2.0
+    assert buffer.pending() == 0
+
+
+def test_write_buffer_keeps_updates_when_the_write_raises(dex):
+    buffer = ReserveWriteBuffer(dex)
+    buffer.add("a", "b", 1.0, 1.0)
+    write = dex.update_reserves_many
+    dex.update_reserves_many = lambda *args, **kwargs: 1 / 0
+    with pytest.raises(ZeroDivisionError):
+        buffer.flush()
+    dex.update_reserves_many = write
+    assert buffer.pending() == 1
+    assert buffer.flush()["written"] == 1
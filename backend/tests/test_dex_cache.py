@@ -0,0 +1,183 @@
+import threading
+
+import pytest
+
+from minima_dex_cache import ReservesCache
+
+
+class FakeDex:
+    """Counts reads; each read can be held on `gate` until the test releases it, and then raise `error`."""
+
+    def __init__(self):
+        self.calls = 0
+        self.reserve_a = 1000
+        self.gate = None
+        self.error = None
+        self.started = threading.Event()
+        self._lock = threading.Lock()
+
+    def get_reserves(self, token_a, token_b):
+        with self._lock:
+            self.calls += 1
+            reserves = {"reserve_a": self.reserve_a, "reserve_b": 1000}
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait()
+        if self.error is not None:
+            raise self.error
+        if token_a == "missing":
+            return {"error": "Reserves not found for this token pair."}
+        return reserves
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_concurrent_misses_share_one_read():
+    dex = FakeDex()
+    dex.gate = threading.Event()
+    cache = ReservesCache(dex)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_reserves("a", "b"))) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    dex.started.wait()
+    dex.gate.set()
+    for thread in threads:
+        thread.join()
+    assert dex.calls == 1
+    assert results == [{"reserve_a": 1000, "reserve_b": 1000}] * 16
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] + stats["coalesced"] == 15
+
+
+def test_entries_expire_after_their_ttl():
+    dex, clock = FakeDex(), FakeClock()
+    cache = ReservesCache(dex, ttl=5.0, clock=clock)
+    cache.set_ttl("a", "c", 60.0)
+    cache.get_reserves("a", "b")
+    cache.get_reserves("a", "c")
+    clock.now = 4.9
+    cache.get_reserves("a", "b")
+    assert dex.calls == 2
+    clock.now = 5.1
+    cache.get_reserves("a", "b")
+    cache.get_reserves("a", "c")
+    assert dex.calls == 3
+
+
+def test_least_recently_used_pair_is_evicted():
+    dex = FakeDex()
+    cache = ReservesCache(dex, max_entries=2)
+    cache.get_reserves("a", "b")
+    cache.get_reserves("a", "c")
+    cache.get_reserves("a", "b")
+    cache.get_reserves("a", "d")
+    assert cache.stats()["evictions"] == 1
+    cache.get_reserves("a", "b")
+    assert dex.calls == 3
+    cache.get_reserves("a", "c")
+    assert dex.calls == 4
+
+
+def test_errors_are_not_cached():
+    dex = FakeDex()
+    cache = ReservesCache(dex)
+    assert "error" in cache.get_reserves("missing", "b")
+    assert "error" in cache.get_reserves("missing", "b")
+    assert dex.calls == 2
+
+
+def test_invalidate_drops_the_entry():
+    dex = FakeDex()
+    cache = ReservesCache(dex)
+    cache.get_reserves("a", "b")
+    dex.reserve_a = 2000
+    cache.invalidate("a", "b", 2000, 1000)
+    assert cache.get_reserves("a", "b")["reserve_a"] == 2000
+    assert cache.stats()["invalidations"] == 1
+
+
+@pytest.mark.parametrize("drop", [lambda cache: cache.invalidate("a", "b"), lambda cache: cache.clear()])
+def test_a_read_invalidated_while_in_flight_is_not_stored(drop):
+    dex = FakeDex()
+    dex.gate = threading.Event()
+    cache = ReservesCache(dex)
+    thread = threading.Thread(target=cache.get_reserves, args=("a", "b"))
+    thread.start()
+    dex.started.wait()
+    # The pair changes while the read that started before the change is still running.
+    dex.reserve_a = 2000
+    drop(cache)
+    dex.gate.set()
+    thread.join()
+    assert cache.get_reserves("a", "b")["reserve_a"] == 2000
+    assert dex.calls == 2
+
+
+def test_waiters_share_the_leaders_error():
+    dex = FakeDex()
+    dex.gate = threading.Event()
+    cache = ReservesCache(dex)
+    results = []
+
+    def read():
+        try:
+            results.append(cache.get_reserves("a", "b"))
+        except ConnectionError as e:
+            results.append(e)
+
+    dex.error = ConnectionError("firestore unavailable")
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    threads[0].start()
+    dex.started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    while cache.stats()["coalesced"] < 7:
+        pass
+    dex.gate.set()
+    for thread in threads:
+        thread.join()
+    assert dex.calls == 1
+    assert results == [dex.error] * 8
+
+
+def test_a_waiter_gives_up_on_a_hung_read():
+    dex = FakeDex()
+    dex.gate = threading.Event()
+    cache = ReservesCache(dex, wait_timeout=0.05)
+    leader = threading.Thread(target=cache.get_reserves, args=("a", "b"))
+    leader.start()
+    dex.started.wait()
+    assert "error" in cache.get_reserves("a", "b")
+    assert cache.stats()["wait_timeouts"] == 1
+    dex.gate.set()
+    leader.join()
+    assert dex.calls == 1
+
+
+def test_bookkeeping_stays_bounded():
+    dex = FakeDex()
+    cache = ReservesCache(dex, max_entries=8)
+    for i in range(1000):
+        cache.get_reserves("a", f"t{i}")
+        cache.invalidate("a", f"t{i}")
+        cache.invalidate("x", f"t{i}")
+    assert len(cache._entries) <= 8
+    assert not cache._stale and not cache._inflight
+
+
+def test_ttl_overrides_are_capped():
+    cache = ReservesCache(FakeDex(), max_entries=2)
+    cache.set_ttl("a", "b", 1.0)
+    cache.set_ttl("a", "c", 1.0)
+    cache.set_ttl("a", "c", 2.0)
+    with pytest.raises(ValueError):
+        cache.set_ttl("a", "d", 1.0)
+    cache.set_ttl("a", "b", None)
+    cache.set_ttl("a", "d", 1.0)
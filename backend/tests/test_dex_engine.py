@@ -0,0 +1,186 @@
+import random
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+from minima_dex import SimpleDex
+from minima_dex_engine import TOKEN_A, PoolRegistry, token_codes
+
+
+@pytest.fixture
+def fast_switching():
+    # Switch threads as often as possible, so torn reads have a chance to show up.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def simple_dex_loop(reserves_a, reserves_b, pair_ids, tokens, amounts):
+    dexes = [SimpleDex(a, b) for a, b in zip(reserves_a, reserves_b)]
+    out = [dexes[p].swap_tokens(t, x)["amount_out"] for p, t, x in zip(pair_ids, tokens, amounts)]
+    return dexes, np.array(out)
+
+
+@pytest.mark.parametrize("path, min_round_width", [("rounds", 0), ("scan", 10 ** 9)])
+@pytest.mark.parametrize("pools, swaps", [(1, 1), (1, 257), (5, 40), (300, 2000)])
+def test_swap_many_matches_a_simple_dex_loop(monkeypatch, pools, swaps, path, min_round_width):
+    monkeypatch.setattr(PoolRegistry, "MIN_ROUND_WIDTH", min_round_width)
+    rng = np.random.default_rng(pools * 1000 + swaps)
+    reserves_a = rng.uniform(100, 1e6, pools)
+    reserves_b = rng.uniform(100, 1e6, pools)
+    # Skewed so some pools see long runs of swaps in one batch.
+    pair_ids = np.minimum(rng.geometric(0.05, swaps) - 1, pools - 1)
+    tokens = rng.choice(['tokenA', 'tokenB'], swaps)
+    amounts = rng.uniform(0, 50, swaps)
+
+    registry = PoolRegistry(capacity=2)
+    registry.add_pools(reserves_a, reserves_b)
+    result = registry.swap_many(pair_ids, tokens, amounts)
+    dexes, expected = simple_dex_loop(reserves_a, reserves_b, pair_ids, tokens, amounts)
+
+    assert np.allclose(result["amount_out"], expected, rtol=1e-9, atol=1e-9)
+    assert list(result["token_out"]) == [1 if t == 'tokenA' else 0 for t in tokens]
+    for pair_id, dex in enumerate(dexes):
+        reserves = registry.get_reserves(pair_id)
+        assert reserves['tokenA'] == pytest.approx(dex.reserves['tokenA'], rel=1e-9)
+        assert reserves['tokenB'] == pytest.approx(dex.reserves['tokenB'], rel=1e-9)
+
+
+def test_consecutive_batches_match_one_loop():
+    registry = PoolRegistry()
+    registry.add_pools([1000.0, 5000.0], [1000.0, 200.0])
+    pair_ids, tokens, amounts = [0, 1, 0, 0, 1], ['tokenA', 'tokenB', 'tokenB', 'tokenA', 'tokenA'], [10, 3, 7, 1, 50]
+    first = registry.swap_many(pair_ids[:2], tokens[:2], amounts[:2])["amount_out"]
+    second = registry.swap_many(pair_ids[2:], tokens[2:], amounts[2:])["amount_out"]
+    _, expected = simple_dex_loop([1000.0, 5000.0], [1000.0, 200.0], pair_ids, tokens, amounts)
+    assert np.allclose(np.concatenate([first, second]), expected, rtol=1e-12)
+
+
+def test_quote_many_prices_each_swap_alone_and_changes_nothing():
+    registry = PoolRegistry()
+    registry.add_pools([1000.0, 400.0], [1000.0, 900.0])
+    quote = registry.quote_many([0, 0, 1], [TOKEN_A, TOKEN_A, 1], [100.0, 100.0, 50.0])
+    single = SimpleDex(1000.0, 1000.0).swap_tokens('tokenA', 100.0)["amount_out"]
+    assert quote["amount_out"][0] == quote["amount_out"][1] == pytest.approx(single)
+    assert quote["amount_out"][2] == pytest.approx(SimpleDex(400.0, 900.0).swap_tokens('tokenB', 50.0)["amount_out"])
+    assert registry.get_reserves(0) == {'tokenA': 1000.0, 'tokenB': 1000.0}
+
+
+def test_pools_by_key_and_liquidity_follow_simple_dex():
+    registry = PoolRegistry()
+    pair_id = registry.add_pool(1000.0, 2000.0, key="minima-custom-token")
+    assert registry.pair_id("minima-custom-token") == pair_id
+    dex = SimpleDex(1000.0, 2000.0)
+    registry.add_liquidity(pair_id, 500.0, 1000.0)
+    dex.add_liquidity(500.0, 1000.0)
+    registry.swap_many([pair_id], ['tokenB'], [250.0])
+    dex.swap_tokens('tokenB', 250.0)
+    assert registry.get_reserves(pair_id) == pytest.approx(dex.reserves)
+    assert registry.get_price(pair_id, 'tokenA', 'tokenB') == pytest.approx(dex.get_price('tokenA', 'tokenB'))
+    with pytest.raises(ValueError):
+        registry.add_pool(1.0, 1.0, key="minima-custom-token")
+
+
+@pytest.mark.parametrize("args", [
+    ([0], ['tokenC'], [1.0]),
+    ([0], [2], [1.0]),
+    ([5], ['tokenA'], [1.0]),
+    ([0], ['tokenA'], [-1.0]),
+    ([0, 0], ['tokenA'], [1.0, 2.0]),
+])
+def test_swap_many_rejects_bad_batches(args):
+    registry = PoolRegistry()
+    registry.add_pool(1000.0, 1000.0)
+    with pytest.raises(ValueError):
+        registry.swap_many(*args)
+    assert registry.get_reserves(0) == {'tokenA': 1000.0, 'tokenB': 1000.0}
+
+
+def test_token_codes_accepts_names_and_codes():
+    assert list(token_codes(['tokenA', 'tokenB'])) == [0, 1]
+    assert list(token_codes(np.array([1, 0]))) == [1, 0]
+
+
+@pytest.mark.parametrize("codes", [[256], [0, 257], [-1], np.array([255], dtype=np.uint8), ['tokenC']])
+def test_token_codes_rejects_unknown_tokens_before_narrowing(codes):
+    with pytest.raises(ValueError):
+        token_codes(codes)
+
+
+def test_concurrent_swaps_keep_every_read_on_the_k_curve(fast_switching):
+    registry = PoolRegistry(capacity=4)
+    initial_a = np.array([1000.0, 2000.0, 500.0, 10_000.0, 750.0, 3000.0])
+    initial_b = np.array([1000.0, 500.0, 4000.0, 10_000.0, 750.0, 1200.0])
+    registry.add_pools(initial_a, initial_b)
+    k = initial_a * initial_b
+    pools = len(k)
+    stop = threading.Event()
+    errors = []
+    totals = []
+
+    def writer(seed):
+        rng = random.Random(seed)
+        net_a, net_b = np.zeros(pools), np.zeros(pools)
+        for _ in range(300):
+            pair_ids = [rng.randrange(pools) for _ in range(8)]
+            tokens = [rng.choice((0, 1)) for _ in pair_ids]
+            amounts = [rng.uniform(0.1, 20) for _ in pair_ids]
+            out = registry.swap_many(pair_ids, tokens, amounts)["amount_out"]
+            for pair_id, token, amount_in, amount_out in zip(pair_ids, tokens, amounts, out):
+                if token == TOKEN_A:
+                    net_a[pair_id] += amount_in
+                    net_b[pair_id] -= amount_out
+                else:
+                    net_b[pair_id] += amount_in
+                    net_a[pair_id] -= amount_out
+        totals.append((net_a, net_b))
+
+    def reader():
+        while not stop.is_set():
+            pair_id = random.randrange(pools)
+            reserves = registry.get_reserves(pair_id)
+            if not np.isclose(reserves['tokenA'] * reserves['tokenB'], k[pair_id], rtol=1e-9):
+                errors.append(("get_reserves", pair_id, reserves))
+            # A zero-amount quote prices the pool at its own reserves; a torn read would not return 0.
+            quote = registry.quote_many(np.arange(pools), np.zeros(pools, dtype=np.int8), np.zeros(pools))
+            if not np.allclose(quote["amount_out"], 0, atol=1e-6):
+                errors.append(("quote_many", quote["amount_out"]))
+
+    writers = [threading.Thread(target=writer, args=(seed,)) for seed in range(4)]
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert errors == []
+    # Every swap is accounted for, and the pools are still on their curves.
+    final = [registry.get_reserves(pair_id) for pair_id in range(pools)]
+    final_a = np.array([reserves['tokenA'] for reserves in final])
+    final_b = np.array([reserves['tokenB'] for reserves in final])
+    assert np.allclose(final_a, initial_a + sum(a for a, _ in totals))
+    assert np.allclose(final_b, initial_b + sum(b for _, b in totals))
+    assert np.allclose(final_a * final_b, k)
+
+
+def test_growing_while_swapping_loses_no_swap():
+    registry = PoolRegistry(capacity=1)
+    first = registry.add_pool(1000.0, 1000.0)
+
+    def grow():
+        for _ in range(200):
+            registry.add_pool(10.0, 10.0)
+
+    thread = threading.Thread(target=grow)
+    thread.start()
+    for _ in range(200):
+        registry.swap_many([first], [TOKEN_A], [1.0])
+    thread.join()
+    assert len(registry) == 201
+    assert registry.get_reserves(first)['tokenA'] == pytest.approx(1200.0)
@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+import pytest
+
+from minima_dex import ExactDex, contract_amount_out, from_wei, get_amount_out, to_wei
+
+
+@pytest.mark.parametrize("amount, expected", [
+    (1, 10 ** 18),
+    ("1.5", 15 * 10 ** 17),
+    (0.1, 10 ** 17),
+    ("0.000000000000000001", 1),
+    # Digits beyond 18 places are truncated.
+    ("0.0000000000000000019", 1),
+    ("-2.25", -225 * 10 ** 16),
+    ("1e-18", 1),
+    (Decimal("3.000000000000000007"), 3 * 10 ** 18 + 7),
+])
+def test_to_wei(amount, expected):
+    assert to_wei(amount) == expected
+
+
+def test_from_wei_round_trips():
+    assert from_wei(to_wei("123.456789012345678901")) == Decimal("123.456789012345678901")
+    assert from_wei(to_wei("0.1234567890123456789")) == Decimal("0.123456789012345678")
+
+
+def test_get_amount_out_truncates_like_uint256():
+    # 1000 - floor(1_000_000 / 1100) = 1000 - 909
+    assert get_amount_out(100, 1000, 1000, 1_000_000) == 91
+    # A 30 bps fee prices floor(100 * 9970 / 10000) = 99 of the input.
+    assert get_amount_out(100, 1000, 1000, 1_000_000, fee_bps=30) == 1000 - 1_000_000 // 1099
+
+
+def test_exact_dex_swaps_step_by_step():
+    dex = ExactDex(1000, 1000)
+    assert dex.swap_tokens('tokenA', 100) == {"status": True, "amount_out": 91, "token_out": 'tokenB'}
+    assert dex.reserves == {'tokenA': 1100, 'tokenB': 909}
+    # 1100 - floor(1_000_000 / (909 + 500)) = 1100 - 709
+    assert dex.swap_tokens('tokenB', 500)["amount_out"] == 391
+    assert dex.reserves == {'tokenA': 709, 'tokenB': 1409}
+
+
+def test_a_zero_swap_pays_nothing_after_a_fee_swap():
+    dex = ExactDex(10 ** 6, 10 ** 6, fee_bps=100)
+    dex.swap_tokens('tokenA', 10 ** 5)
+    assert dex.k == dex.reserves['tokenA'] * dex.reserves['tokenB']
+    assert dex.swap_tokens('tokenB', 0)["amount_out"] == 0
+    assert dex.swap_tokens('tokenA', 0)["amount_out"] == 0
+
+
+def test_exact_dex_rejects_floats():
+    with pytest.raises(ValueError):
+        ExactDex(1000.0, 1000)
+    with pytest.raises(ValueError):
+        ExactDex(1000, 1000).swap_tokens('tokenA', 1.5)
+
+
+def test_contract_amount_out_follows_a_hand_computed_contract_trace():
+    # initializePool(1000, 1000): k = 1_000_000, balances A=1000, B=1000.
+    k = 1_000_000
+    # swap(A, 100): after transferFrom balanceOf(A) = 1100 is reserveIn, and
+    # amountOut = 1000 - 1_000_000 / (1100 + 100) = 1000 - 833 = 167.
+    assert contract_amount_out(100, 1000, 1000, k) == 167
+    # Balances are now A=1100, B=833. swap(B, 500): reserveIn = 1333,
+    # amountOut = 1100 - 1_000_000 / (1333 + 500) = 1100 - 545 = 555.
+    assert contract_amount_out(500, 833, 1100, k) == 555
+    # Balances are now A=545, B=1333. swap(A, 10): reserveIn = 555,
+    # 1333 - 1_000_000 / 565 = 1333 - 1769 underflows, so the swap reverts.
+    with pytest.raises(ValueError):
+        contract_amount_out(10, 545, 1333, k)
+
+
+def test_contract_pays_more_than_the_constant_product():
+    assert contract_amount_out(100, 1000, 1000, 1_000_000) > get_amount_out(100, 1000, 1000, 1_000_000)
@@ -0,0 +1,267 @@
+import os
+
+import pytest
+
+import minima_dex_history
+from app import create_app
+from minima_dex_history import CandleSeries, ReserveHistory
+
+DAY = 86400
+# Midnight, so minute, hour and day buckets all start here.
+T0 = 1_790_000_000 // DAY * DAY
+
+
+class Clock:
+    def __init__(self, now=T0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock(T0 + 3 * 3600)
+
+
+@pytest.fixture
+def history(tmp_path, clock):
+    history = ReserveHistory(str(tmp_path), clock=clock)
+    yield history
+    history.close()
+
+
+def record_prices(history, points, pair=("A", "B")):
+    """Records (time, reserve_a, price) points, so reserve_b = price * reserve_a."""
+    for timestamp, reserve_a, price in points:
+        history.record(*pair, reserve_a, price * reserve_a, timestamp=timestamp)
+
+
+def ohlcv(candle):
+    return candle["open"], candle["high"], candle["low"], candle["close"], candle["volume"], candle["updates"]
+
+
+def test_points_are_bucketed_per_interval(history):
+    record_prices(history, [(T0 + 10, 100, 1.0), (T0 + 70, 100, 1.0), (T0 + 130, 100, 1.0),
+                            (T0 + 400, 100, 1.0), (T0 + 3700, 100, 1.0)])
+    assert [c["time"] for c in history.candles("A", "B", "1m")] == [T0, T0 + 60, T0 + 120, T0 + 360, T0 + 3660]
+    assert [c["updates"] for c in history.candles("A", "B", "5m")] == [3, 1, 1]
+    assert [c["time"] for c in history.candles("A", "B", "5m")] == [T0, T0 + 300, T0 + 3600]
+    assert [c["updates"] for c in history.candles("A", "B", "1h")] == [4, 1]
+    assert [(c["time"], c["updates"]) for c in history.candles("A", "B", "1d")] == [(T0, 5)]
+
+
+def test_candles_hold_ohlc_and_reserve_volume(history):
+    record_prices(history, [(T0 + 1, 100, 2.0), (T0 + 2, 110, 3.0), (T0 + 3, 105, 1.5), (T0 + 4, 120, 2.5),
+                            (T0 + 61, 90, 4.0)])
+    first, second = history.candles("A", "B", "1m")
+    # The first point has nothing to measure a change against.
+    assert ohlcv(first) == (2.0, 3.0, 1.5, 2.5, 10 + 5 + 15, 4)
+    assert ohlcv(second) == (4.0, 4.0, 4.0, 4.0, 30, 1)
+    assert ohlcv(history.candles("A", "B", "1h")[0]) == (2.0, 4.0, 1.5, 4.0, 60, 5)
+
+
+def test_a_late_point_does_not_move_the_close(history):
+    record_prices(history, [(T0 + 100, 100, 1.0), (T0 + 110, 130, 3.0), (T0 + 105, 110, 2.0)])
+    candle = history.candles("A", "B", "1h")[0]
+    assert (candle["open"], candle["high"], candle["low"], candle["close"]) == (1.0, 3.0, 1.0, 3.0)
+    # Volume follows time order: 100 -> 110 -> 130, not 100 -> 130 -> 110.
+    assert candle["volume"] == 30
+
+
+def test_a_late_point_before_the_first_moves_the_open(history):
+    record_prices(history, [(T0 + 100, 100, 1.0), (T0 + 110, 100, 3.0), (T0 + 90, 100, 5.0)])
+    candle = history.candles("A", "B", "1h")[0]
+    assert (candle["open"], candle["close"]) == (5.0, 3.0)
+
+
+def test_a_late_point_in_an_earlier_candle_moves_volume_between_candles(history):
+    record_prices(history, [(T0 + 10, 100, 1.0), (T0 + 70, 150, 1.0), (T0 + 20, 140, 1.0)])
+    first, second = history.candles("A", "B", "1m")
+    assert (first["volume"], first["updates"], first["close"]) == (40, 2, 1.0)
+    assert second["volume"] == 10
+
+
+def test_a_point_older_than_the_volume_window_counts_no_volume(history, monkeypatch):
+    monkeypatch.setattr(minima_dex_history, "VOLUME_WINDOW", 2)
+    record_prices(history, [(T0 + 10 + i, 100 + i, 1.0) for i in range(5)] + [(T0 + 1, 500, 1.0)])
+    candle = history.candles("A", "B", "1m")[0]
+    assert (candle["volume"], candle["updates"]) == (4, 6)
+
+
+def test_expired_candles_are_dropped():
+    series = CandleSeries(60, retention=800)
+    for minute in range(20):
+        series.add(minute * 60, float(minute), 1.0)
+    # Dropped an eighth of the retention at a time, once the oldest is that far past it.
+    assert series.start[0] == 360
+    assert all(len(column) == 14 for column in series._columns())
+    assert series.range(None, 1140, 100)[-1]["close"] == 19.0
+    # A late point for an expired candle is not brought back.
+    series.add(0, 99.0, 1.0)
+    assert series.start[0] == 360
+
+
+def test_coarser_intervals_keep_what_finer_ones_expire(history, clock):
+    record_prices(history, [(T0 - 10 * DAY, 100, 1.0), (T0, 100, 2.0)])
+    assert [c["time"] for c in history.candles("A", "B", "1m")] == [T0]
+    assert [c["time"] for c in history.candles("A", "B", "1d")] == [T0 - 10 * DAY, T0]
+
+
+@pytest.fixture
+def hours(history):
+    record_prices(history, [(T0 + hour * 3600, 100, float(hour)) for hour in range(10)])
+    return history
+
+
+def test_range_without_start_returns_the_latest(hours, clock):
+    clock.now = T0 + 10 * 3600
+    assert [c["close"] for c in hours.candles("A", "B", "1h", limit=3)] == [7.0, 8.0, 9.0]
+    assert [c["close"] for c in hours.candles("A", "B", "1h", end=T0 + 4 * 3600, limit=2)] == [3.0, 4.0]
+    assert len(hours.candles("A", "B", "1h")) == 10
+
+
+def test_range_with_start_returns_the_earliest_from_it(hours, clock):
+    clock.now = T0 + 10 * 3600
+    assert [c["close"] for c in hours.candles("A", "B", "1h", start=T0 + 2 * 3600, limit=3)] == [2.0, 3.0, 4.0]
+    assert [c["close"] for c in hours.candles("A", "B", "1h", start=T0 + 5 * 3600, end=T0 + 6 * 3600)] == [5.0, 6.0]
+    assert hours.candles("A", "B", "1h", start=T0 + 20 * 3600) == []
+
+
+def test_unknown_pairs_have_no_history(history):
+    record_prices(history, [(T0, 100, 1.0)])
+    assert history.candles("B", "A") is None
+    assert history.candles("A", "C") is None
+
+
+def test_points_another_writer_appended_are_folded_in(tmp_path, clock):
+    reader = ReserveHistory(str(tmp_path), clock=clock)
+    writer = ReserveHistory(str(tmp_path), clock=clock)
+    record_prices(writer, [(T0 + 1, 100, 1.0)])
+    assert reader.candles("A", "B", "1m")[0]["updates"] == 1
+    record_prices(writer, [(T0 + 2, 100, 2.0), (T0 + 3, 100, 3.0)])
+    assert ohlcv(reader.candles("A", "B", "1m")[0])[:4] == (1.0, 3.0, 1.0, 3.0)
+    writer.close()
+    reader.close()
+
+
+def test_a_partly_written_point_waits_for_the_rest(history):
+    record_prices(history, [(T0 + 1, 100, 1.0)])
+    directory = history._pair_directory("A-B")
+    (path,) = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.points')]
+    point = minima_dex_history._POINT.pack(T0 + 2, 100, 200)
+    with open(path, 'ab') as f:
+        f.write(point[:10])
+    assert history.candles("A", "B", "1m")[0]["updates"] == 1
+    with open(path, 'ab') as f:
+        f.write(point[10:])
+    assert history.candles("A", "B", "1m")[0]["updates"] == 2
+
+
+def test_a_new_reader_starts_from_the_checkpoint(tmp_path, clock):
+    writer = ReserveHistory(str(tmp_path), clock=clock)
+    record_prices(writer, [(T0 + 10, 100, 1.0), (T0 + 20, 110, 3.0)])
+    expected = writer.candles("A", "B", "1m")
+    record_prices(writer, [(T0 + 30, 130, 2.0)])
+    assert os.path.exists(os.path.join(writer._pair_directory("A-B"), 'candles.bin'))
+
+    reader = ReserveHistory(str(tmp_path), clock=clock)
+    candle = reader.candles("A", "B", "1m")[0]
+    assert ohlcv(candle) == (1.0, 3.0, 1.0, 2.0, 30, 3)
+    assert expected[0]["updates"] == 2
+    writer.close()
+    reader.close()
+
+
+def test_folded_points_files_are_compacted_into_the_checkpoint(tmp_path, clock):
+    writer = ReserveHistory(str(tmp_path), clock=clock)
+    directory = writer._pair_directory("A-B")
+    for day in range(4):
+        clock.now = T0 + day * DAY
+        record_prices(writer, [(clock.now + 1, 100 + day, 1.0 + day)])
+    assert len([name for name in os.listdir(directory) if name.endswith('.points')]) == 4
+
+    writer.candles("A", "B", "1d")
+    # Today's and yesterday's files may still be written; older ones are in the checkpoint.
+    assert sorted(name for name in os.listdir(directory) if name.endswith('.points')) == [
+        f"{(T0 + 2 * DAY) // DAY}.points", f"{(T0 + 3 * DAY) // DAY}.points"]
+
+    clock.now += 60
+    record_prices(writer, [(clock.now, 110, 9.0)])
+    reader = ReserveHistory(str(tmp_path), clock=clock)
+    candles = reader.candles("A", "B", "1d")
+    assert [c["close"] for c in candles] == [1.0, 2.0, 3.0, 9.0]
+    assert [c["volume"] for c in candles] == [0, 1, 1, 8]
+    assert candles == writer.candles("A", "B", "1d")
+    writer.close()
+    reader.close()
+
+
+def test_a_reader_behind_a_compaction_reloads_the_checkpoint(tmp_path, clock):
+    writer = ReserveHistory(str(tmp_path), clock=clock)
+    reader = ReserveHistory(str(tmp_path), clock=clock)
+    record_prices(writer, [(T0 + 1, 100, 1.0)])
+    assert reader.candles("A", "B", "1d")[0]["updates"] == 1
+    clock.now = T0 + 1 * DAY
+    record_prices(writer, [(clock.now, 105, 2.0)])
+    clock.now = T0 + 3 * DAY
+    record_prices(writer, [(clock.now, 107, 3.0)])
+    writer.candles("A", "B", "1d")
+
+    assert [(c["close"], c["volume"]) for c in reader.candles("A", "B", "1d")] == [(1.0, 0), (2.0, 5), (3.0, 2)]
+    writer.close()
+    reader.close()
+
+
+def test_a_corrupt_checkpoint_is_ignored(tmp_path, clock):
+    writer = ReserveHistory(str(tmp_path), clock=clock)
+    record_prices(writer, [(T0 + 1, 100, 1.0), (T0 + 2, 100, 2.0)])
+    writer.candles("A", "B", "1m")
+    checkpoint = os.path.join(writer._pair_directory("A-B"), 'candles.bin')
+    with open(checkpoint, 'r+b') as f:
+        f.seek(20)
+        f.write(b'\xff\xff')
+
+    reader = ReserveHistory(str(tmp_path), clock=clock)
+    assert reader.candles("A", "B", "1m")[0]["updates"] == 2
+    writer.close()
+    reader.close()
+
+
+@pytest.fixture
+def client(tmp_path):
+    history = ReserveHistory(str(tmp_path))
+    record_prices(history, [(T0 + 60, 100, 1.0), (T0 + 120, 100, 2.0)])
+    history.close()
+    app = create_app({"RESERVE_HISTORY_DIR": str(tmp_path), "MARKETPLACE_DIR": None,
+                      "BRIDGE_QUEUE_PATH": str(tmp_path / "bridge.db")})
+    yield app.test_client()
+    app.extensions['services'].close()
+
+
+def test_the_route_returns_candles(client):
+    response = client.get("/api/dex/candles?token_a=A&token_b=B&interval=1m&limit=1")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["pair"], body["interval"]) == ("A-B", "1m")
+    assert [c["close"] for c in body["candles"]] == [2.0]
+
+
+@pytest.mark.parametrize("query", [
+    "token_a=A",
+    "token_a=A&token_b=B&interval=2m",
+    "token_a=A&token_b=B&start=yesterday",
+    "token_a=A&token_b=B&limit=1.5",
+    "token_a=A&token_b=B&limit=0",
+    "token_a=A&token_b=B&limit=5001",
+])
+def test_the_route_rejects_bad_queries(client, query):
+    response = client.get(f"/api/dex/candles?{query}")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_the_route_reports_pairs_without_history(client):
+    response = client.get("/api/dex/candles?token_a=B&token_b=A")
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "No reserve history for this token pair."}
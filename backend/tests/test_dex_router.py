@@ -0,0 +1,221 @@
+import itertools
+import threading
+
+import pytest
+
+from app import DEFAULT_CONFIG, Services
+from firestore_stub import StubFirestoreClient
+from minima_dex_router import RouteIndex
+from providers import ProviderUnavailable
+
+POOLS = [
+    ("minima", "custom-token", 1000, 1000),
+    ("minima", "wMINIMA", 5000, 5000),
+    ("wMINIMA", "custom-token", 8000, 9000),
+    ("wMINIMA", "USDT", 4000, 2000),
+    ("USDT", "custom-token", 3000, 3500),
+]
+
+
+def amount_out(reserve_in, reserve_out, amount_in):
+    return reserve_out * amount_in / (reserve_in + amount_in)
+
+
+def brute_force_best(pools, token_in, token_out, amount_in, max_hops):
+    """Tries every simple path of at most max_hops pools."""
+    best = None
+
+    def walk(token, amount, path, used):
+        nonlocal best
+        if token == token_out:
+            if best is None or amount > best[0]:
+                best = (amount, path)
+            return
+        if len(used) == max_hops:
+            return
+        for i, (token_a, token_b, reserve_a, reserve_b) in enumerate(pools):
+            if token not in (token_a, token_b) or i in used:
+                continue
+            nxt, reserve_in, reserve_out = ((token_b, reserve_a, reserve_b) if token == token_a
+                                            else (token_a, reserve_b, reserve_a))
+            if nxt in path:
+                continue
+            walk(nxt, amount_out(reserve_in, reserve_out, amount), path + [nxt], used + [i])
+
+    walk(token_in, amount_in, [token_in], [])
+    return best
+
+
+@pytest.fixture
+def index():
+    index = RouteIndex()
+    index.load([dict(zip(("token_a", "token_b", "reserve_a", "reserve_b"), pool)) for pool in POOLS])
+    return index
+
+
+TOKENS = ["minima", "custom-token", "wMINIMA", "USDT"]
+
+
+@pytest.mark.parametrize("token_in, token_out", list(itertools.permutations(TOKENS, 2)))
+@pytest.mark.parametrize("max_hops", [1, 2, 3])
+def test_best_route_matches_brute_force(index, token_in, token_out, max_hops):
+    route = index.best_route(token_in, token_out, 100, max_hops=max_hops)
+    best = brute_force_best(POOLS, token_in, token_out, 100, max_hops)
+    if best is None:
+        assert route is None
+        return
+    assert route["amount_out"] == pytest.approx(best[0])
+    assert route["path"][0] == token_in and route["path"][-1] == token_out
+    assert len(route["pools"]) == len(route["path"]) - 1 <= max_hops
+
+
+@pytest.mark.parametrize("token_in, token_out", list(itertools.permutations(TOKENS, 2)))
+def test_best_route_reports_the_amount_after_every_hop(index, token_in, token_out):
+    route = index.best_route(token_in, token_out, 100)
+    pools = {f"{a}-{b}": (a, b, reserve_a, reserve_b) for a, b, reserve_a, reserve_b in POOLS}
+    amount = 100
+    for token, key, hop_amount in zip(route["path"][:-1], route["pools"], route["amounts"], strict=True):
+        token_a, _, reserve_a, reserve_b = pools[key]
+        amount = (amount_out(reserve_a, reserve_b, amount) if token == token_a
+                  else amount_out(reserve_b, reserve_a, amount))
+        assert hop_amount == pytest.approx(amount)
+    assert route["amounts"][-1] == route["amount_out"]
+
+
+def test_update_pool_reprices_routes(index):
+    direct = index.best_route("minima", "custom-token", 100, max_hops=1)
+    index.update_pool("minima", "custom-token", 1000, 2000)
+    updated = index.best_route("minima", "custom-token", 100, max_hops=1)
+    assert updated["amount_out"] == pytest.approx(2 * direct["amount_out"])
+    assert len(index) == len(POOLS)
+
+
+def test_remove_pool_drops_its_routes(index):
+    index.remove_pool("minima", "custom-token")
+    route = index.best_route("minima", "custom-token", 100, max_hops=3)
+    assert "minima-custom-token" not in route["pools"]
+    index.remove_pool("minima", "wMINIMA")
+    assert index.best_route("minima", "custom-token", 100) is None
+
+
+def test_load_skips_malformed_documents():
+    index = RouteIndex()
+    index.load([{"token_a": "a", "token_b": "b", "reserve_a": 1, "reserve_b": 2},
+                {"token_a": "a", "token_b": "a", "reserve_a": 1, "reserve_b": 2},
+                {"token_a": "a", "reserve_a": 1}])
+    assert len(index) == 1
+
+
+@pytest.mark.parametrize("kwargs", [dict(amount_in=0), dict(amount_in=10, max_hops=0)])
+def test_best_route_rejects_bad_arguments(index, kwargs):
+    with pytest.raises(ValueError):
+        index.best_route("minima", "custom-token", **kwargs)
+
+
+def test_concurrent_updates_never_price_a_mixed_pair():
+    # Every update keeps reserve_b == 2 * reserve_a, so a one-hop quote for 1 token
+    # is always 2 * ra / (ra + 1); mixing two updates would break that relation.
+    index = RouteIndex()
+    index.update_pool("a", "b", 10.0, 20.0)
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        for i in range(20_000):
+            reserve_a = 10.0 if i % 2 else 1000.0
+            index.update_pool("a", "b", reserve_a, 2 * reserve_a)
+        stop.set()
+
+    def reader():
+        while not stop.is_set():
+            out = index.best_route("a", "b", 1.0, max_hops=1)["amount_out"]
+            if out != pytest.approx(2 * 10 / 11) and out != pytest.approx(2 * 1000 / 1001):
+                errors.append(out)
+
+    threads = [threading.Thread(target=writer), threading.Thread(target=reader)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_routes_can_be_searched_while_pools_are_added_and_removed():
+    index = RouteIndex()
+    index.update_pool("A", "B", 1000.0, 1000.0)
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        for i in range(3000):
+            # New intermediate tokens grow the neighbor maps of A and B mid-search.
+            index.update_pool("A", f"m{i}", 1000.0, 1000.0)
+            index.update_pool(f"m{i}", "B", 1000.0, 1000.0)
+            if i % 3 == 0:
+                index.remove_pool("A", f"m{i}")
+        stop.set()
+
+    def reader():
+        try:
+            while not stop.is_set():
+                route = index.best_route("A", "B", 10.0)
+                if route is None or route["path"] != ["A", "B"]:
+                    errors.append(route)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(index) == 1 + 3000 + 2000
+
+
+class FlakyFirestore(StubFirestoreClient):
+    """A stub client whose collection queries fail while `down` is set."""
+
+    down = True
+
+    def _list(self, path):
+        if FlakyFirestore.down:
+            raise ConnectionError("firestore unavailable")
+        return super()._list(path)
+
+
+def test_route_index_is_retried_after_a_failed_load(tmp_path):
+    FlakyFirestore.down = True
+    services = Services(dict(DEFAULT_CONFIG, FIRESTORE_CLIENT_FACTORY=FlakyFirestore, PROVIDER_RETRY_INTERVAL=0,
+                             RESERVE_HISTORY_DIR=str(tmp_path)))
+    services.dex.update_reserves("minima", "wMINIMA", 5000, 5000)
+    with pytest.raises(ProviderUnavailable):
+        services.route_index
+    FlakyFirestore.down = False
+    assert len(services.route_index) == 1
+    assert services.route_index.best_route("minima", "wMINIMA", 100) is not None
+
+
+class RacingFirestore(StubFirestoreClient):
+    """A stub client that runs `during_list` after a collection query has read its documents."""
+
+    during_list = None
+
+    def _list(self, path):
+        documents = super()._list(path)
+        if self.during_list:
+            self.during_list()
+        return documents
+
+
+def test_reserve_updates_during_the_route_index_load_are_applied(tmp_path):
+    services = Services(dict(DEFAULT_CONFIG, FIRESTORE_CLIENT_FACTORY=RacingFirestore,
+                             RESERVE_HISTORY_DIR=str(tmp_path)))
+    services.dex.update_reserves("minima", "wMINIMA", 5000, 5000)
+    services.dex.db.during_list = lambda: services.dex.update_reserves("minima", "wMINIMA", 5000, 20000)
+    index = services.route_index
+    services.dex.db.during_list = None
+    assert index.best_route("minima", "wMINIMA", 100)["amount_out"] > 300
+    services.dex.update_reserves("minima", "USDT", 100, 100)
+    assert len(index) == 2
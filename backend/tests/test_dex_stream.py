@@ -0,0 +1,102 @@
+import json
+import threading
+
+import pytest
+
+from app import create_app
+from firestore_stub import StubFirestoreClient
+from minima_dex_stream import ReserveBroadcaster, sse_event
+
+
+def test_a_burst_is_coalesced_to_the_latest_update_per_pair():
+    broadcaster = ReserveBroadcaster()
+    subscription = broadcaster.subscribe()
+    for reserve in range(100):
+        broadcaster.publish("A", "B", reserve, 1000 - reserve)
+    broadcaster.publish("C", "D", 5, 6)
+    broadcaster.publish("A", "B", 500, 500)
+    updates = subscription.get(timeout=0)
+    # Delivered in the order each pair last changed.
+    assert [(u["pair"], u["reserve_a"]) for u in updates] == [("C-D", 5), ("A-B", 500)]
+    assert subscription.get(timeout=0) == []
+
+
+def test_subscribers_only_get_their_pairs():
+    broadcaster = ReserveBroadcaster()
+    one = broadcaster.subscribe(["A-B"])
+    two = broadcaster.subscribe(["C-D", "A-B", "C-D"])
+    everything = broadcaster.subscribe()
+    broadcaster.publish("A", "B", 1, 2)
+    broadcaster.publish("C", "D", 3, 4)
+    broadcaster.publish("B", "A", 5, 6)
+    assert [u["pair"] for u in one.get(timeout=0)] == ["A-B"]
+    assert [u["pair"] for u in two.get(timeout=0)] == ["A-B", "C-D"]
+    assert [u["pair"] for u in everything.get(timeout=0)] == ["A-B", "C-D", "B-A"]
+
+
+def test_closing_unsubscribes_and_wakes_the_reader():
+    broadcaster = ReserveBroadcaster()
+    subscription = broadcaster.subscribe(["A-B", "C-D"])
+    other = broadcaster.subscribe(["A-B"])
+    assert broadcaster.subscriber_count() == 2
+    woke = []
+    reader = threading.Thread(target=lambda: woke.append(subscription.get(timeout=10)))
+    reader.start()
+    subscription.close()
+    reader.join(timeout=2)
+    assert woke == [[]]
+    assert broadcaster.subscriber_count() == 1
+    broadcaster.publish("C", "D", 1, 2)
+    assert subscription.get(timeout=0) == []
+    assert broadcaster._topics.keys() == {"A-B"}
+    other.close()
+    assert broadcaster.subscriber_count() == 0
+
+
+def test_sse_events_are_framed():
+    assert sse_event({"pair": "A-B", "reserve_a": 1}) == 'event: reserves\ndata: {"pair": "A-B", "reserve_a": 1}\n\n'
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({"FIRESTORE_CLIENT_FACTORY": StubFirestoreClient, "RESERVE_HISTORY_DIR": str(tmp_path),
+                      "MARKETPLACE_DIR": None, "BRIDGE_QUEUE_PATH": str(tmp_path / "bridge.db")})
+    yield app
+    app.extensions['services'].close()
+
+
+def read_event(chunks):
+    """Reads the next SSE message from a streamed response, skipping keep-alive comments."""
+    for chunk in chunks:
+        text = chunk.decode()
+        if text.startswith("event:"):
+            event, data = text.strip().split("\n")
+            return event[len("event: "):], json.loads(data[len("data: "):])
+    return None
+
+
+def test_reserve_updates_stream_through_the_route(app):
+    services = app.extensions['services']
+    services.dex.update_reserves("A", "B", 100, 200)
+    response = app.test_client().get("/api/dex/reserves/stream?token_a=A&token_b=B", buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    chunks = response.iter_encoded()
+    # The current reserves come first.
+    event, data = read_event(chunks)
+    assert (event, data["pair"], data["reserve_a"], data["reserve_b"]) == ("reserves", "A-B", 100, 200)
+
+    services.dex.update_reserves("C", "D", 1, 1)
+    services.dex.update_reserves("A", "B", 150, 180)
+    assert read_event(chunks)[1] == {"pair": "A-B", "token_a": "A", "token_b": "B", "reserve_a": 150, "reserve_b": 180}
+    assert services.reserve_broadcaster.subscriber_count() == 1
+
+    # A disconnect closes the generator, which unsubscribes.
+    response.close()
+    assert services.reserve_broadcaster.subscriber_count() == 0
+
+
+def test_the_stream_needs_both_tokens(app):
+    response = app.test_client().get("/api/dex/reserves/stream?token_a=A")
+    assert response.status_code == 400
+    assert app.extensions['services'].reserve_broadcaster.subscriber_count() == 0
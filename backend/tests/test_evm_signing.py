@@ -0,0 +1,60 @@
+import pytest
+import rlp
+from eth_abi import encode
+from eth_account import Account
+
+from evm_transactions import MINT_SELECTOR, MintBinding, TransactionSigner, _rlp_list
+
+# A well-known local development key; never use it on a real network.
+PRIVATE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+CONTRACT = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+RECIPIENT = "0x742d35cc4a95d71c0f4a5e44007b819973e73e77"
+
+
+@pytest.mark.parametrize("items", [
+    [],
+    [0],
+    [1, 127, 128, 255, 256],
+    [b"", b"\x00", b"\x7f", b"\x80", b"dog"],
+    [b"x" * 55, b"y" * 56, b"z" * 1024],
+    [2 ** 256 - 1, 10 ** 18, bytes(20)],
+    [b"a"] * 60,
+])
+def test_rlp_list_matches_the_reference_encoder(items):
+    assert _rlp_list(items) == rlp.encode(items)
+
+
+def test_mint_calldata_matches_the_abi_encoder():
+    calldata = MintBinding.encode(RECIPIENT, 15 * 10 ** 17)
+    assert calldata == MINT_SELECTOR + encode(["address", "uint256"], [RECIPIENT, 15 * 10 ** 17])
+
+
+@pytest.mark.parametrize("amount", [-1, 2 ** 256])
+def test_mint_calldata_rejects_amounts_outside_uint256(amount):
+    with pytest.raises(ValueError):
+        MintBinding.encode(RECIPIENT, amount)
+
+
+@pytest.mark.parametrize("fast", [True, False])
+@pytest.mark.parametrize("nonce, gas_price, chain_id", [(0, 10 ** 9, 1337), (300, 25 * 10 ** 9, 1), (2 ** 20, 1, 137)])
+def test_signed_mint_is_byte_for_byte_what_eth_account_produces(fast, nonce, gas_price, chain_id):
+    signer = TransactionSigner(PRIVATE_KEY, chain_id)
+    if not fast:
+        signer._fast_key = None  # sign through eth_keys, as without coincurve
+    mint = MintBinding(signer, CONTRACT, gas_limit=100_000)
+    tx_hash, raw = mint.sign_mint(RECIPIENT, 10 ** 18, nonce, gas_price)
+
+    expected = Account.sign_transaction({
+        "nonce": nonce, "gasPrice": gas_price, "gas": 100_000, "to": CONTRACT, "value": 0,
+        "data": MintBinding.encode(RECIPIENT, 10 ** 18), "chainId": chain_id
+    }, PRIVATE_KEY)
+    # eth_account renamed rawTransaction to raw_transaction in 0.12.
+    assert raw == bytes(getattr(expected, "raw_transaction", None) or expected.rawTransaction)
+    assert tx_hash == "0x" + bytes(expected.hash).hex()
+    assert Account.recover_transaction(raw) == signer.address
+
+
+def test_signer_rejects_malformed_addresses():
+    mint_signer = TransactionSigner(PRIVATE_KEY, 1337)
+    with pytest.raises(ValueError):
+        MintBinding(mint_signer, "0x1234", gas_limit=100_000)
@@ -0,0 +1,161 @@
+import itertools
+import random
+import threading
+
+import pytest
+
+from minima_nft_marketplace import NFTMarketplace, SortedKeyList
+
+
+class CountingDict(dict):
+    """A listings dict that counts lookups, to bound how much of the marketplace a page walks."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.lookups = 0
+
+    def get(self, key, default=None):
+        self.lookups += 1
+        return super().get(key, default)
+
+    def __getitem__(self, key):
+        self.lookups += 1
+        return super().__getitem__(key)
+
+
+@pytest.fixture
+def marketplace():
+    rng = random.Random(3)
+    market = NFTMarketplace()
+    owners = [f"MxOwner{i}" for i in range(5)]
+    for i in range(400):
+        market.list_nft_for_sale(f"NFT{i}", rng.choice(owners), round(rng.uniform(1, 100), 2))
+    for number in rng.sample(range(1, 401), 300):
+        listing_id = f"LST_{number}"
+        market.place_bid(listing_id, "MxBidder", 150.0)
+        market.accept_highest_bid(listing_id, market.listings[listing_id].owner)
+    return market
+
+
+def all_pages(market, **query):
+    listings, cursor = [], None
+    for _ in range(1000):
+        page = market.query_listings(cursor=cursor, **query)
+        listings += page["listings"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return listings
+    raise AssertionError("paging did not terminate")
+
+
+def expected(market, status=None, owner=None, min_price=None, max_price=None, sort='recency', order='desc'):
+    rows = [(int(lid[4:]), lid, listing) for lid, listing in market.listings.items()
+            if (status is None or listing.status == status) and (owner is None or listing.owner == owner)
+            and (min_price is None or listing.price >= min_price) and (max_price is None or listing.price <= max_price)]
+    if sort == 'price':
+        rows = [row for row in rows if row[2].status == 'for_sale']
+        rows.sort(key=lambda row: (row[2].price, row[0]), reverse=order == 'desc')
+    else:
+        rows.sort(key=lambda row: row[0], reverse=order == 'desc')
+    return [lid for _, lid, _ in rows]
+
+
+QUERIES = [dict(zip(("status", "owner", "min_price", "sort", "order"), values)) for values in itertools.product(
+    (None, 'for_sale', 'sold'), (None, "MxOwner2"), (None, 40.0), ('recency', 'price'), ('desc', 'asc'))
+    if not (values[3] == 'price' and values[0] == 'sold')]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_pages_cover_every_match_once_in_order(marketplace, query):
+    listings = all_pages(marketplace, limit=7, **query)
+    assert [listing["id"] for listing in listings] == expected(marketplace, **query)
+
+
+def test_sparse_status_page_walks_only_its_status(marketplace):
+    marketplace.listings = CountingDict(marketplace.listings)
+    page = marketplace.query_listings(status='for_sale', limit=10)
+    assert len(page["listings"]) == 10
+    # Driven by the status index, a page looks up its own listings plus the one that shows there is more.
+    assert marketplace.listings.lookups <= 2 * 11
+
+
+def test_owner_page_walks_only_that_owner(marketplace):
+    marketplace.listings = CountingDict(marketplace.listings)
+    page = marketplace.query_listings(owner="MxOwner2", limit=5)
+    assert [listing["owner"] for listing in page["listings"]] == ["MxOwner2"] * 5
+    assert marketplace.listings.lookups <= 2 * 6
+
+
+def test_status_changes_move_listings_between_status_pages(marketplace):
+    for_sale = expected(marketplace, status='for_sale')
+    listing_id = for_sale[0]
+    marketplace.place_bid(listing_id, "MxBidder", 200.0)
+    marketplace.accept_highest_bid(listing_id, marketplace.listings[listing_id].owner)
+    assert [listing["id"] for listing in all_pages(marketplace, status='for_sale', limit=50)] == for_sale[1:]
+    assert listing_id in [listing["id"] for listing in all_pages(marketplace, status='sold', limit=50)]
+
+
+def test_index_walks_take_no_lock(marketplace):
+    results = []
+
+    def read():
+        results.append(marketplace.query_listings(status='for_sale', limit=5))
+        results.append(marketplace.query_listings(sort='price', limit=5))
+        results.append(marketplace.browse_by_price(limit=5))
+        results.append(marketplace.get_listings_by_status('sold'))
+
+    with marketplace._index_lock:
+        reader = threading.Thread(target=read)
+        reader.start()
+        reader.join(5)
+        assert not reader.is_alive()
+    assert [len(result) for result in results] == [2, 2, 5, 300]
+
+
+def test_index_walks_survive_sales_reshaping_the_buckets(monkeypatch):
+    # Tiny buckets, so sales split and drop buckets while the readers walk them.
+    monkeypatch.setattr(SortedKeyList, "LOAD", 2)
+    market = NFTMarketplace()
+    for i in range(600):
+        market.list_nft_for_sale(f"NFT{i}", "MxOwner", float(i % 37))
+    stop = threading.Event()
+    errors = []
+
+    def seller():
+        for number in range(1, 601, 2):
+            market.place_bid(f"LST_{number}", "MxBidder", 100.0)
+            market.accept_highest_bid(f"LST_{number}", "MxOwner")
+        stop.set()
+
+    def reader():
+        try:
+            while not stop.is_set():
+                prices = [listing["price"] for listing in market.query_listings(sort='price', order='asc',
+                                                                                limit=100)["listings"]]
+                numbers = [int(listing["id"][4:]) for listing in market.query_listings(status='sold',
+                                                                                       limit=100)["listings"]]
+                if prices != sorted(prices) or numbers != sorted(numbers, reverse=True):
+                    errors.append((prices, numbers))
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=seller)] + [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(market.listings_by_status['sold']) == len(market.price_index) == 300
+    assert list(market.price_index) == sorted(market.price_index)
+
+
+def test_unknown_status_returns_an_empty_page(marketplace):
+    assert marketplace.query_listings(status='burned') == {"listings": [], "next_cursor": None}
+
+
+@pytest.mark.parametrize("kwargs", [dict(sort='newest'), dict(order='up'), dict(limit=0),
+                                    dict(sort='price', status='sold'), dict(cursor='not-a-cursor')])
+def test_invalid_queries_raise(marketplace, kwargs):
+    with pytest.raises(ValueError):
+        marketplace.query_listings(**kwargs)
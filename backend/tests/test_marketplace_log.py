@@ -0,0 +1,223 @@
+import os
+import threading
+
+import pytest
+
+from app import DEFAULT_CONFIG, Services
+from minima_marketplace_log import CorruptLogError, DurableMarketplace, _list_files, load_snapshot, read_segment
+from minima_nft_marketplace import NFTMarketplace
+
+
+def state(market):
+    return {listing_id: (listing.token_id, listing.owner, listing.price, listing.status,
+                         market.get_highest_bid(listing_id))
+            for listing_id, listing in market.listings.items()}
+
+
+def trade(market, count=20):
+    for i in range(count):
+        market.list_nft_for_sale(f"NFT{i}", f"MxOwner{i % 3}", 10.0 + i)
+    for i in range(1, count + 1, 2):
+        market.place_bid(f"LST_{i}", "MxBidder", 50.0 + i)
+    for i in range(1, count + 1, 4):
+        market.accept_highest_bid(f"LST_{i}", market.listings[f"LST_{i}"].owner)
+
+
+def segments(directory):
+    return [path for _, path in _list_files(str(directory), 'events-', '.log')]
+
+
+@pytest.mark.parametrize("snapshot_every", [None, 7])
+def test_state_survives_a_restart(tmp_path, snapshot_every):
+    market = DurableMarketplace(str(tmp_path), snapshot_every=snapshot_every, fsync=False)
+    trade(market)
+    expected = state(market)
+    market.close()
+
+    recovered = DurableMarketplace(str(tmp_path), snapshot_every=snapshot_every, fsync=False)
+    assert state(recovered) == expected
+    assert recovered.next_listing_id == market.next_listing_id
+    # New events continue the log where it stopped.
+    recovered.list_nft_for_sale("NFT-after", "MxOwner9", 5.0)
+    recovered.close()
+    assert "LST_21" in state(DurableMarketplace(str(tmp_path), fsync=False))
+
+
+def test_snapshot_replaces_older_segments(tmp_path):
+    market = DurableMarketplace(str(tmp_path), snapshot_every=None, fsync=False)
+    trade(market)
+    market.snapshot()
+    market.place_bid("LST_2", "MxLate", 99.0)
+    market.close()
+    assert len(_list_files(str(tmp_path), 'snapshot-', '.bin')) == 1
+    assert len(segments(tmp_path)) == 1
+    recovered = DurableMarketplace(str(tmp_path), fsync=False)
+    assert recovered.get_highest_bid("LST_2") == {"bidder": "MxLate", "amount": 99.0}
+
+
+def test_torn_tail_is_truncated_and_earlier_events_kept(tmp_path):
+    market = DurableMarketplace(str(tmp_path), snapshot_every=None, fsync=False)
+    trade(market, count=5)
+    market.close()
+    path = segments(tmp_path)[-1]
+    records = list(read_segment(path))
+    intact_end = records[-2][3]
+    # Crash in the middle of writing the last record.
+    with open(path, 'r+b') as f:
+        f.truncate(records[-1][3] - 3)
+
+    recovered = DurableMarketplace(str(tmp_path), snapshot_every=None, fsync=False)
+    assert os.path.getsize(path) == intact_end
+    assert recovered.replayed_to == records[-2][0]
+    # The last event was the accept of LST_5; everything before it is back.
+    assert recovered.listings["LST_5"].status == 'for_sale'
+    assert recovered.get_highest_bid("LST_5")["amount"] == 55.0
+    # Appends after the truncation are readable on the next start.
+    recovered.accept_highest_bid("LST_5", recovered.listings["LST_5"].owner)
+    recovered.close()
+    assert DurableMarketplace(str(tmp_path), fsync=False).listings["LST_5"].status == 'sold'
+
+
+def test_a_corrupt_record_before_the_tail_refuses_to_start(tmp_path):
+    market = DurableMarketplace(str(tmp_path), snapshot_every=None, fsync=False)
+    trade(market, count=5)
+    market.close()
+    path = segments(tmp_path)[-1]
+    records = list(read_segment(path))
+    size = os.path.getsize(path)
+    with open(path, 'r+b') as f:
+        f.seek(records[2][3] - 1)
+        f.write(b'\xff')
+    with pytest.raises(CorruptLogError):
+        DurableMarketplace(str(tmp_path), snapshot_every=None, fsync=False)
+    # The intact records after the damage are left for an operator to recover.
+    assert os.path.getsize(path) == size
+
+
+def test_a_torn_tail_in_an_older_segment_refuses_to_start(tmp_path):
+    market = DurableMarketplace(str(tmp_path), snapshot_every=None, fsync=False)
+    trade(market, count=5)
+    market.log.rotate()
+    market.list_nft_for_sale("NFT-next", "MxOwner", 1.0)
+    market.close()
+    older = segments(tmp_path)[0]
+    with open(older, 'r+b') as f:
+        f.truncate(os.path.getsize(older) - 3)
+    with pytest.raises(CorruptLogError):
+        DurableMarketplace(str(tmp_path), snapshot_every=None, fsync=False)
+
+
+def test_concurrent_writers_replay_to_the_same_state(tmp_path):
+    market = DurableMarketplace(str(tmp_path), snapshot_every=50, fsync=False)
+    for i in range(40):
+        market.list_nft_for_sale(f"NFT{i}", f"MxOwner{i}", 10.0)
+
+    def writer(worker):
+        for round_ in range(25):
+            for i in range(worker, 40, 4):
+                market.place_bid(f"LST_{i + 1}", f"MxBidder{worker}", 11.0 + round_)
+        for i in range(worker, 40, 8):
+            market.accept_highest_bid(f"LST_{i + 1}", f"MxOwner{i}")
+        market.list_nft_for_sale(f"NFT-w{worker}", "MxLate", 5.0)
+
+    threads = [threading.Thread(target=writer, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    expected = state(market)
+    market.close()
+    assert state(DurableMarketplace(str(tmp_path), fsync=False)) == expected
+
+
+class FailingFile:
+    """Wraps a segment file so its next write fails after writing part of the data."""
+
+    def __init__(self, file):
+        self._file = file
+
+    def write(self, data):
+        self._file.write(data[:5])
+        raise OSError("disk full")
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def test_a_failed_commit_keeps_its_records(tmp_path):
+    market = DurableMarketplace(str(tmp_path), snapshot_every=None, fsync=False)
+    market.list_nft_for_sale("NFT1", "MxOwner", 10.0)
+    market.log._file = FailingFile(market.log._file)
+    with pytest.raises(OSError):
+        market.place_bid("LST_1", "MxBidder", 20.0)
+    # The next commit writes the failed record too, after cutting off its partial write.
+    market.place_bid("LST_1", "MxBidder2", 30.0)
+    expected = state(market)
+    market.close()
+    recovered = DurableMarketplace(str(tmp_path), fsync=False)
+    assert state(recovered) == expected
+    assert recovered.listings["LST_1"].bid_count == 2
+
+
+def test_snapshots_are_taken_off_the_writing_thread(tmp_path):
+    market = DurableMarketplace(str(tmp_path), snapshot_every=5, fsync=False)
+    threads = []
+    take = market._snapshot
+    market._snapshot = lambda: threads.append(threading.current_thread()) or take()
+    trade(market)
+    expected = state(market)
+    market.close()
+    assert threads and threading.current_thread() not in threads
+    assert _list_files(str(tmp_path), 'snapshot-', '.bin')
+    assert state(DurableMarketplace(str(tmp_path), fsync=False)) == expected
+
+
+def test_a_snapshot_holds_the_state_it_copied(tmp_path):
+    market = DurableMarketplace(str(tmp_path), snapshot_every=None, fsync=False)
+    trade(market)
+    expected = state(market)
+    listing_lock = market._listing_lock
+    changed = []
+
+    def change_while_encoding(listing_id):
+        # Runs once the listings are copied, before the encoder reads the first one.
+        if market._preserved is not None and not changed:
+            changed.append(listing_id)
+            market.place_bid("LST_2", "MxDuring", 500.0)
+            market.accept_highest_bid("LST_3", market.listings["LST_3"].owner)
+            market.list_nft_for_sale("NFT-during", "MxOwner", 1.0)
+        return listing_lock(listing_id)
+
+    market._listing_lock = change_while_encoding
+    market.snapshot()
+    market.close()
+    assert changed
+    restored = NFTMarketplace()
+    [(_, path)] = _list_files(str(tmp_path), 'snapshot-', '.bin')
+    load_snapshot(path, restored)
+    assert state(restored) == expected
+    assert state(DurableMarketplace(str(tmp_path), fsync=False)) == state(market)
+
+
+def test_unreadable_snapshot_falls_back_to_the_log(tmp_path):
+    market = DurableMarketplace(str(tmp_path), snapshot_every=None, fsync=False)
+    trade(market, count=5)
+    expected = state(market)
+    market.close()
+    with open(os.path.join(str(tmp_path), "snapshot-99999999999999999999.bin"), 'wb') as f:
+        f.write(b'not a snapshot')
+    assert state(DurableMarketplace(str(tmp_path), fsync=False)) == expected
+
+
+def test_app_marketplace_is_durable(tmp_path):
+    config = dict(DEFAULT_CONFIG, MARKETPLACE_DIR=str(tmp_path / "marketplace"))
+    market = Services(config).marketplace
+    assert isinstance(market, DurableMarketplace)
+    market.list_nft_for_sale("NFT1", "MxOwner", 12.5)
+    market.close()
+    assert Services(config).marketplace.listings["LST_1"].price == 12.5
+
+
+def test_app_marketplace_can_stay_in_memory():
+    market = Services(dict(DEFAULT_CONFIG, MARKETPLACE_DIR=None)).marketplace
+    assert type(market) is NFTMarketplace
@@ -0,0 +1,94 @@
+import pytest
+
+from metrics import Registry, upstream_timer, UPSTREAM_LATENCY
+
+
+def sample_lines(text):
+    return [line for line in text.splitlines() if not line.startswith("#")]
+
+
+def test_counters_render_with_help_type_and_total():
+    registry = Registry()
+    served = registry.counter("requests", "Requests served.", ("route",))
+    served.labels("/a").inc()
+    served.labels("/a").inc(2)
+    served.labels("/b").inc(0.5)
+    assert registry.render() == (
+        "# HELP requests_total Requests served.\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{route="/a"} 3\n'
+        'requests_total{route="/b"} 0.5\n')
+
+
+def test_histograms_render_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0, 0.5))
+    for value in (0.05, 0.1, 0.3, 0.7, 2.0):
+        latency.observe(value)
+    assert sample_lines(registry.render()) == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="0.5"} 3',
+        'latency_seconds_bucket{le="1"} 4',
+        'latency_seconds_bucket{le="+Inf"} 5',
+        "latency_seconds_count 5",
+        "latency_seconds_sum 3.15",
+    ]
+    assert "# TYPE latency_seconds histogram" in registry.render()
+
+
+def test_histogram_buckets_carry_the_other_labels():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(1.0,))
+    with latency.labels("/a").time():
+        pass
+    assert sample_lines(registry.render())[:2] == ['latency_seconds_bucket{route="/a",le="1"} 1',
+                                                   'latency_seconds_bucket{route="/a",le="+Inf"} 1']
+
+
+def test_label_values_and_help_are_escaped():
+    registry = Registry()
+    registry.counter("events", 'Events\\by "kind"\nand more.', ("kind",)).labels('a "b"\\c\nd').inc()
+    lines = registry.render().splitlines()
+    assert lines[0] == '# HELP events_total Events\\\\by \\"kind\\"\\nand more.'
+    assert lines[2] == 'events_total{kind="a \\"b\\"\\\\c\\nd"} 1'
+
+
+def test_collected_metrics_are_read_at_render():
+    registry = Registry()
+    depth = []
+    registry.collected("queue_depth", "Items waiting.", labels=("queue",), collect=lambda: [(("q",), len(depth))])
+    registry.collected("hits", "Cache hits.", "counter", collect=lambda: [((), 7)])
+    depth.extend([1, 2])
+    assert sample_lines(registry.render()) == ['queue_depth{queue="q"} 2', "hits_total 7"]
+    assert "# TYPE hits_total counter" in registry.render()
+
+
+def test_a_failing_collector_is_skipped():
+    registry = Registry()
+    registry.collected("broken", "Fails.", collect=lambda: 1 / 0)
+    registry.counter("ok", "Works.").inc()
+    assert sample_lines(registry.render()) == ["ok_total 1"]
+
+
+def test_registering_again_returns_the_same_metric_or_raises():
+    registry = Registry()
+    counter = registry.counter("requests", "Requests.", ("route",))
+    assert registry.counter("requests", "Requests.", ("route",)) is counter
+    with pytest.raises(ValueError):
+        registry.counter("requests", "Requests.", ("method",))
+    with pytest.raises(ValueError):
+        registry.histogram("requests", "Requests.", ("route",))
+    with pytest.raises(ValueError):
+        counter.labels("/a", "GET")
+
+
+def test_upstream_timer_records_the_outcome():
+    ok = UPSTREAM_LATENCY.labels("test", "call", "ok")
+    error = UPSTREAM_LATENCY.labels("test", "call", "error")
+    ok_before, error_before = ok.count, error.count
+    with upstream_timer("test", "call"):
+        pass
+    with pytest.raises(RuntimeError):
+        with upstream_timer("test", "call"):
+            raise RuntimeError("down")
+    assert (ok.count, error.count) == (ok_before + 1, error_before + 1)
@@ -0,0 +1,103 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+import minima_async
+from minima_async import AsyncMinimaClient, get_balances
+from minima_stub_server import start_stub_server
+
+
+@pytest.fixture
+def stub():
+    server, url = start_stub_server()
+    yield server, url
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(minima_async.random, "uniform", lambda low, high: 0.0)
+
+
+def run(coroutine_fn, url, **kwargs):
+    async def main():
+        async with AsyncMinimaClient(url, **kwargs) as client:
+            return await coroutine_fn(client)
+    return asyncio.run(main())
+
+
+def test_a_failing_address_only_lands_in_errors(stub):
+    server, url = stub
+    server.fail_addresses.add("Mx02")
+    result = get_balances(["Mx01", "Mx02", "Mx03"], base_url=url)
+    assert sorted(result["results"]) == ["Mx01", "Mx03"]
+    assert result["results"]["Mx01"]["response"][0]["address"] == "Mx01"
+    assert list(result["errors"]) == ["Mx02"]
+    assert "503" in result["errors"]["Mx02"]
+    # The failing GET was retried; the others were asked once.
+    assert server.calls["balance"] == 2 + 3
+
+
+def test_repeated_addresses_are_fetched_once(stub):
+    server, url = stub
+    result = get_balances(["Mx01", "Mx02", "Mx01", "Mx02", "Mx03"], base_url=url)
+    assert list(result["results"]) == ["Mx01", "Mx02", "Mx03"]
+    assert server.calls["balance"] == 3
+
+
+def test_unavailable_gets_are_retried(stub):
+    server, url = stub
+    server.fail_next = 2
+    result = run(lambda client: client.get_balance("Mx01"), url, retries=2)
+    assert result["status"] is True
+    assert server.calls["balance"] == 3
+
+
+def test_posts_are_not_retried_unless_asked(stub):
+    server, url = stub
+    server.fail_next = 1
+    with pytest.raises(aiohttp.ClientResponseError) as e:
+        run(lambda client: client.request("POST", "tokencreate", json={"name": "test"}), url)
+    assert e.value.status == 503
+    assert server.calls["tokencreate"] == 1
+
+    server.fail_next = 1
+    result = run(lambda client: client.request("POST", "tokencreate", json={"name": "test"}, retries=1), url)
+    assert result["response"]["payload"] == {"name": "test"}
+    assert server.calls["tokencreate"] == 3
+
+
+def test_inventory_queries_opt_in_to_retries(stub):
+    server, url = stub
+    server.fail_next = 1
+    result = run(lambda client: client.get_inventory("Mx01"), url)
+    assert result["response"]["payload"] == {"address": "Mx01"}
+    assert server.calls["tokens"] == 2
+
+
+def test_requests_in_flight_are_bounded():
+    server, url = start_stub_server(latency=0.05)
+    try:
+        result = get_balances([f"Mx{i:02d}" for i in range(20)], base_url=url, concurrency=4)
+        assert len(result["results"]) == 20
+        assert server.peak_in_flight == 4
+    finally:
+        server.shutdown()
+
+
+def test_latency_is_recorded_per_endpoint(stub):
+    server, url = stub
+    server.fail_addresses.add("Mx02")
+
+    async def fetch(client):
+        await client.get_balances(["Mx01", "Mx02"])
+        return client.histograms
+
+    histograms = run(fetch, url, retries=1)
+    assert (histograms["balance"].count, histograms["balance"].errors) == (3, 2)
+
+
+def test_requests_need_the_context_manager():
+    with pytest.raises(RuntimeError):
+        asyncio.run(AsyncMinimaClient("http://unused").get_balance())
@@ -0,0 +1,152 @@
+import socket
+
+import pytest
+import requests
+
+import minima_rpc
+import minima_wallet
+from metrics import UPSTREAM_LATENCY
+from minima_rpc import LatencyHistogram, MinimaRPCClient
+from minima_stub_server import start_stub_server
+
+
+@pytest.fixture
+def stub():
+    server, url = start_stub_server()
+    yield server, url
+    server.shutdown()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Records the backoff bounds instead of sleeping."""
+    bounds = []
+
+    def uniform(low, high):
+        bounds.append((low, high))
+        return 0.0
+
+    monkeypatch.setattr(minima_rpc.random, "uniform", uniform)
+    return bounds
+
+
+def closed_port_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+@pytest.mark.parametrize("failures", [1, 2])
+def test_unavailable_responses_are_retried(stub, sleeps, failures):
+    server, url = stub
+    server.fail_next = failures
+    client = MinimaRPCClient(url, retries=2)
+    assert client.get("status")["response"]["chain"]["block"] == 1
+    assert server.calls["status"] == failures + 1
+    stats = client.latency_stats()["status"]
+    assert (stats["count"], stats["errors"]) == (failures + 1, failures)
+    client.close()
+
+
+def test_the_last_unavailable_response_is_raised(stub, sleeps):
+    server, url = stub
+    server.fail_next = 5
+    client = MinimaRPCClient(url, retries=2)
+    with pytest.raises(requests.exceptions.HTTPError) as e:
+        client.get("status")
+    assert e.value.response.status_code == 503
+    assert server.calls["status"] == 3
+    client.close()
+
+
+def test_connection_errors_are_retried(sleeps):
+    client = MinimaRPCClient(closed_port_url(), retries=2, timeout=(0.5, 0.5))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.get("status")
+    assert len(sleeps) == 2
+    assert client.latency_stats()["status"]["errors"] == 3
+    client.close()
+
+
+def test_backoff_is_jittered_and_capped(stub, sleeps):
+    server, url = stub
+    server.fail_next = 4
+    client = MinimaRPCClient(url, retries=4, backoff=0.1, max_backoff=0.3)
+    client.get("status")
+    # A random sleep up to the doubling bound, which stops at max_backoff.
+    assert sleeps == [(0, 0.1), (0, 0.2), (0, 0.3), (0, 0.3)]
+    client.close()
+
+
+def test_backoff_sleeps_are_spread_out(monkeypatch):
+    slept = []
+    monkeypatch.setattr(minima_rpc.time, "sleep", slept.append)
+    client = MinimaRPCClient("http://unused", backoff=1.0, max_backoff=1.0)
+    for _ in range(50):
+        client._sleep_before_retry(0)
+    assert all(0 <= s <= 1.0 for s in slept)
+    assert len(set(slept)) > 40
+    client.close()
+
+
+def test_send_is_never_retried(stub, sleeps, monkeypatch):
+    server, url = stub
+    monkeypatch.setattr(minima_wallet, "MINIMA_API_URL", url)
+    server.fail_next = 1
+    result = minima_wallet.send_transaction("0xRECIPIENT", 5)
+    assert "503" in result["error"]
+    assert server.calls["send"] == 1
+    assert sleeps == []
+
+    assert minima_wallet.send_transaction("0xRECIPIENT", 5)["response"]["amount"] == "5"
+    assert server.calls["send"] == 2
+    minima_rpc._clients.pop(url).close()
+
+
+def test_posts_are_not_retried_unless_asked(stub, sleeps):
+    server, url = stub
+    client = MinimaRPCClient(url, retries=2)
+    server.fail_next = 1
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.post("tokencreate", {"name": "test"})
+    assert server.calls["tokencreate"] == 1
+
+    server.fail_next = 1
+    assert client.post("tokencreate", {"name": "test"}, retries=1)["response"]["payload"] == {"name": "test"}
+    assert server.calls["tokencreate"] == 3
+    client.close()
+
+
+def test_latency_is_recorded_per_endpoint():
+    server, url = start_stub_server(latency=0.03)
+    try:
+        client = MinimaRPCClient(url)
+        ok_before = UPSTREAM_LATENCY.labels("minima", "balance", "ok").count
+        for _ in range(3):
+            client.get("balance")
+        client.get("status")
+        stats = client.latency_stats()
+        assert set(stats) == {"balance", "status"}
+        balance = stats["balance"]
+        assert (balance["count"], balance["errors"]) == (3, 0)
+        assert balance["mean_ms"] >= 30
+        assert balance["p50_ms"] in (50, 100, 250)
+        assert sum(balance["buckets"].values()) == 3
+        assert balance["buckets"]["25"] == 0
+        # Also exported to /metrics.
+        assert UPSTREAM_LATENCY.labels("minima", "balance", "ok").count == ok_before + 3
+        client.close()
+    finally:
+        server.shutdown()
+
+
+def test_histogram_quantiles_are_bucket_bounds():
+    histogram = LatencyHistogram()
+    assert histogram.quantile(0.5) is None
+    for ms in [0.5] * 50 + [7] * 49 + [20_000]:
+        histogram.observe(ms, error=ms > 10_000)
+    assert histogram.quantile(0.5) == 1
+    assert histogram.quantile(0.99) == 10
+    assert histogram.quantile(1.0) == float('inf')
+    stats = histogram.to_dict()
+    assert (stats["count"], stats["errors"], stats["buckets"]["+Inf"]) == (100, 1, 1)
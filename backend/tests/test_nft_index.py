@@ -0,0 +1,148 @@
+import pytest
+
+from minima_nft_index import NFTIndex, NFTIndexFollower, _block, parse_block
+from minima_stub_server import start_stub_server
+
+TOKENS = ["0x" + f"{i:02x}" * 32 for i in range(1, 6)]
+
+
+def mint(token_id, address, supply=1, decimals=0):
+    return {"tokenid": token_id, "address": address,
+            "token": {"name": f"NFT {token_id[:6]}", "description": "", "total_supply": supply,
+                      "token_decimals": decimals}}
+
+
+def extend(blocks, outputs_per_block, fork=""):
+    """Appends blocks that each hold the given outputs, chained onto the last block."""
+    for outputs in outputs_per_block:
+        parent = blocks[-1]["txpowid"] if blocks else None
+        blocks.append(_block(len(blocks) + 1, parent, outputs, fork=fork))
+    return blocks
+
+
+def ownership(index):
+    return {token_id: index.owner_of(token_id) for token_id in TOKENS}
+
+
+def fresh_index(blocks):
+    """Indexes `blocks` from scratch, for comparison with one that followed the reorgs."""
+    index = NFTIndex(":memory:")
+    index.apply_blocks(parse_block(block) for block in blocks)
+    return index
+
+
+@pytest.fixture
+def minima():
+    server, url = start_stub_server()
+    yield server, url
+    server.shutdown()
+
+
+def test_only_single_indivisible_tokens_are_indexed():
+    blocks = extend([], [[mint(TOKENS[0], "MxA"), mint(TOKENS[1], "MxA", supply=100),
+                          mint(TOKENS[2], "MxA", decimals=8), {"tokenid": "0x00", "address": "MxA"}]])
+    index = fresh_index(blocks)
+    assert [nft["tokenid"] for nft in index.inventory("MxA")] == [TOKENS[0]]
+    assert index.counts() == {"tokens": 1, "owners": 1}
+
+
+def test_rewind_restores_owners_and_drops_later_mints():
+    blocks = extend([], [[mint(TOKENS[0], "MxA")], [{"tokenid": TOKENS[0], "address": "MxB"}],
+                         [mint(TOKENS[1], "MxB"), {"tokenid": TOKENS[0], "address": "MxC"}]])
+    index = fresh_index(blocks)
+    assert index.rewind(1)
+    assert index.height() == 1
+    assert ownership(index) == ownership(fresh_index(blocks[:1]))
+    assert index.block_hash(2) is None and index.block_hash(1) == blocks[0]["txpowid"]
+
+
+def test_rewind_past_the_reorg_depth_is_refused():
+    index = NFTIndex(":memory:", reorg_depth=3)
+    blocks = extend([], [[mint(TOKENS[0], "MxA")]] + [[{"tokenid": TOKENS[0], "address": f"Mx{i}"}]
+                                                      for i in range(6)])
+    index.apply_blocks(parse_block(block) for block in blocks)
+    assert not index.rewind(2)
+    assert index.height() == 7 and index.owner_of(TOKENS[0]) == "Mx5"
+    assert index.rewind(4)
+    assert index.owner_of(TOKENS[0]) == "Mx2"
+
+
+def test_follower_indexes_the_chain_in_pages(minima):
+    server, url = minima
+    extend(server.blocks, [[mint(token_id, "MxA")] for token_id in TOKENS])
+    extend(server.blocks, [[{"tokenid": TOKENS[1], "address": "MxB"}], []])
+    index = NFTIndex(":memory:")
+    follower = NFTIndexFollower(index, base_url=url, page_size=2)
+    assert follower.poll_once() == 6
+    assert index.height() == 7
+    assert [nft["tokenid"] for nft in index.inventory("MxB")] == [TOKENS[1]]
+    assert follower.poll_once() == 0
+
+
+def test_a_reorg_that_replaces_the_tip_is_noticed(minima):
+    server, url = minima
+    extend(server.blocks, [[mint(TOKENS[0], "MxA")], [{"tokenid": TOKENS[0], "address": "MxB"}]])
+    index = NFTIndex(":memory:")
+    follower = NFTIndexFollower(index, base_url=url)
+    follower.poll_once()
+    # A fork of the same length: the tip height does not move, only the last block's hash.
+    server.blocks[1:] = extend(server.blocks[:1], [[{"tokenid": TOKENS[0], "address": "MxC"}]], fork="f")[1:]
+    follower.poll_once()
+    assert index.height() == 2
+    assert index.owner_of(TOKENS[0]) == "MxC"
+    assert index.block_hash(2) == server.blocks[1]["txpowid"]
+
+
+def test_a_longer_fork_is_followed_back_to_the_common_block(minima):
+    server, url = minima
+    extend(server.blocks, [[mint(TOKENS[0], "MxA")], [mint(TOKENS[1], "MxA")],
+                           [{"tokenid": TOKENS[0], "address": "MxB"}], [mint(TOKENS[2], "MxB")]])
+    index = NFTIndex(":memory:")
+    follower = NFTIndexFollower(index, base_url=url, page_size=2)
+    follower.poll_once()
+    # Blocks 3 and 4 are replaced by a longer fork from block 2.
+    server.blocks[2:] = extend(server.blocks[:2], [[{"tokenid": TOKENS[1], "address": "MxC"}], [],
+                                                   [mint(TOKENS[3], "MxC")]], fork="f")[2:]
+    follower.poll_once()
+    assert index.height() == 5
+    assert ownership(index) == ownership(fresh_index(server.blocks))
+
+
+def test_a_node_that_rolled_back_below_the_cursor_is_followed_down(minima):
+    server, url = minima
+    extend(server.blocks, [[mint(TOKENS[0], "MxA")], [{"tokenid": TOKENS[0], "address": "MxB"}], []])
+    index = NFTIndex(":memory:")
+    follower = NFTIndexFollower(index, base_url=url)
+    follower.poll_once()
+    del server.blocks[1:]
+    follower.poll_once()
+    assert index.height() == 1
+    assert index.owner_of(TOKENS[0]) == "MxA"
+
+
+def test_a_reorg_deeper_than_the_kept_blocks_rebuilds_the_index(minima):
+    server, url = minima
+    transfers = [[{"tokenid": TOKENS[0], "address": f"Mx{i}"}] for i in range(8)]
+    extend(server.blocks, [[mint(TOKENS[0], "MxA")]] + transfers)
+    index = NFTIndex(":memory:", reorg_depth=3)
+    follower = NFTIndexFollower(index, base_url=url)
+    follower.poll_once()
+    server.blocks[1:] = extend(server.blocks[:1], [[mint(TOKENS[4], "MxF")]] * 9, fork="f")[1:]
+    follower.poll_once()
+    assert index.height() == 10
+    assert ownership(index) == ownership(fresh_index(server.blocks))
+    assert index.owner_of(TOKENS[0]) == "MxA"
+
+
+def test_a_block_the_node_does_not_serve_yet_is_retried(minima):
+    server, url = minima
+    extend(server.blocks, [[mint(TOKENS[0], "MxA")], [mint(TOKENS[1], "MxA")]])
+    missing = server.blocks.pop()
+    server.blocks.append(None)
+    index = NFTIndex(":memory:")
+    follower = NFTIndexFollower(index, base_url=url)
+    assert follower.poll_once() == 1
+    assert index.height() == 1
+    server.blocks[-1] = missing
+    assert follower.poll_once() == 1
+    assert index.height() == 2
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from providers import LazyProvider, ProviderUnavailable
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Factory:
+    """Fails while `error` is set; counts its calls."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return {"instance": self.calls}
+
+
+def test_nothing_is_created_until_first_use():
+    factory = Factory()
+    provider = LazyProvider("Service", factory)
+    assert (factory.calls, provider.status(), provider.peek()) == (0, "not started", None)
+    assert provider.get() is provider.get()
+    assert (factory.calls, provider.status(), provider.initialized) == (1, "ready", True)
+    assert provider.peek() == {"instance": 1}
+
+
+def test_concurrent_first_calls_create_once():
+    created = []
+
+    def slow():
+        time.sleep(0.05)
+        created.append(object())
+        return created[-1]
+
+    provider = LazyProvider("Service", slow)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(provider.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+    assert all(result is created[0] for result in results)
+
+
+def test_a_failure_is_reported_until_the_retry_interval_passes():
+    clock = Clock()
+    factory = Factory(KeyError("FIREBASE_CONFIG"))
+    provider = LazyProvider("Firestore", factory, retry_interval=30, clock=clock)
+    with pytest.raises(ProviderUnavailable) as first:
+        provider.get()
+    assert str(first.value) == "Firestore is unavailable: 'FIREBASE_CONFIG'"
+    assert isinstance(first.value.cause, KeyError)
+    assert provider.status() == "failed"
+
+    clock.now = 29.9
+    with pytest.raises(ProviderUnavailable) as second:
+        provider.get()
+    assert second.value is first.value
+    assert factory.calls == 1
+
+    factory.error = None
+    clock.now = 30.0
+    assert provider.get() == {"instance": 2}
+    assert provider.status() == "ready"
+
+
+def test_a_failure_after_the_interval_is_remembered_again():
+    clock = Clock()
+    factory = Factory(RuntimeError("down"))
+    provider = LazyProvider("Service", factory, retry_interval=10, clock=clock)
+    for now in (0, 5, 10, 15, 20):
+        clock.now = now
+        with pytest.raises(ProviderUnavailable):
+            provider.get()
+    assert factory.calls == 3
+
+
+def test_an_unavailable_dependency_is_passed_through():
+    clock = Clock()
+    firestore = LazyProvider("Firestore", Factory(RuntimeError("no credentials")), clock=clock)
+    dex = LazyProvider("DEX", lambda: {"db": firestore.get()}, clock=clock)
+    with pytest.raises(ProviderUnavailable) as e:
+        dex.get()
+    assert e.value.name == "Firestore"
+    assert dex.status() == "failed"
+
+
+def test_reset_forgets_the_instance_and_the_failure():
+    clock = Clock()
+    factory = Factory(RuntimeError("down"))
+    provider = LazyProvider("Service", factory, retry_interval=60, clock=clock)
+    with pytest.raises(ProviderUnavailable):
+        provider.get()
+    factory.error = None
+    provider.reset()
+    assert provider.status() == "not started"
+    assert provider.get() == {"instance": 2}
+    provider.reset()
+    assert provider.get() == {"instance": 3}
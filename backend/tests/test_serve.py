@@ -0,0 +1,166 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+import requests
+from aiohttp import web
+
+from serve import RoutePolicy, WSGIServer
+
+POLICIES = (
+    RoutePolicy("/stream", "stream", 2, None, streaming=True),
+    RoutePolicy("/slow", "default", 1, 0.3),
+    RoutePolicy("/", "default", 8, 5.0),
+)
+
+
+class GatedApp:
+    """A WSGI app whose /slow requests and stream chunks wait on events the test sets."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.chunk_gate = threading.Event()
+        self.stream_closed = threading.Event()
+
+    def _stream(self):
+        try:
+            yield b"data: first\n\n"
+            # Blocks in next() until the test lets it go, like a stream waiting for an event.
+            self.chunk_gate.wait(10)
+            yield b"data: second\n\n"
+        finally:
+            self.stream_closed.set()
+
+    def __call__(self, environ, start_response):
+        path = environ["PATH_INFO"]
+        if path == "/stream":
+            start_response("200 OK", [("Content-Type", "text/event-stream")])
+            return self._stream()
+        if path == "/slow":
+            self.started.set()
+            self.gate.wait(10)
+        start_response("200 OK", [("Content-Type", "text/plain"), ("Content-Length", "2")])
+        return [b"ok"]
+
+
+class Harness:
+    """Runs a WSGIServer on its own event loop thread, listening on a free local port."""
+
+    def __init__(self, wsgi_app, handler_cancellation=False):
+        self.server = WSGIServer(wsgi_app, policies=POLICIES, pool_sizes={"default": 4, "stream": 4},
+                                 drain_timeout=5.0)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.runner, self.url = self.run(self._start(handler_cancellation))
+
+    async def _start(self, handler_cancellation):
+        application = web.Application()
+        application.router.add_route("*", "/{path:.*}", self.server.handle)
+        runner = web.AppRunner(application, access_log=None, handler_cancellation=handler_cancellation)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = runner.addresses[0][:2]
+        return runner, f"http://{host}:{port}"
+
+    def run(self, coroutine, timeout=10):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def stop(self):
+        self.run(self.runner.cleanup())
+        self.server.close()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def app():
+    app = GatedApp()
+    yield app
+    app.gate.set()
+    app.chunk_gate.set()
+
+
+@pytest.fixture
+def harness(app):
+    harness = Harness(app)
+    yield harness
+    harness.stop()
+
+
+def in_background(url):
+    responses = []
+    thread = threading.Thread(target=lambda: responses.append(requests.get(url, timeout=10)))
+    thread.start()
+    return thread, responses
+
+
+def test_requests_over_the_limit_are_rejected(harness, app):
+    thread, responses = in_background(harness.url + "/slow")
+    app.started.wait(5)
+    busy = requests.get(harness.url + "/slow", timeout=5)
+    assert busy.status_code == 503 and busy.headers["Retry-After"] == "1"
+    # Other routes have their own limit.
+    assert requests.get(harness.url + "/other", timeout=5).text == "ok"
+    app.gate.set()
+    thread.join()
+    assert harness.server.stats()["rejected"]["/slow"] == 1
+
+
+def test_a_timed_out_request_keeps_its_slot_until_the_handler_returns(harness, app):
+    response = requests.get(harness.url + "/slow", timeout=5)
+    assert response.status_code == 504
+    assert harness.server.timeouts == 1
+    assert requests.get(harness.url + "/slow", timeout=5).status_code == 503
+    app.gate.set()
+    wait_for(lambda: harness.server.in_flight() == 0)
+    assert requests.get(harness.url + "/slow", timeout=5).status_code == 200
+
+
+def test_drain_refuses_new_requests_and_waits_for_in_flight_ones(harness, app):
+    thread, responses = in_background(harness.url + "/slow")
+    app.started.wait(5)
+    drained = threading.Thread(target=harness.run, args=(harness.server.drain(),))
+    drained.start()
+    wait_for(lambda: harness.server.draining)
+    refused = requests.get(harness.url + "/other", timeout=5)
+    assert refused.status_code == 503 and refused.json() == {"error": "Server is shutting down"}
+    assert drained.is_alive()
+    app.gate.set()
+    drained.join(5)
+    thread.join()
+    assert not drained.is_alive()
+    assert responses[0].status_code == 200
+
+
+@pytest.mark.parametrize("handler_cancellation", [False, True])
+def test_a_disconnected_stream_returns_its_slot(app, handler_cancellation):
+    harness = Harness(app, handler_cancellation=handler_cancellation)
+    try:
+        host, port = harness.url[len("http://"):].split(":")
+        with socket.create_connection((host, int(port)), timeout=5) as client:
+            client.sendall(b"GET /stream HTTP/1.1\r\nHost: test\r\n\r\n")
+            received = b""
+            while b"data: first" not in received:
+                received += client.recv(4096)
+            assert harness.server.in_flight() == 1
+        # The client is gone while a pool thread is still inside next() on the body.
+        time.sleep(0.2)
+        app.chunk_gate.set()
+        wait_for(app.stream_closed.is_set)
+        wait_for(lambda: harness.server.in_flight() == 0)
+        assert harness.server.stats()["in_flight"]["/stream"] == 0
+    finally:
+        harness.stop()
@@ -0,0 +1,141 @@
+import io
+import json
+import tracemalloc
+
+import pytest
+
+from parse_slither_report import (ReportFormatError, diff_reports, fingerprint, iter_detectors, iter_findings, main,
+                                  summarize_report, write_sarif)
+
+
+def issue(check, impact="High", confidence="Medium", name="f", filename="contracts/A.sol", line=10):
+    return {
+        "check": check, "impact": impact, "confidence": confidence,
+        "description": f"{check} in {name} \"quoted\" \\ {{braces}} [brackets]\n",
+        "elements": [{"type": "function", "name": name,
+                      "source_mapping": {"filename_relative": filename, "lines": [line, line + 1]}}]
+    }
+
+
+def report(detectors, **extra):
+    return {"success": True, "error": None,
+            "results": {"printers": [{"big": "x" * 500, "text": 'say "hi" \\ [{ \\"'}], "detectors": detectors,
+                        "tail": [1.5e10, -2, None]},
+            **extra}
+
+
+def write_report(path, detectors, **extra):
+    path.write_text(json.dumps(report(detectors, **extra), indent=1))
+    return str(path)
+
+
+DETECTORS = [issue("reentrancy-eth"), issue("unused-return", "Medium", name="g", line=3),
+             issue("naming-convention", "Informational", "High", name="h", filename="contracts/B.sol"),
+             {"check": "bare", "impact": "Low", "confidence": "Low", "elements": []}]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 1 << 20])
+def test_streaming_parser_yields_what_json_load_does(chunk_size):
+    text = json.dumps(report(DETECTORS, extra={"nested": [[{"a": "]}"}], -1.25e-3]}))
+    assert list(iter_detectors(io.StringIO(text), chunk_size)) == DETECTORS
+
+
+@pytest.mark.parametrize("text", [
+    '', '[]', '{"results": {"detectors": [{"check": "x"}, }}',
+    '{"results": {"detectors": [{"check": "unterminated}]}}', '{"results": {"detectors": [1, 2'
+])
+def test_malformed_reports_raise_report_format_error(text):
+    with pytest.raises(ReportFormatError):
+        list(iter_detectors(io.StringIO(text), 4))
+
+
+def test_skipping_a_large_section_holds_only_about_a_chunk(tmp_path):
+    # 10 MB of printer output, with escapes, nested brackets in strings and quotes split across chunks.
+    entry = json.dumps({"printer": "p", "text": 'x\\" [{"]} ' * 10 + "y" * 4000, "nested": [[{"a": "}"}]]})
+    path = tmp_path / "report.json"
+    with open(path, "w") as f:
+        f.write('{"success": true, "results": {"printers": [')
+        f.write(",".join([entry] * (10_000_000 // len(entry))))
+        f.write('], "detectors": ' + json.dumps(DETECTORS) + '}, "error": null}')
+    chunk_size = 1 << 16
+    with open(path) as report:
+        tracemalloc.start()
+        try:
+            detectors = list(iter_detectors(report, chunk_size))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    assert detectors == DETECTORS
+    # A str of the chunk is up to 4 bytes per character; the skipped section never accumulates.
+    assert peak < 16 * chunk_size * 4
+
+
+@pytest.mark.parametrize("text", ['{"results": {"printers": [{"a": "b\\"}]}}', '{"results": {"printers": [[1, 2'])
+def test_a_truncated_skipped_section_raises(text):
+    with pytest.raises(ReportFormatError):
+        list(iter_detectors(io.StringIO(text), 3))
+
+
+def test_slither_failure_is_raised():
+    with pytest.raises(ReportFormatError, match="compilation failed"):
+        list(iter_detectors(io.StringIO(json.dumps(report([], error="compilation failed")))))
+
+
+def test_report_without_detectors_yields_nothing():
+    assert list(iter_detectors(io.StringIO('{"success": true, "results": {}}'))) == []
+
+
+def test_fingerprint_ignores_line_numbers():
+    assert fingerprint(issue("reentrancy-eth", line=10)) == fingerprint(issue("reentrancy-eth", line=99))
+    assert fingerprint(issue("reentrancy-eth")) != fingerprint(issue("reentrancy-eth", name="other"))
+
+
+def test_summary_counts_and_filters(tmp_path):
+    path = write_report(tmp_path / "report.json", DETECTORS)
+    summary = summarize_report(path)
+    assert summary["total"] == 4
+    assert list(summary["by_impact"]) == ["High", "Medium", "Low", "Informational"]
+    assert summary["by_file"] == {"contracts/A.sol": 2, "contracts/B.sol": 1, "N/A": 1}
+    assert summarize_report(path, min_impact="Medium")["total"] == 2
+    assert summarize_report(path, min_confidence="High")["by_check"] == {
+        "naming-convention": {"impact": "Informational", "count": 1}}
+
+
+def test_sarif_output_is_valid_json(tmp_path):
+    path = write_report(tmp_path / "report.json", DETECTORS)
+    out = io.StringIO()
+    assert write_sarif(iter_findings(path), out) == 4
+    run = json.loads(out.getvalue())["runs"][0]
+    assert [result["ruleId"] for result in run["results"]] == [d["check"] for d in DETECTORS]
+    assert run["results"][0]["locations"][0]["physicalLocation"]["region"] == {"startLine": 10}
+    assert "region" not in run["results"][3]["locations"][0]["physicalLocation"]
+    assert len(run["tool"]["driver"]["rules"]) == 4
+
+
+def test_diff_reports_new_findings_and_extra_copies(tmp_path):
+    base = write_report(tmp_path / "base.json", DETECTORS[:2])
+    # The known finding moved, and a second copy of another one appeared.
+    head = write_report(tmp_path / "head.json", [issue("reentrancy-eth", line=50), DETECTORS[1], DETECTORS[1],
+                                                 DETECTORS[2]])
+    assert [finding["check"] for finding in diff_reports(base, head)] == ["unused-return", "naming-convention"]
+    assert [finding["check"] for finding in diff_reports(base, head, min_impact="Medium")] == ["unused-return"]
+
+
+def test_diff_command_exit_codes(tmp_path, capsys):
+    base = write_report(tmp_path / "base.json", DETECTORS)
+    head = write_report(tmp_path / "head.json", DETECTORS + [issue("tx-origin", name="z")])
+    assert main(["diff", base, base]) == 0
+    output = tmp_path / "new.jsonl"
+    assert main(["diff", base, head, "--format", "json", "--output", str(output)]) == 1
+    assert [json.loads(line)["check"] for line in output.read_text().splitlines()] == ["tx-origin"]
+    assert main(["diff", base, str(tmp_path / "missing.json")]) == 2
+    (tmp_path / "broken.json").write_text('{"results": {"detectors": [')
+    assert main(["diff", base, str(tmp_path / "broken.json")]) == 2
+    assert "1 new finding(s)." in capsys.readouterr().err
+
+
+def test_print_is_the_default_command(tmp_path, capsys):
+    path = write_report(tmp_path / "report.json", DETECTORS[:1])
+    assert main([path]) == 0
+    out = capsys.readouterr().out
+    assert "Check: reentrancy-eth" in out and "Location: contracts/A.sol:10" in out
@@ -0,0 +1,59 @@
+import io
+import json
+import logging
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+import pytest
+
+from structured_log import get_logger
+
+
+@pytest.fixture
+def log():
+    log = get_logger("test")
+    log._logger.setLevel(logging.INFO)
+    yield log
+    log._logger.setLevel(logging.NOTSET)
+
+
+def captured(fn):
+    out = io.StringIO()
+    with redirect_stdout(out):
+        fn()
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_events_are_json_lines_with_their_fields(log):
+    (entry,) = captured(lambda: log.info("listed", token_id="NFT1", price=2.5))
+    assert entry["level"] == "info"
+    assert entry["logger"] == "primals.test"
+    assert entry["event"] == "listed"
+    assert (entry["token_id"], entry["price"]) == ("NFT1", 2.5)
+    assert isinstance(entry["ts"], float)
+
+
+def test_events_below_the_level_are_dropped(log):
+    entries = captured(lambda: [log.debug("hidden"), log.info("shown"), log.warning("warned"), log.error("failed")])
+    assert [(e["level"], e["event"]) for e in entries] == [("info", "shown"), ("warning", "warned"), ("error", "failed")]
+    assert not log.is_enabled(logging.DEBUG)
+
+    log._logger.setLevel(logging.ERROR)
+    assert [e["event"] for e in captured(lambda: [log.info("shown"), log.error("failed")])] == ["failed"]
+
+
+def test_every_samples_one_in_n_per_event(log):
+    entries = captured(lambda: [log.info(event, every=3, i=i) for i in range(7) for event in ("swap", "bid")])
+    assert [(e["event"], e["i"]) for e in entries] == [
+        ("swap", 0), ("bid", 0), ("swap", 3), ("bid", 3), ("swap", 6), ("bid", 6)]
+    assert all(e["sampled"] == 3 for e in entries)
+
+
+def test_dropped_events_do_not_count_toward_sampling(log):
+    captured(lambda: [log.debug("swap", every=2) for _ in range(5)])
+    assert len(captured(lambda: log.info("swap", every=2))) == 1
+
+
+def test_unserializable_fields_are_written_as_strings(log):
+    (entry,) = captured(lambda: log.info("sold", price=Decimal("2.50")))
+    assert entry["price"] == "2.50"